@@ -0,0 +1,103 @@
+"""
+Benchmark comparing per-packet and batched callback delivery in PacketCapture.
+
+Synthetic frames are pushed through `PacketCapture._process_packet`, the path
+every backend uses, with either a `packet_callback` invoked once per frame or a
+`batch_callback` invoked once per batch. Both callbacks do the same work per
+frame: decode it with `EthernetAnalyzer.analyze_frame` and feed a
+`ConnectionTracker`. The batch callback hoists attribute lookups out of its
+loop, as a batch consumer would; the remaining difference is the per-call
+overhead that batching amortises.
+
+Usage:
+    python benchmarks/bench_batch_callback.py [--frames 50000] [--sizes 1 16 64 256 1024]
+"""
+import argparse
+import time
+
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.packet_capture import PacketCapture
+from tcp_monitor.tracking.tracker import ConnectionTracker
+
+
+def build_frame(src_port, payload_size=512) -> bytes:
+    """Builds an Ethernet/IPv4/TCP frame from the given source port."""
+    ethernet = bytes.fromhex('0242ac110002' '0242ac110003' '0800')
+    total_length = 20 + 20 + payload_size
+    ipv4 = bytes([0x45, 0x00, total_length >> 8, total_length & 0xFF,
+                  0x12, 0x34, 0x40, 0x00, 0x40, 0x06, 0x00, 0x00,
+                  192, 168, 1, 1, 10, 0, 0, 1])
+    tcp = bytes([src_port >> 8, src_port & 0xFF, 0x00, 0x50, 0, 0, 0x03, 0xE8, 0, 0, 0x07, 0xD0,
+                 0x50, 0x18, 0x20, 0x00, 0x00, 0x00, 0x00, 0x00])
+    return ethernet + ipv4 + tcp + b'\x00' * payload_size
+
+
+def callbacks(workload) -> tuple:
+    """Returns the per-packet callback, the batch callback and a result check for a workload."""
+    if workload == 'count':
+        total = [0]
+
+        def count_packet(frame):
+            total[0] += len(frame.data)
+
+        def count_batch(batch):
+            total[0] += sum([len(frame.data) for frame in batch])
+
+        return count_packet, count_batch, lambda: total[0]
+
+    tracker = ConnectionTracker()
+
+    def track_packet(frame):
+        tracker.process_frame(frame.data, frame.timestamp)
+
+    def track_batch(batch):
+        process_frame = tracker.process_frame
+        for frame in batch:
+            process_frame(frame.data, frame.timestamp)
+
+    return track_packet, track_batch, lambda: tracker.packets_processed
+
+
+def run(frames, workload, batch_size=None) -> tuple:
+    """Delivers the frames through PacketCapture and returns the elapsed seconds and result."""
+    packet_callback, batch_callback, result = callbacks(workload)
+    capture = PacketCapture()
+    if batch_size is None:
+        capture.packet_callback = packet_callback
+    else:
+        capture.batch_callback = batch_callback
+        capture.set_batching(batch_size=batch_size, max_delay_ms=1000)
+        capture._start_batcher()
+
+    process_packet = capture._process_packet
+    start = time.perf_counter()
+    for frame in frames:
+        process_packet(frame)
+    if capture._batcher:
+        capture._batcher.stop()
+    return time.perf_counter() - start, result()
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=50000, help='Synthetic frames per run')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 16, 64, 256, 1024],
+                        help='Batch sizes to compare')
+    parser.add_argument('--workload', choices=('count', 'track'), default='count',
+                        help='Work done per frame by the callbacks')
+    args = parser.parse_args()
+
+    frames = [RawFrame(float(i), build_frame(1024 + i % 256)) for i in range(args.frames)]
+    baseline, expected = run(frames, args.workload)
+    print(f"{'per-packet':>12}: {args.frames / baseline:>10,.0f} frames/s "
+          f"({baseline / args.frames * 1e6:.2f} us/frame)")
+    for size in args.sizes:
+        elapsed, result = run(frames, args.workload, size)
+        assert result == expected
+        print(f"{f'batch={size}':>12}: {args.frames / elapsed:>10,.0f} frames/s "
+              f"({elapsed / args.frames * 1e6:.2f} us/frame, {baseline / elapsed:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
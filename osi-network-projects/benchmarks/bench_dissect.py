@@ -0,0 +1,85 @@
+"""
+Benchmark of `dissect` against calling the analyzers by hand.
+
+The manual chain is the one callers wrote before `dissect` existed: run
+`EthernetAnalyzer.analyze_frame`, resolve the VLAN tag and compare
+`ethertype_name`, run `IPAnalyzer.analyze_packet`, compare `protocol_name`,
+then run `TCPAnalyzer.analyze_segment`. `dissect` is timed at each depth, on
+a mix of untagged, 802.1Q tagged and non-IP frames.
+
+Usage:
+    python benchmarks/bench_dissect.py [--frames 20000] [--repeat 5]
+"""
+import argparse
+import timeit
+
+from tcp_monitor.analyzers.dissector import DEPTH_LINK, DEPTH_NETWORK, DEPTH_TRANSPORT, dissect
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+
+
+def build_frames(count) -> list:
+    """Builds TCP frames, one in eight 802.1Q tagged and one in sixteen ARP."""
+    ethernet = bytes.fromhex('0242ac110002' '0242ac110003')
+    ipv4 = bytes([0x45, 0x00, 0x00, 0x2C, 0x12, 0x34, 0x40, 0x00, 0x40, 0x06, 0x00, 0x00,
+                  192, 168, 1, 1, 10, 0, 0, 1])
+    tcp = bytes([0xCE, 0x40, 0x00, 0x50, 0, 0, 0x03, 0xE8, 0, 0, 0x07, 0xD0,
+                 0x50, 0x18, 0x20, 0x00, 0x00, 0x00, 0x00, 0x00]) + b'data'
+    frames = []
+    for i in range(count):
+        if i % 16 == 15:
+            frames.append(ethernet + b'\x08\x06' + bytes(28))
+        elif i % 8 == 7:
+            frames.append(ethernet + b'\x81\x00\x00\x64\x08\x00' + ipv4 + tcp)
+        else:
+            frames.append(ethernet + b'\x08\x00' + ipv4 + tcp)
+    return frames
+
+
+def manual_chain(frame) -> dict:
+    """Decodes a frame by calling the analyzers one after another."""
+    ethernet_info = EthernetAnalyzer.analyze_frame(frame)
+    layers = {'ethernet': ethernet_info}
+    if 'error' in ethernet_info:
+        return layers
+    ip_packet = ethernet_info['payload']
+    if ethernet_info['is_vlan_tagged']:
+        ethertype_name = ethernet_info['inner_ethertype_name']
+        ip_packet = ip_packet[4:]
+    else:
+        ethertype_name = ethernet_info['ethertype_name']
+    if ethertype_name not in ('IPv4', 'IPv6'):
+        return layers
+    ip_info = layers['ip'] = IPAnalyzer.analyze_packet(ip_packet)
+    if 'error' in ip_info or ip_info['protocol_name'] != 'TCP':
+        return layers
+    layers['tcp'] = TCPAnalyzer.analyze_segment(ip_info['payload'])
+    return layers
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000, help='Frames decoded per repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per method')
+    args = parser.parse_args()
+
+    frames = build_frames(args.frames)
+    assert [list(manual_chain(frame)) for frame in frames] == [list(dissect(frame)) for frame in frames]
+    methods = (
+        ('manual chain', manual_chain),
+        ('dissect', lambda frame: dissect(frame, DEPTH_TRANSPORT)),
+        ('depth 2', lambda frame: dissect(frame, DEPTH_NETWORK)),
+        ('depth 1', lambda frame: dissect(frame, DEPTH_LINK)),
+    )
+    baseline = None
+    for name, method in methods:
+        seconds = min(timeit.repeat(lambda: [method(frame) for frame in frames],
+                                    number=1, repeat=args.repeat)) / len(frames)
+        baseline = baseline or seconds
+        print(f"{name:>14}: {seconds * 1e6:6.2f} us/frame, {baseline / seconds:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
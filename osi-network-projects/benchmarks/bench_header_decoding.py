@@ -0,0 +1,66 @@
+"""
+Microbenchmarks of the header decoding of each analyzer.
+
+Times the header decoder of every analyzer on a representative header, in
+isolation from payload handling and from the other layers:
+    - ethernet: `EthernetAnalyzer.analyze_ethernet_header` (untagged and 802.1Q frames);
+    - ipv4 / ipv6: `IPAnalyzer.analyze_ipv4_packet_header` and `analyze_ipv6_packet_header`;
+    - tcp: `TCPAnalyzer.analyze_tcp_header`.
+
+Each decoder is given a `memoryview`, as it is when called through
+`analyze_frame`. The best of several repeats is reported, in nanoseconds per
+header and headers per second.
+
+Usage:
+    python benchmarks/bench_header_decoding.py [--number 200000] [--repeat 5] [--analyzers ethernet tcp]
+"""
+import argparse
+import timeit
+
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+
+ETHERNET_HEADER = bytes.fromhex('0242ac110002' '0242ac110003' '0800')
+VLAN_HEADER = bytes.fromhex('0242ac110002' '0242ac110003' '8100' '0064' '0800')
+IPV4_HEADER = bytes([0x45, 0x00, 0x05, 0xDC, 0x12, 0x34, 0x40, 0x00, 0x40, 0x06, 0xB8, 0x61,
+                     192, 168, 1, 1, 10, 0, 0, 1])
+IPV6_HEADER = bytes.fromhex('60000000' '05b4' '06' '40'
+                            '20010db8000000000000000000000001' '20010db8000000000000000000000002')
+TCP_HEADER = bytes([0xCE, 0x40, 0x00, 0x50, 0, 0, 0x03, 0xE8, 0, 0, 0x07, 0xD0,
+                    0x50, 0x18, 0x20, 0x00, 0x00, 0x00, 0x00, 0x00])
+
+BENCHMARKS = {
+    'ethernet': (EthernetAnalyzer.analyze_ethernet_header, ETHERNET_HEADER),
+    'ethernet-vlan': (EthernetAnalyzer.analyze_ethernet_header, VLAN_HEADER),
+    'ipv4': (IPAnalyzer.analyze_ipv4_packet_header, IPV4_HEADER),
+    'ipv6': (IPAnalyzer.analyze_ipv6_packet_header, IPV6_HEADER),
+    'tcp': (TCPAnalyzer.analyze_tcp_header, TCP_HEADER),
+}
+
+
+def run(decode, header, number, repeat) -> float:
+    """Returns the best time in seconds of one call of a decoder."""
+    view = memoryview(header)
+    timings = timeit.repeat(lambda: decode(view), number=number, repeat=repeat)
+    return min(timings) / number
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000, help='Headers decoded per repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per decoder')
+    parser.add_argument('--analyzers', nargs='+', default=None,
+                        help=f"Benchmarks to run (prefixes of {', '.join(BENCHMARKS)})")
+    args = parser.parse_args()
+
+    for name, (decode, header) in BENCHMARKS.items():
+        if args.analyzers and not any(name.startswith(prefix) for prefix in args.analyzers):
+            continue
+        seconds = run(decode, header, args.number, args.repeat)
+        print(f"{name:>14}: {seconds * 1e9:8.0f} ns/header, {1 / seconds:12,.0f} headers/s")
+
+
+if __name__ == '__main__':
+    main()
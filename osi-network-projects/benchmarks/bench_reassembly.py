@@ -0,0 +1,77 @@
+"""
+Benchmark of `FragmentReassembler` on regular traffic and fragment floods.
+
+Three workloads are timed at growing fragment counts; the time per fragment
+should stay flat as the count grows:
+
+- regular: 1500-byte MTU fragments of 4000-byte TCP segments, the fragments of
+  neighbouring datagrams interleaved and their order shuffled
+- new datagrams: first fragments with a new identification each, which never
+  complete and fill the memory and datagram caps
+- one datagram: fragments of a single datagram, up to `max_fragments`, then the
+  same datagram again once it is dropped
+
+Usage:
+    python benchmarks/bench_reassembly.py [--fragments 20000] [--repeat 5]
+"""
+import argparse
+import random
+import struct
+import timeit
+
+from tcp_monitor.analyzers.reassembly import FragmentReassembler
+
+
+def ipv4_fragment(payload, offset, more_fragments, identification) -> bytes:
+    """Builds an IPv4 fragment of a TCP segment from 192.168.1.1 to 10.0.0.1."""
+    flags_fragment = (0x2000 if more_fragments else 0) | offset // 8
+    return struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(payload), identification & 0xFFFF,
+                       flags_fragment, 64, 6, 0, bytes([192, 168, 1, 1]), bytes([10, 0, 0, 1])) + payload
+
+
+def regular(count) -> list:
+    """Builds fragments of 4000-byte datagrams, shuffled within groups of four datagrams."""
+    payload = bytes(4000)
+    fragments = []
+    for identification in range(0, count // 3 + 1, 4):
+        group = [ipv4_fragment(payload[offset:offset + 1480], offset, offset + 1480 < len(payload),
+                               identification + i)
+                 for i in range(4) for offset in range(0, len(payload), 1480)]
+        random.shuffle(group)
+        fragments += group
+    return fragments[:count]
+
+
+def new_datagrams(count) -> list:
+    """Builds first fragments of datagrams that never complete."""
+    return [ipv4_fragment(bytes(64), 0, True, identification) for identification in range(count)]
+
+
+def one_datagram(count) -> list:
+    """Builds 8-byte fragments of a single datagram."""
+    return [ipv4_fragment(bytes(8), (i % 4096) * 8, True, 1) for i in range(count)]
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fragments', type=int, default=20000, help='Fragments at the smallest count')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per workload')
+    args = parser.parse_args()
+
+    random.seed(0)
+    for name, build in (('regular', regular), ('new datagrams', new_datagrams), ('one datagram', one_datagram)):
+        for scale in (1, 4):
+            fragments = build(args.fragments * scale)
+
+            def run():
+                reassembler = FragmentReassembler()
+                for number, fragment in enumerate(fragments):
+                    reassembler.reassemble_ipv4(fragment, number * 1e-4)
+
+            seconds = min(timeit.repeat(run, number=1, repeat=args.repeat)) / len(fragments)
+            print(f"{name:>14}: {len(fragments):7d} fragments, {seconds * 1e6:6.2f} us/fragment")
+
+
+if __name__ == '__main__':
+    main()
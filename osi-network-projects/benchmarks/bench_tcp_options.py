@@ -0,0 +1,58 @@
+"""
+Benchmark of TCP option parsing with and without the options cache.
+
+Segments carry the option sequences seen on real traffic: Linux SYN options
+(MSS, SACK permitted, timestamps, window scale), bare timestamps on data
+segments, and timestamps with SACK blocks on a few duplicate ACKs. The cached
+`parse_tcp_options` is compared with the same walk run on every segment
+(`parse_tcp_options.__wrapped__`).
+
+Usage:
+    python benchmarks/bench_tcp_options.py [--segments 20000] [--repeat 5]
+"""
+import argparse
+import struct
+import timeit
+
+from tcp_monitor.analyzers.tcp_analyzer import parse_tcp_options
+
+
+def build_options(count) -> list:
+    """Builds option bytes: one SYN in eight, one SACK in sixteen, timestamps otherwise."""
+    syn = b'\x02\x04\x05\xb4\x04\x02\x08\x0a' + struct.pack('!II', 4294967, 0) + b'\x01\x03\x03\x07'
+    options = []
+    for i in range(count):
+        timestamps = b'\x01\x01\x08\x0a' + struct.pack('!II', 1000 + i // 4, 500 + i // 4)
+        if i % 8 == 0:
+            options.append(syn)
+        elif i % 16 == 15:
+            options.append(timestamps + b'\x01\x01\x05\x0a' + struct.pack('!II', i * 1448, i * 1448 + 2896))
+        else:
+            options.append(timestamps)
+    return options
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=20000, help='Option blocks parsed per repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeats per method')
+    args = parser.parse_args()
+
+    options = build_options(args.segments)
+    methods = (
+        ('uncached', parse_tcp_options.__wrapped__),
+        ('cached', parse_tcp_options),
+    )
+    baseline = None
+    for name, method in methods:
+        parse_tcp_options.cache_clear()
+        seconds = min(timeit.repeat(lambda: [method(data) for data in options],
+                                    number=1, repeat=args.repeat)) / len(options)
+        baseline = baseline or seconds
+        print(f"{name:>12}: {seconds * 1e6:6.2f} us/segment, {baseline / seconds:5.2f}x")
+    print(f"{'cache':>12}: {parse_tcp_options.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark of the bytes copied per packet when decoding Ethernet -> IP -> TCP.
+
+Compares the slicing the analyzers used to do, where every layer sliced a
+`bytes` object and so copied the rest of the packet (Ethernet payload, IP
+payload, TCP payload), with the current analyzers, which hand `memoryview`
+slices from layer to layer.
+
+For each path it reports:
+    - copied: payload bytes copied per packet, counted from the type and length
+      of the payload each layer returns (a `bytes` payload is a copy, a view is not);
+    - allocated: bytes allocated per packet as measured by `tracemalloc`, which
+      also includes the result dictionaries and header fields;
+    - the decode rate.
+
+Usage:
+    python benchmarks/bench_zero_copy.py [--frames 20000] [--payload 1460]
+"""
+import argparse
+import time
+import tracemalloc
+
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+
+
+def build_frame(payload_size) -> bytes:
+    """Builds an Ethernet/IPv4/TCP frame with the given payload size."""
+    ethernet = bytes.fromhex('0242ac110002' '0242ac110003' '0800')
+    total_length = 20 + 20 + payload_size
+    ipv4 = bytes([0x45, 0x00, total_length >> 8, total_length & 0xFF,
+                  0x12, 0x34, 0x40, 0x00, 0x40, 0x06, 0x00, 0x00,
+                  192, 168, 1, 1, 10, 0, 0, 1])
+    tcp = bytes([0xCE, 0x40, 0x00, 0x50, 0, 0, 0x03, 0xE8, 0, 0, 0x07, 0xD0,
+                 0x50, 0x18, 0x20, 0x00, 0x00, 0x00, 0x00, 0x00])
+    return ethernet + ipv4 + tcp + b'\x00' * payload_size
+
+
+def copied(payload) -> int:
+    """Returns the number of bytes a layer copied to produce its payload."""
+    return 0 if isinstance(payload, memoryview) else len(payload)
+
+
+def decode_slicing(frame) -> int:
+    """Decodes a frame the way the analyzers used to: one `bytes` slice per layer."""
+    ip_packet = frame[14:]
+    header_length = (ip_packet[0] & 0x0F) * 4
+    segment = ip_packet[header_length:]
+    payload = segment[(segment[12] >> 4) * 4:]
+    return copied(ip_packet) + copied(segment) + copied(payload)
+
+
+def decode_views(frame) -> int:
+    """Decodes a frame with the analyzers, which pass views from layer to layer."""
+    ethernet_info = EthernetAnalyzer.analyze_frame(frame)
+    ip_info = IPAnalyzer.analyze_packet(ethernet_info['payload'])
+    tcp_info = TCPAnalyzer.analyze_segment(ip_info['payload'])
+    return copied(ethernet_info['payload']) + copied(ip_info['payload']) + copied(tcp_info['payload'])
+
+
+def decode_analyzers_on_bytes(frame) -> int:
+    """Runs the analyzers, converting each payload to `bytes` as before the change."""
+    ethernet_info = EthernetAnalyzer.analyze_frame(frame)
+    ip_packet = bytes(ethernet_info['payload'])
+    ip_info = IPAnalyzer.analyze_packet(ip_packet)
+    segment = bytes(ip_info['payload'])
+    tcp_info = TCPAnalyzer.analyze_segment(segment)
+    return len(ip_packet) + len(segment) + len(bytes(tcp_info['payload']))
+
+
+def measure(decode, frames) -> tuple:
+    """Returns the copied bytes, allocated bytes and seconds per frame of a decode path."""
+    sample = frames[:1000]
+    total_copied = sum(decode(frame) for frame in sample)
+
+    # Peak allocation of each decode, including the copies it frees again
+    tracemalloc.start()
+    allocated = 0
+    for frame in sample:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        decode(frame)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for frame in frames:
+        decode(frame)
+    elapsed = time.perf_counter() - start
+    return total_copied / len(sample), allocated / len(sample), elapsed / len(frames)
+
+
+def main() -> None:
+    """Parses command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000, help='Frames decoded per path')
+    parser.add_argument('--payload', type=int, default=1460, help='TCP payload size in bytes')
+    args = parser.parse_args()
+
+    frames = [build_frame(args.payload) for _ in range(args.frames)]
+    print(f"{len(frames[0])}-byte frames ({args.payload}-byte TCP payload)")
+    for name, decode in (('bytes slicing', decode_slicing),
+                         ('analyzers + bytes()', decode_analyzers_on_bytes),
+                         ('analyzers (views)', decode_views)):
+        per_frame_copied, per_frame_allocated, seconds = measure(decode, frames)
+        print(f"{name:>20}: copied {per_frame_copied:>7,.0f} B/packet, "
+              f"allocated {per_frame_allocated:>7,.0f} B/packet, {seconds * 1e6:6.2f} us/packet")
+
+
+if __name__ == '__main__':
+    main()
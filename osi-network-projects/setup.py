@@ -42,8 +42,16 @@ setup(
         "html": [
             "beautifulsoup4>=4.9.3"
         ],
+        "zstd": [
+            "zstandard>=0.15.0"
+        ],
+        "numpy": [
+            "numpy>=1.17"
+        ],
         "full": [
-            "beautifulsoup4>=4.9.3"
+            "beautifulsoup4>=4.9.3",
+            "zstandard>=0.15.0",
+            "numpy>=1.17"
         ]
     },
 
@@ -69,5 +77,5 @@ setup(
         "License :: OSI Approved :: MIT License",
     ],
 
-    python_requires=">=3.7",
+    python_requires=">=3.8",
 )
\ No newline at end of file
@@ -0,0 +1,377 @@
+from ipaddress import IPv6Address
+
+from tcp_monitor.analyzers.ip_analyzer import IPV6_AUTHENTICATION, IPV6_EXTENSION_HEADERS, IPV6_FRAGMENT
+
+# numpy is optional: without it only the per-packet analyzers are available
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = 0x8100
+PROTOCOL_TCP = 6
+# Each extension header appears at most once in a valid chain (Destination Options twice)
+IPV6_MAX_EXTENSION_HEADERS = len(IPV6_EXTENSION_HEADERS) + 1
+
+# One row per frame. Addresses are 16 bytes, IPv4 addresses in their
+# IPv4-mapped IPv6 form (::ffff:a.b.c.d); MAC addresses are 48-bit integers.
+BATCH_FIELDS = [
+    ('length', 'u4'),
+    ('dst_mac', 'u8'),
+    ('src_mac', 'u8'),
+    ('ethertype', 'u2'),
+    ('vlan_id', 'u2'),
+    ('ip_version', 'u1'),
+    ('protocol', 'u1'),
+    ('ttl', 'u1'),
+    ('ip_header_length', 'u2'),
+    ('ip_length', 'u4'),
+    ('is_fragment', '?'),
+    ('src_ip', 'u1', (16,)),
+    ('dst_ip', 'u1', (16,)),
+    ('is_tcp', '?'),
+    ('src_port', 'u2'),
+    ('dst_port', 'u2'),
+    ('seq_num', 'u4'),
+    ('ack_num', 'u4'),
+    ('tcp_flags', 'u1'),
+    ('window_size', 'u2'),
+    ('header_length', 'u1'),
+    ('payload_offset', 'u8'),
+    ('payload_size', 'u4'),
+]
+BATCH_DTYPE = np.dtype(BATCH_FIELDS) if NUMPY_AVAILABLE else None
+
+
+def _require_numpy() -> None:
+    """
+    Checks that numpy can be used.
+
+    Raises:
+        ImportError: If numpy is not installed.
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("Batch analysis requires the numpy package")
+
+
+def _uint(buffer, positions, width, valid):
+    """
+    Reads a big-endian unsigned integer at each position of a byte array.
+
+    Rows that are not valid read 0; their positions may be out of range, but
+    the buffer must hold at least `width` bytes.
+
+    Args:
+        buffer (numpy.ndarray): The packed frames as a uint8 array.
+        positions (numpy.ndarray): The offset of the field in each row.
+        width (int): The field width in bytes (at most 7).
+        valid (numpy.ndarray): A boolean mask of the rows holding the field.
+
+    Returns:
+        numpy.ndarray: The field values as int64.
+    """
+    positions = np.where(valid, positions, 0)
+    if positions.max() + width > len(buffer):
+        positions = np.minimum(positions, len(buffer) - width)
+    value = buffer[positions].astype(np.int64)
+    for i in range(1, width):
+        value = (value << 8) | buffer[positions + i]
+    return np.where(valid, value, 0)
+
+
+def _gather(buffer, positions, width, valid):
+    """
+    Copies `width` bytes at each position of a byte array into a 2-D array.
+
+    Args:
+        buffer (numpy.ndarray): The packed frames as a uint8 array.
+        positions (numpy.ndarray): The offset of the bytes in each row.
+        width (int): The number of bytes per row.
+        valid (numpy.ndarray): A boolean mask of the rows holding the bytes.
+
+    Returns:
+        numpy.ndarray: A `(rows, width)` uint8 array, zero for rows that are not valid.
+    """
+    positions = np.where(valid, positions, 0)
+    if positions.max() + width > len(buffer):
+        positions = np.minimum(positions, len(buffer) - width)
+    block = buffer[positions[:, None] + np.arange(width)]
+    block[~valid] = 0
+    return block
+
+
+class BatchAnalyzer:
+    """
+    Decodes the Ethernet, IP and TCP headers of many frames at once with NumPy.
+
+    The BatchAnalyzer class is the batch counterpart of `EthernetAnalyzer`,
+    `IPAnalyzer` and `TCPAnalyzer` for offline analysis of large captures. It
+    takes frames packed into one buffer, plus the offset (and length) of each
+    frame, and computes every header field for all frames with vectorized
+    array operations, returning one row of a structured array per frame.
+
+    Rows of frames that are not IPv4 or IPv6 have an `ip_version` of 0, and
+    rows of frames that are not complete TCP segments (including IPv4 and IPv6
+    fragments other than unfragmented first ones) have `is_tcp` False; fields
+    of layers a frame does not have are 0. A single 802.1Q tag is skipped.
+    Like `IPAnalyzer`, IPv6 extension headers are walked to the upper-layer
+    protocol (all rows advancing one header per step) and the payload is
+    bounded by the IP length fields, so Ethernet padding is excluded.
+
+    Flow grouping and statistics then run as array operations, e.g. the bytes
+    sent per connection are `numpy.bincount(ids, weights=decoded['payload_size'])`
+    with `ids` from `flow_ids`.
+
+    Requires numpy (the "numpy" extra).
+
+    Methods:
+        pack_frames(frames) -> tuple:
+            Packs frames into one buffer and returns it with the frame offsets and lengths.
+
+        analyze_batch(buffer, offsets, lengths=None) -> numpy.ndarray:
+            Decodes the headers of the packed frames into a structured array.
+
+        flow_ids(decoded) -> tuple:
+            Numbers the TCP connections of decoded frames, both directions alike.
+
+        format_address(address) -> str:
+            Formats an address column value as an IPv4 or IPv6 address string.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes an instance of the BatchAnalyzer class.
+
+        Since this class contains only static methods, this initializer
+        does not perform any specific setup or hold any instance-specific
+        data. It exists for potential extension or instantiation needs.
+        """
+        pass
+
+    @staticmethod
+    def pack_frames(frames) -> tuple:
+        """
+        Packs frames into one contiguous buffer.
+
+        Args:
+            frames (iterable): Frames as bytes-like objects or `RawFrame`s.
+
+        Returns:
+            tuple: `(buffer, offsets, lengths)` where `buffer` is a bytes object and
+            `offsets` and `lengths` are int64 arrays, ready for `analyze_batch`.
+
+        Raises:
+            ImportError: If numpy is not installed.
+        """
+        _require_numpy()
+        chunks = [getattr(frame, 'data', frame) for frame in frames]
+        lengths = np.fromiter((len(chunk) for chunk in chunks), dtype=np.int64, count=len(chunks))
+        offsets = np.zeros(len(chunks), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        return b''.join(chunks), offsets, lengths
+
+    @staticmethod
+    def analyze_batch(buffer, offsets, lengths=None):
+        """
+        Decodes the headers of packed frames into a structured array.
+
+        Args:
+            buffer (bytes-like or numpy.ndarray): The packed frames. It is read, never copied.
+            offsets (array-like of int): The offset of each frame in the buffer.
+            lengths (array-like of int, optional): The length of each frame. Defaults
+                to the distance to the next offset, and to the end of the buffer
+                for the last frame (so offsets must be increasing).
+
+        Returns:
+            numpy.ndarray: An array of `BATCH_DTYPE` with one row per frame:
+                - length: The captured length of the frame.
+                - dst_mac, src_mac: The MAC addresses as 48-bit integers.
+                - ethertype: The outer Ethertype, as `EthernetAnalyzer` reports it.
+                - vlan_id: The VLAN identifier of a tagged frame (low 12 bits of the tag).
+                - ip_version: 4, 6, or 0 for frames that are not IP.
+                - protocol: The IPv4 protocol, or the IPv6 upper-layer protocol after the
+                  extension headers.
+                - ttl: The IPv4 TTL or IPv6 hop limit.
+                - ip_header_length: The IP header length in bytes, IPv6 extension headers included.
+                - ip_length: The IP packet length (IPv4 total length, IPv6 40 + payload length).
+                - is_fragment: Whether the packet is a fragment (MF set or non-zero offset, in
+                  the IPv4 header or an IPv6 Fragment header).
+                - src_ip, dst_ip: 16-byte addresses, IPv4 ones IPv4-mapped (see `format_address`).
+                - is_tcp: Whether the frame holds a complete TCP header.
+                - src_port, dst_port, seq_num, ack_num, window_size: The TCP fields.
+                - tcp_flags: The TCP control bits (`TCP_SYN`, `TCP_ACK`... masks).
+                - header_length: The TCP header length in bytes.
+                - payload_offset: The offset of the TCP payload in the buffer.
+                - payload_size: The TCP payload size in bytes.
+
+        Raises:
+            ImportError: If numpy is not installed.
+            ValueError: If offsets and lengths differ in size or a frame exceeds the buffer.
+        """
+        _require_numpy()
+        data = buffer if isinstance(buffer, np.ndarray) else np.frombuffer(buffer, dtype=np.uint8)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if lengths is None:
+            lengths = np.diff(offsets, append=len(data))
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if offsets.shape != lengths.shape:
+            raise ValueError("Offsets and lengths must have the same size.")
+        if len(offsets) and (np.any(offsets < 0) or np.any(lengths < 0)
+                             or np.any(offsets + lengths > len(data))):
+            raise ValueError("Frames must lie within the buffer.")
+
+        decoded = np.zeros(len(offsets), dtype=BATCH_DTYPE)
+        decoded['length'] = lengths
+        if not len(offsets):
+            return decoded
+        if len(data) < 64:
+            # Every field read, even masked out, must lie within the buffer
+            data = np.concatenate([data, np.zeros(64, dtype=np.uint8)])
+        ends = offsets + lengths
+
+        # Ethernet, skipping a single 802.1Q tag
+        is_ethernet = lengths >= 14
+        decoded['dst_mac'] = _uint(data, offsets, 6, is_ethernet)
+        decoded['src_mac'] = _uint(data, offsets + 6, 6, is_ethernet)
+        ethertype = _uint(data, offsets + 12, 2, is_ethernet)
+        decoded['ethertype'] = ethertype
+        is_vlan = is_ethernet & (ethertype == ETHERTYPE_VLAN) & (lengths >= 18)
+        decoded['vlan_id'] = _uint(data, offsets + 14, 2, is_vlan) & 0x0FFF
+        network_type = np.where(is_vlan, _uint(data, offsets + 16, 2, is_vlan), ethertype)
+        network = offsets + np.where(is_vlan, 18, 14)
+
+        # IP
+        available = ends - network
+        first = _uint(data, network, 1, available >= 1)
+        is_ipv4 = (network_type == ETHERTYPE_IPV4) & (available >= 20) & (first >> 4 == 4)
+        is_ipv6 = (network_type == ETHERTYPE_IPV6) & (available >= 40) & (first >> 4 == 6)
+        header_length = np.where(is_ipv4, (first & 0x0F) * 4, np.where(is_ipv6, 40, 0))
+        is_ipv4 &= header_length >= 20
+        is_ip = is_ipv4 | is_ipv6
+        decoded['ip_version'] = np.where(is_ipv4, 4, np.where(is_ipv6, 6, 0))
+        protocol = _uint(data, network + np.where(is_ipv4, 9, 6), 1, is_ip)
+        decoded['ttl'] = _uint(data, network + np.where(is_ipv4, 8, 7), 1, is_ip)
+        ip_length = np.where(is_ipv4, _uint(data, network + 2, 2, is_ipv4),
+                             40 + _uint(data, network + 4, 2, is_ipv6))
+        decoded['ip_length'] = np.where(is_ip, ip_length, 0)
+        fragment = _uint(data, network + 6, 2, is_ipv4)
+        is_fragment = (fragment & 0x3FFF) != 0
+        # IPv4 fragments other than the first hold no TCP header
+        partial = (fragment & 0x1FFF) != 0
+
+        # IPv6 extension headers, one header of every walking row per step, as in `walk_ipv6_extension_headers`
+        extension_headers = np.array(sorted(IPV6_EXTENSION_HEADERS))
+        walking = is_ipv6 & np.isin(protocol, extension_headers)
+        for _ in range(IPV6_MAX_EXTENSION_HEADERS):
+            if not walking.any():
+                break
+            position = network + header_length
+            is_complete = walking & (ends - position >= 8)
+            partial |= walking & ~is_complete
+            walking = is_complete
+            is_fragment_header = walking & (protocol == IPV6_FRAGMENT)
+            length_field = _uint(data, position + 1, 1, walking)
+            length = np.where(is_fragment_header, 8, np.where(protocol == IPV6_AUTHENTICATION,
+                                                              (length_field + 2) * 4, (length_field + 1) * 8))
+            is_complete = walking & (position + length <= ends)
+            partial |= walking & ~is_complete
+            walking = is_complete
+            # Fragment offset (high 13 bits) or More Fragments (low bit); atomic fragments are walked through
+            fragmented = walking & is_fragment_header & ((_uint(data, position + 2, 2, walking) & 0xFFF9) != 0)
+            is_fragment |= fragmented
+            partial |= fragmented
+            protocol = np.where(walking, _uint(data, position, 1, walking), protocol)
+            header_length = np.where(walking, header_length + length, header_length)
+            walking &= ~fragmented & np.isin(protocol, extension_headers)
+        partial |= walking
+        decoded['protocol'] = protocol
+        decoded['ip_header_length'] = np.where(is_ip, header_length, 0)
+        decoded['is_fragment'] = is_fragment
+
+        src_ip = np.zeros((len(offsets), 16), dtype=np.uint8)
+        dst_ip = np.zeros((len(offsets), 16), dtype=np.uint8)
+        src_ip[is_ipv4, 10:12] = 0xFF
+        dst_ip[is_ipv4, 10:12] = 0xFF
+        src_ip[is_ipv4, 12:] = _gather(data, network + 12, 4, is_ipv4)[is_ipv4]
+        dst_ip[is_ipv4, 12:] = _gather(data, network + 16, 4, is_ipv4)[is_ipv4]
+        src_ip[is_ipv6] = _gather(data, network + 8, 16, is_ipv6)[is_ipv6]
+        dst_ip[is_ipv6] = _gather(data, network + 24, 16, is_ipv6)[is_ipv6]
+        decoded['src_ip'] = src_ip
+        decoded['dst_ip'] = dst_ip
+
+        # The IP packet ends at its length field unless that is inconsistent or truncated
+        ip_end = network + ip_length
+        ip_end = np.where((ip_length >= header_length) & (ip_end <= ends) & (ip_length > 0), ip_end, ends)
+
+        # TCP, in unfragmented packets and first IPv4 fragments
+        transport = network + header_length
+        is_tcp = is_ip & (protocol == PROTOCOL_TCP) & ~partial & (ip_end - transport >= 20)
+        decoded['is_tcp'] = is_tcp
+        decoded['src_port'] = _uint(data, transport, 2, is_tcp)
+        decoded['dst_port'] = _uint(data, transport + 2, 2, is_tcp)
+        decoded['seq_num'] = _uint(data, transport + 4, 4, is_tcp)
+        decoded['ack_num'] = _uint(data, transport + 8, 4, is_tcp)
+        tcp_header_length = (_uint(data, transport + 12, 1, is_tcp) >> 4) * 4
+        decoded['tcp_flags'] = _uint(data, transport + 13, 1, is_tcp) & 0x3F
+        decoded['window_size'] = _uint(data, transport + 14, 2, is_tcp)
+        decoded['header_length'] = tcp_header_length
+        payload_offset = np.minimum(transport + tcp_header_length, ip_end)
+        decoded['payload_offset'] = np.where(is_tcp, payload_offset, 0)
+        decoded['payload_size'] = np.where(is_tcp, ip_end - payload_offset, 0)
+        return decoded
+
+    @staticmethod
+    def flow_ids(decoded) -> tuple:
+        """
+        Numbers the TCP connections of decoded frames.
+
+        Both directions of a connection get the same number, as with `flow_key`.
+
+        Args:
+            decoded (numpy.ndarray): The result of `analyze_batch`.
+
+        Returns:
+            tuple: `(ids, count)` where `ids` is an int64 array holding the connection
+            number of each frame (-1 for frames that are not TCP) and `count` is the
+            number of connections.
+
+        Raises:
+            ImportError: If numpy is not installed.
+        """
+        _require_numpy()
+        is_tcp = decoded['is_tcp']
+        tcp = decoded[is_tcp]
+        src = np.concatenate([tcp['src_ip'], tcp['src_port'].astype('>u2')[:, None].view(np.uint8)], axis=1)
+        dst = np.concatenate([tcp['dst_ip'], tcp['dst_port'].astype('>u2')[:, None].view(np.uint8)], axis=1)
+
+        # Order the endpoints of each row: swap where the source sorts after the destination
+        differs = src != dst
+        first_difference = np.argmax(differs, axis=1)
+        rows = np.arange(len(tcp))
+        swap = differs[rows, first_difference] & (src[rows, first_difference] > dst[rows, first_difference])
+        low = np.where(swap[:, None], dst, src)
+        high = np.where(swap[:, None], src, dst)
+        keys = np.ascontiguousarray(np.concatenate([low, high], axis=1)).view(np.dtype((np.void, 36))).ravel()
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        ids = np.full(len(decoded), -1, dtype=np.int64)
+        ids[is_tcp] = inverse.ravel()
+        return ids, len(unique_keys)
+
+    @staticmethod
+    def format_address(address) -> str:
+        """
+        Formats a value of the `src_ip` or `dst_ip` column.
+
+        Args:
+            address (numpy.ndarray or bytes): A 16-byte address.
+
+        Returns:
+            str: The IPv4 address for IPv4-mapped addresses, the IPv6 address otherwise.
+        """
+        address = IPv6Address(bytes(address))
+        mapped = address.ipv4_mapped
+        return str(mapped) if mapped is not None else str(address)
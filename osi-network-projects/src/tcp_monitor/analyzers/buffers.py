@@ -0,0 +1,17 @@
+def as_view(data) -> memoryview:
+    """
+    Wraps packet data in a byte-oriented `memoryview` without copying it.
+
+    Slicing the returned view yields further views of the same buffer, which is
+    how the analyzers hand payloads from one layer to the next without copying
+    the packet bytes.
+
+    Args:
+        data (bytes, bytearray or memoryview): The packet data.
+
+    Returns:
+        memoryview: A view of `data` with one-byte items (`data` itself if it already is one).
+    """
+    if isinstance(data, memoryview):
+        return data if data.format == 'B' else data.cast('B')
+    return memoryview(data)
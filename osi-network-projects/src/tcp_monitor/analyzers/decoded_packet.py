@@ -0,0 +1,277 @@
+from ipaddress import IPv6Address
+from socket import inet_ntoa
+
+from tcp_monitor.analyzers.buffers import as_view
+from tcp_monitor.analyzers.dissector import dissect
+from tcp_monitor.analyzers.ethernet_analyzer import ETHERNET_HEADER, VLAN_TAG
+from tcp_monitor.analyzers.ip_analyzer import (IP_FLAG_MF, IP_FLAG_RESERVED, IP_FRAGMENT_OFFSET_MASK,
+                                               IPV4_HEADER, IPV6_EXTENSION_HEADERS, IPV6_HEADER,
+                                               walk_ipv6_extension_headers)
+from tcp_monitor.analyzers.tcp_analyzer import (TCP_ACK, TCP_FIN, TCP_HEADER, TCP_PSH, TCP_RST, TCP_SYN, TCP_URG,
+                                                parse_tcp_options)
+
+
+class DecodedPacket:
+    """
+    A lazily decoded view of an Ethernet frame carrying IP and TCP.
+
+    The `DecodedPacket` class wraps a frame buffer without copying it and
+    decodes fields on first access, caching them in slots. The fixed Ethernet,
+    IP and TCP headers are unpacked together, with the analyzers' precompiled
+    structs, when any of their fields is first read; derived values (MAC and
+    IP address strings, the flags dictionary, TCP options, the payload view)
+    are only built when they are read. A consumer that only reads ports and
+    flags therefore never formats MAC or IPv6 addresses or parses options, and
+    no per-layer dictionaries are allocated.
+
+    Fields of a layer the frame does not have are None (0 for `ip_version`).
+    Frames are decoded as `EthernetAnalyzer`, `IPAnalyzer` and `TCPAnalyzer`
+    would, skipping a single 802.1Q tag; `to_dict` returns their dictionaries
+    as `dissect` does.
+
+    Attributes:
+        frame (memoryview): The frame. Payload views share its buffer.
+        dst_mac, src_mac (str): The MAC addresses.
+        ethertype (int): The outer Ethertype.
+        vlan_id (int): The 802.1Q tag, or None for untagged frames.
+        ip_offset (int): The offset of the network layer header in the frame.
+        ip_version (int): 4, 6, or 0 if the frame is not a valid IP packet.
+        protocol (int): The IPv4 protocol or the IPv6 upper-layer protocol, after any
+            extension headers.
+        ttl (int): The IPv4 TTL or IPv6 hop limit.
+        src_ip, dst_ip (str): The IP addresses.
+        is_fragment (bool): Whether the More Fragments flag (IPv6: M flag) is set.
+        fragment_offset (int): The fragment offset in bytes.
+        is_tcp (bool): Whether the frame holds a TCP segment. Fragments do not, as
+            their payload only decodes once reassembled.
+        src_port, dst_port, seq_num, ack_num, window_size, checksum, urgent_ptr (int):
+            The TCP header fields.
+        tcp_flags (int): The TCP control bits (`TCP_SYN`, `TCP_ACK`... masks).
+        flags (dict): The control bits as `TCPAnalyzer` returns them.
+        header_length (int): The TCP header length in bytes.
+        tcp_options (TCPOptions): The typed TCP option values, from `parse_tcp_options`.
+        payload (memoryview): The TCP payload, a view of the frame.
+        payload_size (int): The TCP payload size in bytes.
+
+    Methods:
+        to_dict() -> dict:
+            Returns the analyzers' dictionaries for each layer of the frame.
+    """
+    __slots__ = (
+        'frame',
+        # Ethernet layer
+        'ethertype', 'vlan_id', '_macs', 'ip_offset',
+        'dst_mac', 'src_mac',
+        # IP layer
+        'ip_version', 'protocol', 'ttl', 'is_fragment', 'fragment_offset', '_addresses', '_segment', '_ip_end',
+        'src_ip', 'dst_ip',
+        # TCP layer
+        'is_tcp', 'src_port', 'dst_port', 'seq_num', 'ack_num', 'tcp_flags', 'window_size', 'checksum',
+        'urgent_ptr', 'header_length', 'payload_size',
+        'flags', 'tcp_options', 'payload',
+    )
+
+    def __init__(self, frame) -> None:
+        """
+        Wraps a frame. Nothing is decoded until a field is read.
+
+        Args:
+            frame (bytes, bytearray or memoryview): The raw Ethernet frame.
+        """
+        self.frame = as_view(frame)
+
+    def __getattr__(self, name):
+        """
+        Decodes the layer holding a field on its first access.
+
+        Python only calls this method for slots that are still unset, so once a
+        layer is decoded its fields are read directly from their slots.
+
+        Args:
+            name (str): The field name.
+
+        Returns:
+            The field value.
+
+        Raises:
+            AttributeError: If the name is not a field.
+        """
+        decoder = _DECODERS.get(name)
+        if decoder is None:
+            raise AttributeError(f"'DecodedPacket' object has no attribute '{name}'")
+        decoder(self)
+        return object.__getattribute__(self, name)
+
+    def _decode_headers(self) -> None:
+        """
+        Unpacks the fixed Ethernet, IP and TCP headers in one pass.
+
+        A single 802.1Q tag is skipped, and the IP payload is bounded as in
+        `IPAnalyzer.analyze_packet_payload`.
+        """
+        frame = self.frame
+        size = len(frame)
+
+        # Ethernet
+        if size < ETHERNET_HEADER.size:
+            self.ethertype = self.vlan_id = self._macs = self.ip_offset = None
+            return self._no_ip()
+        dst_mac, src_mac, ethertype = ETHERNET_HEADER.unpack_from(frame)
+        self.ethertype = network_type = ethertype
+        self._macs = (dst_mac, src_mac)
+        start = ETHERNET_HEADER.size
+        if ethertype == 0x8100 and size >= start + VLAN_TAG.size:
+            self.vlan_id, network_type = VLAN_TAG.unpack_from(frame, start)
+            start += VLAN_TAG.size
+        else:
+            self.vlan_id = None
+        self.ip_offset = start
+
+        # IP
+        available = size - start
+        if network_type not in (0x0800, 0x86dd) or available < 20:
+            return self._no_ip()
+        version = frame[start] >> 4
+        if version == 4:
+            version_ihl, _, total_length, _, flags_fragment, ttl, protocol, _, src, dst = \
+                IPV4_HEADER.unpack_from(frame, start)
+            if flags_fragment & IP_FLAG_RESERVED:
+                return self._no_ip()
+            header_length = (version_ihl & 0x0F) * 4
+            end = total_length if header_length <= total_length <= available else available
+            self.is_fragment = bool(flags_fragment & IP_FLAG_MF)
+            self.fragment_offset = (flags_fragment & IP_FRAGMENT_OFFSET_MASK) * 8
+            # A fragment only holds part of the segment, which decodes once reassembled
+            partial = flags_fragment & (IP_FLAG_MF | IP_FRAGMENT_OFFSET_MASK)
+            segment = start + min(header_length, end)
+        elif version == 6 and available >= IPV6_HEADER.size:
+            _, payload_length, protocol, ttl, src, dst = IPV6_HEADER.unpack_from(frame, start)
+            end = 40 + payload_length
+            end = end if 40 < end <= available else available
+            self.is_fragment, self.fragment_offset = False, 0
+            partial = False
+            header_length = IPV6_HEADER.size
+            if protocol in IPV6_EXTENSION_HEADERS:
+                try:
+                    protocol, header_length, _, fragment = \
+                        walk_ipv6_extension_headers(frame[start:start + end], protocol)
+                except ValueError:
+                    partial = True
+                else:
+                    if fragment is not None:
+                        self.is_fragment, self.fragment_offset = fragment.more_fragments, fragment.offset
+                        partial = fragment.more_fragments or fragment.offset
+            segment = start + header_length
+        else:
+            return self._no_ip()
+        end += start
+        self.ip_version, self.protocol, self.ttl = version, protocol, ttl
+        self._addresses = (src, dst)
+        self._segment = segment
+        self._ip_end = end
+
+        # TCP
+        if protocol != 6 or partial or end - segment < TCP_HEADER.size:
+            return self._no_tcp()
+        (self.src_port, self.dst_port, self.seq_num, self.ack_num, offset, flags,
+         self.window_size, self.checksum, self.urgent_ptr) = TCP_HEADER.unpack_from(frame, segment)
+        self.is_tcp = True
+        self.tcp_flags = flags & 0x3F
+        self.header_length = header_length = (offset >> 4) * 4
+        self.payload_size = max(end - segment - header_length, 0)
+
+    def _no_ip(self) -> None:
+        """Sets the IP and TCP fields of a frame that is not a valid IP packet."""
+        self.ip_version = 0
+        self.protocol = self.ttl = self.is_fragment = self.fragment_offset = self._addresses = None
+        self._segment = self._ip_end = 0
+        self._no_tcp()
+
+    def _no_tcp(self) -> None:
+        """Sets the TCP fields of a packet that is not a TCP segment."""
+        self.is_tcp = False
+        self.src_port = self.dst_port = self.seq_num = self.ack_num = self.tcp_flags = None
+        self.window_size = self.checksum = self.urgent_ptr = self.header_length = self.payload_size = None
+
+    def _decode_macs(self) -> None:
+        """Formats the MAC addresses."""
+        macs = self._macs
+        self.dst_mac, self.src_mac = (macs[0].hex(':'), macs[1].hex(':')) if macs else (None, None)
+
+    def _decode_addresses(self) -> None:
+        """Formats the IP addresses."""
+        addresses = self._addresses
+        if addresses is None:
+            self.src_ip = self.dst_ip = None
+        elif self.ip_version == 4:
+            self.src_ip, self.dst_ip = inet_ntoa(addresses[0]), inet_ntoa(addresses[1])
+        else:
+            self.src_ip, self.dst_ip = IPv6Address(addresses[0]).__str__(), IPv6Address(addresses[1]).__str__()
+
+    def _decode_flags(self) -> None:
+        """Builds the flags dictionary of `TCPAnalyzer.analyze_tcp_header`."""
+        bits = self.tcp_flags
+        self.flags = None if bits is None else _FLAG_DICTS[bits].copy()
+
+    def _decode_options(self) -> None:
+        """Parses the TCP options, which `parse_tcp_options` caches by their bytes."""
+        if self.is_tcp:
+            start = self._segment + TCP_HEADER.size
+            end = min(self._segment + self.header_length, self._ip_end)
+            self.tcp_options = parse_tcp_options(bytes(self.frame[start:end]))
+        else:
+            self.tcp_options = None
+
+    def _decode_payload(self) -> None:
+        """Slices the TCP payload out of the frame."""
+        if self.is_tcp:
+            self.payload = self.frame[self._segment + self.header_length:self._ip_end]
+        else:
+            self.payload = None
+
+    def to_dict(self) -> dict:
+        """
+        Returns the analyzers' dictionaries for the layers of the frame.
+
+        Each layer is decoded by its analyzer through `dissect`, so the
+        dictionaries hold every field (including IP options and Ethertype
+        names) exactly as before.
+
+        Returns:
+            dict: `{'ethernet': ..., 'ip': ..., 'tcp': ...}` as returned by `dissect`.
+        """
+        return dissect(self.frame)
+
+    def __repr__(self) -> str:
+        """Returns a short description of the packet, decoding only what it shows."""
+        if self.is_tcp:
+            return (f"DecodedPacket({self.src_ip}:{self.src_port} -> {self.dst_ip}:{self.dst_port}, "
+                    f"{self.payload_size} bytes)")
+        return f"DecodedPacket({len(self.frame)} bytes)"
+
+
+# Flags dictionary of each combination of the six control bits
+_FLAG_DICTS = [{
+    'urg': bool(bits & TCP_URG),
+    'ack': bool(bits & TCP_ACK),
+    'psh': bool(bits & TCP_PSH),
+    'rst': bool(bits & TCP_RST),
+    'syn': bool(bits & TCP_SYN),
+    'fin': bool(bits & TCP_FIN)
+} for bits in range(64)]
+
+# Field -> method decoding it (and the other fields decoded with it)
+_DECODERS = {}
+for _decoder, _fields in (
+        (DecodedPacket._decode_headers, ('ethertype', 'vlan_id', '_macs', 'ip_offset',
+                                         'ip_version', 'protocol', 'ttl', 'is_fragment', 'fragment_offset',
+                                         '_addresses', '_segment', '_ip_end',
+                                         'is_tcp', 'src_port', 'dst_port', 'seq_num', 'ack_num', 'tcp_flags',
+                                         'window_size', 'checksum', 'urgent_ptr', 'header_length',
+                                         'payload_size')),
+        (DecodedPacket._decode_macs, ('dst_mac', 'src_mac')),
+        (DecodedPacket._decode_addresses, ('src_ip', 'dst_ip')),
+        (DecodedPacket._decode_flags, ('flags',)),
+        (DecodedPacket._decode_options, ('tcp_options',)),
+        (DecodedPacket._decode_payload, ('payload',))):
+    _DECODERS.update(dict.fromkeys(_fields, _decoder))
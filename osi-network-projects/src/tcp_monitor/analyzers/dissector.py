@@ -0,0 +1,103 @@
+import struct
+
+from tcp_monitor.analyzers.buffers import as_view
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+
+# Depths accepted by `dissect`
+DEPTH_LINK = 1
+DEPTH_NETWORK = 2
+DEPTH_TRANSPORT = 3
+
+# Ethertype -> (layer name, analyzer) for the network layer
+ETHERTYPE_DISSECTORS = {
+    0x0800: ('ip', IPAnalyzer.analyze_packet),
+    0x86dd: ('ip', IPAnalyzer.analyze_packet),
+}
+# IP protocol (IPv6 next header) -> (layer name, analyzer) for the transport layer
+IP_PROTOCOL_DISSECTORS = {
+    6: ('tcp', TCPAnalyzer.analyze_segment),
+}
+
+VLAN_ETHERTYPE = 0x8100
+VLAN_TAG_LENGTH = 4
+
+
+def dissect(frame, depth=DEPTH_TRANSPORT) -> dict:
+    """
+    Decodes an Ethernet frame layer by layer, down to the transport layer.
+
+    The frame is walked in one pass: each layer's analyzer runs on a view of
+    the previous layer's payload, and the next analyzer is looked up in
+    `ETHERTYPE_DISSECTORS` (by Ethertype, the inner one for 802.1Q tagged
+    frames) or `IP_PROTOCOL_DISSECTORS` (by IP protocol). Dissection stops at
+    the requested depth, at a protocol without a dissector, at an IP fragment
+    (whose payload is only part of a segment, see `FragmentReassembler`), or
+    at a layer that fails to decode, whose dictionary then holds an 'error'
+    key. The transport layer of IPv6 packets is found after their extension
+    headers.
+
+    Args:
+        frame (bytes, bytearray or memoryview): The raw Ethernet frame.
+        depth (int, optional): The number of layers to decode: `DEPTH_LINK` (1),
+            `DEPTH_NETWORK` (2) or `DEPTH_TRANSPORT` (3). Default is `DEPTH_TRANSPORT`.
+
+    Returns:
+        dict: The decoded layers in order, keyed by layer name ('ethernet', 'ip', 'tcp'),
+        each holding its analyzer's dictionary.
+
+    Raises:
+        ValueError: If the depth is not between 1 and 3.
+    """
+    if not DEPTH_LINK <= depth <= DEPTH_TRANSPORT:
+        raise ValueError(f"Dissection depth must be between {DEPTH_LINK} and {DEPTH_TRANSPORT}.")
+
+    try:
+        ethernet_info = EthernetAnalyzer.analyze_frame(as_view(frame))
+    except struct.error:
+        # A VLAN tag cut off by the end of the frame
+        ethernet_info = {'error': 'Frame too short to hold its VLAN tag'}
+    layers = {'ethernet': ethernet_info}
+    if depth == DEPTH_LINK or 'error' in ethernet_info:
+        return layers
+
+    payload = ethernet_info['payload']
+    ethertype = ethernet_info['ethertype']
+    if ethertype == VLAN_ETHERTYPE:
+        ethertype = ethernet_info['inner_ethertype']
+        payload = payload[VLAN_TAG_LENGTH:]
+    dissector = ETHERTYPE_DISSECTORS.get(ethertype)
+    if dissector is None:
+        return layers
+    name, analyze = dissector
+    network_info = layers[name] = _run(analyze, payload)
+    if depth == DEPTH_NETWORK or 'error' in network_info:
+        return layers
+    if network_info.get('is_fragment') or network_info.get('fragment_offset'):
+        return layers
+
+    protocol = network_info.get('protocol', network_info.get('next_header'))
+    dissector = IP_PROTOCOL_DISSECTORS.get(protocol)
+    if dissector is None:
+        return layers
+    name, analyze = dissector
+    layers[name] = _run(analyze, network_info['payload'])
+    return layers
+
+
+def _run(analyze, data) -> dict:
+    """
+    Runs an analyzer, turning a decoding failure into an error dictionary.
+
+    Args:
+        analyze (callable): The analyzer.
+        data (memoryview): The layer's bytes.
+
+    Returns:
+        dict: The analyzer's result, or `{'error': ...}` if it raised.
+    """
+    try:
+        return analyze(data)
+    except (ValueError, IndexError, struct.error) as error:
+        return {'error': str(error)}
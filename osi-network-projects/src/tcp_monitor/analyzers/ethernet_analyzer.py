@@ -1,3 +1,13 @@
+import struct
+
+from tcp_monitor.analyzers.buffers import as_view
+
+# Destination MAC, source MAC and Ethertype
+ETHERNET_HEADER = struct.Struct('!6s6sH')
+# 802.1Q tag control information and inner Ethertype, following the header
+VLAN_TAG = struct.Struct('!HH')
+
+
 class EthernetAnalyzer:
     """
     The EthernetAnalyzer class provides static methods for analyzing Ethernet frames.
@@ -8,6 +18,11 @@ class EthernetAnalyzer:
     - Decode the Ethertype and map it to its corresponding protocol name.
     - Format MAC addresses into a human-readable form.
 
+    Frames may be given as `bytes`, `bytearray` or `memoryview`. The payload is
+    returned as a `memoryview` of the frame, so it is never copied; it is only
+    valid as long as the frame's buffer is (e.g. for the duration of a capture
+    callback with the "mmap" backend).
+
     Methods:
         analyze_frame(frame: bytes) -> dict:
             Analyzes a complete Ethernet frame, returning information about both the header and payload.
@@ -48,14 +63,15 @@ class EthernetAnalyzer:
         - Extracts and analyzes the payload content and its size.
 
         Args:
-            frame (bytes): A byte sequence representing the raw Ethernet frame 
-            to be analyzed.
+            frame (bytes, bytearray or memoryview): A byte sequence representing the raw
+            Ethernet frame to be analyzed.
 
         Returns:
             dict: A dictionary containing combined details from both the Ethernet 
             header and payload analysis. Also includes an error key if the frame 
             is too short to be valid.
         """
+        frame = as_view(frame)
         # Check if the frame is too short
         if len(frame) < 14:
             return {'error': 'Frame too short to be a valid Ethernet frame'}
@@ -78,7 +94,7 @@ class EthernetAnalyzer:
         VLAN tag details and the inner Ethertype.
 
         Args:
-            frame (bytes): A byte sequence containing the Ethernet frame.
+            frame (bytes, bytearray or memoryview): A byte sequence containing the Ethernet frame.
 
         Returns:
             dict: A dictionary with the following keys:
@@ -93,7 +109,8 @@ class EthernetAnalyzer:
                 - inner_ethertype (int or None): Inner Ethertype for VLAN-tagged frames.
                 - inner_ethertype_name (str): Protocol name for the inner Ethertype.
         """
-        dst_mac = EthernetAnalyzer.format_mac_address(frame[0:6])
+        dst_address, src_address, ethertype = ETHERNET_HEADER.unpack_from(frame)
+        dst_mac = EthernetAnalyzer.format_mac_address(dst_address)
         is_broadcast = False
         is_multicast = False
         if dst_mac == 'ff:ff:ff:ff:ff:ff':
@@ -101,8 +118,7 @@ class EthernetAnalyzer:
         # Multicast destination MAC (first byte has least significant bit set)
         elif dst_mac[0:2] == '01':
             is_multicast = True
-        src_mac = EthernetAnalyzer.format_mac_address(frame[6:12])
-        ethertype = (frame[12] << 8) + frame[13]
+        src_mac = EthernetAnalyzer.format_mac_address(src_address)
         ethertype_name = EthernetAnalyzer.get_ethertype_name(ethertype)
 
         is_vlan_tagged = False
@@ -111,8 +127,7 @@ class EthernetAnalyzer:
         inner_ethertype_name = ''
         if ethertype ==  0x8100:
             is_vlan_tagged = True
-            vlan_id = (frame[14] << 8) + frame[15]
-            inner_ethertype = (frame[16] << 8) + frame[17]
+            vlan_id, inner_ethertype = VLAN_TAG.unpack_from(frame, ETHERNET_HEADER.size)
             inner_ethertype_name = EthernetAnalyzer.get_ethertype_name(inner_ethertype)
 
         return {'dst_mac': dst_mac,
@@ -132,18 +147,18 @@ class EthernetAnalyzer:
         Analyzes the payload of an Ethernet frame.
 
         This method extracts the payload portion of the given Ethernet frame,
-        calculating its size and returning the raw content as bytes.
+        calculating its size and returning the raw content as a view of the frame.
 
         Args:
-            frame (bytes): A byte sequence representing the Ethernet frame 
-            to extract the payload from.
+            frame (bytes, bytearray or memoryview): A byte sequence representing the
+            Ethernet frame to extract the payload from.
 
         Returns:
             dict: A dictionary containing:
-                - payload (bytes): The raw payload data of the Ethernet frame.
+                - payload (memoryview): The raw payload data of the Ethernet frame, not copied.
                 - payload_size (int): The size of the extracted payload in bytes.
         """
-        payload = frame[14:]
+        payload = as_view(frame)[14:]
         payload_size = len(payload)
         return {'payload': payload, 'payload_size': payload_size}
 
@@ -156,12 +171,12 @@ class EthernetAnalyzer:
         it into a string format separated by colons (e.g., '00:1A:2B:3C:4D:5E').
 
         Args:
-            mac (bytes): A 6-byte sequence representing the MAC address.
+            mac (bytes or memoryview): A 6-byte sequence representing the MAC address.
 
         Returns:
             str: A formatted MAC address string in colon-separated format.
         """
-        return ':'.join(mac.hex()[i:i+2] for i in range(0,12,2))
+        return mac.hex(':')
 
     @staticmethod
     def get_ethertype_name(ethertype: int) -> str:
@@ -1,4 +1,100 @@
-from ipaddress import IPv4Address, IPv6Address, ip_address
+import struct
+from collections import namedtuple
+from ipaddress import IPv6Address, ip_address
+from socket import inet_ntoa
+
+from tcp_monitor.analyzers.buffers import as_view
+
+# Fixed part of the IPv4 header: version/IHL, TOS, total length, identification,
+# flags/fragment offset, TTL, protocol, checksum, source and destination addresses
+IPV4_HEADER = struct.Struct('!BBHHHBBH4s4s')
+# IPv6 header: version/traffic class/flow label, payload length, next header,
+# hop limit, source and destination addresses
+IPV6_HEADER = struct.Struct('!IHBB16s16s')
+
+# Bits of the IPv4 flags/fragment offset field
+IP_FLAG_RESERVED = 0x8000
+IP_FLAG_DF = 0x4000
+IP_FLAG_MF = 0x2000
+IP_FRAGMENT_OFFSET_MASK = 0x1FFF
+
+# IPv6 extension headers (RFC 8200, RFC 4302, RFC 6275, RFC 7401, RFC 5533)
+IPV6_HOP_BY_HOP = 0
+IPV6_ROUTING = 43
+IPV6_FRAGMENT = 44
+IPV6_AUTHENTICATION = 51
+IPV6_DESTINATION_OPTIONS = 60
+IPV6_MOBILITY = 135
+IPV6_HIP = 139
+IPV6_SHIM6 = 140
+# Extension headers whose length byte counts 8-byte units after the first 8 bytes
+IPV6_OPTION_HEADERS = frozenset((IPV6_HOP_BY_HOP, IPV6_ROUTING, IPV6_DESTINATION_OPTIONS,
+                                 IPV6_MOBILITY, IPV6_HIP, IPV6_SHIM6))
+IPV6_EXTENSION_HEADERS = IPV6_OPTION_HEADERS | {IPV6_FRAGMENT, IPV6_AUTHENTICATION}
+# Fragment header: next header, reserved, fragment offset/flags, identification
+IPV6_FRAGMENT_HEADER = struct.Struct('!BBHI')
+IPV6_FRAGMENT_MF = 0x0001
+
+# Result of `walk_ipv6_extension_headers`
+IPv6Chain = namedtuple('IPv6Chain', ['protocol', 'header_length', 'headers', 'fragment'])
+# Fragment header of an IPv6 packet; `next_header_field` is the offset of the
+# Next Header field pointing at it
+IPv6Fragment = namedtuple('IPv6Fragment', ['offset', 'more_fragments', 'identification', 'next_header_field'])
+
+
+def walk_ipv6_extension_headers(ipv6_packet, next_header) -> IPv6Chain:
+    """
+    Walks the extension headers of an IPv6 packet to its upper-layer protocol.
+
+    The chain is followed in one pass from the Next Header field of the fixed
+    header, reading only each extension header's next header and length bytes.
+    The walk stops at the first header that is not an extension header (the
+    upper-layer protocol, or ESP and No Next Header, which cannot be walked
+    past), or at the fragment header of a fragment: the headers after it are
+    part of the fragmented data. An atomic fragment (offset 0, no more
+    fragments) is walked through.
+
+    Args:
+        ipv6_packet (bytes, bytearray or memoryview): The IPv6 packet, fixed header included.
+        next_header (int): The Next Header field of the fixed header.
+
+    Returns:
+        IPv6Chain: The upper-layer `protocol`, the `header_length` up to its payload, the
+        `headers` walked (a tuple of header numbers) and the `fragment` header as an
+        `IPv6Fragment`, or None.
+
+    Raises:
+        ValueError: If an extension header runs past the end of the packet.
+    """
+    offset = IPV6_HEADER.size
+    size = len(ipv6_packet)
+    headers = []
+    fragment = None
+    field = 6  # Offset of the Next Header field in the fixed header
+    while next_header in IPV6_EXTENSION_HEADERS:
+        if offset + 8 > size:
+            raise ValueError("IPv6 extension headers run past the end of the packet.")
+        headers.append(next_header)
+        if next_header == IPV6_FRAGMENT:
+            following, _, offset_flags, identification = IPV6_FRAGMENT_HEADER.unpack_from(ipv6_packet, offset)
+            fragment = IPv6Fragment(offset_flags & 0xFFF8, bool(offset_flags & IPV6_FRAGMENT_MF),
+                                    identification, field)
+            length = 8
+        elif next_header == IPV6_AUTHENTICATION:
+            following = ipv6_packet[offset]
+            length = (ipv6_packet[offset + 1] + 2) * 4
+        else:
+            following = ipv6_packet[offset]
+            length = (ipv6_packet[offset + 1] + 1) * 8
+        if offset + length > size:
+            raise ValueError("IPv6 extension headers run past the end of the packet.")
+        field = offset
+        offset += length
+        next_header = following
+        if fragment is not None and (fragment.offset or fragment.more_fragments):
+            break
+    return IPv6Chain(next_header, offset, tuple(headers), fragment)
+
 
 class IPAnalyzer:
     """
@@ -9,6 +105,10 @@ class IPAnalyzer:
     interpret various details such as IP protocol version, header flags,
     source and destination IP addresses, and more.
 
+    Packets may be given as `bytes`, `bytearray` or `memoryview`. The payload is
+    returned as a `memoryview` of the packet, bounded by the length fields of
+    the header so that link-layer padding is excluded, and is never copied.
+
     Attributes:
         ip_packet (bytes): The raw IP packet to be analyzed. Default is None.
 
@@ -20,7 +120,7 @@ class IPAnalyzer:
             Extracts and interprets details from an IPv4 packet header.
         
         analyze_ipv6_packet_header(ipv6_packet: bytes) -> dict:
-            Extracts and interprets details from an IPv6 packet header.
+            Extracts and interprets details from an IPv6 packet header and its extension headers.
         
         analyze_packet_payload(ip_packet: bytes, ip_results: dict) -> dict:
             Extracts the payload from the given IP packet based on the version.
@@ -48,13 +148,14 @@ class IPAnalyzer:
         appropriate method based on the version and processes the packet's payload.
 
         Args:
-            ip_packet (bytes): Raw bytes of the IP packet to analyze.
+            ip_packet (bytes, bytearray or memoryview): Raw bytes of the IP packet to analyze.
 
         Returns:
             dict: A dictionary containing the parsed details of the IP packet, 
             including version, header details, payload information, and errors 
             if any occur during analysis.
         """
+        ip_packet = as_view(ip_packet)
         # Extract 1st byte of packet header
         # Shift the value right by 4 bits, extracting the first 4 bits of the byte
         ip_results = {}
@@ -83,12 +184,12 @@ class IPAnalyzer:
         the version, header length, type of service, total length, flags, 
         fragment offset, time to live, protocol, checksum, source IP, destination IP, and options.
 
-        It performs bitwise operations to decode specific fields such as flags 
-        and fragment information. Additionally, it handles IP header options 
-        by parsing them based on their type, length, and associated data.
+        The fixed fields are unpacked with a precompiled `struct.Struct`, and flags
+        and fragment information are decoded with bit masks. Additionally, it handles
+        IP header options by parsing them based on their type, length, and associated data.
 
         Args:
-            ipv4_packet (bytes): A byte string representing the raw IPv4 packet.
+            ipv4_packet (bytes, bytearray or memoryview): A byte string representing the raw IPv4 packet.
 
         Returns:
             dict: A dictionary containing parsed details from the IPv4 header, 
@@ -110,60 +211,37 @@ class IPAnalyzer:
                 - options: A list of parsed options containing type, length, and data.
 
         Raises:
-            ValueError: If an unexpected value is found in the flag bits or if 
-            the first bit of the flags segment is not zero.
+            ValueError: If the reserved first bit of the flags segment is not zero.
         """
+        version_ihl, tos, total_length, identification, flags_fragment, time_to_live, protocol, \
+            checksum, src_address, dst_address = IPV4_HEADER.unpack_from(ipv4_packet)
         # Here I am extracting the last 4 bits, by performing a bitwise AND operation with
         # 0x0F, which corresponds the binary number 0000 1111
-        ihl = ipv4_packet[0] & 0x0F
+        ihl = version_ihl & 0x0F
         header_length = ihl * 4
-        tos = ipv4_packet[1]
-        total_length = ipv4_packet[2] + ipv4_packet[3]
-        identification = ipv4_packet[4] + ipv4_packet[5] # not verified here
 
-        # Extract the 3 most significant bits of byte 6:
-        # Shift right by 5 and mask with 0x07 (binary 0000 0111)
-        binary_flags = format((ipv4_packet[6] >> 5) & 0x07, '03b')
+        if flags_fragment & IP_FLAG_RESERVED:
+            raise ValueError("Bit 0 of Flags section should be 0.")
         flags = {
-            'df': False,
-            'mf': False
+            'df': bool(flags_fragment & IP_FLAG_DF),
+            'mf': bool(flags_fragment & IP_FLAG_MF)
         }
 
-        if binary_flags[0] != '0':
-            raise ValueError("Bit 0 of Flags section should be 0.")
-
-        if binary_flags[1] == '0':
-            flags['df'] = False
-        elif binary_flags[1] == '1':
-            flags['df'] = True
-        else:
-            # Handle unexpected value
-            raise ValueError("Invalid DF flag value.")
-
-        if binary_flags[2] == '0':
-            flags['mf'] = False
-        elif binary_flags[2] == '1':
-            flags['mf'] = True
-        else:
-            # Handle unexpected value
-            raise ValueError("Invalid MF flag value.")
-
         is_fragment = flags['mf']
-        # Get the last 3 bits of byte 6 and shift them left by 8 positions
-        high_bits = ipv4_packet[6] & 0x1F << 8
-        fragment_offset = ( high_bits + ipv4_packet[7] ) * 8
-        time_to_live = ipv4_packet[8]
-        protocol = ipv4_packet[9]
+        # The offset is counted in 8-byte blocks
+        fragment_offset = (flags_fragment & IP_FRAGMENT_OFFSET_MASK) * 8
         protocol_name = IPAnalyzer.protocol_name(protocol)
-        checksum = ipv4_packet[10] + ipv4_packet[11]
-        src_ip = IPv4Address(ipv4_packet[12:16]).__str__()
-        dst_ip = IPv4Address(ipv4_packet[16:20]).__str__()
+        # checksum is not verified here
+        src_ip = inet_ntoa(src_address)
+        dst_ip = inet_ntoa(dst_address)
 
         # Parsing Options
         offset = 20  # Start at the end of the standard header
         options = []
+        # Options of a truncated header end with the captured bytes
+        end = min(header_length, len(ipv4_packet))
 
-        while offset < header_length:
+        while offset < end:
             option_type = ipv4_packet[offset]
 
             # Handle special single-byte options
@@ -174,9 +252,13 @@ class IPAnalyzer:
                 offset += 1
                 continue
 
-            # Normal TLV options
+            # Normal TLV options; stop at a malformed length rather than loop or overrun the header
+            if offset + 1 >= end:
+                break
             option_length = ipv4_packet[offset + 1]
-            option_data = ipv4_packet[offset + 2:offset + option_length]
+            if option_length < 2 or offset + option_length > end:
+                break
+            option_data = bytes(ipv4_packet[offset + 2:offset + option_length])
 
             options.append({
                 'type': option_type,
@@ -186,7 +268,6 @@ class IPAnalyzer:
 
             offset += option_length
 
-
         return {
             'ihl': ihl,
             'header_length': header_length,
@@ -241,37 +322,61 @@ class IPAnalyzer:
         flow label, payload length, next header, hop limit, source IP, 
         and destination IP addresses. It provides a dictionary with all the extracted details.
 
+        Extension headers (hop-by-hop options, routing, fragment, destination
+        options...) are walked with `walk_ipv6_extension_headers`, so 'protocol'
+        is the upper-layer protocol and 'header_length' the offset of its data.
+        A fragment's data is not walked: it only decodes once reassembled, e.g.
+        by `FragmentReassembler.reassemble_ipv6`.
+
         Args:
-            ipv6_packet (bytes): The raw bytes of the IPv6 packet header to be analyzed.
+            ipv6_packet (bytes, bytearray or memoryview): The raw bytes of the IPv6 packet to be analyzed.
 
         Returns:
             dict: A dictionary containing the following keys:
                 - 'traffic_class' (int): The 8-bit traffic class field.
                 - 'flow_label' (int): The 20-bit flow label field.
                 - 'payload_length' (int): The total length of the payload in bytes.
-                - 'next_header' (int): The identifier for the next header's protocol type.
-                - 'protocol_name' (str): The human-readable name of the next header's protocol.
+                - 'next_header' (int): The Next Header field of the fixed header.
+                - 'protocol' (int): The upper-layer protocol, after the extension headers.
+                - 'protocol_name' (str): The human-readable name of the upper-layer protocol.
+                - 'extension_headers' (tuple): The extension header numbers, in order.
+                - 'header_length' (int): The length of the fixed and extension headers in bytes.
+                - 'is_fragment' (bool): True if the fragment header's M flag is set.
+                - 'fragment_offset' (int): The fragment offset in bytes (0 without fragment header).
+                - 'id' (int): The fragment header's identification, or None.
                 - 'hop_limit' (int): The hop limit for the packet.
                 - 'src_ip' (str): The source IP address as a string.
                 - 'dst_ip' (str): The destination IP address as a string.
+
+        Raises:
+            ValueError: If an extension header runs past the end of the packet.
         """
-        # Traffic Class: 4 bits from byte 0 (shifted left) + 4 bits from byte 1
-        traffic_class = ((ipv6_packet[0] & 0x0F) << 4) + ((ipv6_packet[1] & 0xF0) >> 4)
-        # Flow Label: 4 bits from byte 1 + all 8 bits from byte 2 + all 8 bits from byte 3
-        flow_label = ((ipv6_packet[1] & 0x0F) << 16) + (ipv6_packet[2] << 8) + ipv6_packet[3]
-        payload_length = ipv6_packet[4] + ipv6_packet[5]
-        next_header = ipv6_packet[6]
-        protocol_name = IPAnalyzer.protocol_name(next_header)
-        hop_limit = ipv6_packet[7]
-        src_ip = IPv6Address(ipv6_packet[8:24]).__str__()
-        dst_ip = IPv6Address(ipv6_packet[24:40]).__str__()
+        version_class_label, payload_length, next_header, hop_limit, src_address, dst_address = \
+            IPV6_HEADER.unpack_from(ipv6_packet)
+        # Traffic Class: the 8 bits after the version, Flow Label: the low 20 bits
+        traffic_class = (version_class_label >> 20) & 0xFF
+        flow_label = version_class_label & 0xFFFFF
+        if next_header in IPV6_EXTENSION_HEADERS:
+            protocol, header_length, extension_headers, fragment = \
+                walk_ipv6_extension_headers(ipv6_packet, next_header)
+        else:
+            protocol, header_length, extension_headers, fragment = next_header, IPV6_HEADER.size, (), None
+        protocol_name = IPAnalyzer.protocol_name(protocol)
+        src_ip = IPv6Address(src_address).__str__()
+        dst_ip = IPv6Address(dst_address).__str__()
 
         return {
             'traffic_class': traffic_class,
             'flow_label': flow_label,
             'payload_length': payload_length,
             'next_header': next_header,
+            'protocol': protocol,
             'protocol_name': protocol_name,
+            'extension_headers': extension_headers,
+            'header_length': header_length,
+            'is_fragment': fragment.more_fragments if fragment else False,
+            'fragment_offset': fragment.offset if fragment else 0,
+            'id': fragment.identification if fragment else None,
             'hop_limit': hop_limit,
             'src_ip': src_ip,
             'dst_ip': dst_ip
@@ -286,26 +391,37 @@ class IPAnalyzer:
         the payload, determines its size, and appends the payload details 
         to the provided IP header analysis results.
 
+        The payload ends where the header's length field says the packet ends
+        (IPv4 total length, IPv6 payload length), so padding added to short
+        Ethernet frames is not part of it. It starts after the IPv4 options or
+        the IPv6 extension headers. If the length field is zero or
+        inconsistent (e.g. segmentation offload, jumbograms), or the packet was
+        truncated by the capture, the payload runs to the end of the data.
+
         Args:
-            ip_packet (bytes): The full raw bytes of the IP packet.
+            ip_packet (bytes, bytearray or memoryview): The full raw bytes of the IP packet.
             ip_results (dict): A dictionary containing the analysis of the 
                                IP header, including fields such as version 
                                and header length.
 
         Returns:
             dict: The updated `ip_results` dictionary, including these additional keys:
-                - 'payload' (bytes): The raw payload data extracted from the IP packet.
+                - 'payload' (memoryview): The payload extracted from the IP packet, not copied.
                 - 'payload_size' (int): The size of the extracted payload in bytes.
         """
-        payload = b''
-        payload_size = 0
+        ip_packet = as_view(ip_packet)
+        payload = ip_packet[0:0]
         if ip_results['version'] == 4:
-            payload = ip_packet[ip_results['header_length']:]
-            payload_size = len(payload)
+            start = ip_results['header_length']
+            end = ip_results['total_length']
+            payload = ip_packet[start:end] if start <= end <= len(ip_packet) else ip_packet[start:]
 
         if ip_results['version'] == 6:
-            payload = ip_packet[40:] # IPv6 header is always 40-bytes
-            payload_size = len(payload)
+            # The fixed IPv6 header is always 40 bytes, extension headers follow it
+            start = ip_results.get('header_length', 40)
+            end = 40 + ip_results['payload_length']
+            payload = ip_packet[start:end] if 40 < end <= len(ip_packet) else ip_packet[start:]
+        payload_size = len(payload)
 
         ip_results.update({'payload': payload, 'payload_size': payload_size})
         return ip_results
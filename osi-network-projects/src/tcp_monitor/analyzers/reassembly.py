@@ -0,0 +1,345 @@
+import struct
+from collections import OrderedDict
+from time import time
+
+from tcp_monitor.analyzers.buffers import as_view
+from tcp_monitor.analyzers.ip_analyzer import (IP_FLAG_DF, IP_FLAG_MF, IP_FRAGMENT_OFFSET_MASK, IPV4_HEADER,
+                                               IPV6_EXTENSION_HEADERS, IPV6_FRAGMENT_HEADER, IPV6_HEADER,
+                                               walk_ipv6_extension_headers)
+
+# Largest datagram payload a fragment may reach into (16-bit length fields)
+MAX_DATAGRAM_SIZE = 65535
+
+# 16-bit header fields rewritten in reassembled packets: IPv4 total length and
+# flags/fragment offset, IPv6 payload length
+IP_FIELD = struct.Struct('!H')
+IPV4_TOTAL_LENGTH_OFFSET = 2
+IPV4_FLAGS_FRAGMENT_OFFSET = 6
+IPV6_PAYLOAD_LENGTH_OFFSET = 4
+
+
+class _Datagram:
+    """Fragments received so far for one datagram."""
+    __slots__ = ('holes', 'pieces', 'length', 'highest', 'limit', 'size', 'fragments', 'header', 'last_seen')
+
+    def __init__(self, timestamp) -> None:
+        # Byte ranges [first, end) not yet received (RFC 815 hole descriptors)
+        self.holes = [(0, MAX_DATAGRAM_SIZE)]
+        self.pieces = []
+        self.length = None
+        self.highest = 0
+        self.limit = MAX_DATAGRAM_SIZE
+        self.size = 0
+        self.fragments = 0
+        self.header = None
+        self.last_seen = timestamp
+
+
+class FragmentReassembler:
+    """
+    Reassembles fragmented IP datagrams within a bounded amount of memory.
+
+    The `FragmentReassembler` class buffers the fragments of each datagram,
+    keyed by the fields identifying it (source, destination, identification
+    and protocol for IPv4; source, destination and identification for IPv6),
+    and tracks the byte ranges still missing with the
+    hole descriptors of RFC 815. When the last hole is filled the datagram's
+    payload is joined and returned.
+
+    Work per fragment is bounded by `max_fragments`, and datagrams are kept in
+    least recently used order, so expiring datagrams and evicting them when
+    memory runs short only ever looks at the oldest entries: a fragment flood
+    costs time proportional to the number of fragments.
+
+    Overlapping fragments are trimmed to the ranges still missing, so bytes
+    received first are never overwritten. A datagram is dropped if a fragment
+    contradicts its length, reaches past the largest payload its headers
+    leave room for (at most `MAX_DATAGRAM_SIZE`), or would exceed
+    `max_fragments`.
+
+    Attributes:
+        timeout (float): Seconds without a new fragment after which a datagram is discarded.
+        max_bytes (int): Payload bytes buffered across all datagrams before evicting the least
+            recently used ones.
+        max_datagrams (int): Datagrams buffered before evicting the least recently used ones.
+        max_fragments (int): Fragments accepted per datagram.
+        datagrams (OrderedDict): The incomplete datagrams, least recently used first.
+        memory_used (int): Payload bytes currently buffered.
+        reassembled (int): Datagrams reassembled.
+        timed_out (int): Datagrams discarded after `timeout`.
+        evicted (int): Datagrams evicted to stay within `max_bytes` and `max_datagrams`.
+        overlapping (int): Fragments that overlapped bytes already received.
+        dropped (int): Datagrams dropped for inconsistent or excessive fragments.
+
+    Methods:
+        add_fragment(key, offset, data, more_fragments, timestamp=None, header=None,
+                     max_size=MAX_DATAGRAM_SIZE) -> tuple:
+            Buffers one fragment and returns the datagram once it is complete.
+
+        reassemble(ip_packet, timestamp=None) -> bytes:
+            Reassembles IPv4 or IPv6 fragments into a complete packet.
+
+        reassemble_ipv4(ip_packet, timestamp=None) -> bytes:
+            Reassembles IPv4 fragments into a complete IPv4 packet.
+
+        reassemble_ipv6(ip_packet, timestamp=None) -> bytes:
+            Reassembles IPv6 fragments into a complete IPv6 packet.
+
+        expire(timestamp) -> int:
+            Discards the datagrams that timed out.
+    """
+    def __init__(self, timeout=30.0, max_bytes=4 * 1024 * 1024, max_datagrams=1024, max_fragments=64) -> None:
+        """
+        Initializes an empty FragmentReassembler.
+
+        Args:
+            timeout (float, optional): Seconds a datagram waits for its next fragment. Default is 30.
+            max_bytes (int, optional): Payload bytes buffered at most. Default is 4 MiB.
+            max_datagrams (int, optional): Incomplete datagrams buffered at most. Default is 1024.
+            max_fragments (int, optional): Fragments accepted per datagram. Default is 64.
+
+        Raises:
+            ValueError: If a limit is not positive.
+        """
+        if timeout <= 0 or max_bytes <= 0 or max_datagrams <= 0 or max_fragments <= 0:
+            raise ValueError("Reassembly timeout and limits must be positive.")
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_datagrams = max_datagrams
+        self.max_fragments = max_fragments
+        self.datagrams = OrderedDict()
+        self.memory_used = 0
+        self.reassembled = 0
+        self.timed_out = 0
+        self.evicted = 0
+        self.overlapping = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        """Returns the number of incomplete datagrams."""
+        return len(self.datagrams)
+
+    def add_fragment(self, key, offset, data, more_fragments, timestamp=None, header=None,
+                     max_size=MAX_DATAGRAM_SIZE) -> tuple:
+        """
+        Buffers a fragment and returns its datagram once every byte has arrived.
+
+        The fragment's bytes are copied, so `data` may be a view of a capture
+        buffer that is reused afterwards.
+
+        Args:
+            key (tuple): The fields identifying the datagram.
+            offset (int): The fragment's offset in the datagram payload, in bytes.
+            data (bytes, bytearray or memoryview): The fragment's payload.
+            more_fragments (bool): Whether more fragments follow (False for the last one).
+            timestamp (float, optional): The fragment's capture time. Defaults to now.
+            header (bytes, optional): A header kept for the datagram, e.g. the IP header of
+                the first fragment. Default is None.
+            max_size (int, optional): The largest payload the datagram may have, e.g. what its
+                length field leaves after the headers. The smallest limit given for any of its
+                fragments applies. Default is `MAX_DATAGRAM_SIZE`.
+
+        Returns:
+            tuple: `(header, payload)` with the first header passed for the datagram and the
+            reassembled payload as `bytes`, or None while fragments are missing.
+        """
+        if timestamp is None:
+            timestamp = time()
+        self.expire(timestamp)
+
+        datagram = self.datagrams.get(key)
+        if datagram is None:
+            datagram = self.datagrams[key] = _Datagram(timestamp)
+        else:
+            self.datagrams.move_to_end(key)
+            datagram.last_seen = timestamp
+        if header is not None and datagram.header is None:
+            datagram.header = bytes(header)
+
+        end = offset + len(data)
+        datagram.fragments += 1
+        datagram.limit = min(datagram.limit, max_size)
+        if (max(end, datagram.highest) > datagram.limit or datagram.fragments > self.max_fragments
+                or (datagram.length is not None and end > datagram.length)
+                or (not more_fragments and (end < datagram.highest
+                                            or datagram.length not in (None, end)))):
+            self._discard(key)
+            self.dropped += 1
+            return None
+
+        data = as_view(data)
+        holes = []
+        copied = 0
+        for hole_first, hole_end in datagram.holes:
+            if end <= hole_first or offset >= hole_end:
+                holes.append((hole_first, hole_end))
+                continue
+            if offset > hole_first:
+                holes.append((hole_first, offset))
+            if end < hole_end and more_fragments:
+                holes.append((end, hole_end))
+            first, last = max(offset, hole_first), min(end, hole_end)
+            datagram.pieces.append((first, bytes(data[first - offset:last - offset])))
+            copied += last - first
+        if copied != end - offset:
+            self.overlapping += 1
+        if not more_fragments:
+            # The last fragment fixes the length: nothing is missing past its end
+            datagram.length = end
+            holes = [(first, min(last, end)) for first, last in holes if first < end]
+        datagram.holes = holes
+        datagram.highest = max(datagram.highest, end)
+        datagram.size += copied
+        self.memory_used += copied
+
+        if not holes:
+            self._discard(key)
+            self.reassembled += 1
+            datagram.pieces.sort()
+            return datagram.header, b''.join(piece for _, piece in datagram.pieces)
+
+        while self.memory_used > self.max_bytes or len(self.datagrams) > self.max_datagrams:
+            self._discard(next(iter(self.datagrams)))
+            self.evicted += 1
+        return None
+
+    def reassemble(self, ip_packet, timestamp=None) -> bytes:
+        """
+        Passes an IPv4 or IPv6 packet through reassembly.
+
+        Args:
+            ip_packet (bytes, bytearray or memoryview): The IP packet.
+            timestamp (float, optional): The packet's capture time. Defaults to now.
+
+        Returns:
+            bytes or memoryview: The packet itself if it is not a fragment, the reassembled
+            packet once its last missing fragment arrives, and None otherwise.
+
+        Raises:
+            ValueError: If the packet is neither IPv4 nor IPv6, or its IPv6 extension
+                headers run past its end.
+        """
+        ip_packet = as_view(ip_packet)
+        version = ip_packet[0] >> 4
+        if version == 4:
+            return self.reassemble_ipv4(ip_packet, timestamp)
+        if version == 6:
+            return self.reassemble_ipv6(ip_packet, timestamp)
+        raise ValueError(f"Invalid IP version: {version}. Only IPv4 and IPv6 are supported.")
+
+    def reassemble_ipv4(self, ip_packet, timestamp=None) -> bytes:
+        """
+        Passes an IPv4 packet through reassembly.
+
+        Fragments are keyed by source, destination, identification and protocol.
+        The reassembled packet carries the first fragment's header, with its
+        total length updated and the More Fragments flag and offset cleared;
+        its checksum is left as is, as the analyzers do not verify it.
+
+        Args:
+            ip_packet (bytes, bytearray or memoryview): The IPv4 packet.
+            timestamp (float, optional): The packet's capture time. Defaults to now.
+
+        Returns:
+            bytes or memoryview: The packet itself if it is not a fragment, the reassembled
+            packet once its last missing fragment arrives, and None otherwise.
+        """
+        ip_packet = as_view(ip_packet)
+        version_ihl, _, total_length, identification, flags_fragment, _, protocol, _, src, dst = \
+            IPV4_HEADER.unpack_from(ip_packet)
+        offset = (flags_fragment & IP_FRAGMENT_OFFSET_MASK) * 8
+        more_fragments = bool(flags_fragment & IP_FLAG_MF)
+        if not offset and not more_fragments:
+            return ip_packet
+
+        header_length = (version_ihl & 0x0F) * 4
+        end = total_length if header_length <= total_length <= len(ip_packet) else len(ip_packet)
+        # The total length field counts the header too
+        result = self.add_fragment((src, dst, identification, protocol), offset, ip_packet[header_length:end],
+                                   more_fragments, timestamp, ip_packet[:header_length] if not offset else None,
+                                   MAX_DATAGRAM_SIZE - header_length)
+        if result is None:
+            return None
+        # The first fragment, which fills the hole at offset 0, always brings the header
+        header, payload = result
+        header = bytearray(header)
+        IP_FIELD.pack_into(header, IPV4_TOTAL_LENGTH_OFFSET, len(header) + len(payload))
+        flags = IP_FIELD.unpack_from(header, IPV4_FLAGS_FRAGMENT_OFFSET)[0]
+        IP_FIELD.pack_into(header, IPV4_FLAGS_FRAGMENT_OFFSET, flags & IP_FLAG_DF)
+        return bytes(header) + payload
+
+    def reassemble_ipv6(self, ip_packet, timestamp=None) -> bytes:
+        """
+        Passes an IPv6 packet through reassembly.
+
+        Fragments are found by walking the extension headers with
+        `walk_ipv6_extension_headers` and keyed by source, destination and the
+        fragment header's identification (RFC 8200). The reassembled packet
+        carries the first fragment's unfragmentable part (the fixed header and
+        the extension headers before the fragment header), with the fragment
+        header removed, the Next Header field that pointed to it set to the
+        fragmented protocol, and the payload length updated.
+
+        Args:
+            ip_packet (bytes, bytearray or memoryview): The IPv6 packet.
+            timestamp (float, optional): The packet's capture time. Defaults to now.
+
+        Returns:
+            bytes or memoryview: The packet itself if it is not a fragment, the reassembled
+            packet once its last missing fragment arrives, and None otherwise.
+
+        Raises:
+            ValueError: If the extension headers run past the end of the packet.
+        """
+        ip_packet = as_view(ip_packet)
+        _, payload_length, next_header, _, src, dst = IPV6_HEADER.unpack_from(ip_packet)
+        if next_header not in IPV6_EXTENSION_HEADERS:
+            return ip_packet
+        end = IPV6_HEADER.size + payload_length
+        end = end if IPV6_HEADER.size < end <= len(ip_packet) else len(ip_packet)
+        protocol, header_length, _, fragment = walk_ipv6_extension_headers(ip_packet[:end], next_header)
+        if fragment is None or not (fragment.offset or fragment.more_fragments):
+            return ip_packet
+
+        unfragmentable = header_length - IPV6_FRAGMENT_HEADER.size
+        # The payload length field counts the extension headers kept before the payload
+        result = self.add_fragment((src, dst, fragment.identification), fragment.offset,
+                                   ip_packet[header_length:end], fragment.more_fragments, timestamp,
+                                   ip_packet[:unfragmentable] if not fragment.offset else None,
+                                   MAX_DATAGRAM_SIZE - (unfragmentable - IPV6_HEADER.size))
+        if result is None:
+            return None
+        header, payload = result
+        header = bytearray(header)
+        # The walk stops right after the fragment header, so `protocol` is its Next Header
+        header[fragment.next_header_field] = protocol
+        IP_FIELD.pack_into(header, IPV6_PAYLOAD_LENGTH_OFFSET, len(header) - IPV6_HEADER.size + len(payload))
+        return bytes(header) + payload
+
+    def expire(self, timestamp) -> int:
+        """
+        Discards the datagrams that received no fragment for `timeout` seconds.
+
+        Datagrams are kept in the order they last received a fragment, so only
+        the expired ones and the first live one are looked at.
+
+        Args:
+            timestamp (float): The current capture time.
+
+        Returns:
+            int: The number of datagrams discarded.
+        """
+        expired = 0
+        deadline = timestamp - self.timeout
+        while self.datagrams:
+            key, datagram = next(iter(self.datagrams.items()))
+            if datagram.last_seen > deadline:
+                break
+            self._discard(key)
+            expired += 1
+        self.timed_out += expired
+        return expired
+
+    def _discard(self, key) -> None:
+        """Forgets a datagram and releases its memory."""
+        self.memory_used -= self.datagrams.pop(key).size
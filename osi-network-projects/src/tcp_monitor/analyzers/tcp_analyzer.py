@@ -1,3 +1,117 @@
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+from tcp_monitor.analyzers.buffers import as_view
+
+# Fixed part of the TCP header: ports, sequence and acknowledgment numbers,
+# data offset, flags, window, checksum and urgent pointer
+TCP_HEADER = struct.Struct('!HHIIBBHHH')
+
+# Control bits in the flags byte
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+TCP_URG = 0x20
+
+# Option kinds
+TCP_OPTION_EOO = 0
+TCP_OPTION_NOP = 1
+TCP_OPTION_MSS = 2
+TCP_OPTION_WSCALE = 3
+TCP_OPTION_SACKOK = 4
+TCP_OPTION_SACK = 5
+TCP_OPTION_TIMESTAMP = 8
+
+TCP_OPTION_MSS_VALUE = struct.Struct('!H')
+TCP_OPTION_TIMESTAMP_VALUE = struct.Struct('!II')
+TCP_OPTION_SACK_BLOCK = struct.Struct('!II')
+
+# Distinct option byte strings remembered by `parse_tcp_options`
+TCP_OPTIONS_CACHE_SIZE = 4096
+
+# Typed values of the options of a segment; fields of absent options are None
+# (False for sack_permitted, an empty tuple for sack_blocks)
+TCPOptions = namedtuple('TCPOptions', ['mss', 'window_scale', 'sack_permitted', 'tsval', 'tsecr',
+                                       'sack_blocks', 'text'])
+
+
+@lru_cache(maxsize=TCP_OPTIONS_CACHE_SIZE)
+def parse_tcp_options(options) -> TCPOptions:
+    """
+    Walks the options of a TCP header and returns their typed values.
+
+    Results are cached by the raw option bytes: SYN and SYN-ACK options, and
+    the options of segments without timestamps, repeat from segment to segment.
+
+    The walk stops at End of Option List, at an option whose length is invalid
+    or runs past the options, and at the end of the options. Options with an
+    unexpected length are listed in `text` but their values are ignored.
+
+    Args:
+        options (bytes): The option bytes, from offset 20 to the end of the header.
+            Must be hashable, so memoryviews are converted with `bytes()` first.
+
+    Returns:
+        TCPOptions: The options:
+            - mss (int): The Maximum Segment Size.
+            - window_scale (int): The window scale shift count.
+            - sack_permitted (bool): Whether SACK is permitted.
+            - tsval, tsecr (int): The timestamp value and echo reply.
+            - sack_blocks (tuple): The SACK blocks as `(left_edge, right_edge)` tuples.
+            - text (str): The options in order, comma-separated, e.g.
+              "MSS=1460,SACKOK,TS=4294967/0,NOP,WSCALE=7". Unknown kinds
+              appear as "UNKNOWN=<kind>".
+    """
+    mss = window_scale = tsval = tsecr = None
+    sack_permitted = False
+    sack_blocks = ()
+    text = []
+    offset = 0
+    end = len(options)
+    while offset < end:
+        kind = options[offset]
+        if kind == TCP_OPTION_EOO:
+            text.append('EOO')
+            break
+        if kind == TCP_OPTION_NOP:
+            text.append('NOP')
+            offset += 1
+            continue
+        if offset + 1 >= end:
+            break
+        length = options[offset + 1]
+        if length < 2 or offset + length > end:
+            break
+
+        if kind == TCP_OPTION_MSS:
+            if length == 4:
+                mss = TCP_OPTION_MSS_VALUE.unpack_from(options, offset + 2)[0]
+            text.append(f"MSS={mss}")
+        elif kind == TCP_OPTION_WSCALE:
+            if length == 3:
+                window_scale = options[offset + 2]
+            text.append(f"WSCALE={window_scale}")
+        elif kind == TCP_OPTION_SACKOK:
+            sack_permitted = True
+            text.append('SACKOK')
+        elif kind == TCP_OPTION_SACK:
+            sack_blocks = tuple(TCP_OPTION_SACK_BLOCK.unpack_from(options, block)
+                                for block in range(offset + 2, offset + length - 7, 8))
+            text.append('SACK=' + ';'.join(f"{left}-{right}" for left, right in sack_blocks))
+        elif kind == TCP_OPTION_TIMESTAMP:
+            if length == 10:
+                tsval, tsecr = TCP_OPTION_TIMESTAMP_VALUE.unpack_from(options, offset + 2)
+            text.append(f"TS={tsval}/{tsecr}")
+        else:
+            text.append(f"UNKNOWN={kind}")
+        offset += length
+
+    return TCPOptions(mss, window_scale, sack_permitted, tsval, tsecr, sack_blocks, ','.join(text))
+
+
 class TCPAnalyzer:
     """
     TCPAnalyzer is a utility class designed to process and analyze Transmission Control 
@@ -5,6 +119,9 @@ class TCPAnalyzer:
     options, and control packet flags. The class is implemented with several static 
     methods to accommodate the non-instantaneous nature of TCP segment analysis.
 
+    Segments may be given as `bytes`, `bytearray` or `memoryview`; the payload is
+    returned as a `memoryview` of the segment and is never copied.
+
     Attributes:
         tcp_header (bytes): The TCP header provided during its instantiation, defaults to None.
         tcp_payload (bytes): The TCP payload provided during its instantiation, defaults to None.
@@ -23,7 +140,7 @@ class TCPAnalyzer:
             Extracts and interprets the payload of a TCP segment starting after the header.
 
         analyze_header_with_options(tcp_segment: bytes) -> dict:
-            Parses TCP header options (if present) and returns their details.
+            Parses all TCP header options (if present) and returns their typed values.
 
         get_service_name(port: int) -> str:
             Maps a well-known port number to its corresponding service name.
@@ -53,7 +170,8 @@ class TCPAnalyzer:
         Finally, it extracts and decodes the payload of the TCP segment.
 
         Args:
-            tcp_segment (bytes): A byte sequence representing the entire TCP segment.
+            tcp_segment (bytes, bytearray or memoryview): A byte sequence representing the
+                entire TCP segment.
 
         Returns:
             dict: A dictionary containing the parsed header information (including flags, 
@@ -63,6 +181,7 @@ class TCPAnalyzer:
         Raises:
             ValueError: If the TCP header length is invalid (shorter than 20 bytes).
         """
+        tcp_segment = as_view(tcp_segment)
         tcp_results = {}
         if len(tcp_segment) < 20:
             tcp_results['error'] = "TCP segment too short to contain a valid header."
@@ -89,7 +208,7 @@ class TCPAnalyzer:
         size, checksum, and the urgent pointer from the header.
 
         Args:
-            tcp_segment (bytes): A byte sequence representing the TCP segment.
+            tcp_segment (bytes, bytearray or memoryview): A byte sequence representing the TCP segment.
 
         Returns:
             dict: A dictionary containing the parsed TCP header information, including:
@@ -102,39 +221,18 @@ class TCPAnalyzer:
                   - `checksum` (int): TCP checksum value.
                   - `urgent_ptr` (int): Urgent pointer value.
         """
-        src_prt = (tcp_segment[0] << 8) + tcp_segment[1]
-        dst_prt = (tcp_segment[2] << 8) + tcp_segment[3]
-        seq_num = (tcp_segment[4] << 24) + (tcp_segment[5] << 16) + (tcp_segment[6] << 8) + tcp_segment[7]
-        ack_num = (tcp_segment[8] << 24) + (tcp_segment[9] << 16) + (tcp_segment[10] << 8) + tcp_segment[11]
-        window_size = (tcp_segment[14] << 8) + tcp_segment[15]
-        checksum = (tcp_segment[16] << 8) + tcp_segment[17]
-        urgent_ptr = (tcp_segment[18] << 8) + tcp_segment[19]
-
-        # Extract control bits from lowest 6 bits of second byte
-        binary_flags = format(tcp_segment[13], '08b')[-6:]
+        src_prt, dst_prt, seq_num, ack_num, _, flag_bits, window_size, checksum, urgent_ptr = \
+            TCP_HEADER.unpack_from(tcp_segment)
 
         flags = {
-            'urg': False,
-            'ack': False,
-            'psh': False,
-            'rst': False,
-            'syn': False,
-            'fin': False
+            'urg': bool(flag_bits & TCP_URG),
+            'ack': bool(flag_bits & TCP_ACK),
+            'psh': bool(flag_bits & TCP_PSH),
+            'rst': bool(flag_bits & TCP_RST),
+            'syn': bool(flag_bits & TCP_SYN),
+            'fin': bool(flag_bits & TCP_FIN)
         }
 
-        if binary_flags[0] == '1':
-            flags['urg'] = True
-        if binary_flags[1] == '1':
-            flags['ack'] = True
-        if binary_flags[2] == '1':
-            flags['psh'] = True
-        if binary_flags[3] == '1':
-            flags['rst'] = True
-        if binary_flags[4] == '1':
-            flags['syn'] = True
-        if binary_flags[5] == '1':
-            flags['fin'] = True
-
         return {
             'src_port': src_prt,
             'dst_port': dst_prt,
@@ -156,15 +254,15 @@ class TCPAnalyzer:
         the relevant information into a dictionary.
 
         Args:
-            tcp_segment (bytes): A byte sequence representing the TCP segment.
+            tcp_segment (bytes, bytearray or memoryview): A byte sequence representing the TCP segment.
             header_length (int): The length of the TCP header in bytes.
 
         Returns:
             dict: A dictionary containing:
-                  - `payload` (bytes): The extracted payload data.
+                  - `payload` (memoryview): The extracted payload data, a view of the segment.
                   - `payload_size` (int): The size of the payload in bytes.
         """
-        payload = tcp_segment[header_length:]
+        payload = as_view(tcp_segment)[header_length:]
         payload_size = len(payload)
 
         return {
@@ -177,44 +275,34 @@ class TCPAnalyzer:
         """
         Parses the TCP header with options of a given segment.
 
-        This method extracts and interprets TCP options found in the header beyond the standard 
-        20-byte length. It identifies the option type, translates it to its corresponding code,
-        and retrieves the associated value.
+        This method walks every option found in the header beyond the standard
+        20-byte length with `parse_tcp_options`, which caches its results by the
+        raw option bytes.
 
         Args:
-            tcp_segment (bytes): A byte sequence representing the TCP segment.
+            tcp_segment (bytes, bytearray or memoryview): A byte sequence representing the TCP segment.
 
         Returns:
             dict: A dictionary containing:
-                  - `options` (str): A string representation of the TCP option in the format 
-                    `<option_code>=<option_value>`. Common option codes include:
+                  - `options` (str): The options in order, comma-separated, in the format
+                    `<option_code>=<option_value>` or `<option_code>` for options without
+                    a value, e.g. "MSS=1460,SACKOK,TS=4294967/0,NOP,WSCALE=7". Option codes are:
                     - `EOO` (End of Option List)
                     - `NOP` (No Operation)
                     - `MSS` (Maximum Segment Size)
                     - `WSCALE` (Window Scale)
                     - `SACKOK` (Selective Acknowledgment Permitted)
-                    - `SACK` (Selective Acknowledgment)
-                    If the option is unrecognized, the code will be `UNKNOWN`.
+                    - `SACK` (Selective Acknowledgment), blocks as `left-right` separated by `;`
+                    - `TS` (Timestamps), as `TSval/TSecr`
+                    If the option is unrecognized, the code will be `UNKNOWN` and the value its kind.
+                  - `tcp_options` (TCPOptions): The typed option values (MSS, window scale
+                    shift, SACK permitted, TSval and TSecr, SACK blocks).
         """
-        option_number = tcp_segment[20]
-        option_value = (tcp_segment[22] << 8) + tcp_segment[23]
-        option_code = 'UNKNOWN'
-
-        if option_number == 0:
-            option_code = 'EOO'
-        if option_number == 1:
-            option_code = 'NOP'
-        if option_number == 2:
-            option_code = 'MSS'
-        if option_number == 3:
-            option_code = 'WSCALE'
-        if option_number == 4:
-            option_code = 'SACKOK'
-        if option_number == 5:
-            option_code = 'SACK'
-
+        header_length = (tcp_segment[12] >> 4) * 4
+        tcp_options = parse_tcp_options(bytes(tcp_segment[20:header_length]))
         return {
-            'options': f"{option_code}={option_value}"
+            'options': tcp_options.text,
+            'tcp_options': tcp_options
         }
 
     @staticmethod
@@ -0,0 +1,183 @@
+import threading
+import time
+
+from tcp_monitor.capture.frame import detach_frame
+
+
+class PacketBatcher:
+    """
+    Groups captured packets into batches for a batch callback.
+
+    The `PacketBatcher` class amortises the per-call overhead of packet
+    processing: instead of invoking a callback once per packet, packets are
+    collected in a list that is handed to the callback once it holds
+    `batch_size` packets or once its oldest packet has waited `max_delay`
+    seconds, whichever comes first. A background thread flushes batches that
+    went stale because traffic stopped, so latency stays bounded on quiet links.
+
+    Batches are delivered one at a time, either from the thread calling `add`
+    or from the flush thread, so the callback does not need to be thread-safe.
+    Frames backed by a capture buffer (`memoryview` data) are copied when added,
+    since they outlive the capture callback.
+
+    Attributes:
+        callback (callable): The function invoked with each list of packets.
+        batch_size (int): The maximum number of packets per batch.
+        max_delay (float): The maximum time in seconds a packet waits for its batch.
+        batches_delivered (int): The number of batches passed to the callback.
+        packets_delivered (int): The number of packets passed to the callback.
+        callback_errors (int): The number of batches whose callback raised an exception.
+
+    Methods:
+        start():
+            Starts the thread flushing stale batches.
+
+        add(packet):
+            Adds a packet, delivering the batch if it is full.
+
+        flush() -> int:
+            Delivers the pending packets immediately.
+
+        stop():
+            Stops the flush thread and delivers the pending packets.
+    """
+    def __init__(self, callback, batch_size=256, max_delay=0.01) -> None:
+        """
+        Initializes the PacketBatcher.
+
+        Args:
+            callback (callable): The function invoked with each list of packets.
+            batch_size (int, optional): The maximum number of packets per batch. Default is 256.
+            max_delay (float, optional): The maximum time in seconds before a partial
+                batch is delivered. Default is 0.01 (10 ms).
+
+        Raises:
+            ValueError: If the batch size or delay is not positive.
+        """
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive.")
+        if max_delay <= 0:
+            raise ValueError("Maximum batch delay must be positive.")
+
+        self.callback = callback
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.batches_delivered = 0
+        self.packets_delivered = 0
+        self.callback_errors = 0
+
+        self._batch = []
+        self._deadline = None
+        # Held while a batch is collected and delivered, so batches never interleave
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self) -> int:
+        """
+        Gets the number of packets waiting for their batch to be delivered.
+
+        Returns:
+            int: The size of the current partial batch.
+        """
+        return len(self._batch)
+
+    def start(self) -> None:
+        """
+        Starts the thread delivering partial batches once they reach the maximum delay.
+
+        Raises:
+            ValueError: If the batcher is already running.
+        """
+        if self._thread:
+            raise ValueError("Batcher is already running")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_stale, name="packet-batcher", daemon=True)
+        self._thread.start()
+
+    def add(self, packet) -> None:
+        """
+        Adds a packet to the current batch.
+
+        The batch is delivered on the calling thread when it reaches `batch_size`
+        packets; stale partial batches are left to the flush thread, so adding a
+        packet does not read the clock.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+        Returns:
+            None
+        """
+        packet = detach_frame(packet)
+        with self._lock:
+            batch = self._batch
+            if not batch:
+                self._deadline = time.monotonic() + self.max_delay
+            batch.append(packet)
+            if len(batch) >= self.batch_size:
+                self._deliver()
+
+    def flush(self) -> int:
+        """
+        Delivers the pending packets immediately.
+
+        Returns:
+            int: The number of packets delivered (0 if none were pending).
+        """
+        with self._lock:
+            return self._deliver()
+
+    def stop(self) -> None:
+        """
+        Stops the flush thread and delivers the pending packets.
+
+        Returns:
+            None
+        """
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _deliver(self) -> int:
+        """
+        Hands the current batch to the callback. Must be called with the lock held.
+
+        Returns:
+            int: The number of packets delivered.
+        """
+        batch = self._batch
+        if not batch:
+            return 0
+        self._batch = []
+        self._deadline = None
+        try:
+            self.callback(batch)
+        except Exception:
+            self.callback_errors += 1
+        self.batches_delivered += 1
+        self.packets_delivered += len(batch)
+        return len(batch)
+
+    def _flush_stale(self) -> None:
+        """
+        Main loop of the flush thread.
+
+        Wakes up at the deadline of the current batch (or every `max_delay` while
+        no batch is pending) and delivers the batch if it is due.
+
+        Returns:
+            None
+        """
+        timeout = self.max_delay
+        while not self._stop_event.wait(timeout):
+            with self._lock:
+                deadline = self._deadline
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    self._deliver()
+                    deadline = None
+            timeout = deadline - now if deadline is not None else self.max_delay
@@ -0,0 +1,433 @@
+import ipaddress
+import re
+import socket
+
+# libpcap DLT_EN10MB: Ethernet link-layer headers
+LINKTYPE_ETHERNET = 1
+
+# Linux <asm-generic/socket.h> and <linux/filter.h>: BPF_RET | BPF_K returns a constant
+SO_ATTACH_FILTER = 26
+BPF_RET_K = 0x06
+# Accept length used when no snap length applies: libpcap's maximum snapshot length
+BPF_ACCEPT_ALL = 262144
+
+FILTER_PROTOCOLS = ('tcp', 'udp', 'icmp', 'icmp6', 'sctp', 'arp', 'ip', 'ip6')
+FILTER_DIRECTIONS = (None, 'src', 'dst')
+TCP_FLAGS = ('fin', 'syn', 'rst', 'push', 'ack', 'urg', 'ece', 'cwr')
+
+_HOSTNAME = re.compile(r'^[A-Za-z0-9]([A-Za-z0-9-]{0,62})(\.[A-Za-z0-9]([A-Za-z0-9-]{0,62}))*$')
+
+
+def compile_bpf(expression, linktype=LINKTYPE_ETHERNET):
+    """
+    Compiles a filter expression into a BPF program with libpcap.
+
+    The expression is compiled against a "dead" capture handle of the given
+    link type, so no interface or privileges are needed. This is the same
+    compiler the capture backends use, so an expression that compiles here
+    will be accepted when the capture starts.
+
+    Args:
+        expression (str): The tcpdump-style filter expression.
+        linktype (int, optional): The link-layer type to compile for. Default is Ethernet.
+
+    The program is allocated by libpcap and must be released with Scapy's
+    `free_filter` once it is no longer needed; use `validate_bpf` to only
+    check an expression.
+
+    Returns:
+        scapy.arch.common.bpf_program: The compiled program.
+
+    Raises:
+        ValueError: If libpcap rejects the expression.
+        ImportError: If libpcap is not available.
+    """
+    from scapy.arch.common import compile_filter
+    from scapy.error import Scapy_Exception
+
+    try:
+        return compile_filter(expression, linktype=linktype)
+    except Scapy_Exception as e:
+        raise ValueError(f"Invalid capture filter {expression!r}: {e}") from e
+
+
+def validate_bpf(expression, linktype=LINKTYPE_ETHERNET) -> None:
+    """
+    Checks that libpcap accepts a filter expression.
+
+    The expression is compiled like `compile_bpf` and the program is freed
+    straight away.
+
+    Args:
+        expression (str): The tcpdump-style filter expression.
+        linktype (int, optional): The link-layer type to compile for. Default is Ethernet.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If libpcap rejects the expression.
+        ImportError: If libpcap is not available.
+    """
+    from scapy.arch.common import free_filter
+
+    free_filter(compile_bpf(expression, linktype))
+
+
+def truncate_program(instructions, snaplen) -> list:
+    """
+    Rewrites a BPF program so that accepted packets are truncated to a snap length.
+
+    A classic BPF program accepts a packet by returning the number of bytes to
+    keep (`ret #k`). Capping every non-zero constant return at `snaplen` makes
+    the kernel trim packets before they are queued to the socket or copied into
+    the ring, while the original length remains available to userspace.
+
+    Args:
+        instructions (list of tuple): The program as `(code, jt, jf, k)` tuples.
+        snaplen (int): The maximum number of bytes to keep per packet.
+
+    Returns:
+        list of tuple: The rewritten program.
+    """
+    return [(code, jt, jf, min(k, snaplen) if code == BPF_RET_K and k else k)
+            for code, jt, jf, k in instructions]
+
+
+def attach_bpf(sock, expression, iface, snaplen=None) -> None:
+    """
+    Compiles a filter expression and attaches it to a socket, optionally truncating packets.
+
+    Without a snap length this is Scapy's `attach_filter`. With one, the
+    compiled program's accept instructions are capped at `snaplen` (see
+    `truncate_program`); when there is no expression, a one-instruction
+    program accepting every packet up to `snaplen` bytes (or whole packets
+    without a snap length) is attached, which does not need libpcap.
+
+    Attaching a program to a socket that already has one replaces it
+    atomically: every packet is checked against either the old or the new
+    program, with no window in which the socket is unfiltered.
+
+    Args:
+        sock (socket.socket): The `AF_PACKET` socket.
+        expression (str): The filter expression, or None to accept every packet.
+        iface (str): The interface used to compile the expression.
+        snaplen (int, optional): The maximum number of bytes to keep per packet. Default is None.
+
+    Returns:
+        None
+    """
+    # Imported lazily: Scapy's Linux helpers are unavailable on other platforms
+    if not snaplen and expression:
+        from scapy.arch.linux import attach_filter
+        attach_filter(sock, expression, iface)
+        return None
+
+    from scapy.libs.structures import bpf_insn, sock_fprog
+
+    if expression:
+        from scapy.arch.common import compile_filter, free_filter
+        program = compile_filter(expression, iface)
+        instructions = [(instruction.code, instruction.jt, instruction.jf, instruction.k)
+                        for instruction in program.bf_insns[:program.bf_len]]
+        free_filter(program)
+    else:
+        instructions = [(BPF_RET_K, 0, 0, snaplen or BPF_ACCEPT_ALL)]
+
+    if snaplen:
+        instructions = truncate_program(instructions, snaplen)
+    array = (bpf_insn * len(instructions))(*(bpf_insn(*instruction) for instruction in instructions))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, sock_fprog(len(instructions), array))
+
+
+class BPFFilter:
+    """
+    Builds a kernel-side capture filter from structured predicates.
+
+    The `BPFFilter` class assembles a single tcpdump-style expression from
+    protocols, hosts and networks, ports and port ranges, VLAN tags, and TCP flag
+    predicates. The whole expression compiles into one BPF program attached to the
+    capture socket, so uninteresting traffic is discarded in the kernel before it
+    costs any Python work. Each predicate is validated as it is added, and
+    `compile` checks the final expression with libpcap.
+
+    Hosts and ports are grouped by direction: entries added with the same
+    direction are alternatives (joined with "or"), while the groups themselves,
+    the protocols, the VLAN tag, and the TCP flags must all match (joined with
+    "and"). For example::
+
+        bpf = BPFFilter(protocols=["tcp"])
+        bpf.add_hosts("10.0.0.0/8", direction="src")
+        bpf.add_ports(443, (8000, 8100), direction="dst")
+        bpf.set_tcp_flags(set_flags=["syn"], clear_flags=["ack"])
+
+    builds ``(tcp) and (dst port 443 or dst portrange 8000-8100) and src net
+    10.0.0.0/8 and tcp[tcpflags] & (tcp-syn|tcp-ack) == tcp-syn``.
+
+    Attributes:
+        protocols (list): The protocols to capture; any of them may match.
+        vlan (int or bool): The VLAN ID to match, True for any VLAN, or None.
+
+    Methods:
+        add_hosts(*hosts, direction=None):
+            Adds IP addresses, CIDR networks, or hostnames.
+
+        add_ports(*ports, direction=None):
+            Adds ports or inclusive port ranges.
+
+        set_vlan(vlan_id=True):
+            Restricts the capture to 802.1Q tagged frames.
+
+        set_tcp_flags(set_flags=(), clear_flags=()):
+            Restricts the capture to TCP segments with the given flags set and cleared.
+
+        build() -> str:
+            Returns the filter expression.
+
+        compile(linktype=LINKTYPE_ETHERNET):
+            Compiles the expression into a BPF program with libpcap.
+
+        validate(linktype=LINKTYPE_ETHERNET):
+            Checks that libpcap accepts the expression.
+    """
+    def __init__(self, protocols=None) -> None:
+        """
+        Initializes the BPFFilter.
+
+        Args:
+            protocols (list of str, optional): The protocols to capture. Default is ["tcp"].
+
+        Raises:
+            ValueError: If a protocol is not supported.
+        """
+        self.protocols = []
+        self.vlan = None
+        self._hosts = {}
+        self._ports = {}
+        self._flags_set = ()
+        self._flags_clear = ()
+        self.set_protocols(protocols or ["tcp"])
+
+    def set_protocols(self, protocols) -> None:
+        """
+        Sets the protocols to capture.
+
+        Args:
+            protocols (list of str): Protocol names, e.g. ["tcp", "udp"].
+
+        Raises:
+            ValueError: If the list is empty or a protocol is not supported.
+        """
+        protocols = [protocol.lower() for protocol in protocols]
+        if not protocols:
+            raise ValueError("At least one protocol is required.")
+        for protocol in protocols:
+            if protocol not in FILTER_PROTOCOLS:
+                raise ValueError(f"Unsupported protocol: {protocol}. "
+                                 f"Supported protocols: {', '.join(FILTER_PROTOCOLS)}.")
+        self.protocols = protocols
+
+    def add_hosts(self, *hosts, direction=None) -> None:
+        """
+        Adds hosts or networks to match.
+
+        Addresses with a prefix length ("10.0.0.0/8", "2001:db8::/32") become
+        `net` predicates; plain addresses and hostnames become `host` predicates.
+
+        Args:
+            *hosts (str): IPv4/IPv6 addresses, CIDR networks, or hostnames.
+            direction (str, optional): "src", "dst", or None for either. Default is None.
+
+        Raises:
+            ValueError: If a host is malformed or the direction is unknown.
+        """
+        self._check_direction(direction)
+        predicates = self._hosts.setdefault(direction, [])
+        for host in hosts:
+            host = str(host).strip()
+            if '/' in host:
+                try:
+                    network = ipaddress.ip_network(host, strict=False)
+                except ValueError as e:
+                    raise ValueError(f"Invalid network: {host}") from e
+                predicates.append(f"net {network}")
+                continue
+            try:
+                ipaddress.ip_address(host)
+            except ValueError:
+                if not _HOSTNAME.match(host):
+                    raise ValueError(f"Invalid host: {host}")
+            predicates.append(f"host {host}")
+
+    def add_ports(self, *ports, direction=None) -> None:
+        """
+        Adds ports or port ranges to match.
+
+        Args:
+            *ports (int, str, or tuple): Port numbers, or inclusive ranges given as a
+                `(low, high)` tuple or a "low-high" string.
+            direction (str, optional): "src", "dst", or None for either. Default is None.
+
+        Raises:
+            ValueError: If a port is out of range, a range is inverted, or the direction is unknown.
+        """
+        self._check_direction(direction)
+        predicates = self._ports.setdefault(direction, [])
+        for port in ports:
+            if isinstance(port, str) and '-' in port:
+                port = tuple(port.split('-', 1))
+            if isinstance(port, tuple):
+                low, high = (self._check_port(value) for value in port)
+                if low > high:
+                    raise ValueError(f"Invalid port range: {low}-{high}")
+                predicates.append(f"portrange {low}-{high}")
+            else:
+                predicates.append(f"port {self._check_port(port)}")
+
+    def set_vlan(self, vlan_id=True) -> None:
+        """
+        Restricts the capture to 802.1Q tagged frames.
+
+        Note that in BPF the `vlan` keyword shifts the offsets used by every
+        following predicate, so untagged frames no longer match the rest of the
+        expression.
+
+        Args:
+            vlan_id (int or bool, optional): The VLAN ID to match, True for any
+                VLAN, or None/False to remove the restriction. Default is True.
+
+        Raises:
+            ValueError: If the VLAN ID is outside 0-4095.
+        """
+        if vlan_id is None or vlan_id is False:
+            self.vlan = None
+            return
+        if vlan_id is not True and (not isinstance(vlan_id, int) or not 0 <= vlan_id <= 4095):
+            raise ValueError(f"Invalid VLAN ID: {vlan_id}")
+        self.vlan = vlan_id
+
+    def set_tcp_flags(self, set_flags=(), clear_flags=()) -> None:
+        """
+        Restricts the capture to TCP segments with specific flags.
+
+        For example, `set_flags=["syn"], clear_flags=["ack"]` matches only the
+        initial SYN of each handshake. Flags not listed are ignored. libpcap
+        evaluates `tcp[...]` against IPv4 only.
+
+        Args:
+            set_flags (list of str, optional): Flags that must be set.
+            clear_flags (list of str, optional): Flags that must be cleared.
+
+        Raises:
+            ValueError: If a flag is unknown, listed in both lists, or "tcp" is not a captured protocol.
+        """
+        set_flags = tuple(flag.lower() for flag in set_flags)
+        clear_flags = tuple(flag.lower() for flag in clear_flags)
+        for flag in set_flags + clear_flags:
+            if flag not in TCP_FLAGS:
+                raise ValueError(f"Unknown TCP flag: {flag}. Supported flags: {', '.join(TCP_FLAGS)}.")
+        if set(set_flags) & set(clear_flags):
+            raise ValueError("A TCP flag cannot be both set and cleared.")
+        if (set_flags or clear_flags) and 'tcp' not in self.protocols:
+            raise ValueError("TCP flag predicates require the tcp protocol.")
+        self._flags_set = set_flags
+        self._flags_clear = clear_flags
+
+    def build(self) -> str:
+        """
+        Assembles the filter expression.
+
+        Returns:
+            str: The tcpdump-style filter expression.
+        """
+        filters = []
+        if self.vlan is True:
+            filters.append("vlan")
+        elif self.vlan is not None:
+            filters.append(f"vlan {self.vlan}")
+
+        filters.append(f"({' or '.join(self.protocols)})")
+
+        for groups in (self._ports, self._hosts):
+            for direction, predicates in groups.items():
+                if not predicates:
+                    continue
+                if direction:
+                    predicates = [f"{direction} {predicate}" for predicate in predicates]
+                if len(predicates) == 1:
+                    filters.append(predicates[0])
+                else:
+                    filters.append(f"({' or '.join(predicates)})")
+
+        if self._flags_set or self._flags_clear:
+            mask = '|'.join(f"tcp-{flag}" for flag in self._flags_set + self._flags_clear)
+            value = '|'.join(f"tcp-{flag}" for flag in self._flags_set) or '0'
+            if len(self._flags_set + self._flags_clear) > 1:
+                mask = f"({mask})"
+            filters.append(f"tcp[tcpflags] & {mask} == {value}")
+
+        return " and ".join(filters)
+
+    def compile(self, linktype=LINKTYPE_ETHERNET):
+        """
+        Compiles the filter into a BPF program.
+
+        The caller owns the program and must release it with Scapy's `free_filter`.
+
+        Args:
+            linktype (int, optional): The link-layer type to compile for. Default is Ethernet.
+
+        Returns:
+            scapy.arch.common.bpf_program: The compiled program.
+
+        Raises:
+            ValueError: If libpcap rejects the expression.
+            ImportError: If libpcap is not available.
+        """
+        return compile_bpf(self.build(), linktype)
+
+    def validate(self, linktype=LINKTYPE_ETHERNET) -> None:
+        """
+        Checks that libpcap accepts the filter, without keeping the compiled program.
+
+        Args:
+            linktype (int, optional): The link-layer type to compile for. Default is Ethernet.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If libpcap rejects the expression.
+            ImportError: If libpcap is not available.
+        """
+        validate_bpf(self.build(), linktype)
+
+    @staticmethod
+    def _check_direction(direction) -> None:
+        """
+        Validates a direction qualifier.
+
+        Raises:
+            ValueError: If the direction is not "src", "dst", or None.
+        """
+        if direction not in FILTER_DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction}. Expected 'src', 'dst', or None.")
+
+    @staticmethod
+    def _check_port(port) -> int:
+        """
+        Validates a port number.
+
+        Returns:
+            int: The port as an integer.
+
+        Raises:
+            ValueError: If the port is not an integer in 0-65535.
+        """
+        try:
+            value = int(port)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid port: {port}") from None
+        if not 0 <= value <= 65535:
+            raise ValueError(f"Invalid port: {port}")
+        return value
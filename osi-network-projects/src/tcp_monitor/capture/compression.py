@@ -0,0 +1,245 @@
+import gzip
+import io
+import time
+import zlib
+
+# zstandard is optional: without it only gzip output and input are available
+ZSTD_AVAILABLE = False
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+
+COMPRESSION_FORMATS = ('gzip', 'zstd')
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 6, 'zstd': 3}
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def check_compression(compression, level=None) -> None:
+    """
+    Validates a compression format and level.
+
+    Args:
+        compression (str): "gzip" or "zstd".
+        level (int, optional): The compression level, or None for the format's default.
+
+    Raises:
+        ValueError: If the format is unknown or unavailable, or the level is out of range.
+    """
+    if compression not in COMPRESSION_FORMATS:
+        raise ValueError(f"Unsupported compression: {compression}. "
+                         f"Supported formats: {', '.join(COMPRESSION_FORMATS)}.")
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        raise ValueError("zstd compression requires the zstandard package")
+    if level is None:
+        return None
+    low, high = (1, 9) if compression == 'gzip' else (1, 22)
+    if not low <= level <= high:
+        raise ValueError(f"{compression} compression level must be between {low} and {high}.")
+
+
+def detect_compression(header) -> str:
+    """
+    Detects the compression format of a file from its first bytes.
+
+    Args:
+        header (bytes): At least the first four bytes of the file.
+
+    Returns:
+        str: "gzip", "zstd", or None for uncompressed data.
+    """
+    if header[:2] == GZIP_MAGIC:
+        return 'gzip'
+    if header[:4] == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+
+class BlockCompressedFile:
+    """
+    A write-only file that compresses its data in independent blocks.
+
+    The `BlockCompressedFile` class buffers written bytes and compresses them
+    into a self-contained gzip member or zstd frame once `block_size` bytes are
+    pending or the oldest pending byte is `max_delay` seconds old. Concatenated
+    members (frames) form a valid gzip (zstd) file, so every completed block can
+    be decompressed on its own: if the process dies, only the block being
+    written is lost, and `PcapFileSource` reads everything before it.
+
+    Compression happens on the thread calling `write` and `flush`, which for
+    capture output is the `RotatingPcapWriter` thread, never the sniffer thread.
+
+    Attributes:
+        compression (str): "gzip" or "zstd".
+        level (int): The compression level.
+        block_size (int): Uncompressed bytes per block.
+        max_delay (float): Seconds after which a partial block is compressed by `flush`.
+        compressed_bytes (int): Bytes written to the underlying file.
+        blocks_written (int): Blocks compressed so far.
+
+    Methods:
+        write(data) -> int:
+            Buffers data, compressing a block once enough is pending.
+
+        flush():
+            Compresses the partial block if it is due and flushes the underlying file.
+
+        close():
+            Compresses the pending data and closes the underlying file.
+    """
+    def __init__(self, file, compression, level=None, block_size=DEFAULT_BLOCK_SIZE, max_delay=1.0) -> None:
+        """
+        Initializes the BlockCompressedFile.
+
+        Args:
+            file (file object): The underlying binary file, opened for writing or appending.
+            compression (str): "gzip" or "zstd".
+            level (int, optional): The compression level. Defaults to 6 for gzip and 3 for zstd.
+            block_size (int, optional): Uncompressed bytes per block. Default is 1 MiB.
+            max_delay (float, optional): Maximum age in seconds of a partial block before
+                `flush` compresses it. Default is 1.0.
+
+        Raises:
+            ValueError: If the compression settings or the block size are invalid.
+        """
+        check_compression(compression, level)
+        if block_size <= 0:
+            raise ValueError("Compression block size must be positive.")
+        self.compression = compression
+        self.level = level if level is not None else DEFAULT_COMPRESSION_LEVELS[compression]
+        self.block_size = block_size
+        self.max_delay = max_delay
+        self.compressed_bytes = 0
+        self.blocks_written = 0
+
+        self._file = file
+        self._pending = bytearray()
+        self._pending_since = None
+        self._compressor = (zstandard.ZstdCompressor(level=self.level)
+                            if compression == 'zstd' else None)
+
+    @property
+    def deadline(self) -> float:
+        """
+        Gets the time at which the partial block becomes due.
+
+        Returns:
+            float: A `time.monotonic()` value, or None if nothing is pending.
+        """
+        if self._pending_since is None:
+            return None
+        return self._pending_since + self.max_delay
+
+    def write(self, data) -> int:
+        """
+        Buffers data, compressing a block once `block_size` bytes are pending.
+
+        Args:
+            data (bytes-like): The bytes to write.
+
+        Returns:
+            int: The number of bytes accepted.
+        """
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._pending += data
+        if len(self._pending) >= self.block_size:
+            self._write_block()
+        return len(data)
+
+    def flush(self, force=False) -> None:
+        """
+        Compresses the partial block if it is older than `max_delay`, then flushes the file.
+
+        Args:
+            force (bool, optional): Compress the partial block regardless of its age. Default is False.
+
+        Returns:
+            None
+        """
+        if self._pending and (force or time.monotonic() >= self.deadline):
+            self._write_block()
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Compresses the pending data and closes the underlying file.
+
+        Returns:
+            None
+        """
+        self.flush(force=True)
+        self._file.close()
+
+    def _write_block(self) -> None:
+        """
+        Compresses the pending bytes into one independent block and writes it.
+
+        Returns:
+            None
+        """
+        if self._compressor is not None:
+            block = self._compressor.compress(bytes(self._pending))
+        else:
+            block = gzip.compress(bytes(self._pending), compresslevel=self.level, mtime=0)
+        self._file.write(block)
+        self._file.flush()
+        self.compressed_bytes += len(block)
+        self.blocks_written += 1
+        self._pending = bytearray()
+        self._pending_since = None
+
+
+def open_decompressed(file_path, compression) -> io.BufferedIOBase:
+    """
+    Opens a gzip or zstd file for reading its decompressed contents.
+
+    Files made of several members (frames), as written by `BlockCompressedFile`,
+    are read across member boundaries.
+
+    Args:
+        file_path (str): The path of the compressed file.
+        compression (str): "gzip" or "zstd", e.g. from `detect_compression`.
+
+    Returns:
+        io.BufferedIOBase: A readable binary stream.
+
+    Raises:
+        ValueError: If the format is unknown or unavailable.
+    """
+    check_compression(compression)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True,
+                                                        closefd=True)
+    return io.BufferedReader(reader)
+
+
+def read_exact(stream, size) -> bytes:
+    """
+    Reads exactly `size` bytes from a decompressed stream.
+
+    A file that ends in the middle of a block, e.g. because the writer was
+    killed, is treated as ending at the last complete record.
+
+    Args:
+        stream (io.BufferedIOBase): A stream returned by `open_decompressed`.
+        size (int): The number of bytes to read.
+
+    Returns:
+        bytes: The bytes read, or None if fewer than `size` bytes remain.
+    """
+    try:
+        data = stream.read(size)
+    except (EOFError, zlib.error):
+        return None
+    except Exception as error:
+        if zstandard is not None and isinstance(error, zstandard.ZstdError):
+            return None
+        raise
+    return data if len(data) == size else None
@@ -0,0 +1,392 @@
+import logging
+import os
+import queue
+import threading
+
+from tcp_monitor.analyzers.decoded_packet import DecodedPacket
+from tcp_monitor.analyzers.tcp_analyzer import TCP_RST
+from tcp_monitor.capture.pcap_writer import (DEFAULT_SNAPLEN, PCAP_RECORD_HEADER, pack_record,
+                                             packet_record, pcap_global_header, split_timestamp)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECORDER_SIZE = 64 * 1024 * 1024
+
+
+class FlightRecorder:
+    """
+    Keeps the most recent traffic in memory and dumps it to pcap on demand.
+
+    The `FlightRecorder` class holds the last `max_bytes` of frames (and
+    optionally only the last `max_seconds`) in a circular buffer allocated once
+    up front. Frames are stored as ready-made pcap records, header and data,
+    packed in place into the buffer, so recording a frame allocates nothing and
+    dumping the window is a copy of at most two contiguous slices. The oldest
+    records are evicted as new ones arrive.
+
+    A trigger, either a call to `trigger()` or the `trigger` predicate returning
+    True for a frame, starts a dump: the buffered window is written to a new pcap
+    file by a background thread, followed by every frame recorded during the
+    next `post_trigger` seconds. The post-trigger deadline is measured in packet
+    timestamps, so recorded files replay the same way; it is checked as frames
+    arrive and when `finish()` is called. Triggers during a dump extend nothing
+    and are ignored.
+
+    `trigger()` and `finish()` may be called from any thread while the capture
+    thread calls `record()`: a lock makes storing a frame and starting or ending
+    a dump atomic, so every frame is either in the copied window or in the
+    post-trigger frames, exactly once. Dump files are written one after the
+    other by their threads, without blocking the capture thread.
+
+    Attributes:
+        file_path (str): The base path of the dump files; each dump gets a sequence
+            number before the extension (e.g. `incident_00001.pcap`).
+        max_bytes (int): The size of the circular buffer.
+        max_seconds (float): The maximum age of buffered frames, or None for no limit.
+        post_trigger (float): Seconds of traffic written after a trigger.
+        trigger_predicate (callable): Called with each frame; a truthy result triggers a dump.
+        dumps (list of str): The paths of the dump files started so far.
+        buffered_packets (int): Frames currently held in the buffer.
+        buffered_bytes (int): Bytes currently used in the buffer.
+        is_dumping (bool): Whether a dump is collecting post-trigger frames.
+
+    Methods:
+        record(packet):
+            Adds a frame to the buffer and feeds an active dump.
+
+        trigger(reason=None) -> str:
+            Starts a dump of the buffered window plus the post-trigger window.
+
+        finish():
+            Completes an active dump and waits for it to be written.
+    """
+    def __init__(self, file_path, max_bytes=DEFAULT_RECORDER_SIZE, max_seconds=None,
+                 post_trigger=5.0, trigger=None) -> None:
+        """
+        Initializes the FlightRecorder and allocates its buffer.
+
+        Args:
+            file_path (str): The base path of the dump files.
+            max_bytes (int, optional): The size of the circular buffer. Default is 64 MiB.
+            max_seconds (float, optional): The maximum age of buffered frames. Default is None (no limit).
+            post_trigger (float, optional): Seconds of traffic written after a trigger. Default is 5.
+            trigger (callable, optional): A predicate called with each frame, e.g. a
+                `RstStormTrigger`. Default is None (API triggers only).
+
+        Raises:
+            ValueError: If the path is empty or the limits are invalid.
+        """
+        if not file_path:
+            raise ValueError("Flight recorder file path must be specified.")
+        if max_bytes <= PCAP_RECORD_HEADER.size:
+            raise ValueError("Flight recorder buffer is too small.")
+        if max_seconds is not None and max_seconds <= 0:
+            raise ValueError("Flight recorder window must be positive.")
+        if post_trigger < 0:
+            raise ValueError("Post-trigger duration must not be negative.")
+
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.post_trigger = post_trigger
+        self.trigger_predicate = trigger
+        self.dumps = []
+
+        self._buffer = bytearray(max_bytes)
+        self._view = memoryview(self._buffer)
+        # Records occupy [tail, head), or [tail, end) followed by [0, head) once wrapped
+        self._head = 0
+        self._tail = 0
+        self._end = 0
+        self._wrapped = False
+        self._count = 0
+        self._used = 0
+        self._last_timestamp = None
+
+        self._dump_queue = None
+        self._dump_thread = None
+        self._dump_deadline = None
+        self._lock = threading.Lock()
+
+    @property
+    def buffered_packets(self) -> int:
+        """
+        Gets the number of frames held in the buffer.
+
+        Returns:
+            int: The number of buffered frames.
+        """
+        return self._count
+
+    @property
+    def buffered_bytes(self) -> int:
+        """
+        Gets the number of buffer bytes used by records.
+
+        Returns:
+            int: The bytes used, including the 16-byte pcap record headers.
+        """
+        return self._used
+
+    @property
+    def is_dumping(self) -> bool:
+        """
+        Indicates whether a dump is collecting post-trigger frames.
+
+        Returns:
+            bool: True between a trigger and the end of its post-trigger window.
+        """
+        return self._dump_queue is not None
+
+    def record(self, packet) -> None:
+        """
+        Adds a frame to the buffer, evicting the oldest frames as needed.
+
+        If a dump is active, the frame is also passed to it, or the dump is
+        completed if the frame is past the post-trigger deadline. Afterwards, the
+        trigger predicate (if any) is evaluated.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured frame.
+
+        Returns:
+            None
+        """
+        timestamp, data, wire_length = packet_record(packet)
+        with self._lock:
+            self._last_timestamp = timestamp
+            self._store(timestamp, data, wire_length)
+
+            if self._dump_queue is not None:
+                if timestamp > self._dump_deadline:
+                    self._complete_dump()
+                else:
+                    self._dump_queue.put((timestamp, bytes(data), wire_length))
+            dumping = self._dump_queue is not None
+
+        if self.trigger_predicate is not None and not dumping and self.trigger_predicate(packet):
+            self.trigger(f"predicate {self.trigger_predicate!r}")
+
+    def _store(self, timestamp, data, wire_length) -> None:
+        """
+        Packs a pcap record into the buffer. Called with the lock held.
+
+        Returns:
+            None
+        """
+        length = len(data)
+        size = PCAP_RECORD_HEADER.size + length
+        if size > self.max_bytes:
+            return None
+
+        while True:
+            if not self._wrapped:
+                if self._head + size <= self.max_bytes:
+                    break
+                # Wrap: the records at the end of the buffer remain until evicted
+                self._end = self._head
+                self._head = 0
+                self._wrapped = True
+            if self._head + size <= self._tail:
+                break
+            self._evict()
+
+        head = self._head
+        seconds, microseconds = split_timestamp(timestamp)
+        PCAP_RECORD_HEADER.pack_into(self._buffer, head, seconds, microseconds, length,
+                                     length if wire_length is None else wire_length)
+        self._buffer[head + PCAP_RECORD_HEADER.size:head + size] = data
+        self._head = head + size
+        self._count += 1
+        self._used += size
+
+        if self.max_seconds is not None:
+            oldest = timestamp - self.max_seconds
+            while self._count > 1:
+                seconds, microseconds = PCAP_RECORD_HEADER.unpack_from(self._buffer, self._tail)[:2]
+                if seconds + microseconds / 1_000_000 >= oldest:
+                    break
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the oldest record from the buffer.
+
+        Returns:
+            None
+        """
+        if self._wrapped and self._tail == self._end:
+            self._tail = 0
+            self._wrapped = False
+            return None
+        size = PCAP_RECORD_HEADER.size + PCAP_RECORD_HEADER.unpack_from(self._buffer, self._tail)[2]
+        self._tail += size
+        self._count -= 1
+        self._used -= size
+        if self._wrapped and self._tail >= self._end:
+            self._tail = 0
+            self._wrapped = False
+
+    def _segments(self) -> list:
+        """
+        Copies the buffered records out, oldest first. Called with the lock held.
+
+        Returns:
+            list of bytes: One or two runs of contiguous pcap records.
+        """
+        if self._wrapped:
+            return [bytes(self._view[self._tail:self._end]), bytes(self._view[:self._head])]
+        return [bytes(self._view[self._tail:self._head])]
+
+    def trigger(self, reason=None) -> str:
+        """
+        Starts dumping the buffered window and the next `post_trigger` seconds.
+
+        The window is copied while holding the lock, which briefly holds up
+        `record()` on the capture thread; the file is written by a background
+        thread once the previous dump, if any, has been written.
+
+        Args:
+            reason (str, optional): A description of the trigger, logged with the dump.
+
+        Returns:
+            str: The path of the dump file, or the path of the dump in progress
+            if one is already collecting post-trigger frames.
+        """
+        with self._lock:
+            if self._dump_queue is not None:
+                return self.dumps[-1]
+
+            root, extension = os.path.splitext(self.file_path)
+            dump_path = f"{root}_{len(self.dumps) + 1:05d}{extension or '.pcap'}"
+            self.dumps.append(dump_path)
+            logger.warning("Flight recorder triggered%s: dumping %d packets to %s",
+                           f" by {reason}" if reason else "", self._count, dump_path)
+
+            # The new writer waits for the previous one instead of the capture thread
+            frames = queue.Queue()
+            self._dump_thread = threading.Thread(target=self._write_dump,
+                                                 args=(dump_path, self._segments(), frames, self._dump_thread),
+                                                 name="flight-recorder-dump", daemon=True)
+            self._dump_thread.start()
+            self._dump_deadline = (self._last_timestamp or 0.0) + self.post_trigger
+            self._dump_queue = frames
+            if not self.post_trigger:
+                self._complete_dump()
+        return dump_path
+
+    def finish(self) -> None:
+        """
+        Completes an active dump and waits until every dump is written.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._dump_queue is not None:
+                self._complete_dump()
+            dump_thread, self._dump_thread = self._dump_thread, None
+        if dump_thread is not None:
+            dump_thread.join()
+
+    def _complete_dump(self) -> None:
+        """
+        Ends the post-trigger window of the active dump. Called with the lock held.
+
+        Returns:
+            None
+        """
+        self._dump_queue.put(None)
+        self._dump_queue = None
+        self._dump_deadline = None
+
+    @staticmethod
+    def _write_dump(dump_path, segments, frames, previous=None) -> None:
+        """
+        Main loop of the dump thread: writes the pre-trigger window, then post-trigger frames.
+
+        Args:
+            dump_path (str): The path of the pcap file to create.
+            segments (list of bytes): The buffered pcap records.
+            frames (queue.Queue): Post-trigger `(timestamp, data, wire_length)` tuples,
+                terminated by None.
+            previous (threading.Thread, optional): The previous dump's thread, which
+                finishes writing first.
+
+        Returns:
+            None
+        """
+        if previous is not None:
+            previous.join()
+        with open(dump_path, 'wb') as pcap_file:
+            pcap_file.write(pcap_global_header(DEFAULT_SNAPLEN))
+            for segment in segments:
+                pcap_file.write(segment)
+            while True:
+                frame = frames.get()
+                if frame is None:
+                    break
+                timestamp, data, wire_length = frame
+                pcap_file.write(pack_record(timestamp, data, wire_length))
+                pcap_file.write(data)
+
+
+class RstStormTrigger:
+    """
+    A flight recorder trigger firing when too many TCP resets are seen.
+
+    The `RstStormTrigger` class decodes each frame with the Ethernet, IP and TCP
+    analyzers and counts segments with the RST flag set within a fixed window of
+    packet time. It returns True for the frame that brings the count to the threshold.
+
+    Attributes:
+        threshold (int): The number of resets that triggers.
+        window (float): The length of the counting window in seconds.
+        resets (int): Resets counted in the current window.
+    """
+    def __init__(self, threshold=100, window=1.0) -> None:
+        """
+        Initializes the RstStormTrigger.
+
+        Args:
+            threshold (int, optional): The number of resets that triggers. Default is 100.
+            window (float, optional): The counting window in seconds. Default is 1.
+
+        Raises:
+            ValueError: If the threshold or window is not positive.
+        """
+        if threshold <= 0 or window <= 0:
+            raise ValueError("RST storm threshold and window must be positive.")
+        self.threshold = threshold
+        self.window = window
+        self.resets = 0
+        self._window_start = None
+
+    def __repr__(self) -> str:
+        """Describes the trigger for log messages."""
+        return f"RstStormTrigger(threshold={self.threshold}, window={self.window})"
+
+    def __call__(self, packet) -> bool:
+        """
+        Counts the frame if it is a TCP reset.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured frame.
+
+        Returns:
+            bool: True if the frame brings the reset count to the threshold.
+        """
+        timestamp, data, _ = packet_record(packet)
+        if not self._is_reset(data):
+            return False
+        if self._window_start is None or timestamp - self._window_start >= self.window:
+            self._window_start = timestamp
+            self.resets = 0
+        self.resets += 1
+        return self.resets == self.threshold
+
+    @staticmethod
+    def _is_reset(data) -> bool:
+        """Tells whether a frame is a TCP segment with RST set, decoding only its flags."""
+        packet = DecodedPacket(data)
+        return packet.is_tcp and bool(packet.tcp_flags & TCP_RST)
@@ -0,0 +1,232 @@
+import ipaddress
+import zlib
+from collections import namedtuple
+
+from tcp_monitor.analyzers.ip_analyzer import IPV6_EXTENSION_HEADERS, walk_ipv6_extension_headers
+
+# Ethernet (14) + 802.1Q tag (4) + IPv4 header with options (60) + TCP header with options (60)
+SNAPLEN_HEADERS = 138
+
+ETHERTYPE_VLAN = 0x8100
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+
+RawFrame = namedtuple('RawFrame', ['timestamp', 'data', 'wire_length', 'weight'], defaults=(None, 1))
+RawFrame.__doc__ = """
+A raw link-layer frame delivered by the non-Scapy capture backends.
+
+Unlike a Scapy `Packet`, a `RawFrame` is not dissected: `data` holds the frame
+exactly as received, ready to be passed to `EthernetAnalyzer.analyze_frame`.
+
+Attributes:
+    timestamp (float): The capture time in seconds since the epoch.
+    data (bytes): The raw bytes of the frame, starting at the Ethernet header.
+    wire_length (int): The length of the frame on the wire when `data` was
+        truncated to a snap length, or None when `data` is the whole frame.
+    weight (int): The number of captured packets the frame stands for, set when
+        a packet sampler kept it (see `weigh_frame`); 1 for unsampled frames.
+"""
+
+
+def frame_wire_length(packet) -> int:
+    """
+    Returns the original on-the-wire length of a captured packet.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+    Returns:
+        int: The wire length, which exceeds the captured length for truncated frames.
+    """
+    if isinstance(packet, tuple):
+        if len(packet) > 2 and packet[2] is not None:
+            return packet[2]
+        return len(packet[1])
+    wire_length = getattr(packet, 'wirelen', None)
+    if isinstance(wire_length, int):
+        return wire_length
+    return len(bytes(packet))
+
+
+def frame_weight(packet) -> int:
+    """
+    Returns the number of captured packets a packet stands for.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+    Returns:
+        int: The weight recorded by `weigh_frame`, or 1 if the packet was not weighed.
+    """
+    if isinstance(packet, tuple):
+        return packet[3] if len(packet) > 3 else 1
+    return getattr(packet, 'sampling_weight', 1)
+
+
+def weigh_frame(packet, weight):
+    """
+    Records the number of captured packets a sampled packet stands for.
+
+    The weight must be taken when the sampler keeps the packet: with adaptive
+    sampling the rate may have changed by the time a pipeline worker analyses it.
+    Raw frames are copied with their `weight` field set; Scapy packets get a
+    `sampling_weight` attribute.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+        weight (int): The number of packets it stands for.
+
+    Returns:
+        scapy.packet.Packet or RawFrame: The weighed packet.
+    """
+    if weight == frame_weight(packet):
+        return packet
+    if isinstance(packet, tuple):
+        return RawFrame(*packet[:3])._replace(weight=weight)
+    packet.sampling_weight = weight
+    return packet
+
+
+def truncate_frame(packet, snaplen):
+    """
+    Truncates a captured packet to a snap length, keeping its wire length.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+        snaplen (int): The maximum number of bytes to keep.
+
+    Returns:
+        scapy.packet.Packet or RawFrame: The packet unchanged if it already fits,
+        otherwise a `RawFrame` holding the first `snaplen` bytes.
+    """
+    if isinstance(packet, tuple):
+        if len(packet[1]) <= snaplen:
+            return packet
+        return RawFrame(packet[0], packet[1][:snaplen], frame_wire_length(packet))
+    data = bytes(packet)
+    if len(data) <= snaplen:
+        return packet
+    wire_length = getattr(packet, 'wirelen', None)
+    return RawFrame(float(packet.time), data[:snaplen],
+                    wire_length if isinstance(wire_length, int) else len(data))
+
+
+def detach_frame(packet):
+    """
+    Returns a packet that no longer references a capture buffer.
+
+    Frames from the mmap ring and offline file sources hold `memoryview`s that
+    are only valid during the capture callback. Anything that keeps a packet
+    beyond the callback (queues, writers, buffers) must copy such views first.
+    Scapy packets and frames that already own their bytes are returned unchanged.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+    Returns:
+        scapy.packet.Packet or RawFrame: A packet safe to keep after the callback returns.
+    """
+    if isinstance(packet, tuple) and isinstance(packet[1], memoryview):
+        return RawFrame(packet[0], packet[1].tobytes(), *packet[2:])
+    return packet
+
+
+def flow_key(frame) -> bytes:
+    """
+    Builds the canonical, direction-independent 5-tuple key of an Ethernet frame.
+
+    The two endpoints (address and port) are put in a canonical order, so both
+    directions of a connection produce the same key. Frames that are not IPv4
+    or IPv6 are keyed by their Ethernet header instead, and non-TCP/UDP packets
+    by their addresses and protocol only. IPv6 extension headers are walked to
+    the upper-layer protocol and its ports. Fragments are keyed by addresses
+    and protocol too: only the first fragment carries the ports, and keying it
+    differently would send the fragments of one datagram to different shards.
+
+    Args:
+        frame (bytes): The raw Ethernet frame.
+
+    Returns:
+        bytes: The protocol followed by the ordered endpoints.
+    """
+    offset = 14
+    if len(frame) < offset:
+        return bytes(frame)
+    ethertype = (frame[12] << 8) | frame[13]
+    if ethertype == ETHERTYPE_VLAN and len(frame) >= 18:
+        ethertype = (frame[16] << 8) | frame[17]
+        offset = 18
+
+    if ethertype == ETHERTYPE_IPV4 and len(frame) >= offset + 20:
+        protocol = frame[offset + 9]
+        src = bytes(frame[offset + 12:offset + 16])
+        dst = bytes(frame[offset + 16:offset + 20])
+        transport = offset + (frame[offset] & 0x0F) * 4
+        if ((frame[offset + 6] << 8) | frame[offset + 7]) & 0x3FFF:
+            # More Fragments set or a nonzero fragment offset
+            return _endpoints_key(protocol, src, b'', dst, b'')
+    elif ethertype == ETHERTYPE_IPV6 and len(frame) >= offset + 40:
+        protocol = frame[offset + 6]
+        src = bytes(frame[offset + 8:offset + 24])
+        dst = bytes(frame[offset + 24:offset + 40])
+        transport = offset + 40
+        if protocol in IPV6_EXTENSION_HEADERS:
+            try:
+                protocol, header_length, _, fragment = walk_ipv6_extension_headers(memoryview(frame)[offset:],
+                                                                                   protocol)
+            except ValueError:
+                return _endpoints_key(protocol, src, b'', dst, b'')
+            if fragment is not None and (fragment.offset or fragment.more_fragments):
+                return _endpoints_key(protocol, src, b'', dst, b'')
+            transport = offset + header_length
+    else:
+        return bytes(frame[:14])
+
+    src_port = dst_port = b''
+    if protocol in (6, 17) and len(frame) >= transport + 4:
+        src_port = bytes(frame[transport:transport + 2])
+        dst_port = bytes(frame[transport + 2:transport + 4])
+    return _endpoints_key(protocol, src, src_port, dst, dst_port)
+
+
+def tuple_flow_key(src_ip, dst_ip, src_port, dst_port, protocol=6) -> bytes:
+    """
+    Builds the `flow_key` of a connection from its 5-tuple.
+
+    Args:
+        src_ip (str): One endpoint's IPv4 or IPv6 address.
+        dst_ip (str): The other endpoint's address.
+        src_port (int): One endpoint's port.
+        dst_port (int): The other endpoint's port.
+        protocol (int, optional): The IP protocol number. Default is 6 (TCP).
+
+    Returns:
+        bytes: The same key `flow_key` returns for the connection's frames.
+    """
+    return _endpoints_key(protocol, ipaddress.ip_address(src_ip).packed, src_port.to_bytes(2, 'big'),
+                          ipaddress.ip_address(dst_ip).packed, dst_port.to_bytes(2, 'big'))
+
+
+def _endpoints_key(protocol, src, src_port, dst, dst_port) -> bytes:
+    """Joins the protocol and both endpoints in canonical order."""
+    first, second = (src, src_port), (dst, dst_port)
+    if second < first:
+        first, second = second, first
+    return b''.join((bytes([protocol]), first[0], first[1], second[0], second[1]))
+
+
+def flow_hash(frame) -> int:
+    """
+    Computes a symmetric hash of an Ethernet frame's 5-tuple.
+
+    This is the CRC-32 of `flow_key`, so both directions of a connection produce
+    the same value. The hash is deterministic across processes, unlike Python's
+    randomised `hash()`.
+
+    Args:
+        frame (bytes): The raw Ethernet frame.
+
+    Returns:
+        int: An unsigned 32-bit hash of the flow.
+    """
+    return zlib.crc32(flow_key(frame))
@@ -0,0 +1,379 @@
+import mmap
+import os
+import select
+import socket
+import struct
+import threading
+import time
+
+from tcp_monitor.capture.bpf_filter import attach_bpf
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.raw_socket import ETH_P_ALL, SOL_PACKET, read_packet_statistics
+
+# Linux <linux/if_packet.h>
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+# struct tpacket_req3
+TPACKET_REQ3 = struct.Struct('7I')
+# struct tpacket_block_desc: version, offset_to_priv, then tpacket_hdr_v1
+# (block_status, num_pkts, offset_to_first_pkt, ...)
+BLOCK_STATUS_OFFSET = 8
+BLOCK_HEADER = struct.Struct('III')
+# struct tpacket3_hdr: tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len, tp_status, tp_mac
+FRAME_HEADER = struct.Struct('IIIIIIH')
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+DEFAULT_BLOCK_COUNT = 64
+DEFAULT_FRAME_SIZE = 2048
+DEFAULT_RETIRE_TIMEOUT_MS = 60
+
+
+class MmapRingSniffer:
+    """
+    A capture backend that reads frames from a `PACKET_MMAP` (TPACKET_V3) ring buffer.
+
+    The `MmapRingSniffer` class asks the kernel to place captured frames directly
+    into a ring of blocks shared with userspace. Instead of one `recv` system call
+    and one copy per packet, the capture thread waits for a whole block to be
+    retired, walks every frame in it, and returns the block to the kernel. A block
+    is retired when it is full or when `retire_timeout_ms` has elapsed.
+
+    Frames are delivered to the callback as `RawFrame(timestamp, data)` where `data`
+    is a `memoryview` over the ring itself. The view is only valid until the callback
+    returns, because the block is handed back to the kernel afterwards; callbacks
+    that keep packets around must copy them (e.g. `bytes(frame.data)`). Each frame
+    also carries its `wire_length` from the ring's frame header.
+
+    With a snap length, the attached BPF program truncates frames in the kernel, so
+    only their first `snaplen` bytes are copied into the ring and many more frames
+    fit into each block.
+
+    This backend mirrors the `AsyncSniffer` interface used by `PacketCapture`. It is
+    only available on Linux and requires the `CAP_NET_RAW` capability. If the socket
+    reports an error (e.g. the interface goes away), the capture thread stops and
+    `stop` raises it.
+
+    Attributes:
+        iface (str): The network interface to capture frames from.
+        filter (str): The BPF filter expression attached to the socket.
+        prn (callable): Callback invoked with each captured `RawFrame`.
+        count (int): Stop after this many frames; 0 means no limit.
+        timeout (float): Stop after this many seconds; None means no limit.
+        store (bool): Whether copies of the captured frames are kept in `results`.
+        block_size (int): Size in bytes of each ring block (a multiple of the page size).
+        block_count (int): Number of blocks in the ring.
+        frame_size (int): Nominal frame slot size used to size the ring.
+        retire_timeout_ms (int): Milliseconds after which a partially filled block is retired.
+        snaplen (int): Maximum number of bytes captured per frame; None captures whole frames.
+        results (list of RawFrame): Captured frames when `store` is True.
+        running (bool): Whether the capture thread is active.
+        error (OSError): The error that ended the capture thread, or None.
+
+    Methods:
+        start():
+            Sets up the ring, attaches the filter, and starts the capture thread.
+
+        stop(join=True):
+            Stops the capture thread and tears down the ring, raising the error that ended it.
+
+        set_filter(expression):
+            Atomically replaces the BPF filter while capturing.
+
+        join(timeout=None):
+            Waits for the capture thread to finish.
+
+        kernel_statistics() -> dict:
+            Returns the kernel's received, dropped, and queue-freeze counters.
+    """
+    def __init__(self, iface, filter=None, prn=None, count=0, timeout=None, store=False,
+                 block_size=DEFAULT_BLOCK_SIZE, block_count=DEFAULT_BLOCK_COUNT,
+                 frame_size=DEFAULT_FRAME_SIZE,
+                 retire_timeout_ms=DEFAULT_RETIRE_TIMEOUT_MS, snaplen=None) -> None:
+        """
+        Initializes the MmapRingSniffer with the capture and ring settings.
+
+        Args:
+            iface (str): The network interface to capture frames from.
+            filter (str, optional): BPF filter expression. Default is None (no filter).
+            prn (callable, optional): Callback invoked with each `RawFrame`. Default is None.
+            count (int, optional): Maximum number of frames to capture. Default is 0 (unlimited).
+            timeout (float, optional): Capture duration in seconds. Default is None (unlimited).
+            store (bool, optional): Keep copies of captured frames in `results`. Default is False.
+            block_size (int, optional): Ring block size in bytes. Default is 1 MiB.
+            block_count (int, optional): Number of ring blocks. Default is 64.
+            frame_size (int, optional): Nominal frame slot size in bytes. Default is 2048.
+            retire_timeout_ms (int, optional): Block retire timeout in milliseconds. Default is 60.
+            snaplen (int, optional): Maximum bytes copied into the ring per frame.
+                Default is None (whole frames).
+
+        Raises:
+            ValueError: If the ring geometry is invalid.
+        """
+        if block_size <= 0 or block_size % mmap.PAGESIZE:
+            raise ValueError(f"Block size must be a positive multiple of the page size ({mmap.PAGESIZE}).")
+        if block_count <= 0:
+            raise ValueError("Block count must be positive.")
+        if frame_size <= 0 or frame_size % 16 or block_size % frame_size:
+            raise ValueError("Frame size must be a multiple of 16 that divides the block size.")
+        if retire_timeout_ms < 0:
+            raise ValueError("Retire timeout cannot be negative.")
+
+        self.iface = iface
+        self.filter = filter
+        self.prn = prn
+        self.count = count
+        self.timeout = timeout
+        self.store = store
+        self.block_size = block_size
+        self.block_count = block_count
+        self.frame_size = frame_size
+        self.retire_timeout_ms = retire_timeout_ms
+        self.snaplen = snaplen
+        self.results = []
+        self.running = False
+        self.error = None
+
+        self._socket = None
+        self._mmap = None
+        self._ring = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._captured = 0
+        self._kernel_stats = {'packets': 0, 'drops': 0, 'freeze_queue_count': 0}
+
+    def start(self) -> None:
+        """
+        Creates the socket and ring, attaches the BPF filter, and starts the capture thread.
+
+        Raises:
+            OSError: If the socket or ring cannot be set up (e.g. missing privileges).
+        """
+        self._open_ring()
+        self._stop_event.clear()
+        self.error = None
+        self._captured = 0
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="mmap-sniffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, join=True) -> list:
+        """
+        Stops the capture and tears down the ring.
+
+        Args:
+            join (bool, optional): Wait for the capture thread to exit. Default is True.
+
+        Raises:
+            OSError: If the socket reported an error that ended the capture early.
+
+        Returns:
+            list of RawFrame: The stored frames (empty unless `store` is True).
+        """
+        self._stop_event.set()
+        if join:
+            self.join()
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+    def set_filter(self, expression) -> None:
+        """
+        Replaces the BPF filter of the running capture.
+
+        The new program is attached to the open socket, which the kernel does
+        atomically, so the capture keeps running without losing or leaking
+        packets. Frames already queued in the ring passed the previous filter
+        and are still delivered.
+
+        Args:
+            expression (str): The new filter expression, or None to accept every frame.
+
+        Raises:
+            ValueError: If the capture is not running.
+        """
+        sock = self._socket
+        if sock is None:
+            raise ValueError("Cannot change the filter of a stopped capture")
+        attach_bpf(sock, expression or None, self.iface, self.snaplen)
+        self.filter = expression
+
+    def join(self, timeout=None) -> None:
+        """
+        Waits for the capture thread to finish.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Default is None.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def kernel_statistics(self) -> dict:
+        """
+        Retrieves the kernel's packet counters for this socket.
+
+        The kernel resets its counters each time they are read, so the values are
+        accumulated here. After the capture stops, the final totals remain available.
+
+        Returns:
+            dict: A dictionary containing:
+                - packets (int): Packets that passed the filter and reached the socket.
+                - drops (int): Packets dropped because the ring was full.
+                - freeze_queue_count (int): Times the queue was frozen for lack of free blocks.
+        """
+        if self._socket is not None:
+            self._accumulate_kernel_statistics()
+        return dict(self._kernel_stats)
+
+    def _accumulate_kernel_statistics(self) -> None:
+        """
+        Reads and accumulates the kernel counters (which reset on read).
+
+        Returns:
+            None
+        """
+        try:
+            packets, drops, freeze_queue_count = read_packet_statistics(self._socket, v3=True)
+        except OSError:
+            return None
+        self._kernel_stats['packets'] += packets
+        self._kernel_stats['drops'] += drops
+        self._kernel_stats['freeze_queue_count'] += freeze_queue_count
+
+    def _open_ring(self) -> None:
+        """
+        Creates the `AF_PACKET` socket, configures the TPACKET_V3 ring, and maps it.
+
+        The socket is created with protocol 0 and only starts receiving once `bind`
+        sets `ETH_P_ALL` together with the interface, as in libpcap, so no frame
+        from another interface lands in the ring.
+
+        Returns:
+            None
+        """
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            if self.filter or self.snaplen:
+                attach_bpf(sock, self.filter, self.iface, self.snaplen)
+            sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            frame_count = self.block_size // self.frame_size * self.block_count
+            request = TPACKET_REQ3.pack(self.block_size, self.block_count, self.frame_size,
+                                        frame_count, self.retire_timeout_ms, 0, 0)
+            sock.setsockopt(SOL_PACKET, PACKET_RX_RING, request)
+            ring = mmap.mmap(sock.fileno(), self.block_size * self.block_count,
+                             mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            sock.bind((self.iface, socket.htons(ETH_P_ALL)))
+        except Exception:
+            sock.close()
+            raise
+
+        self._socket = sock
+        self._mmap = ring
+        self._ring = memoryview(ring)
+
+    def _close_ring(self) -> None:
+        """
+        Records the final kernel statistics and releases the ring and socket.
+
+        Returns:
+            None
+        """
+        self._accumulate_kernel_statistics()
+        self._ring.release()
+        self._ring = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # A callback kept a view over the ring; the mapping is freed once it is released
+            pass
+        self._mmap = None
+        self._socket.close()
+        self._socket = None
+
+    def _run(self) -> None:
+        """
+        Main loop of the capture thread.
+
+        Waits for the current block to be handed to userspace, processes all of its
+        frames, returns it to the kernel, and moves on to the next block, until the
+        stop event is set, the packet count is reached, or the capture duration elapses.
+        An error reported by the socket ends the loop and is kept in `error`.
+
+        Returns:
+            None
+        """
+        deadline = time.time() + self.timeout if self.timeout else None
+        poller = select.poll()
+        poller.register(self._socket.fileno(), select.POLLIN | select.POLLERR)
+        block_index = 0
+        try:
+            while not self._stop_event.is_set():
+                if deadline and time.time() >= deadline:
+                    break
+                block_offset = block_index * self.block_size
+                if not self._block_ready(block_offset):
+                    if any(events & select.POLLERR for _, events in poller.poll(100)):
+                        code = self._socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                        if code:
+                            raise OSError(code, os.strerror(code))
+                    continue
+                if not self._process_block(block_offset):
+                    break
+                block_index = (block_index + 1) % self.block_count
+        except OSError as error:
+            self.error = error
+        finally:
+            self.running = False
+            self._close_ring()
+
+    def _block_ready(self, block_offset) -> bool:
+        """
+        Checks whether the kernel has handed the block at the given offset to userspace.
+
+        Args:
+            block_offset (int): The byte offset of the block within the ring.
+
+        Returns:
+            bool: True if the block is owned by userspace and can be processed.
+        """
+        status = struct.unpack_from('I', self._ring, block_offset + BLOCK_STATUS_OFFSET)[0]
+        return bool(status & TP_STATUS_USER)
+
+    def _process_block(self, block_offset) -> bool:
+        """
+        Delivers every frame of a retired block and hands the block back to the kernel.
+
+        Args:
+            block_offset (int): The byte offset of the block within the ring.
+
+        Returns:
+            bool: False if the packet count was reached, True to keep capturing.
+        """
+        ring = self._ring
+        _, packet_count, offset = BLOCK_HEADER.unpack_from(
+            ring, block_offset + BLOCK_STATUS_OFFSET)
+        offset += block_offset
+        keep_going = True
+
+        for _ in range(packet_count):
+            next_offset, seconds, nanoseconds, snaplen, wire_length, _, mac_offset = \
+                FRAME_HEADER.unpack_from(ring, offset)
+            start = offset + mac_offset
+            frame = RawFrame(seconds + nanoseconds / 1e9, ring[start:start + snaplen], wire_length)
+
+            if self.store:
+                self.results.append(frame._replace(data=frame.data.tobytes()))
+            if self.prn:
+                self.prn(frame)
+
+            self._captured += 1
+            if self.count and self._captured >= self.count:
+                keep_going = False
+                break
+            offset += next_offset
+
+        struct.pack_into('I', ring, block_offset + BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+        return keep_going
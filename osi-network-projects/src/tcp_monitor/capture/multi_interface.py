@@ -0,0 +1,337 @@
+import heapq
+import threading
+import time
+from collections import deque
+
+from tcp_monitor.capture.frame import detach_frame
+from tcp_monitor.capture.pcap_writer import packet_record
+
+
+class FrameMerger:
+    """
+    Merges the packets of several interfaces into one timestamp-ordered stream.
+
+    The `FrameMerger` class holds packets from every interface in a heap ordered
+    by capture timestamp and releases them once they are older than the reorder
+    window, either relative to the newest packet seen on any interface or to the
+    clock. Packets arriving out of order by less than the window are therefore
+    delivered in order; later stragglers are delivered immediately.
+
+    Before ordering, packets whose contents were already seen on a different
+    interface within the dedup window are dropped. Mirror and bonded ports deliver
+    byte-identical copies of the same frame, which would otherwise be counted twice,
+    e.g. in `TCPConnection` statistics. Copies on the same interface are kept.
+
+    Packets are released one at a time while holding a lock, so the output
+    callback does not need to be thread-safe.
+
+    Attributes:
+        prn (callable): The callback receiving the merged packets.
+        reorder_window (float): Seconds a packet is held for packets with earlier timestamps.
+        dedup_window (float): Seconds within which identical frames are duplicates.
+        duplicates (int): Packets dropped as duplicates.
+        reordered (int): Packets that arrived after a packet with a later timestamp.
+        pending (int): Packets held in the reorder window.
+
+    Methods:
+        add(packet, interface_index):
+            Adds a packet captured on an interface.
+
+        release(now=None) -> int:
+            Delivers the packets older than the reorder window.
+
+        flush() -> int:
+            Delivers every held packet.
+    """
+    def __init__(self, prn, reorder_window=0.005, dedup_window=0.01) -> None:
+        """
+        Initializes the FrameMerger.
+
+        Args:
+            prn (callable): The callback receiving the merged packets.
+            reorder_window (float, optional): The reorder window in seconds. Default is 0.005.
+            dedup_window (float, optional): The duplicate detection window in seconds;
+                0 disables deduplication. Default is 0.01.
+
+        Raises:
+            ValueError: If a window is negative.
+        """
+        if reorder_window < 0 or dedup_window < 0:
+            raise ValueError("Merge windows must not be negative.")
+        self.prn = prn
+        self.reorder_window = reorder_window
+        self.dedup_window = dedup_window
+        self.duplicates = 0
+        self.reordered = 0
+
+        self._heap = []
+        self._sequence = 0
+        self._newest = None
+        # Frame hash -> (timestamp, interface index), expired in arrival order
+        self._recent = {}
+        self._recent_order = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """
+        Gets the number of packets held in the reorder window.
+
+        Returns:
+            int: The number of held packets.
+        """
+        return len(self._heap)
+
+    def add(self, packet, interface_index=0) -> None:
+        """
+        Adds a packet, dropping it if it duplicates a frame seen on another interface.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured packet.
+            interface_index (int, optional): The index of the capturing interface. Default is 0.
+
+        Returns:
+            None
+        """
+        packet = detach_frame(packet)
+        timestamp, data, _ = packet_record(packet)
+        with self._lock:
+            if self.dedup_window and self._is_duplicate(hash(data), timestamp, interface_index):
+                self.duplicates += 1
+                return None
+
+            if self._newest is None or timestamp > self._newest:
+                self._newest = timestamp
+            elif timestamp < self._newest:
+                self.reordered += 1
+            heapq.heappush(self._heap, (timestamp, self._sequence, packet))
+            self._sequence += 1
+            self._release(self._newest - self.reorder_window)
+
+    def _is_duplicate(self, frame_hash, timestamp, interface_index) -> bool:
+        """
+        Checks a frame hash against the recent frames of other interfaces and records it.
+
+        Returns:
+            bool: True if the same frame was seen on another interface within the window.
+        """
+        recent = self._recent
+        order = self._recent_order
+        horizon = timestamp - self.dedup_window
+        while order and order[0][0] < horizon:
+            expired_timestamp, expired_hash = order.popleft()
+            if recent.get(expired_hash, (None,))[0] == expired_timestamp:
+                del recent[expired_hash]
+
+        seen = recent.get(frame_hash)
+        if seen is not None and seen[1] != interface_index and abs(timestamp - seen[0]) <= self.dedup_window:
+            return True
+        recent[frame_hash] = (timestamp, interface_index)
+        order.append((timestamp, frame_hash))
+        return False
+
+    def release(self, now=None) -> int:
+        """
+        Delivers the held packets that are older than the reorder window by the clock.
+
+        Called periodically so that packets are not held indefinitely when no
+        newer packet arrives.
+
+        Args:
+            now (float, optional): The current time. Defaults to `time.time()`.
+
+        Returns:
+            int: The number of packets delivered.
+        """
+        with self._lock:
+            return self._release((time.time() if now is None else now) - self.reorder_window)
+
+    def flush(self) -> int:
+        """
+        Delivers every held packet in timestamp order.
+
+        Returns:
+            int: The number of packets delivered.
+        """
+        with self._lock:
+            return self._release(float('inf'))
+
+    def _release(self, horizon) -> int:
+        """
+        Delivers the held packets with a timestamp up to the horizon. Must be called with the lock held.
+
+        Returns:
+            int: The number of packets delivered.
+        """
+        heap = self._heap
+        released = 0
+        while heap and heap[0][0] <= horizon:
+            packet = heapq.heappop(heap)[2]
+            released += 1
+            if self.prn:
+                self.prn(packet)
+        return released
+
+
+class MultiInterfaceSniffer:
+    """
+    Captures on several interfaces at once, presenting them as a single sniffer.
+
+    The `MultiInterfaceSniffer` class runs one sniffer per interface (of any
+    backend) and feeds their packets through a `FrameMerger`, so the callback
+    receives one deduplicated, timestamp-ordered stream. It offers the sniffer
+    interface used by `PacketCapture` (`start`, `stop`, `join`, `results`,
+    `kernel_statistics`). A background thread releases held packets once the
+    reorder window has passed on the clock, bounding the added latency on quiet links.
+
+    Attributes:
+        ifaces (list of str): The interfaces captured from.
+        sniffers (list): One sniffer per interface.
+        merger (FrameMerger): The merge and dedup stage.
+        store (bool): Whether merged packets are kept in `results`.
+        results (list): The merged packets when `store` is True.
+
+    Methods:
+        start():
+            Starts every interface sniffer and the release thread.
+
+        stop(join=True) -> list:
+            Stops every sniffer and delivers the packets still held.
+
+        join(timeout=None):
+            Waits for every sniffer to finish.
+
+        kernel_statistics() -> dict:
+            Sums the kernel counters of the interface sniffers.
+    """
+    def __init__(self, ifaces, sniffer_factory, prn=None, store=False,
+                 reorder_window=0.005, dedup_window=0.01) -> None:
+        """
+        Initializes the MultiInterfaceSniffer.
+
+        Args:
+            ifaces (list of str): The interfaces to capture from.
+            sniffer_factory (callable): Called as `sniffer_factory(iface, prn)` to create
+                the sniffer of one interface.
+            prn (callable, optional): The callback receiving the merged packets. Default is None.
+            store (bool, optional): Keep the merged packets in `results`. Default is False.
+            reorder_window (float, optional): The reorder window in seconds. Default is 0.005.
+            dedup_window (float, optional): The duplicate detection window in seconds. Default is 0.01.
+
+        Raises:
+            ValueError: If no interface is given or a window is negative.
+        """
+        if not ifaces:
+            raise ValueError("At least one interface is required.")
+        self.ifaces = list(ifaces)
+        self.prn = prn
+        self.store = store
+        self.results = []
+        self.merger = FrameMerger(self._deliver, reorder_window, dedup_window)
+        self.sniffers = [sniffer_factory(iface, self._receiver(index))
+                         for index, iface in enumerate(self.ifaces)]
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _receiver(self, index):
+        """Returns the callback of the sniffer for interface `index`."""
+        return lambda packet: self.merger.add(packet, index)
+
+    def _deliver(self, packet) -> None:
+        """Passes a merged packet to the callback and stores it if requested."""
+        if self.store:
+            self.results.append(packet)
+        if self.prn:
+            self.prn(packet)
+
+    def start(self) -> None:
+        """
+        Starts every interface sniffer and the release thread.
+
+        If a sniffer fails to start, the ones already started are stopped.
+
+        Raises:
+            Exception: Whatever the failing sniffer raised.
+        """
+        started = []
+        try:
+            for sniffer in self.sniffers:
+                sniffer.start()
+                started.append(sniffer)
+        except Exception:
+            for sniffer in started:
+                sniffer.stop()
+            raise
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._release_periodically, name="frame-merger",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, join=True) -> list:
+        """
+        Stops every sniffer, then delivers the packets still held by the merger.
+
+        Args:
+            join (bool, optional): Wait for the sniffer threads to exit. Default is True.
+
+        Raises:
+            OSError: The first error that ended an interface's capture early, once every
+                sniffer is stopped and the merger is flushed.
+
+        Returns:
+            list: The stored merged packets (empty unless `store` is True).
+        """
+        capture_error = None
+        for sniffer in self.sniffers:
+            try:
+                sniffer.stop()
+            except OSError as error:
+                capture_error = capture_error or error
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.merger.flush()
+        if capture_error is not None:
+            raise capture_error
+        return self.results
+
+    def join(self, timeout=None) -> None:
+        """
+        Waits for every interface sniffer to finish.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait per sniffer. Default is None.
+        """
+        for sniffer in self.sniffers:
+            sniffer.join(timeout)
+
+    def kernel_statistics(self) -> dict:
+        """
+        Sums the kernel counters of the interface sniffers.
+
+        Returns:
+            dict: The summed counters, or None if the sniffers do not report any.
+        """
+        totals = None
+        for sniffer in self.sniffers:
+            if not hasattr(sniffer, 'kernel_statistics'):
+                continue
+            statistics = sniffer.kernel_statistics()
+            if totals is None:
+                totals = dict.fromkeys(statistics, 0)
+            for name, value in statistics.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def _release_periodically(self) -> None:
+        """
+        Main loop of the release thread.
+
+        Returns:
+            None
+        """
+        interval = max(self.merger.reorder_window, 0.001)
+        while not self._stop_event.wait(interval):
+            self.merger.release()
@@ -1,34 +1,126 @@
+import threading
+import time
+from contextlib import closing
+
 from scapy.sendrecv import AsyncSniffer
 from scapy.utils import wrpcap
 
+from tcp_monitor.capture.batching import PacketBatcher
+from tcp_monitor.capture.bpf_filter import BPFFilter
+from tcp_monitor.capture.compression import check_compression
+from tcp_monitor.capture.flight_recorder import DEFAULT_RECORDER_SIZE, FlightRecorder
+from tcp_monitor.capture.frame import SNAPLEN_HEADERS, weigh_frame
+from tcp_monitor.capture.pcap_writer import RotatingPcapWriter, append_pcap
+from tcp_monitor.capture.pipeline import PacketPipeline
+from tcp_monitor.capture.mmap_ring import MmapRingSniffer
+from tcp_monitor.capture.multi_interface import MultiInterfaceSniffer
+from tcp_monitor.capture.pcap_index import extract_connection, extract_time_slice
+from tcp_monitor.capture.pcap_reader import PcapFileSource
+from tcp_monitor.capture.raw_socket import RawSocketSniffer
+from tcp_monitor.capture.sampling import PacketSampler
+from tcp_monitor.capture.statistics import CaptureStatistics, packet_length
+from tcp_monitor.capture.streaming import PacketStream
+
+CAPTURE_BACKENDS = ('scapy', 'raw', 'mmap')
+SNAPLEN_PRESETS = {'headers': SNAPLEN_HEADERS}
+
 class PacketCapture:
     """
-    A class for capturing network packets using Scapy's AsyncSniffer.
+    A class for capturing network packets using Scapy's AsyncSniffer or a raw socket.
     
     The `PacketCapture` class provides capabilities to configure network interfaces, 
     apply filters, and capture network packets based on specified criteria. 
     It supports capturing packets for a specified duration or count and can optionally 
     write the captured data to a file.
+
+    Three capture backends are available. The default "scapy" backend delivers fully
+    dissected Scapy packets to the callback. The "raw" backend reads frames straight
+    from a Linux `AF_PACKET` socket and delivers `RawFrame(timestamp, data)` tuples,
+    skipping Scapy's per-packet dissection for callers that only need raw bytes.
+    The "mmap" backend uses a `PACKET_MMAP` (TPACKET_V3) ring shared with the kernel
+    and delivers `RawFrame`s whose data is a `memoryview` over the ring, valid only
+    for the duration of the callback.
     
     Attributes:
-        interface (str): The network interface to capture packets from.
+        interface (str or list): The network interface, or list of interfaces, to capture packets from.
+        interfaces (list of str): The configured interfaces as a list.
+        backend (str): The capture backend: "scapy" (default), "raw", or "mmap".
+        snaplen (int): Maximum bytes captured per packet, or None for whole packets.
+        kernel_statistics (dict): Kernel received/dropped counters for the raw and mmap backends.
+        queue_depth (int): Packets waiting for a pipeline worker.
+        dropped_packets (int): Packets discarded by the pipeline's overflow policy.
+        callback_latency (dict): Count, average, and maximum callback duration in pipeline mode.
+        statistics (CaptureStatistics): Packet/byte rates, callback latency and stage timing histograms.
+        sampler (PacketSampler): The packet or flow sampler applied before the callback, or None.
+        flight_recorder (FlightRecorder): The in-memory pre-trigger buffer, or None.
         packet_count (int): The number of packets captured so far.
         is_running (bool): Indicates whether the packet capture is currently active.
+        is_paused (bool): Indicates whether delivery of captured packets is paused.
+        missed_packets (int): The number of packets discarded while paused.
         protocols (list): A list of protocols to filter during capture. Defaults to ["tcp"].
         packet_callback (callable): A callback function to process each captured packet.
+        batch_callback (callable): A callback function receiving lists of captured packets.
     
     Methods:
         set_filters(port=None, ip=None, protocols=None):
             Configures port, IP, and protocol filters for packet capture.
+
+        set_capture_filter(bpf_filter):
+            Uses a `BPFFilter` with multiple hosts, networks, port ranges, VLAN and TCP flag predicates,
+            replacing the kernel filter of a running "raw" or "mmap" capture in place.
     
-        set_output_file(file_path=None):
-            Specifies the file where captured packets should be saved.
+        set_pipeline(workers=1, queue_size=10000, overflow_policy="block"):
+            Runs the packet callback on a pool of worker threads fed by a bounded queue.
+
+        set_merge_options(reorder_window_ms=5, dedup_window_ms=10):
+            Configures how packets from several interfaces are ordered and deduplicated.
+
+        set_ring_options(block_size=None, block_count=None, retire_timeout_ms=None):
+            Configures the ring geometry used by the "mmap" backend.
+
+        set_snaplen(snaplen):
+            Truncates captured packets, e.g. to their headers with the "headers" preset.
+
+        set_sampling(rate=1, mode="packet", adaptive=False, max_rate=1024):
+            Passes only 1 in N packets, or the packets of 1 in N flows, to the callback.
+
+        set_batching(batch_size=256, max_delay_ms=10):
+            Configures how many packets, or how much time, each `batch_callback` call covers.
+
+        set_statistics(record_packets=True):
+            Turns the per-packet counts and byte rates of the statistics on or off.
+
+        set_output_file(file_path=None, streaming=False, ...):
+            Specifies the file where captured packets should be saved, optionally
+            streaming them to disk with size/time/count based rotation and gzip/zstd compression.
+
+        set_flight_recorder(file_path, max_bytes=64 MiB, max_seconds=None, post_trigger=5, trigger=None):
+            Keeps recent traffic in memory and writes it to pcap only when triggered.
+
+        trigger_recording(reason=None) -> str:
+            Dumps the flight recorder's pre-trigger window plus the next seconds of traffic.
     
         start_capture(duration=60, count=100):
             Starts capturing packets based on the configured settings.
     
         stop_capture():
             Stops the packet capture and saves the captured packets if an output file is specified.
+
+        pause():
+            Discards captured packets, counting them, until `resume` is called.
+
+        resume():
+            Resumes delivery of captured packets after `pause`.
+
+        read_file(file_path, count=0, connection=None, start_time=None, end_time=None):
+            Processes a recorded pcap or pcapng file, optionally compressed, through the same callback
+            path as a live capture.
+
+        stream(file_path=None, duration=None, count=0, max_queue=1000) -> PacketStream:
+            Returns an asynchronous iterator over live or recorded packets for asyncio code.
+
+        get_statistics() -> dict:
+            Returns rates, latency histograms, kernel and queue counters in one dictionary.
     
         _build_filter_string():
             Constructs a string representing the filter configuration for packet capture.
@@ -46,25 +138,66 @@ class PacketCapture:
         The sniffer is also not active by default.
 
         Attributes initialized:
-            _interface (str): The network interface to capture packets from. Initially None.
+            _interface (str or list): The network interface(s) to capture packets from. Initially None.
+            _merge_options (dict): Reorder and dedup windows for multi-interface captures.
             _packet_count (int): Counter for the number of packets captured. Starts at 0.
             _is_running (bool): Indicates the state of the packet capturing process. Initially False.
+            _paused (bool): Whether captured packets are discarded instead of processed. Initially False.
+            _missed_packets (int): Packets discarded while paused, across all captures. Starts at 0.
             _port_filter (str): Filter for specific port(s). Initially None.
             _ip_filter (str): Filter for specific IP(s). Initially None.
+            _capture_filter (BPFFilter): Structured filter overriding the simple filters. Initially None.
             _output_file (str): Path for the output file to save captured packets. Initially None.
-            _sniffer (AsyncSniffer): Sniffer instance used for capturing packets. Initially None.
+            _writer_options (dict): Streaming writer settings, or None to buffer until stop. Initially None.
+            _writer (RotatingPcapWriter): Active streaming writer during a capture. Initially None.
+            _backend (str): The capture backend to use. Default is "scapy".
+            _ring_options (dict): Ring settings passed to the "mmap" backend. Initially empty.
+            _snaplen (int): Maximum bytes captured per packet. Initially None (whole packets).
+            _pipeline_options (dict): Worker pool settings, or None to run the callback inline. Initially None.
+            _pipeline (PacketPipeline): Worker pool of the current or last capture. Initially None.
+            _statistics (CaptureStatistics): Runtime metrics of all captures so far.
+            _record_packets (bool): Whether each packet is counted in `_statistics`. Default is True.
+            _sampler (PacketSampler): Sampler applied before the callback. Initially None (no sampling).
+            _batch_options (dict): Batch size and delay used for `batch_callback`.
+            _batcher (PacketBatcher): Batcher of the current or last capture. Initially None.
+            _stream (PacketStream): Asynchronous stream receiving the packets. Initially None.
+            _recorder (FlightRecorder): Pre-trigger buffer fed with every packet. Initially None.
+            _stop_reading (threading.Event): Set by `stop_capture` to interrupt `read_file`.
+            _sniffer (AsyncSniffer, RawSocketSniffer or MmapRingSniffer): Sniffer instance used for
+                capturing packets. Initially None.
             protocols (list of str): List of protocols to filter during capture. Default is ["tcp"].
             packet_callback (callable): A callback function to process each packet captured. Initially None.
+            batch_callback (callable): A callback function to process lists of captured packets. Initially None.
         """
         self._interface = None
+        self._merge_options = {'reorder_window': 0.005, 'dedup_window': 0.01}
         self._packet_count = 0
         self._is_running = False
+        self._paused = False
+        self._missed_packets = 0
         self._port_filter = None
         self._ip_filter = None
+        self._capture_filter = None
         self._output_file = None
+        self._writer_options = None
+        self._writer = None
+        self._backend = 'scapy'
+        self._ring_options = {}
+        self._snaplen = None
+        self._pipeline_options = None
+        self._pipeline = None
+        self._statistics = CaptureStatistics()
+        self._record_packets = True
+        self._sampler = None
+        self._batch_options = {'batch_size': 256, 'max_delay': 0.01}
+        self._batcher = None
+        self._stream = None
+        self._recorder = None
+        self._stop_reading = threading.Event()
         self._sniffer = None
         self.protocols = ["tcp"]
         self.packet_callback = None
+        self.batch_callback = None
 
     @property
     def interface(self) -> str:
@@ -75,10 +208,52 @@ class PacketCapture:
         that has been set for capturing packets.
 
         Returns:
-            str: The name of the network interface configured for packet capture.
+            str or list: The name of the network interface configured for packet capture,
+            or the list of names if several interfaces were configured.
         """
         return self._interface
 
+    @property
+    def interfaces(self) -> list:
+        """
+        Gets the configured network interfaces as a list.
+
+        Returns:
+            list of str: The interfaces to capture from (empty if none is configured).
+        """
+        if not self._interface:
+            return []
+        if isinstance(self._interface, str):
+            return [self._interface]
+        return list(self._interface)
+
+    @property
+    def backend(self) -> str:
+        """
+        Gets the configured capture backend.
+
+        Returns:
+            str: "scapy" for Scapy's AsyncSniffer, "raw" for the `AF_PACKET` socket
+            backend, or "mmap" for the TPACKET_V3 ring backend.
+        """
+        return self._backend
+
+    @property
+    def kernel_statistics(self) -> dict:
+        """
+        Retrieves the kernel's packet counters for the current or last capture.
+
+        Comparing `drops` across backends or ring sizes shows whether the kernel
+        had to discard packets because userspace did not keep up.
+
+        Returns:
+            dict: The `packets`, `drops`, and `freeze_queue_count` counters, or None
+            if no capture has run or the backend ("scapy") does not expose them.
+        """
+        if self._sniffer is None or not hasattr(self._sniffer, 'kernel_statistics'):
+            return None
+        return self._sniffer.kernel_statistics()
+
     @property
     def packet_count(self) -> int:
         """
@@ -93,6 +268,20 @@ class PacketCapture:
         """
         return self._packet_count
 
+    @property
+    def output_writer(self) -> RotatingPcapWriter:
+        """
+        Retrieves the streaming pcap writer of the current capture.
+
+        The writer exposes counters such as `packets_written` and `packets_dropped`
+        and the list of retained output files. It only exists while a streaming
+        capture is running.
+
+        Returns:
+            RotatingPcapWriter: The active writer, or None if not streaming.
+        """
+        return self._writer
+
     @property
     def is_running(self) -> bool:
         """
@@ -108,6 +297,71 @@ class PacketCapture:
         """
         return self._is_running
 
+    @property
+    def is_paused(self) -> bool:
+        """
+        Checks whether delivery of captured packets is paused.
+
+        Returns:
+            bool: True between `pause` and `resume` (or the end of the capture).
+        """
+        return self._paused
+
+    @property
+    def missed_packets(self) -> int:
+        """
+        Gets the number of packets discarded while the capture was paused.
+
+        Returns:
+            int: The number of missed packets, across all captures.
+        """
+        return self._missed_packets
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Retrieves the number of packets waiting for a pipeline worker.
+
+        Returns:
+            int: The current queue depth, or 0 when the callback runs inline.
+        """
+        return self._pipeline.queue_depth if self._pipeline else 0
+
+    @property
+    def dropped_packets(self) -> int:
+        """
+        Retrieves the number of packets discarded by the pipeline's overflow policy.
+
+        Returns:
+            int: The number of dropped packets in the current or last pipelined capture.
+        """
+        return self._pipeline.dropped_packets if self._pipeline else 0
+
+    @property
+    def callback_latency(self) -> dict:
+        """
+        Summarises the time the pipeline workers spent in the packet callback.
+
+        Returns:
+            dict: The `count`, `average`, and `max` callback durations in seconds,
+            or None when the callback runs inline.
+        """
+        return self._pipeline.callback_latency if self._pipeline else None
+
+    @property
+    def statistics(self) -> CaptureStatistics:
+        """
+        Retrieves the runtime metrics collector.
+
+        Besides the metrics recorded by the capture itself, the collector can
+        be passed to a `ConnectionTracker` or used by the packet callback
+        (`statistics.time_stage("decode")`) to record time spent per stage.
+
+        Returns:
+            CaptureStatistics: The metrics of every capture run by this instance.
+        """
+        return self._statistics
+
     @interface.setter
     def interface(self, value) -> None:
         """
@@ -115,18 +369,46 @@ class PacketCapture:
 
         This setter method allows configuration of the network interface 
         used for capturing packets. It ensures that a valid (non-empty) 
-        interface value is provided.
+        interface value is provided. A list of interfaces (e.g. the members
+        of a bond, or several mirror ports) captures on all of them at once,
+        merging their packets into one timestamp-ordered stream without the
+        duplicates seen on several ports (see `set_merge_options`).
 
         Args:
-            value (str): The name of the network interface to be set.
+            value (str or list of str): The name of the network interface to be set,
+                or a list of interface names.
 
         Raises:
-            ValueError: If the provided interface value is empty.
+            ValueError: If the provided interface value is empty or a list contains an empty name.
         """
         if not value:
             raise ValueError("Interface cannot be empty.")
+        if not isinstance(value, str):
+            value = list(value)
+            if not all(value):
+                raise ValueError("Interface cannot be empty.")
+            if len(value) == 1:
+                value = value[0]
         self._interface = value
 
+    @backend.setter
+    def backend(self, value) -> None:
+        """
+        Sets the capture backend.
+
+        Args:
+            value (str): One of "scapy", "raw", or "mmap".
+
+        Raises:
+            ValueError: If the backend is unknown or a capture is running.
+        """
+        if value not in CAPTURE_BACKENDS:
+            raise ValueError(f"Unknown capture backend: {value}. "
+                             f"Supported backends: {', '.join(CAPTURE_BACKENDS)}.")
+        if self._is_running:
+            raise ValueError("Cannot change the backend while a capture is running")
+        self._backend = value
+
     # Method-based configurations
     def set_filters(self, port=None, ip=None, protocols=None) -> None:
         """
@@ -151,22 +433,414 @@ class PacketCapture:
         if protocols:
             self.protocols = protocols
 
-    def set_output_file(self, file_path) -> None:
+    def set_capture_filter(self, bpf_filter) -> None:
+        """
+        Configures a structured kernel-side capture filter.
+
+        A `BPFFilter` can express multiple hosts and ports, CIDR networks, port
+        ranges, src/dst direction, VLAN tags, and TCP flag predicates. While set,
+        it replaces the filters configured with `set_filters`, and it is compiled
+        with libpcap when the capture starts so that an invalid expression is
+        reported before any packet is captured.
+
+        On a running "raw" or "mmap" capture the new program replaces the one
+        attached to the open socket, which the kernel does atomically: every
+        packet is matched by either the old or the new filter, and the sniffer
+        keeps running. Packets already queued in the socket or ring passed the
+        old filter and are still delivered. The "scapy" backend does not expose
+        its socket, so its filter can only be changed between captures.
+
+        Args:
+            bpf_filter (BPFFilter): The filter to apply, or None to return to the
+                filters configured with `set_filters`.
+
+        Raises:
+            TypeError: If the filter is not a `BPFFilter`.
+            ValueError: If a "scapy" capture is currently running, or the new
+                filter does not compile (the previous filter then stays attached).
+
+        Returns:
+            None
+        """
+        if bpf_filter is not None and not isinstance(bpf_filter, BPFFilter):
+            raise TypeError("Capture filter must be a BPFFilter")
+        if not self._is_running:
+            self._capture_filter = bpf_filter
+            return None
+        if self._backend == 'scapy':
+            raise ValueError("Cannot change the capture filter while a capture is running")
+
+        previous = self._capture_filter
+        self._capture_filter = bpf_filter
+        try:
+            filters = self._build_filter_string()
+            if bpf_filter:
+                bpf_filter.validate()
+            sniffers = (self._sniffer.sniffers if isinstance(self._sniffer, MultiInterfaceSniffer)
+                        else [self._sniffer])
+            for sniffer in sniffers:
+                sniffer.set_filter(filters)
+        except Exception:
+            self._capture_filter = previous
+            raise
+
+    def set_pipeline(self, workers=1, queue_size=10000, overflow_policy='block') -> None:
+        """
+        Configures pipeline mode, decoupling capture from packet processing.
+
+        In pipeline mode, the sniffer thread only places packets into a bounded
+        queue and a pool of worker threads runs the packet callback, so slow
+        analysis no longer stalls capture. The overflow policy decides what
+        happens when the queue is full: "block" waits for room, "drop-newest"
+        discards the incoming packet, and "drop-oldest" discards the oldest
+        queued packet. With several workers the callback must be thread-safe.
+        Passing `workers=0` restores inline processing.
+
+        Args:
+            workers (int, optional): The number of worker threads. Default is 1.
+            queue_size (int, optional): The maximum number of queued packets. Default is 10000.
+            overflow_policy (str, optional): "block", "drop-newest", or "drop-oldest". Default is "block".
+
+        Raises:
+            ValueError: If a capture is running or the settings are invalid.
+
+        Returns:
+            None
+        """
+        if self._is_running:
+            raise ValueError("Cannot change the pipeline while a capture is running")
+        if not workers:
+            self._pipeline_options = None
+            return None
+
+        # Validate eagerly rather than when the capture starts
+        PacketPipeline(self.packet_callback, workers, queue_size, overflow_policy)
+        self._pipeline_options = {'workers': workers,
+                                  'queue_size': queue_size,
+                                  'overflow_policy': overflow_policy}
+
+    def set_merge_options(self, reorder_window_ms=5, dedup_window_ms=10) -> None:
+        """
+        Configures the merge of packets captured on several interfaces.
+
+        Packets are held for the reorder window so that packets captured slightly
+        earlier on another interface can be delivered first; a larger window
+        tolerates more skew between interfaces at the cost of latency. Frames
+        with identical contents seen on different interfaces within the dedup
+        window are delivered once, so mirrored traffic is not counted twice.
+        These settings have no effect when capturing on a single interface.
+
+        Args:
+            reorder_window_ms (float, optional): The reorder window in milliseconds. Default is 5.
+            dedup_window_ms (float, optional): The dedup window in milliseconds; 0 disables
+                deduplication. Default is 10.
+
+        Raises:
+            ValueError: If a window is negative or a capture is running.
+
+        Returns:
+            None
+        """
+        if reorder_window_ms < 0 or dedup_window_ms < 0:
+            raise ValueError("Merge windows must not be negative.")
+        if self._is_running:
+            raise ValueError("Cannot change the merge options while a capture is running")
+        self._merge_options = {'reorder_window': reorder_window_ms / 1000,
+                               'dedup_window': dedup_window_ms / 1000}
+
+    def set_ring_options(self, block_size=None, block_count=None, retire_timeout_ms=None) -> None:
+        """
+        Configures the memory-mapped ring used by the "mmap" backend.
+
+        Larger or more numerous blocks absorb longer traffic bursts before the kernel
+        starts dropping packets, at the cost of locked memory. The retire timeout
+        bounds how long a partially filled block waits before being delivered, i.e.
+        the added latency on quiet links. Unset values keep the backend defaults.
+
+        Args:
+            block_size (int, optional): Block size in bytes, a multiple of the page size.
+            block_count (int, optional): Number of blocks in the ring.
+            retire_timeout_ms (int, optional): Block retire timeout in milliseconds.
+
+        Returns:
+            None
+        """
+        options = {'block_size': block_size,
+                   'block_count': block_count,
+                   'retire_timeout_ms': retire_timeout_ms}
+        self._ring_options = {name: value for name, value in options.items() if value is not None}
+
+    @property
+    def snaplen(self) -> int:
+        """
+        Gets the configured snap length.
+
+        Returns:
+            int: The maximum number of bytes captured per packet, or None for whole packets.
+        """
+        return self._snaplen
+
+    def set_snaplen(self, snaplen) -> None:
+        """
+        Configures the maximum number of bytes captured per packet.
+
+        Connection tracking only needs the Ethernet, IP and TCP headers, so the
+        "headers" preset keeps the first 138 bytes of each frame: enough for an
+        802.1Q tag, an IPv4 header with options, and a TCP header with options.
+        With the "raw" and "mmap" backends the frames are truncated by the kernel
+        before they are copied to userspace; with the "scapy" backend they are
+        truncated when written to the output file. In every case the original
+        wire length is kept (in `RawFrame.wire_length` and in the pcap records)
+        so byte counts stay accurate.
+
+        Args:
+            snaplen (int or str): The snap length in bytes, a preset name ("headers"),
+                or None to capture whole packets.
+
+        Raises:
+            ValueError: If the snap length is not positive, the preset is unknown,
+                        or a capture is running.
+
+        Returns:
+            None
+        """
+        if isinstance(snaplen, str):
+            if snaplen not in SNAPLEN_PRESETS:
+                raise ValueError(f"Unknown snap length preset: {snaplen}. "
+                                 f"Supported presets: {', '.join(SNAPLEN_PRESETS)}.")
+            snaplen = SNAPLEN_PRESETS[snaplen]
+        elif snaplen is not None and snaplen <= 0:
+            raise ValueError("Snap length must be positive.")
+        if self._is_running:
+            raise ValueError("Cannot change the snap length while a capture is running")
+        self._snaplen = snaplen
+
+    @property
+    def sampler(self) -> PacketSampler:
+        """
+        Gets the configured sampler.
+
+        Returns:
+            PacketSampler: The sampler, or None if every packet reaches the callback.
+        """
+        return self._sampler
+
+    def set_sampling(self, rate=1, mode='packet', adaptive=False, max_rate=1024) -> None:
+        """
+        Configures sampling of the packets passed to the callback.
+
+        Under heavy load, analysing every packet may not be affordable. In
+        "packet" mode one packet in `rate` reaches the callback; in "flow" mode
+        all packets of one flow in `rate` do, chosen by a symmetric 5-tuple hash
+        so both directions of a connection are kept together. Packets are still
+        counted in the statistics and written to the output file in full; only
+        analysis is sampled. Each kept packet carries the number of packets it
+        stands for at the time it was sampled (`frame_weight`), so counters can be
+        scaled back up even when the rate changed while it was queued, e.g. by
+        passing it to `ConnectionTracker.process_frame`. The current rate is
+        available from `sampler` and in `get_statistics()`.
+
+        With `adaptive=True` and pipeline mode, the rate doubles while the
+        pipeline queue is more than three quarters full, up to `max_rate`, and
+        returns towards `rate` once the queue drains.
+
+        Args:
+            rate (int, optional): Keep one packet (or flow) in `rate`. Default is 1; 1 without
+                adaptation disables sampling.
+            mode (str, optional): "packet" or "flow". Default is "packet".
+            adaptive (bool, optional): Whether to adapt the rate to queue pressure. Default is False.
+            max_rate (int, optional): The highest adaptive rate. Default is 1024.
+
+        Raises:
+            ValueError: If the settings are invalid or a capture is running.
+
+        Returns:
+            None
+        """
+        if self._is_running:
+            raise ValueError("Cannot change sampling while a capture is running")
+        sampler = PacketSampler(rate, mode, adaptive=adaptive, max_rate=max_rate)
+        self._sampler = sampler if rate > 1 or adaptive else None
+
+    def set_statistics(self, record_packets=True) -> None:
+        """
+        Configures which metrics are recorded on the packet path.
+
+        Counting each packet and its bytes into the sliding-window rates costs a
+        clock read and a few updates per packet. At the highest packet rates this
+        can be turned off; the packet count (`packet_count`), the kernel counters
+        and the latency histograms are still available.
+
+        Args:
+            record_packets (bool, optional): Whether to record packet and byte counts and
+                rates. Default is True.
+
+        Returns:
+            None
+        """
+        self._record_packets = record_packets
+
+    def set_batching(self, batch_size=256, max_delay_ms=10) -> None:
+        """
+        Configures the batches delivered to `batch_callback`.
+
+        `batch_callback` is an alternative to `packet_callback` for consumers that
+        can process many packets per call: it receives a list of up to
+        `batch_size` packets, or the packets that arrived within `max_delay_ms`
+        milliseconds if fewer, so the Python call overhead is paid once per batch.
+        Both callbacks may be set; sampling applies to both, pipeline mode only
+        to `packet_callback`. Batches are delivered one at a time from the capture
+        thread, or from a timer thread when traffic pauses.
+
+        Args:
+            batch_size (int, optional): The maximum number of packets per batch. Default is 256.
+            max_delay_ms (float, optional): The maximum time in milliseconds a packet waits
+                for its batch. Default is 10.
+
+        Raises:
+            ValueError: If the settings are not positive or a capture is running.
+
+        Returns:
+            None
+        """
+        if self._is_running:
+            raise ValueError("Cannot change batching while a capture is running")
+        options = {'batch_size': batch_size, 'max_delay': max_delay_ms / 1000}
+        # Validate eagerly rather than when the capture starts
+        PacketBatcher(self.batch_callback, **options)
+        self._batch_options = options
+
+    @property
+    def flight_recorder(self) -> FlightRecorder:
+        """
+        Gets the configured flight recorder.
+
+        Returns:
+            FlightRecorder: The flight recorder, or None if it is disabled.
+        """
+        return self._recorder
+
+    def set_flight_recorder(self, file_path, max_bytes=DEFAULT_RECORDER_SIZE, max_seconds=None,
+                            post_trigger=5.0, trigger=None) -> None:
+        """
+        Enables the flight recorder, an alternative to writing every packet to disk.
+
+        The flight recorder keeps the most recent `max_bytes` (and at most
+        `max_seconds`) of captured frames in a preallocated circular buffer.
+        When triggered, by `trigger_recording()` or by the `trigger` predicate
+        returning True for a frame (e.g. `RstStormTrigger()` for an RST storm),
+        the buffered frames and those of the following `post_trigger` seconds
+        are written to a new file next to `file_path` (`incident_00001.pcap`,
+        ...). The recorder sees every packet, before sampling. Combine it with
+        `set_snaplen("headers")` to cover a longer window in the same memory.
+
+        Args:
+            file_path (str): The base path of the dump files, or None to disable the recorder.
+            max_bytes (int, optional): The size of the buffer. Default is 64 MiB.
+            max_seconds (float, optional): The maximum age of buffered frames. Default is None.
+            post_trigger (float, optional): Seconds of traffic written after a trigger. Default is 5.
+            trigger (callable, optional): A predicate called with each frame. Default is None.
+
+        Raises:
+            ValueError: If the settings are invalid or a capture is running.
+
+        Returns:
+            None
+        """
+        if self._is_running:
+            raise ValueError("Cannot change the flight recorder while a capture is running")
+        if self._recorder:
+            self._recorder.finish()
+        self._recorder = None
+        if file_path:
+            self._recorder = FlightRecorder(file_path, max_bytes=max_bytes, max_seconds=max_seconds,
+                                            post_trigger=post_trigger, trigger=trigger)
+
+    def trigger_recording(self, reason=None) -> str:
+        """
+        Triggers the flight recorder.
+
+        Args:
+            reason (str, optional): A description of the incident for the log.
+
+        Raises:
+            ValueError: If the flight recorder is not enabled.
+
+        Returns:
+            str: The path of the dump file.
+        """
+        if not self._recorder:
+            raise ValueError("Flight recorder is not enabled")
+        return self._recorder.trigger(reason)
+
+    def set_output_file(self, file_path, streaming=False, max_file_size=None,
+                        max_file_duration=None, max_file_packets=None, max_files=None,
+                        batch_size=1000, compression=None, compression_level=None, index=False) -> None:
         """
         Sets the file path for saving captured packets.
 
-        This method allows configuring a file path where the captured packets 
-        will be saved after the packet capture process is stopped. If no file 
-        path is provided, captured packets will not be saved.
+        By default, captured packets are kept in memory and saved to the file
+        once the packet capture process is stopped. In streaming mode, packets
+        are instead appended to disk by a background writer thread as they
+        arrive, so memory use stays bounded by `batch_size` and a crash only
+        loses the packets still pending in memory. Streaming output can be
+        rotated by size, age, or packet count, keeping at most `max_files` files.
+        Streaming output can also be gzip or zstd compressed; compression runs on
+        the writer thread in independent blocks, and `read_file` reads the
+        compressed files directly.
+        If no file path is provided, captured packets will not be saved.
 
         Args:
             file_path (str): The path to the file where captured packets will
                              be stored. If None, packets will not be saved.
+            streaming (bool, optional): Write packets continuously instead of at stop. Default is False.
+            max_file_size (int, optional): Rotate after this many bytes. Default is None.
+            max_file_duration (float, optional): Rotate after this many seconds. Default is None.
+            max_file_packets (int, optional): Rotate after this many packets. Default is None.
+            max_files (int, optional): Number of rotated files to retain; requires a rotation
+                limit. Default is None (keep all).
+            batch_size (int, optional): Maximum number of packets pending in memory. Default is 1000.
+            compression (str, optional): "gzip" or "zstd". Default is None (uncompressed).
+            compression_level (int, optional): The compression level. Default is None
+                (the format's default).
+            index (bool, optional): Write a sidecar time and flow index next to each
+                file, used by `read_file` to extract connections and time slices. Default is False.
+
+        Raises:
+            ValueError: If rotation, compression or index settings are given without
+                enabling streaming, `max_files` is given without a rotation limit, or the
+                compression settings are invalid or combined with indexing.
 
         Returns:
             None
         """
+        rotation = (max_file_size, max_file_duration, max_file_packets, max_files)
+        if not streaming and any(option is not None for option in rotation):
+            raise ValueError("File rotation requires streaming output")
+        if max_files is not None and not any(rotation[:3]):
+            raise ValueError("Retaining max_files requires a rotation limit")
+        if compression is not None:
+            if not streaming:
+                raise ValueError("Compressed output requires streaming output")
+            check_compression(compression, compression_level)
+        if index and not streaming:
+            raise ValueError("Indexed output requires streaming output")
+        if index and compression is not None:
+            raise ValueError("Compressed output cannot be indexed")
+
         self._output_file = file_path
+        self._writer_options = None
+        if file_path and streaming:
+            self._writer_options = {
+                'max_file_size': max_file_size,
+                'max_file_duration': max_file_duration,
+                'max_file_packets': max_file_packets,
+                'max_files': max_files,
+                'batch_size': batch_size,
+                'compression': compression,
+                'compression_level': compression_level,
+                'index': index,
+            }
 
     def _build_filter_string(self) -> str:
         """
@@ -175,11 +849,15 @@ class PacketCapture:
         This method constructs a filter string based on the current filter 
         settings such as protocols, port filter, and IP filter. The generated 
         string is compatible with packet capturing tools and determines which 
-        packets will be captured during the process.
+        packets will be captured during the process. A filter configured with
+        `set_capture_filter` takes precedence over these settings.
 
         Returns:
             str: A string that represents the constructed filter for the capture.
         """
+        if self._capture_filter:
+            return self._capture_filter.build()
+
         filters = []
 
         protocol_filter = " or ".join(self.protocols)
@@ -199,18 +877,57 @@ class PacketCapture:
 
         This internal method is invoked whenever a packet is captured during
         the packet sniffing process. It increments the packet count and applies
-        the user-defined packet callback (if any) for additional processing.
+        the user-defined packet callback (if any) for additional processing,
+        either inline or by queueing the packet for the pipeline workers, and
+        adds the packet to the current batch if a batch callback is set and to
+        the queue of the asynchronous stream if one is attached. The flight
+        recorder, if enabled, sees every packet.
+        Packets rejected by the sampler are counted and written, but not processed,
+        and the packets it keeps are weighed with the current rate; the time spent
+        sampling is recorded as the "filter" stage of the statistics (the kernel
+        BPF filter runs before userspace and cannot be timed here).
+        While the capture is paused, packets are only counted as missed.
 
         Args:
-            packet (scapy.packet.Packet): The packet object captured during sniffing.
+            packet (scapy.packet.Packet or RawFrame): The packet object captured during sniffing,
+                or the raw frame when using the "raw" backend.
 
         Returns:
             None
         """
-        
+        if self._paused:
+            self._missed_packets += 1
+            return None
+
         self._packet_count += 1
-        if self.packet_callback:
-            self.packet_callback(packet)
+        if self._record_packets:
+            self._statistics.record_packet(packet_length(packet))
+        if self._writer:
+            self._writer.write(packet)
+        if self._recorder:
+            self._recorder.record(packet)
+        if self._sampler:
+            started = time.perf_counter()
+            if self._pipeline:
+                self._sampler.adapt(self._pipeline.queue_depth, self._pipeline.queue_size)
+            accepted = self._sampler.sample(packet)
+            if accepted:
+                packet = weigh_frame(packet, self._sampler.packet_weight)
+            self._statistics.record_stage('filter', time.perf_counter() - started)
+            if not accepted:
+                return None
+        if self._batcher:
+            self._batcher.add(packet)
+        if self._stream:
+            self._stream.put(packet)
+        if self._pipeline:
+            self._pipeline.submit(packet)
+        elif self.packet_callback:
+            started = time.perf_counter()
+            try:
+                self.packet_callback(packet)
+            finally:
+                self._statistics.record_callback(time.perf_counter() - started)
 
     def start_capture(self, duration=60, count=100) -> None:
         """
@@ -224,11 +941,13 @@ class PacketCapture:
 
         Args:
             duration (int, optional): The capture duration in seconds. Default is 60 seconds.
-            count (int, optional): The maximum number of packets to capture. Default is 100 packets.
+            count (int, optional): The maximum number of packets to capture (per interface when
+                capturing on several interfaces). Default is 100 packets.
 
         Raises:
-            ValueError: If the packet capture is already running or if the
-                        network interface is not configured.
+            ValueError: If the packet capture is already running, if the
+                        network interface is not configured, or if the
+                        capture filter does not compile.
             Exception: If an error occurs during the packet capture initialization.
 
         Returns:
@@ -242,19 +961,56 @@ class PacketCapture:
 
         try:
             filters = self._build_filter_string()
+            if self._capture_filter:
+                self._capture_filter.validate()
+
+            if self._writer_options:
+                self._writer = RotatingPcapWriter(self._output_file, snaplen=self._snaplen,
+                                                  **self._writer_options)
+                self._writer.start()
+            self._start_pipeline()
+            self._start_batcher()
 
-            self._sniffer = AsyncSniffer(iface=self._interface,
-                                         filter=filters,
-                                         prn=self._process_packet,
-                                         count=count,
-                                         timeout=duration,
-                                         store=bool(self._output_file))
+            sniffer_options = {}
+            if self._backend == 'mmap':
+                sniffer_class = MmapRingSniffer
+                sniffer_options = dict(self._ring_options, snaplen=self._snaplen)
+            elif self._backend == 'raw':
+                sniffer_class = RawSocketSniffer
+                sniffer_options = {'snaplen': self._snaplen}
+            else:
+                sniffer_class = AsyncSniffer
+            store = bool(self._output_file) and not self._writer
+            interfaces = self.interfaces
+            if len(interfaces) > 1:
+                # Each interface's sniffer feeds the merger, which stores the merged packets
+                self._sniffer = MultiInterfaceSniffer(
+                    interfaces,
+                    lambda iface, prn: sniffer_class(iface=iface, filter=filters, prn=prn, count=count,
+                                                     timeout=duration, store=False, **sniffer_options),
+                    prn=self._process_packet, store=store, **self._merge_options)
+            else:
+                self._sniffer = sniffer_class(iface=self._interface,
+                                              filter=filters,
+                                              prn=self._process_packet,
+                                              count=count,
+                                              timeout=duration,
+                                              store=store,
+                                              **sniffer_options)
+            self._paused = False
             self._sniffer.start()
             self._is_running = True
 
         except Exception as e:
             self._is_running = False
             self._sniffer = None
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+            if self._pipeline:
+                self._pipeline.stop(drain=False)
+            if self._batcher:
+                self._batcher.stop()
             raise e
 
     def stop_capture(self) -> None:
@@ -263,18 +1019,271 @@ class PacketCapture:
 
         This method halts the ongoing packet capturing process if it is currently
         active. It ensures that captured packets are finalized and saved to the
-        configured output file (if any). After stopping the capture, the state
+        configured output file (if any), either by writing the buffered packets
+        or by flushing and closing the streaming writer. After stopping the capture, the state
         of the capture process is updated to reflect that it is no longer running.
+        A `read_file` call in progress on another thread stops after its current packet.
+
+        Raises:
+            OSError: If the output file could not be written, e.g. when the streaming
+                writer ran out of disk space, or if the raw or mmap backend stopped
+                early on a socket error. The capture is stopped and saved nonetheless.
 
         Returns:
             None
         """
+        self._stop_reading.set()
         if not self._is_running or not self._sniffer:
             return None
 
-        self._sniffer.stop()
+        capture_error = None
+        try:
+            self._sniffer.stop()
+        except OSError as error:
+            # The packets captured before the socket failed are still processed and saved
+            capture_error = error
 
-        if self._output_file:
-            wrpcap(self._output_file, self._sniffer.results, append=True)
+        if self._pipeline:
+            self._pipeline.stop()
+        if self._batcher:
+            self._batcher.stop()
+        if self._recorder:
+            self._recorder.finish()
 
-        self._is_running = False
+        try:
+            if self._writer:
+                self._writer.close()
+            elif self._output_file and (self._backend != 'scapy' or self._snaplen):
+                append_pcap(self._output_file, self._sniffer.results, snaplen=self._snaplen)
+            elif self._output_file:
+                wrpcap(self._output_file, self._sniffer.results, append=True)
+        finally:
+            self._writer = None
+            self._is_running = False
+            self._paused = False
+        if capture_error is not None:
+            raise capture_error
+
+    def pause(self) -> None:
+        """
+        Pauses delivery of captured packets without stopping the sniffer.
+
+        The sniffer and its socket stay open, so the kernel keeps draining the
+        interface and no packets pile up in its buffers. Captured packets are
+        discarded before any processing (they are not counted, written, recorded
+        or passed to a callback) and counted in `missed_packets` instead.
+        Pausing an already paused capture has no effect.
+
+        Raises:
+            ValueError: If no capture is running.
+
+        Returns:
+            None
+        """
+        if not self._is_running:
+            raise ValueError("Cannot pause a capture that is not running")
+        self._paused = True
+
+    def resume(self) -> None:
+        """
+        Resumes delivery of captured packets after `pause`.
+
+        Resuming a capture that is not paused has no effect.
+
+        Returns:
+            None
+        """
+        self._paused = False
+
+    def read_file(self, file_path, count=0, connection=None, start_time=None, end_time=None) -> int:
+        """
+        Processes the packets of a recorded pcap or pcapng file, optionally gzip or zstd compressed.
+
+        This method analyzes recorded traffic instead of a live interface. The file
+        is memory-mapped and each record is passed through `_process_packet` exactly
+        like a captured frame, so the packet count, the streaming writer, and the
+        user-defined packet callback all behave as in a live capture (only streaming
+        output is written; a buffered output file is not). Packets are
+        delivered as `RawFrame(timestamp, data)` tuples where `data` is a
+        `memoryview` over the mapped file, valid only for the duration of the
+        callback (in pipeline mode they are copied before being queued). Compressed
+        files are decompressed while reading and deliver `bytes` instead. The file
+        is read on the calling thread as fast as processing allows, and the method
+        returns once every packet has been processed. Capture filters are not
+        applied to recorded files.
+
+        Given a connection or a time slice, only the matching packets of a
+        classic pcap file are read, using its sidecar `PcapIndex` (built and
+        saved first if it is missing or stale) to seek to them instead of
+        scanning the whole file.
+
+        Args:
+            file_path (str): The path of the pcap or pcapng file to read.
+            count (int, optional): The maximum number of packets to process. Default is 0 (all).
+            connection (TCPConnection or tuple, optional): Only process the packets of this
+                connection, or of its `(src_ip, dst_ip, src_port, dst_port)`. Default is None.
+            start_time (float, optional): Only process packets captured at or after this time.
+            end_time (float, optional): Only process packets captured before this time.
+
+        Raises:
+            ValueError: If a live capture is running, the file is not a valid capture file,
+                or a connection or time slice is requested from a compressed or pcapng file.
+
+        Returns:
+            int: The number of packets processed from the file.
+        """
+        if self._is_running:
+            raise ValueError("Packet capture is already running")
+
+        processed = 0
+        self._stop_reading.clear()
+        if self._writer_options:
+            self._writer = RotatingPcapWriter(self._output_file, snaplen=self._snaplen, **self._writer_options)
+            self._writer.start()
+        try:
+            self._start_pipeline()
+            self._start_batcher()
+            if connection is not None:
+                source = closing(extract_connection(file_path, connection, start_time, end_time))
+            elif start_time is not None or end_time is not None:
+                source = closing(extract_time_slice(file_path, start_time, end_time))
+            else:
+                source = PcapFileSource(file_path)
+            with source as frames:
+                for frame in frames:
+                    if self._stop_reading.is_set():
+                        break
+                    self._process_packet(frame)
+                    processed += 1
+                    if count and processed >= count:
+                        break
+        finally:
+            if self._pipeline:
+                self._pipeline.stop()
+            if self._batcher:
+                self._batcher.stop()
+            if self._recorder:
+                self._recorder.finish()
+            if self._writer:
+                writer, self._writer = self._writer, None
+                writer.close()
+        return processed
+
+    def stream(self, file_path=None, duration=None, count=0, max_queue=1000) -> PacketStream:
+        """
+        Creates an asynchronous iterator over captured packets.
+
+        For use in asyncio applications::
+
+            async with capture.stream(duration=10) as packets:
+                async for packet in packets:
+                    ...
+
+        The first iteration starts a live capture on the configured interface
+        (with the configured filters, backend and snap length), or reads
+        `file_path` on a background thread. Packets cross into the event loop
+        through a bounded `asyncio.Queue`; when it is full the capture thread
+        waits, so memory stays bounded. The packet callback, batch callback and
+        output file keep working alongside the stream.
+
+        Args:
+            file_path (str, optional): A pcap or pcapng file to read instead of the live interface.
+            duration (float, optional): Seconds after which the stream ends. Default is None (no limit).
+            count (int, optional): Packets after which the stream ends. Default is 0 (no limit).
+            max_queue (int, optional): The capacity of the queue. Default is 1000.
+
+        Raises:
+            ValueError: If the queue capacity is not positive.
+
+        Returns:
+            PacketStream: The stream; it must be iterated from a running event loop.
+        """
+        return PacketStream(self, file_path=file_path, duration=duration, count=count,
+                            max_queue=max_queue)
+
+    def _attach_stream(self, stream) -> None:
+        """
+        Attaches an asynchronous stream to the packet path.
+
+        Args:
+            stream (PacketStream): The stream to receive the packets.
+
+        Raises:
+            ValueError: If a capture or another stream is active.
+        """
+        if self._stream is not None:
+            raise ValueError("Another stream is already attached to this capture")
+        if self._is_running:
+            raise ValueError("Packet capture is already running")
+        self._stream = stream
+
+    def _detach_stream(self, stream) -> None:
+        """
+        Detaches an asynchronous stream from the packet path.
+
+        Args:
+            stream (PacketStream): The stream to detach.
+
+        Returns:
+            None
+        """
+        if self._stream is stream:
+            self._stream = None
+
+    def get_statistics(self) -> dict:
+        """
+        Collects every capture metric in one dictionary.
+
+        Suitable for periodic reporting (see `StatisticsReporter`): the call only
+        reads counters, plus one `getsockopt` for the kernel statistics.
+
+        Returns:
+            dict: The `CaptureStatistics.snapshot()` dictionary extended with:
+                - kernel (dict): Kernel received/dropped counters, or None for the "scapy" backend.
+                - queue_depth (int): Packets waiting for a pipeline worker.
+                - dropped (int): Packets discarded by the pipeline's overflow policy.
+                - sampling (dict): `PacketSampler.snapshot()`, or None without sampling.
+                - batches (int): Batches delivered to `batch_callback` in the current or last capture.
+                - duplicates (int): Frames dropped as copies seen on another interface.
+                - paused (bool): Whether delivery is currently paused.
+                - missed (int): Packets discarded while paused.
+        """
+        statistics = self._statistics.snapshot()
+        statistics['kernel'] = self.kernel_statistics
+        statistics['queue_depth'] = self.queue_depth
+        statistics['dropped'] = self.dropped_packets
+        statistics['sampling'] = self._sampler.snapshot() if self._sampler else None
+        statistics['batches'] = self._batcher.batches_delivered if self._batcher else 0
+        statistics['duplicates'] = (self._sniffer.merger.duplicates
+                                    if isinstance(self._sniffer, MultiInterfaceSniffer) else 0)
+        statistics['paused'] = self._paused
+        statistics['missed'] = self._missed_packets
+        return statistics
+
+    def _start_pipeline(self) -> None:
+        """
+        Creates and starts the worker pool if pipeline mode is configured.
+
+        The pipeline of the previous capture is replaced, so its counters remain
+        readable until the next capture starts.
+
+        Returns:
+            None
+        """
+        self._pipeline = None
+        if self._pipeline_options and self.packet_callback:
+            self._pipeline = PacketPipeline(self.packet_callback, statistics=self._statistics,
+                                            **self._pipeline_options)
+            self._pipeline.start()
+
+    def _start_batcher(self) -> None:
+        """
+        Creates and starts the batcher if a batch callback is set.
+
+        Returns:
+            None
+        """
+        self._batcher = None
+        if self.batch_callback:
+            self._batcher = PacketBatcher(self.batch_callback, **self._batch_options)
+            self._batcher.start()
@@ -0,0 +1,368 @@
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+from tcp_monitor.capture.frame import flow_key, tuple_flow_key
+from tcp_monitor.capture.pcap_reader import PcapFileSource
+
+INDEX_MAGIC = b'PIDX'
+INDEX_VERSION = 1
+INDEX_EXTENSION = '.idx'
+DEFAULT_BUCKET_SECONDS = 1.0
+
+# magic, version, reserved, bucket seconds, indexed pcap size, records, buckets, flows
+INDEX_HEADER = struct.Struct('<4sHHdQQII')
+# bucket number, offset of its first record, offset of its last record
+INDEX_BUCKET = struct.Struct('<qQQ')
+# flow hash, number of records
+INDEX_FLOW = struct.Struct('<II')
+
+
+def index_path(pcap_path) -> str:
+    """
+    Gets the path of the sidecar index of a pcap file.
+
+    Args:
+        pcap_path (str): The path of the pcap file.
+
+    Returns:
+        str: The pcap path with ".idx" appended.
+    """
+    return pcap_path + INDEX_EXTENSION
+
+
+class PcapIndex:
+    """
+    A sidecar index mapping time buckets and flows to record offsets in a pcap file.
+
+    The `PcapIndex` class records, for each record added, the time bucket of
+    its timestamp and the symmetric 5-tuple hash of its frame (`flow_hash`).
+    Each bucket keeps the offsets of its first and last record, so a time slice
+    is read as one contiguous range even when timestamps are slightly out of
+    order. Each flow keeps the offsets of all of its records, so a connection
+    is read with one seek per packet instead of a scan of the whole file.
+
+    Hashes can collide; `extract_connection` therefore checks the 5-tuple of
+    every record it reads.
+
+    The index is saved next to the pcap as a small binary file: a fixed header
+    followed by the zlib-compressed buckets and delta-encoded flow offsets. It
+    remembers the size of the pcap it covers, so an index of a file that grew
+    since is detected as stale.
+
+    Attributes:
+        bucket_seconds (float): The width of a time bucket.
+        file_size (int): The size of the indexed part of the pcap file.
+        record_count (int): The number of indexed records.
+        flow_count (int): The number of distinct flow hashes.
+
+    Methods:
+        add(offset, timestamp, data, end_offset):
+            Indexes the record at `offset`.
+
+        flow_offsets(flow_hash) -> list:
+            Returns the offsets of the records of a flow.
+
+        time_range(start_time, end_time) -> tuple:
+            Returns the byte range holding the records of a time slice.
+
+        save(path):
+            Writes the index file.
+
+        load(path) -> PcapIndex:
+            Reads an index file.
+    """
+    def __init__(self, bucket_seconds=DEFAULT_BUCKET_SECONDS) -> None:
+        """
+        Initializes an empty PcapIndex.
+
+        Args:
+            bucket_seconds (float, optional): The width of a time bucket. Default is 1.0.
+
+        Raises:
+            ValueError: If the bucket width is not positive.
+        """
+        if bucket_seconds <= 0:
+            raise ValueError("Index bucket width must be positive.")
+        self.bucket_seconds = bucket_seconds
+        self.file_size = 0
+        self.record_count = 0
+        # Bucket number -> [first record offset, last record offset]
+        self._buckets = {}
+        # Flow hash -> record offsets in file order
+        self._flows = {}
+
+    @property
+    def flow_count(self) -> int:
+        """
+        Gets the number of distinct flow hashes in the index.
+
+        Returns:
+            int: The number of flows.
+        """
+        return len(self._flows)
+
+    def add(self, offset, timestamp, data, end_offset=None) -> None:
+        """
+        Indexes one record. Records must be added in file order.
+
+        Args:
+            offset (int): The offset of the record header in the pcap file.
+            timestamp (float): The record timestamp.
+            data (bytes-like): The captured frame.
+            end_offset (int, optional): The offset just past the record, which becomes
+                the indexed file size. Defaults to the record header offset plus
+                the header and data lengths.
+
+        Returns:
+            None
+        """
+        bucket = math.floor(timestamp / self.bucket_seconds)
+        span = self._buckets.get(bucket)
+        if span is None:
+            self._buckets[bucket] = [offset, offset]
+        else:
+            span[1] = offset
+
+        flow_hash = zlib.crc32(flow_key(data))
+        offsets = self._flows.get(flow_hash)
+        if offsets is None:
+            offsets = self._flows[flow_hash] = array('Q')
+        offsets.append(offset)
+
+        self.record_count += 1
+        self.file_size = end_offset if end_offset is not None else offset + 16 + len(data)
+
+    def flow_offsets(self, flow_hash) -> list:
+        """
+        Returns the offsets of the records whose frames have a flow hash.
+
+        Args:
+            flow_hash (int): A value of `flow_hash`.
+
+        Returns:
+            list of int: The record offsets in file order (empty for an unknown flow).
+        """
+        return list(self._flows.get(flow_hash, ()))
+
+    def time_range(self, start_time=None, end_time=None) -> tuple:
+        """
+        Finds the byte range holding every record of a time slice.
+
+        Args:
+            start_time (float, optional): The start of the slice. Default is None (the first record).
+            end_time (float, optional): The end of the slice (exclusive). Default is None (the last record).
+
+        Returns:
+            tuple: `(start_offset, end_offset)` where `end_offset` is the offset of the
+            last candidate record plus one, or None if no bucket overlaps the slice.
+            Records in the range may still fall outside the slice.
+        """
+        first_bucket = -math.inf if start_time is None else math.floor(start_time / self.bucket_seconds)
+        last_bucket = math.inf if end_time is None else math.floor(end_time / self.bucket_seconds)
+        spans = [span for bucket, span in self._buckets.items() if first_bucket <= bucket <= last_bucket]
+        if not spans:
+            return None
+        return min(span[0] for span in spans), max(span[1] for span in spans) + 1
+
+    def save(self, path) -> None:
+        """
+        Writes the index to a file, replacing it atomically.
+
+        Args:
+            path (str): The index file path, usually `index_path(pcap_path)`.
+
+        Returns:
+            None
+        """
+        body = bytearray()
+        for bucket, (first, last) in sorted(self._buckets.items()):
+            body += INDEX_BUCKET.pack(bucket, first, last)
+        for flow_hash, offsets in self._flows.items():
+            body += INDEX_FLOW.pack(flow_hash, len(offsets))
+            # Offsets grow, so their differences are small and compress well
+            deltas = array('Q', (offsets[0],))
+            deltas.extend(b - a for a, b in zip(offsets, offsets[1:]))
+            if sys.byteorder == 'big':
+                deltas.byteswap()
+            body += deltas.tobytes()
+
+        header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, self.bucket_seconds, self.file_size,
+                                   self.record_count, len(self._buckets), len(self._flows))
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as index_file:
+            index_file.write(header)
+            index_file.write(zlib.compress(bytes(body)))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index file.
+
+        Args:
+            path (str): The index file path.
+
+        Returns:
+            PcapIndex: The loaded index.
+
+        Raises:
+            ValueError: If the file is not a valid index.
+            OSError: If the file cannot be read.
+        """
+        with open(path, 'rb') as index_file:
+            content = index_file.read()
+        if len(content) < INDEX_HEADER.size:
+            raise ValueError(f"Not a pcap index: {path}")
+        magic, version, _, bucket_seconds, file_size, record_count, bucket_count, flow_count = \
+            INDEX_HEADER.unpack_from(content, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not a pcap index: {path}")
+        try:
+            body = zlib.decompress(content[INDEX_HEADER.size:])
+        except zlib.error:
+            raise ValueError(f"Corrupted pcap index: {path}")
+
+        index = cls(bucket_seconds)
+        index.file_size = file_size
+        index.record_count = record_count
+        try:
+            offset = 0
+            for _ in range(bucket_count):
+                bucket, first, last = INDEX_BUCKET.unpack_from(body, offset)
+                index._buckets[bucket] = [first, last]
+                offset += INDEX_BUCKET.size
+            for _ in range(flow_count):
+                flow_hash, count = INDEX_FLOW.unpack_from(body, offset)
+                offset += INDEX_FLOW.size
+                deltas = array('Q', body[offset:offset + count * 8])
+                if sys.byteorder == 'big':
+                    deltas.byteswap()
+                index._flows[flow_hash] = array('Q', accumulate(deltas))
+                offset += count * 8
+        except (struct.error, ValueError):
+            raise ValueError(f"Corrupted pcap index: {path}")
+        return index
+
+
+def build_index(pcap_path, bucket_seconds=DEFAULT_BUCKET_SECONDS, save=True) -> PcapIndex:
+    """
+    Indexes an existing pcap file in one sequential pass.
+
+    Args:
+        pcap_path (str): The path of an uncompressed classic pcap file.
+        bucket_seconds (float, optional): The width of a time bucket. Default is 1.0.
+        save (bool, optional): Write the index next to the file. Default is True.
+
+    Returns:
+        PcapIndex: The index of the file.
+
+    Raises:
+        ValueError: If the file is not an uncompressed classic pcap file.
+    """
+    index = PcapIndex(bucket_seconds)
+    with PcapFileSource(pcap_path) as source:
+        for offset, frame in source.read_records():
+            index.add(offset, frame.timestamp, frame.data)
+    if save:
+        index.save(index_path(pcap_path))
+    return index
+
+
+def open_index(pcap_path, bucket_seconds=DEFAULT_BUCKET_SECONDS) -> PcapIndex:
+    """
+    Loads the sidecar index of a pcap file, building it if it is missing or stale.
+
+    An index is stale when the pcap file's size differs from the size it covers,
+    e.g. because packets were appended after it was written.
+
+    Args:
+        pcap_path (str): The path of an uncompressed classic pcap file.
+        bucket_seconds (float, optional): The bucket width used when the index is built. Default is 1.0.
+
+    Returns:
+        PcapIndex: The up-to-date index.
+
+    Raises:
+        ValueError: If the file is not an uncompressed classic pcap file.
+    """
+    try:
+        index = PcapIndex.load(index_path(pcap_path))
+        if index.file_size == os.path.getsize(pcap_path):
+            return index
+    except (OSError, ValueError):
+        pass
+    return build_index(pcap_path, bucket_seconds)
+
+
+def extract_connection(pcap_path, connection, start_time=None, end_time=None, index=None):
+    """
+    Reads the packets of one connection from a pcap file using its index.
+
+    Both directions of the connection are returned, in file order. Only the
+    records listed for the connection's flow hash are read.
+
+    Args:
+        pcap_path (str): The path of an uncompressed classic pcap file.
+        connection (TCPConnection or tuple): The connection, or its
+            `(src_ip, dst_ip, src_port, dst_port)` tuple.
+        start_time (float, optional): Skip packets before this time. Default is None.
+        end_time (float, optional): Skip packets at or after this time. Default is None.
+        index (PcapIndex, optional): The file's index. Defaults to `open_index(pcap_path)`.
+
+    Yields:
+        RawFrame: The connection's packets; `data` is a `memoryview` over the mapped
+        file, valid until the generator is closed.
+    """
+    if isinstance(connection, tuple):
+        key = tuple_flow_key(*connection)
+    else:
+        key = tuple_flow_key(connection.src_ip, connection.dst_ip, connection.src_port, connection.dst_port)
+    if index is None:
+        index = open_index(pcap_path)
+
+    with PcapFileSource(pcap_path) as source:
+        for offset in index.flow_offsets(zlib.crc32(key)):
+            frame = source.frame_at(offset)
+            if start_time is not None and frame.timestamp < start_time:
+                continue
+            if end_time is not None and frame.timestamp >= end_time:
+                continue
+            # Different flows may share a hash
+            if flow_key(frame.data) == key:
+                yield frame
+
+
+def extract_time_slice(pcap_path, start_time=None, end_time=None, index=None):
+    """
+    Reads the packets captured within a time slice from a pcap file using its index.
+
+    Only the byte range spanned by the overlapping time buckets is read.
+
+    Args:
+        pcap_path (str): The path of an uncompressed classic pcap file.
+        start_time (float, optional): The start of the slice. Default is None.
+        end_time (float, optional): The end of the slice (exclusive). Default is None.
+        index (PcapIndex, optional): The file's index. Defaults to `open_index(pcap_path)`.
+
+    Yields:
+        RawFrame: The packets of the slice in file order; `data` is a `memoryview`
+        over the mapped file, valid until the generator is closed.
+    """
+    if index is None:
+        index = open_index(pcap_path)
+    byte_range = index.time_range(start_time, end_time)
+    if byte_range is None:
+        return
+
+    with PcapFileSource(pcap_path) as source:
+        for _, frame in source.read_records(*byte_range):
+            if start_time is not None and frame.timestamp < start_time:
+                continue
+            if end_time is not None and frame.timestamp >= end_time:
+                continue
+            yield frame
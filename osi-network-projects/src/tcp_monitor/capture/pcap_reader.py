@@ -0,0 +1,520 @@
+import mmap
+import struct
+
+from tcp_monitor.capture.compression import detect_compression, open_decompressed, read_exact
+from tcp_monitor.capture.frame import RawFrame
+
+# Classic pcap magic numbers, as read in little-endian order
+PCAP_MAGIC_MICRO = 0xa1b2c3d4
+PCAP_MAGIC_NANO = 0xa1b23c4d
+PCAP_MAGIC_MICRO_SWAPPED = 0xd4c3b2a1
+PCAP_MAGIC_NANO_SWAPPED = 0x4d3cb2a1
+
+# pcapng block types (https://www.ietf.org/archive/id/draft-ietf-opsawg-pcapng-01.html)
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_INTERFACE_DESCRIPTION = 0x00000001
+PCAPNG_OBSOLETE_PACKET = 0x00000002
+PCAPNG_SIMPLE_PACKET = 0x00000003
+PCAPNG_ENHANCED_PACKET = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_OPTION_END = 0
+PCAPNG_OPTION_IF_TSRESOL = 9
+
+PCAP_GLOBAL_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+
+# Only Ethernet captures can be decoded by the analyzers
+LINKTYPE_ETHERNET = 1
+
+
+def check_link_type(link_type) -> None:
+    """
+    Checks that a capture file or interface holds Ethernet frames.
+
+    Args:
+        link_type (int): The LINKTYPE_* value declared by the file.
+
+    Raises:
+        ValueError: If the link type is not Ethernet.
+    """
+    if link_type != LINKTYPE_ETHERNET:
+        raise ValueError(f"Unsupported link type {link_type}: only Ethernet (1) captures can be read")
+
+
+def pcapng_interface(interfaces, interface_id) -> tuple:
+    """
+    Looks up the interface a pcapng packet block was captured on.
+
+    Args:
+        interfaces (list): The interface table of the current section.
+        interface_id (int): The interface index from the packet block.
+
+    Returns:
+        tuple: The interface's `(snaplen, ticks_per_second)`.
+
+    Raises:
+        ValueError: If the section has no interface with that index.
+    """
+    if interface_id >= len(interfaces):
+        raise ValueError(f"Packet block refers to undefined interface {interface_id}")
+    return interfaces[interface_id]
+
+
+class PcapFileSource:
+    """
+    An offline packet source that reads pcap and pcapng files through `mmap`.
+
+    The `PcapFileSource` class maps the capture file into memory and walks its
+    records in place, yielding a `RawFrame(timestamp, data, wire_length)` per
+    packet where `data` is a `memoryview` over the mapped file and `wire_length`
+    is the original packet length recorded in the file. No packet bytes are
+    copied and no per-packet Python objects other than the frame tuple are
+    created, so multi-gigabyte captures can be processed at disk speed without
+    loading them into memory.
+
+    Both byte orders of the classic pcap format (with microsecond or nanosecond
+    timestamps) and pcapng files (Enhanced, Simple and obsolete Packet Blocks,
+    with per-interface timestamp resolution) are supported. Only Ethernet
+    captures are accepted: files or interfaces with another link type raise a
+    `ValueError`, since their frames would be misread as Ethernet frames.
+
+    gzip and zstd compressed files (e.g. written with `set_output_file(...,
+    compression="gzip")`) are detected from their magic number and decompressed
+    while reading. They cannot be mapped, so their frames carry `bytes` instead
+    of views; a file cut off in the middle of a block ends at the last complete record.
+
+    The views are only valid while the source is open. Callers that keep frames
+    after iteration must copy them (e.g. `bytes(frame.data)`).
+
+    Attributes:
+        file_path (str): The path of the capture file.
+        file_format (str): Either "pcap" or "pcapng", detected from the file's magic number.
+        compression (str): "gzip" or "zstd" for compressed files, otherwise None.
+
+    Methods:
+        open():
+            Maps the file into memory and detects its format.
+
+        close():
+            Unmaps the file.
+
+        __iter__():
+            Yields a `RawFrame` for each packet in the file.
+
+        read_records(start_offset=None, end_offset=None):
+            Yields `(offset, RawFrame)` for the records of a classic pcap file in a byte range.
+
+        frame_at(offset) -> RawFrame:
+            Reads the record at a file offset, e.g. one found in a `PcapIndex`.
+    """
+    def __init__(self, file_path) -> None:
+        """
+        Initializes the PcapFileSource for the given file.
+
+        Args:
+            file_path (str): The path of the pcap or pcapng file to read.
+        """
+        self.file_path = file_path
+        self.file_format = None
+        self.compression = None
+        self._file = None
+        self._mmap = None
+        self._view = None
+        self._stream = None
+
+    def __enter__(self):
+        """Opens the source for use in a `with` statement."""
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Closes the source at the end of a `with` statement."""
+        self.close()
+
+    def open(self) -> None:
+        """
+        Maps the capture file into memory and detects its format.
+
+        Compressed files are opened for decompression instead of being mapped.
+
+        Raises:
+            ValueError: If the file is empty or is neither a pcap nor a pcapng file
+                (compressed or not), is a pcap file of a non-Ethernet link type, or
+                is compressed with zstd and the zstandard package is not installed.
+            OSError: If the file cannot be opened.
+        """
+        self._file = open(self.file_path, 'rb')
+        self.compression = detect_compression(self._file.read(4))
+        if self.compression:
+            self._file.close()
+            self._file = None
+            self._stream = open_decompressed(self.file_path, self.compression)
+            self.file_format = self._detect_format(self._stream.peek(4)[:4])
+            if self.file_format == 'pcap':
+                self._pcap_record_format(self._stream.peek(PCAP_GLOBAL_HEADER_SIZE)[:PCAP_GLOBAL_HEADER_SIZE])
+            return None
+
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            self._file = None
+            raise ValueError(f"Capture file is empty: {self.file_path}")
+        self._view = memoryview(self._mmap)
+        self.file_format = self._detect_format(self._view[:4])
+        if self.file_format == 'pcap':
+            self._pcap_record_format(self._view)
+
+    def close(self) -> None:
+        """
+        Unmaps the capture file.
+
+        If a caller still holds views over the file, the mapping is released once
+        those views are garbage collected.
+
+        Returns:
+            None
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __iter__(self):
+        """
+        Yields each packet of the capture file.
+
+        Yields:
+            RawFrame: The packet timestamp, a `memoryview` of its captured bytes
+            (`bytes` for compressed files), and its original wire length.
+
+        Raises:
+            ValueError: If the source has not been opened. Iteration raises a `ValueError`
+                when a pcapng interface is not Ethernet or a packet block names an
+                undefined interface.
+        """
+        if self._stream is not None:
+            if self.file_format == 'pcapng':
+                return self._iter_pcapng_stream()
+            return self._iter_pcap_stream()
+        if self._view is None:
+            raise ValueError("Capture file is not open")
+        if self.file_format == 'pcapng':
+            return self._iter_pcapng()
+        return self._iter_pcap()
+
+    def read_records(self, start_offset=None, end_offset=None):
+        """
+        Walks the records of a classic pcap file within a byte range.
+
+        Together with a `PcapIndex`, this reads part of a large file without
+        touching the rest of it: only the pages of the mapped range are read from disk.
+
+        Args:
+            start_offset (int, optional): Offset of the first record to read. Defaults
+                to the first record of the file.
+            end_offset (int, optional): Records starting at or after this offset are not
+                read. Defaults to the end of the file.
+
+        Yields:
+            tuple: `(offset, frame)`, the record offset and its `RawFrame`.
+
+        Raises:
+            ValueError: If the source is not open, or is not an uncompressed classic pcap file.
+        """
+        view = self._require_pcap()
+        record_header, divisor = self._pcap_record_format(view)
+        size = len(view)
+        offset = PCAP_GLOBAL_HEADER_SIZE if start_offset is None else start_offset
+        end = size if end_offset is None else min(end_offset, size)
+        while offset < end and offset + PCAP_RECORD_HEADER_SIZE <= size:
+            seconds, fraction, captured_length, wire_length = record_header.unpack_from(view, offset)
+            start = offset + PCAP_RECORD_HEADER_SIZE
+            if start + captured_length > size:
+                break
+            yield offset, RawFrame(seconds + fraction / divisor, view[start:start + captured_length],
+                                   wire_length)
+            offset = start + captured_length
+
+    def frame_at(self, offset) -> RawFrame:
+        """
+        Reads the record starting at a file offset of a classic pcap file.
+
+        Args:
+            offset (int): The offset of the record header.
+
+        Returns:
+            RawFrame: The record's timestamp, a `memoryview` of its bytes, and its wire length.
+
+        Raises:
+            ValueError: If the source is not an uncompressed classic pcap file or no
+                complete record starts at the offset.
+        """
+        view = self._require_pcap()
+        record_header, divisor = self._pcap_record_format(view)
+        if offset < PCAP_GLOBAL_HEADER_SIZE or offset + PCAP_RECORD_HEADER_SIZE > len(view):
+            raise ValueError(f"No pcap record at offset {offset}")
+        seconds, fraction, captured_length, wire_length = record_header.unpack_from(view, offset)
+        start = offset + PCAP_RECORD_HEADER_SIZE
+        if start + captured_length > len(view):
+            raise ValueError(f"No pcap record at offset {offset}")
+        return RawFrame(seconds + fraction / divisor, view[start:start + captured_length], wire_length)
+
+    def _require_pcap(self) -> memoryview:
+        """
+        Returns the mapped file, checking that records can be read at arbitrary offsets.
+
+        Raises:
+            ValueError: If the source is not open, or is compressed or in pcapng format.
+        """
+        if self._view is None and self._stream is None:
+            raise ValueError("Capture file is not open")
+        if self._view is None or self.file_format != 'pcap':
+            raise ValueError("Offset access requires an uncompressed classic pcap file")
+        return self._view
+
+    def _detect_format(self, header) -> str:
+        """
+        Detects the capture file format from its first four bytes.
+
+        Args:
+            header (bytes-like): The first four bytes of the (decompressed) file.
+
+        Returns:
+            str: "pcap" or "pcapng".
+
+        Raises:
+            ValueError: If the magic number is not recognised.
+        """
+        if len(header) < 4:
+            raise ValueError(f"Not a pcap or pcapng file: {self.file_path}")
+        magic = struct.unpack_from('<I', header, 0)[0]
+        if magic == PCAPNG_SECTION_HEADER:
+            return 'pcapng'
+        if magic in (PCAP_MAGIC_MICRO, PCAP_MAGIC_NANO,
+                     PCAP_MAGIC_MICRO_SWAPPED, PCAP_MAGIC_NANO_SWAPPED):
+            return 'pcap'
+        raise ValueError(f"Not a pcap or pcapng file: {self.file_path}")
+
+    def _iter_pcap(self):
+        """
+        Walks the records of a classic pcap file.
+
+        Yields:
+            RawFrame: The timestamp and captured bytes of each record. A truncated
+            final record is ignored.
+        """
+        view = self._view
+        record_header, divisor = self._pcap_record_format(view)
+
+        size = len(view)
+        offset = PCAP_GLOBAL_HEADER_SIZE
+        while offset + PCAP_RECORD_HEADER_SIZE <= size:
+            seconds, fraction, captured_length, wire_length = record_header.unpack_from(view, offset)
+            start = offset + PCAP_RECORD_HEADER_SIZE
+            end = start + captured_length
+            if end > size:
+                break
+            yield RawFrame(seconds + fraction / divisor, view[start:end], wire_length)
+            offset = end
+
+    def _iter_pcap_stream(self):
+        """
+        Reads the records of a compressed classic pcap file.
+
+        Yields:
+            RawFrame: The timestamp and captured bytes of each record. A truncated
+            final record is ignored.
+        """
+        stream = self._stream
+        header = read_exact(stream, PCAP_GLOBAL_HEADER_SIZE)
+        if header is None:
+            return
+        record_header, divisor = self._pcap_record_format(header)
+
+        while True:
+            record = read_exact(stream, PCAP_RECORD_HEADER_SIZE)
+            if record is None:
+                return
+            seconds, fraction, captured_length, wire_length = record_header.unpack(record)
+            data = read_exact(stream, captured_length)
+            if data is None:
+                return
+            yield RawFrame(seconds + fraction / divisor, data, wire_length)
+
+    @staticmethod
+    def _pcap_record_format(header) -> tuple:
+        """
+        Derives the record layout from a classic pcap global header.
+
+        Args:
+            header (bytes-like): The start of the file.
+
+        Returns:
+            tuple: The record header `struct.Struct` in the file's byte order and
+            the number of timestamp fractions per second.
+
+        Raises:
+            ValueError: If the header declares a link type other than Ethernet.
+        """
+        magic = struct.unpack_from('<I', header, 0)[0]
+        byte_order = '<' if magic in (PCAP_MAGIC_MICRO, PCAP_MAGIC_NANO) else '>'
+        divisor = 1e9 if magic in (PCAP_MAGIC_NANO, PCAP_MAGIC_NANO_SWAPPED) else 1e6
+        if len(header) >= PCAP_GLOBAL_HEADER_SIZE:
+            # The upper bits of the link type field carry FCS information
+            check_link_type(struct.unpack_from(byte_order + 'I', header, 20)[0] & 0xFFFF)
+        return struct.Struct(byte_order + 'IIII'), divisor
+
+    def _iter_pcapng(self):
+        """
+        Walks the blocks of a pcapng file, yielding its packet blocks.
+
+        Section Header Blocks reset the byte order and the interface table;
+        Interface Description Blocks provide each interface's snap length and
+        timestamp resolution. Other block types are skipped.
+
+        Yields:
+            RawFrame: The timestamp and captured bytes of each packet block.
+        """
+        view = self._view
+        size = len(view)
+        offset = 0
+        byte_order = '<'
+        interfaces = []
+
+        while offset + 12 <= size:
+            block_type = struct.unpack_from(byte_order + 'I', view, offset)[0]
+            if block_type == PCAPNG_SECTION_HEADER:
+                # The byte-order magic tells how to read the rest of the section
+                magic = struct.unpack_from('<I', view, offset + 8)[0]
+                byte_order = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                interfaces = []
+            block_length = struct.unpack_from(byte_order + 'I', view, offset + 4)[0]
+            if block_length < 12 or offset + block_length > size:
+                break
+            frame = self._pcapng_block(view, offset, block_type, block_length, byte_order, interfaces)
+            if frame is not None:
+                yield frame
+            offset += block_length
+
+    def _iter_pcapng_stream(self):
+        """
+        Reads the blocks of a compressed pcapng file, yielding its packet blocks.
+
+        Each block is read whole and parsed like a block of a mapped file.
+
+        Yields:
+            RawFrame: The timestamp and captured bytes of each packet block.
+        """
+        stream = self._stream
+        byte_order = '<'
+        interfaces = []
+
+        while True:
+            prefix = read_exact(stream, 12)
+            if prefix is None:
+                return
+            block_type = struct.unpack_from(byte_order + 'I', prefix, 0)[0]
+            if block_type == PCAPNG_SECTION_HEADER:
+                magic = struct.unpack_from('<I', prefix, 8)[0]
+                byte_order = '<' if magic == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                interfaces = []
+            block_length = struct.unpack_from(byte_order + 'I', prefix, 4)[0]
+            if block_length < 12:
+                return
+            rest = read_exact(stream, block_length - 12)
+            if rest is None:
+                return
+            frame = self._pcapng_block(prefix + rest, 0, block_type, block_length, byte_order, interfaces)
+            if frame is not None:
+                yield frame
+
+    def _pcapng_block(self, view, offset, block_type, block_length, byte_order, interfaces):
+        """
+        Parses one pcapng block, recording Interface Description Blocks in `interfaces`.
+
+        Args:
+            view (bytes-like): The buffer holding the block.
+            offset (int): Offset of the block in the buffer.
+            block_type (int): The block type.
+            block_length (int): The total block length.
+            byte_order (str): The struct byte-order prefix of the current section.
+            interfaces (list): The interface table of the current section.
+
+        Returns:
+            RawFrame: The packet of a packet block, otherwise None.
+
+        Raises:
+            ValueError: If an interface is not Ethernet, or a packet block names an
+                interface that the section has not described.
+        """
+        body = offset + 8
+        if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+            interfaces.append(self._pcapng_interface(view, body, offset + block_length - 4, byte_order))
+        elif block_type == PCAPNG_ENHANCED_PACKET:
+            interface_id, ts_high, ts_low, captured_length, wire_length = struct.unpack_from(
+                byte_order + 'IIIII', view, body)
+            start = body + 20
+            return RawFrame(((ts_high << 32) | ts_low) / pcapng_interface(interfaces, interface_id)[1],
+                            view[start:start + captured_length], wire_length)
+        elif block_type == PCAPNG_SIMPLE_PACKET:
+            wire_length = struct.unpack_from(byte_order + 'I', view, body)[0]
+            snaplen = interfaces[0][0] if interfaces else 0
+            captured_length = min(wire_length, snaplen) if snaplen else wire_length
+            start = body + 4
+            # Simple Packet Blocks carry no timestamp
+            return RawFrame(0.0, view[start:start + captured_length], wire_length)
+        elif block_type == PCAPNG_OBSOLETE_PACKET:
+            interface_id, _, ts_high, ts_low, captured_length, wire_length = struct.unpack_from(
+                byte_order + 'HHIIII', view, body)
+            start = body + 20
+            return RawFrame(((ts_high << 32) | ts_low) / pcapng_interface(interfaces, interface_id)[1],
+                            view[start:start + captured_length], wire_length)
+        return None
+
+    @staticmethod
+    def _pcapng_interface(view, body, end, byte_order) -> tuple:
+        """
+        Parses an Interface Description Block.
+
+        Args:
+            view (memoryview): The mapped capture file.
+            body (int): Offset of the block body.
+            end (int): Offset of the trailing block length (end of the options).
+            byte_order (str): The struct byte-order prefix of the current section.
+
+        Returns:
+            tuple: `(snaplen, ticks_per_second)` for the interface. The timestamp
+            resolution defaults to microseconds when `if_tsresol` is absent.
+
+        Raises:
+            ValueError: If the interface's link type is not Ethernet.
+        """
+        link_type, _, snaplen = struct.unpack_from(byte_order + 'HHI', view, body)
+        check_link_type(link_type)
+        ticks_per_second = 1_000_000
+        offset = body + 8
+        while offset + 4 <= end:
+            code, length = struct.unpack_from(byte_order + 'HH', view, offset)
+            if code == PCAPNG_OPTION_END:
+                break
+            if code == PCAPNG_OPTION_IF_TSRESOL and length >= 1:
+                resolution = view[offset + 4]
+                if resolution & 0x80:
+                    ticks_per_second = 2 ** (resolution & 0x7F)
+                else:
+                    ticks_per_second = 10 ** resolution
+            # Option values are padded to 32 bits
+            offset += 4 + ((length + 3) & ~3)
+        return snaplen, ticks_per_second
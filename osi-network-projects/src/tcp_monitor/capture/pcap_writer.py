@@ -0,0 +1,605 @@
+import os
+import struct
+import threading
+import time
+
+from tcp_monitor.capture.compression import (COMPRESSION_EXTENSIONS, DEFAULT_BLOCK_SIZE, BlockCompressedFile,
+                                              check_compression)
+from tcp_monitor.capture.frame import detach_frame, frame_wire_length, truncate_frame
+from tcp_monitor.capture.pcap_index import DEFAULT_BUCKET_SECONDS, PcapIndex, index_path, open_index
+
+# Classic libpcap file format (https://wiki.wireshark.org/Development/LibpcapFileFormat)
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_VERSION_MAJOR = 2
+PCAP_VERSION_MINOR = 4
+LINKTYPE_ETHERNET = 1
+DEFAULT_SNAPLEN = 65535
+
+PCAP_GLOBAL_HEADER = struct.Struct('<IHHiIII')
+PCAP_RECORD_HEADER = struct.Struct('<IIII')
+
+
+def pcap_global_header(snaplen=DEFAULT_SNAPLEN, linktype=LINKTYPE_ETHERNET) -> bytes:
+    """
+    Builds the 24-byte global header that starts every pcap file.
+
+    Args:
+        snaplen (int, optional): The maximum captured length advertised in the header.
+        linktype (int, optional): The link-layer header type. Defaults to Ethernet.
+
+    Returns:
+        bytes: The packed pcap global header.
+    """
+    return PCAP_GLOBAL_HEADER.pack(PCAP_MAGIC, PCAP_VERSION_MAJOR, PCAP_VERSION_MINOR,
+                                   0, 0, snaplen, linktype)
+
+
+def packet_record(packet) -> tuple:
+    """
+    Extracts the timestamp, raw bytes, and wire length of a captured packet.
+
+    Packets may either be Scapy `Packet` objects (which carry a `time` attribute
+    and serialise with `bytes()`) or `RawFrame` tuples as produced by the raw
+    capture sources.
+
+    Args:
+        packet (scapy.packet.Packet or tuple): The captured packet.
+
+    Returns:
+        tuple: A `(timestamp, data, wire_length)` triple where `timestamp` is a
+        float in seconds, `data` is a bytes-like object, and `wire_length` is the
+        original length of the packet, which exceeds `len(data)` for truncated frames.
+    """
+    if isinstance(packet, tuple):
+        return float(packet[0]), packet[1], frame_wire_length(packet)
+    data = bytes(packet)
+    wire_length = getattr(packet, 'wirelen', None)
+    return float(packet.time), data, wire_length if isinstance(wire_length, int) else len(data)
+
+
+def split_timestamp(timestamp) -> tuple:
+    """
+    Splits a timestamp into the whole seconds and microseconds of a pcap record.
+
+    Args:
+        timestamp (float): The capture timestamp in seconds since the epoch.
+
+    Returns:
+        tuple: `(seconds, microseconds)`, with the microseconds rounded to the nearest value.
+    """
+    seconds = int(timestamp)
+    microseconds = int(round((timestamp - seconds) * 1_000_000))
+    if microseconds >= 1_000_000:
+        seconds += 1
+        microseconds -= 1_000_000
+    return seconds, microseconds
+
+
+def pack_record(timestamp, data, wire_length=None) -> bytes:
+    """
+    Packs a single pcap record header for the given packet.
+
+    Args:
+        timestamp (float): The capture timestamp in seconds since the epoch.
+        data (bytes): The captured bytes of the packet.
+        wire_length (int, optional): The original length of the packet on the wire.
+            Defaults to the captured length.
+
+    Returns:
+        bytes: The packed 16-byte record header.
+    """
+    seconds, microseconds = split_timestamp(timestamp)
+    captured_length = len(data)
+    return PCAP_RECORD_HEADER.pack(seconds, microseconds, captured_length,
+                                   wire_length if wire_length is not None else captured_length)
+
+
+def append_pcap(file_path, packets, snaplen=None) -> None:
+    """
+    Appends packets to a pcap file, creating it with a global header if needed.
+
+    This is the raw-frame counterpart of Scapy's `wrpcap(..., append=True)`,
+    accepting the `RawFrame` tuples produced by the raw capture backends.
+
+    Args:
+        file_path (str): The path of the pcap file to append to.
+        packets (iterable): The packets to write.
+        snaplen (int, optional): Truncate each packet to this many bytes. The
+            record keeps the original wire length. Default is None (no truncation).
+
+    Returns:
+        None
+    """
+    with open(file_path, 'ab') as pcap_file:
+        if pcap_file.tell() == 0:
+            pcap_file.write(pcap_global_header(snaplen or DEFAULT_SNAPLEN))
+        for packet in packets:
+            timestamp, data, wire_length = packet_record(packet)
+            if snaplen:
+                data = data[:snaplen]
+            pcap_file.write(pack_record(timestamp, data, wire_length))
+            pcap_file.write(data)
+
+
+class RotatingPcapWriter:
+    """
+    A streaming pcap writer that appends packets from a background thread.
+
+    The `RotatingPcapWriter` class accepts packets from the capture thread and hands
+    them to a dedicated writer thread, so the capture thread never blocks on disk I/O
+    and never holds more than one in-memory batch of packets. Output files can be
+    rotated by size, age, or packet count, and the number of retained files can be
+    bounded, with the oldest files deleted first.
+
+    When no rotation limit is configured, packets are appended to `file_path` itself.
+    Otherwise, each file gets a sequence number inserted before its extension
+    (e.g. `capture_00001.pcap`).
+
+    With gzip or zstd compression, the writer thread compresses the output in
+    independent blocks of `block_size` bytes (see `BlockCompressedFile`), so the
+    capture thread never pays for compression and a crash loses at most the
+    block being filled. A partial block is compressed once it is `max_block_delay`
+    seconds old. Size-based rotation counts uncompressed bytes.
+
+    With indexing enabled, the writer records the offset of every packet in a
+    `PcapIndex` and saves it next to each file (`capture.pcap.idx`) when the file
+    is closed, so connections and time slices can be extracted without a scan.
+
+    If writing fails on the writer thread (e.g. the disk is full), the thread
+    stops and keeps the exception: `write` and `close` raise it, so the failure
+    is not silently mistaken for a quiet capture.
+
+    Attributes:
+        file_path (str): The base path of the output file(s).
+        max_file_size (int): Rotate once the current file reaches this many bytes.
+        max_file_duration (float): Rotate once the current file is this many seconds old.
+        max_file_packets (int): Rotate once the current file holds this many packets.
+        max_files (int): Maximum number of rotated files to keep on disk.
+        batch_size (int): Maximum number of packets held in memory awaiting the writer thread.
+        snaplen (int): Maximum number of bytes written per packet, or None to write whole packets.
+        compression (str): "gzip" or "zstd", or None for uncompressed output.
+        compression_level (int): The compression level, or None for the format's default.
+        block_size (int): Uncompressed bytes per compressed block.
+        max_block_delay (float): Seconds after which a partial block is compressed.
+        index (bool): Whether a sidecar index is written for each file.
+        index_bucket_seconds (float): The width of the index's time buckets.
+
+    Methods:
+        start():
+            Opens the first output file and starts the writer thread.
+
+        write(packet) -> bool:
+            Queues a packet for writing, dropping it if the in-memory batch is full.
+
+        close():
+            Flushes all pending packets, closes the current file, and stops the writer thread.
+            Raises the exception that stopped the writer thread, if any.
+    """
+    def __init__(self, file_path, max_file_size=None, max_file_duration=None,
+                 max_file_packets=None, max_files=None, batch_size=1000, snaplen=None,
+                 compression=None, compression_level=None, block_size=DEFAULT_BLOCK_SIZE,
+                 max_block_delay=1.0, index=False, index_bucket_seconds=DEFAULT_BUCKET_SECONDS) -> None:
+        """
+        Initializes the RotatingPcapWriter with its rotation and retention settings.
+
+        Args:
+            file_path (str): The base path of the output file(s).
+            max_file_size (int, optional): Size in bytes at which to rotate. Default is None.
+            max_file_duration (float, optional): Age in seconds at which to rotate. Default is None.
+            max_file_packets (int, optional): Packet count at which to rotate. Default is None.
+            max_files (int, optional): Number of rotated files to retain; requires a rotation
+                limit. Default is None (keep all).
+            batch_size (int, optional): Maximum number of pending packets. Default is 1000.
+            snaplen (int, optional): Truncate each packet to this many bytes, keeping
+                its original wire length in the record. Default is None (no truncation).
+            compression (str, optional): "gzip" or "zstd". Default is None (uncompressed).
+            compression_level (int, optional): The compression level. Default is None
+                (6 for gzip, 3 for zstd).
+            block_size (int, optional): Uncompressed bytes per compressed block. Default is 1 MiB.
+            max_block_delay (float, optional): Seconds after which a partial block is
+                compressed. Default is 1.0.
+            index (bool, optional): Write a sidecar `PcapIndex` for each file. Default is False.
+            index_bucket_seconds (float, optional): The index time bucket width. Default is 1.0.
+
+        Raises:
+            ValueError: If the file path is empty, any limit is not positive, `max_files` is
+                given without a rotation limit, the compression settings are invalid, or
+                indexing is combined with compression.
+        """
+        if not file_path:
+            raise ValueError("Output file path cannot be empty.")
+        for name, value in (('max_file_size', max_file_size),
+                            ('max_file_duration', max_file_duration),
+                            ('max_file_packets', max_file_packets),
+                            ('max_files', max_files),
+                            ('batch_size', batch_size),
+                            ('snaplen', snaplen),
+                            ('block_size', block_size),
+                            ('max_block_delay', max_block_delay),
+                            ('index_bucket_seconds', index_bucket_seconds)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be a positive number.")
+        if max_files is not None and not (max_file_size or max_file_duration or max_file_packets):
+            raise ValueError("max_files requires a rotation limit (max_file_size, max_file_duration "
+                             "or max_file_packets).")
+        if compression is not None:
+            check_compression(compression, compression_level)
+            if index:
+                raise ValueError("Compressed output cannot be indexed: offsets need random access.")
+
+        self.file_path = file_path
+        self.max_file_size = max_file_size
+        self.max_file_duration = max_file_duration
+        self.max_file_packets = max_file_packets
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.snaplen = snaplen
+        self.compression = compression
+        self.compression_level = compression_level
+        self.block_size = block_size
+        self.max_block_delay = max_block_delay
+        self.index = index
+        self.index_bucket_seconds = index_bucket_seconds
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._error = None
+
+        self._file = None
+        self._file_index = 0
+        self._file_bytes = 0
+        self._file_path = None
+        self._index = None
+        self._file_packets = 0
+        self._file_opened_at = 0.0
+        self._files = []
+
+        self._packets_written = 0
+        self._packets_dropped = 0
+        self._bytes_written = 0
+        self._compressed_bytes = 0
+
+    @property
+    def is_rotating(self) -> bool:
+        """
+        Indicates whether any rotation limit has been configured.
+
+        Returns:
+            bool: True if output is split across multiple files, False otherwise.
+        """
+        return bool(self.max_file_size or self.max_file_duration or self.max_file_packets)
+
+    @property
+    def error(self) -> Exception:
+        """
+        Retrieves the exception that stopped the writer thread.
+
+        Returns:
+            Exception: The error raised while writing, or None if the writer is healthy.
+        """
+        return self._error
+
+    @property
+    def files(self) -> list:
+        """
+        Lists the output files currently retained on disk, oldest first.
+
+        Returns:
+            list of str: Paths of the retained output files.
+        """
+        return list(self._files)
+
+    @property
+    def packets_written(self) -> int:
+        """
+        Retrieves the number of packets written to disk so far.
+
+        Returns:
+            int: The total number of packets written.
+        """
+        return self._packets_written
+
+    @property
+    def packets_dropped(self) -> int:
+        """
+        Retrieves the number of packets dropped because the in-memory batch was full.
+
+        Returns:
+            int: The total number of packets dropped.
+        """
+        return self._packets_dropped
+
+    @property
+    def bytes_written(self) -> int:
+        """
+        Retrieves the number of bytes written to disk so far, including pcap headers.
+
+        Returns:
+            int: The total number of bytes written.
+        """
+        return self._bytes_written
+
+    @property
+    def compressed_bytes(self) -> int:
+        """
+        Retrieves the number of compressed bytes written to disk so far.
+
+        Returns:
+            int: The total size of the compressed blocks, or 0 for uncompressed output.
+        """
+        if isinstance(self._file, BlockCompressedFile):
+            return self._compressed_bytes + self._file.compressed_bytes
+        return self._compressed_bytes
+
+    def start(self) -> None:
+        """
+        Opens the first output file and starts the background writer thread.
+
+        Raises:
+            ValueError: If the writer has already been started.
+        """
+        if self._thread is not None:
+            raise ValueError("Writer is already running")
+
+        self._closing = False
+        self._error = None
+        self._open_next_file()
+        self._thread = threading.Thread(target=self._run, name="pcap-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, packet) -> bool:
+        """
+        Queues a packet to be written by the background thread.
+
+        This method never blocks on disk I/O. If the in-memory batch is already full,
+        the packet is dropped and counted in `packets_dropped`.
+
+        Packets whose data is a `memoryview` (as delivered by the mmap ring backend)
+        are copied first with `detach_frame`, since the underlying ring slot is
+        recycled once the capture callback returns.
+
+        Args:
+            packet (scapy.packet.Packet or tuple): The packet to write.
+
+        Raises:
+            Exception: The error that stopped the writer thread, e.g. `OSError` when the disk is full.
+
+        Returns:
+            bool: True if the packet was queued, False if it was dropped.
+        """
+        if self._error is not None:
+            raise self._error
+        if self.snaplen:
+            packet = truncate_frame(packet, self.snaplen)
+        packet = detach_frame(packet)
+        with self._condition:
+            if len(self._pending) >= self.batch_size:
+                self._packets_dropped += 1
+                return False
+            self._pending.append(packet)
+            self._condition.notify()
+        return True
+
+    def close(self) -> None:
+        """
+        Flushes pending packets, closes the current file, and stops the writer thread.
+
+        Raises:
+            Exception: The error that stopped the writer thread, once the file is closed.
+
+        Returns:
+            None
+        """
+        if self._thread is None:
+            return None
+
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+
+        try:
+            if self._file:
+                self._close_file()
+        except Exception:
+            # The writer thread's error explains the failure better than the broken file's
+            if self._error is None:
+                raise
+        finally:
+            self._file = None
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        """
+        Main loop of the writer thread.
+
+        Swaps out the pending batch under the lock and writes it without holding
+        the lock, so the capture thread can keep queueing packets meanwhile. When
+        idle, it wakes up periodically to apply time-based rotation. An exception
+        raised while writing is kept in `error` and stops the thread; the pending
+        packets are discarded.
+
+        Returns:
+            None
+        """
+        try:
+            self._write_loop()
+        except Exception as error:
+            with self._condition:
+                self._error = error
+                self._pending = []
+
+    def _write_loop(self) -> None:
+        """
+        Writes batches until the writer is closed.
+
+        Returns:
+            None
+        """
+        while True:
+            with self._condition:
+                if not self._pending and not self._closing:
+                    self._condition.wait(timeout=self._idle_timeout())
+                batch, self._pending = self._pending, []
+                closing = self._closing
+
+            if batch:
+                self._write_batch(batch)
+            elif not closing and self._rotation_due():
+                self._rotate()
+            elif not closing:
+                # Compresses a partial block that reached its maximum delay
+                self._file.flush()
+
+            if closing and not batch:
+                return
+
+    def _idle_timeout(self) -> float:
+        """
+        Computes how long the writer thread may sleep while no packets arrive.
+
+        Returns:
+            float: The number of seconds to wait, or None to wait indefinitely
+            (no age limit or partial compressed block, or the current file is still empty).
+        """
+        timeouts = []
+        if self.max_file_duration and self._file_packets:
+            timeouts.append(self._file_opened_at + self.max_file_duration - time.time())
+        deadline = getattr(self._file, 'deadline', None)
+        if deadline is not None:
+            timeouts.append(deadline - time.monotonic())
+        if not timeouts:
+            return None
+        return max(min(timeouts), 0.0)
+
+    def _write_batch(self, batch) -> None:
+        """
+        Writes a batch of packets to the current file, rotating as needed.
+
+        Args:
+            batch (list): The packets to write.
+
+        Returns:
+            None
+        """
+        for packet in batch:
+            if self._rotation_due():
+                self._rotate()
+            timestamp, data, wire_length = packet_record(packet)
+            record = pack_record(timestamp, data, wire_length)
+            self._file.write(record)
+            self._file.write(data)
+
+            written = len(record) + len(data)
+            if self._index is not None:
+                self._index.add(self._file_bytes, timestamp, data, self._file_bytes + written)
+            self._file_bytes += written
+            self._file_packets += 1
+            self._bytes_written += written
+            self._packets_written += 1
+        self._file.flush()
+
+    def _rotation_due(self) -> bool:
+        """
+        Checks whether the current file has reached any of the rotation limits.
+
+        Returns:
+            bool: True if the writer should move on to a new file.
+        """
+        if not self.is_rotating or not self._file_packets:
+            return False
+        if self.max_file_size and self._file_bytes >= self.max_file_size:
+            return True
+        if self.max_file_packets and self._file_packets >= self.max_file_packets:
+            return True
+        if self.max_file_duration and time.time() - self._file_opened_at >= self.max_file_duration:
+            return True
+        return False
+
+    def _rotate(self) -> None:
+        """
+        Closes the current file and opens the next one.
+
+        Returns:
+            None
+        """
+        self._close_file()
+        self._open_next_file()
+
+    def _close_file(self) -> None:
+        """
+        Closes the current file, compressing its pending data or saving its index.
+
+        Returns:
+            None
+        """
+        self._file.close()
+        if isinstance(self._file, BlockCompressedFile):
+            self._compressed_bytes += self._file.compressed_bytes
+        self._file = None
+        if self._index is not None:
+            self._index.file_size = self._file_bytes
+            self._index.save(index_path(self._file_path))
+            self._index = None
+
+    def _next_file_path(self) -> str:
+        """
+        Determines the path of the next output file.
+
+        Returns:
+            str: The exact `file_path` when rotation is disabled, otherwise the
+            base path with the next sequence number inserted before the extension.
+        """
+        if not self.is_rotating:
+            return self.file_path
+        self._file_index += 1
+        root, suffix = self.file_path, ''
+        if self.compression and root.endswith(COMPRESSION_EXTENSIONS[self.compression]):
+            # Keep "capture.pcap.gz" together as the extension
+            root, suffix = os.path.splitext(root)
+        root, extension = os.path.splitext(root)
+        return f"{root}_{self._file_index:05d}{extension or '.pcap'}{suffix}"
+
+    def _open_next_file(self) -> None:
+        """
+        Opens the next output file, writes its global header, and enforces retention.
+
+        Existing non-rotating output files are appended to, mirroring the behaviour
+        of writing the whole capture at once with `wrpcap(..., append=True)`.
+
+        Returns:
+            None
+        """
+        path = self._next_file_path()
+        self._file_path = path
+        self._file = open(path, 'ab')
+        self._file_bytes = self._file.tell()
+        if self.index:
+            # Appending to an existing capture extends its index
+            self._index = (open_index(path, self.index_bucket_seconds)
+                           if self._file_bytes > PCAP_GLOBAL_HEADER.size else PcapIndex(self.index_bucket_seconds))
+        if self.compression:
+            self._file = BlockCompressedFile(self._file, self.compression, self.compression_level,
+                                             self.block_size, self.max_block_delay)
+        self._file_packets = 0
+        self._file_opened_at = time.time()
+
+        if self._file_bytes == 0:
+            header = pcap_global_header(self.snaplen or DEFAULT_SNAPLEN)
+            self._file.write(header)
+            self._file_bytes += len(header)
+            self._bytes_written += len(header)
+
+        if path not in self._files:
+            self._files.append(path)
+        while self.max_files and len(self._files) > self.max_files:
+            oldest = self._files.pop(0)
+            for stale_path in (oldest, index_path(oldest)):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
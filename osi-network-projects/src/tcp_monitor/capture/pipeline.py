@@ -0,0 +1,285 @@
+import queue
+import threading
+import time
+
+from tcp_monitor.capture.frame import detach_frame
+
+OVERFLOW_POLICIES = ('block', 'drop-newest', 'drop-oldest')
+
+
+class PacketPipeline:
+    """
+    Decouples packet capture from packet processing with a bounded queue.
+
+    The `PacketPipeline` class lets the capture thread hand packets off to a pool
+    of worker threads instead of running the packet callback inline. The capture
+    thread only enqueues packets, so slow analysis no longer stalls the sniffer
+    and causes kernel drops. When the queue is full, the overflow policy decides
+    what happens:
+
+    - "block": the capture thread waits for room (no packet is lost in userspace,
+      but the kernel may drop packets meanwhile).
+    - "drop-newest": the incoming packet is discarded.
+    - "drop-oldest": the oldest queued packet is discarded to make room.
+
+    Note that with more than one worker, packets may be processed out of order
+    and the callback must be thread-safe.
+
+    Attributes:
+        callback (callable): The function invoked by the workers for each packet.
+        workers (int): The number of worker threads.
+        queue_size (int): The maximum number of queued packets.
+        overflow_policy (str): One of "block", "drop-newest", or "drop-oldest".
+        statistics (CaptureStatistics): Optional collector receiving each callback duration.
+
+    Methods:
+        start():
+            Starts the worker threads.
+
+        submit(packet) -> bool:
+            Enqueues a packet according to the overflow policy.
+
+        stop(drain=True):
+            Stops the workers, optionally after processing every queued packet.
+    """
+    def __init__(self, callback, workers=1, queue_size=10000, overflow_policy='block',
+                 statistics=None) -> None:
+        """
+        Initializes the PacketPipeline.
+
+        Args:
+            callback (callable): The function invoked with each packet.
+            workers (int, optional): The number of worker threads. Default is 1.
+            queue_size (int, optional): The maximum number of queued packets. Default is 10000.
+            overflow_policy (str, optional): The policy applied when the queue is full.
+                Default is "block".
+            statistics (CaptureStatistics, optional): Collector whose callback latency
+                histogram is updated by the workers. Default is None.
+
+        Raises:
+            ValueError: If the worker count or queue size is not positive, or the
+                        overflow policy is unknown.
+        """
+        if workers <= 0:
+            raise ValueError("Worker count must be positive.")
+        if queue_size <= 0:
+            raise ValueError("Queue size must be positive.")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}. "
+                             f"Supported policies: {', '.join(OVERFLOW_POLICIES)}.")
+
+        self.callback = callback
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.statistics = statistics
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self._dropped = 0
+        self._processed = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Retrieves the current number of queued packets.
+
+        Returns:
+            int: The approximate number of packets waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    @property
+    def max_queue_depth(self) -> int:
+        """
+        Retrieves the highest queue depth observed so far.
+
+        Returns:
+            int: The maximum number of packets that were queued at once.
+        """
+        return self._max_depth
+
+    @property
+    def dropped_packets(self) -> int:
+        """
+        Retrieves the number of packets discarded by the overflow policy.
+
+        Returns:
+            int: The total number of dropped packets.
+        """
+        return self._dropped
+
+    @property
+    def processed_packets(self) -> int:
+        """
+        Retrieves the number of packets handed to the callback by the workers.
+
+        Returns:
+            int: The total number of processed packets.
+        """
+        return self._processed
+
+    @property
+    def callback_errors(self) -> int:
+        """
+        Retrieves the number of callback invocations that raised an exception.
+
+        Exceptions are counted rather than propagated, so a failing packet does
+        not terminate its worker thread.
+
+        Returns:
+            int: The total number of failed callback invocations.
+        """
+        return self._errors
+
+    @property
+    def callback_latency(self) -> dict:
+        """
+        Summarises the time spent inside the callback.
+
+        Returns:
+            dict: A dictionary containing:
+                - count (int): The number of timed callback invocations.
+                - average (float): The mean callback duration in seconds.
+                - max (float): The longest callback duration in seconds.
+        """
+        with self._lock:
+            count = self._processed
+            average = self._latency_total / count if count else 0.0
+            return {'count': count, 'average': average, 'max': self._latency_max}
+
+    def start(self) -> None:
+        """
+        Starts the worker threads.
+
+        Raises:
+            ValueError: If the pipeline is already running.
+        """
+        if self._threads:
+            raise ValueError("Pipeline is already running")
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"packet-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, packet) -> bool:
+        """
+        Enqueues a packet for the workers, applying the overflow policy if the queue is full.
+
+        Frames that reference a capture buffer (`memoryview` data) are copied first,
+        since the buffer is reused once the capture callback returns.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+        Returns:
+            bool: True if the packet was queued, False if it was dropped.
+        """
+        packet = detach_frame(packet)
+
+        if self.overflow_policy == 'block':
+            self._queue.put(packet)
+        elif self.overflow_policy == 'drop-newest':
+            try:
+                self._queue.put_nowait(packet)
+            except queue.Full:
+                self._count_drop()
+                return False
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(packet)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        self._count_drop()
+                    except queue.Empty:
+                        pass
+
+        depth = self._queue.qsize()
+        if depth > self._max_depth:
+            self._max_depth = depth
+        return True
+
+    def stop(self, drain=True) -> None:
+        """
+        Stops the worker threads.
+
+        Args:
+            drain (bool, optional): Process every queued packet before stopping.
+                If False, queued packets are discarded and counted as dropped.
+                Default is True.
+
+        Returns:
+            None
+        """
+        if not self._threads:
+            return None
+
+        if not drain:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self._count_drop()
+                except queue.Empty:
+                    break
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _count_drop(self) -> None:
+        """
+        Increments the dropped packet counter.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._dropped += 1
+
+    def _work(self) -> None:
+        """
+        Main loop of a worker thread.
+
+        Takes packets off the queue and invokes the callback, timing each call,
+        until it receives the stop sentinel.
+
+        Returns:
+            None
+        """
+        while True:
+            packet = self._queue.get()
+            if packet is None:
+                self._queue.task_done()
+                return
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                self.callback(packet)
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._processed += 1
+                self._latency_total += elapsed
+                if elapsed > self._latency_max:
+                    self._latency_max = elapsed
+                if failed:
+                    self._errors += 1
+            if self.statistics is not None:
+                self.statistics.record_callback(elapsed)
+            self._queue.task_done()
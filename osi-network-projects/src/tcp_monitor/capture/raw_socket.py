@@ -0,0 +1,305 @@
+import socket
+import struct
+import threading
+import time
+
+from tcp_monitor.capture.bpf_filter import attach_bpf
+from tcp_monitor.capture.frame import RawFrame
+
+# Linux <linux/if_ether.h>: receive every protocol
+ETH_P_ALL = 0x0003
+MAX_FRAME_SIZE = 65536
+
+# Linux <linux/if_packet.h>
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+TPACKET_STATS = struct.Struct('II')
+TPACKET_STATS_V3 = struct.Struct('III')
+PACKET_AUXDATA = 8
+# struct tpacket_auxdata: tp_status, tp_len, tp_snaplen, tp_mac, tp_net, tp_vlan_tci, tp_vlan_tpid
+TPACKET_AUXDATA = struct.Struct('IIIHHHH')
+AUXDATA_BUFFER_SIZE = socket.CMSG_SPACE(TPACKET_AUXDATA.size)
+
+
+def read_packet_statistics(sock, v3=False) -> tuple:
+    """
+    Reads the kernel's `PACKET_STATISTICS` counters for an `AF_PACKET` socket.
+
+    The kernel resets the counters on every read, so callers are expected to
+    accumulate the returned values.
+
+    Args:
+        sock (socket.socket): The `AF_PACKET` socket to query.
+        v3 (bool, optional): Whether the socket uses a TPACKET_V3 ring, which adds
+            a queue-freeze counter. Default is False.
+
+    Returns:
+        tuple: `(packets, drops, freeze_queue_count)` since the previous read.
+        `freeze_queue_count` is always 0 for non-V3 sockets.
+
+    Raises:
+        OSError: If the statistics cannot be read.
+    """
+    layout = TPACKET_STATS_V3 if v3 else TPACKET_STATS
+    values = layout.unpack(sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, layout.size))
+    return values if v3 else values + (0,)
+
+
+class RawSocketSniffer:
+    """
+    A capture backend that reads raw frames from a Linux `AF_PACKET` socket.
+
+    The `RawSocketSniffer` class mirrors the parts of Scapy's `AsyncSniffer` interface
+    used by `PacketCapture` (`start`, `stop`, `results`, `running`), but skips Scapy's
+    per-packet dissection entirely: each frame is delivered to the callback as a
+    `RawFrame(timestamp, data)` holding the bytes exactly as received. The BPF filter
+    is compiled and attached to the socket, so filtering still happens in the kernel.
+
+    With a snap length, the filter also truncates each frame in the kernel, so only
+    the first `snaplen` bytes are queued to the socket and copied to userspace. The
+    original length is read from the kernel's `PACKET_AUXDATA` and delivered as the
+    frame's `wire_length`.
+
+    This backend is only available on Linux and requires the `CAP_NET_RAW` capability.
+    If receiving fails (e.g. the interface goes away), the capture thread stops and
+    `stop` raises the error.
+
+    Attributes:
+        iface (str): The network interface to capture frames from.
+        filter (str): The BPF filter expression attached to the socket.
+        prn (callable): Callback invoked with each captured `RawFrame`.
+        count (int): Stop after this many frames; 0 means no limit.
+        timeout (float): Stop after this many seconds; None means no limit.
+        store (bool): Whether captured frames are kept in `results`.
+        snaplen (int): Maximum number of bytes captured per frame; None captures whole frames.
+        results (list of RawFrame): Captured frames when `store` is True.
+        running (bool): Whether the capture thread is active.
+        error (OSError): The error that ended the capture thread, or None.
+
+    Methods:
+        start():
+            Opens the socket, attaches the filter, and starts the capture thread.
+
+        stop(join=True):
+            Stops the capture thread and closes the socket, raising the error that ended it.
+
+        set_filter(expression):
+            Atomically replaces the BPF filter while capturing.
+
+        join(timeout=None):
+            Waits for the capture thread to finish.
+
+        kernel_statistics() -> dict:
+            Returns the kernel's received and dropped packet counters.
+    """
+    def __init__(self, iface, filter=None, prn=None, count=0, timeout=None,
+                 store=False, snaplen=None) -> None:
+        """
+        Initializes the RawSocketSniffer with the same arguments as `AsyncSniffer`.
+
+        Args:
+            iface (str): The network interface to capture frames from.
+            filter (str, optional): BPF filter expression. Default is None (no filter).
+            prn (callable, optional): Callback invoked with each `RawFrame`. Default is None.
+            count (int, optional): Maximum number of frames to capture. Default is 0 (unlimited).
+            timeout (float, optional): Capture duration in seconds. Default is None (unlimited).
+            store (bool, optional): Keep captured frames in `results`. Default is False.
+            snaplen (int, optional): Maximum bytes captured per frame. Default is None (whole frames).
+        """
+        self.iface = iface
+        self.filter = filter
+        self.prn = prn
+        self.count = count
+        self.timeout = timeout
+        self.store = store
+        self.snaplen = snaplen
+        self.results = []
+        self.running = False
+        self.error = None
+
+        self._socket = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._kernel_stats = {'packets': 0, 'drops': 0, 'freeze_queue_count': 0}
+
+    def start(self) -> None:
+        """
+        Opens the raw socket, attaches the BPF filter, and starts the capture thread.
+
+        Raises:
+            OSError: If the socket cannot be opened or bound (e.g. missing privileges).
+        """
+        self._socket = self._open_socket()
+        self._stop_event.clear()
+        self.error = None
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="raw-sniffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, join=True) -> list:
+        """
+        Stops the capture and closes the socket.
+
+        Args:
+            join (bool, optional): Wait for the capture thread to exit. Default is True.
+
+        Raises:
+            OSError: If receiving failed and ended the capture early.
+
+        Returns:
+            list of RawFrame: The stored frames (empty unless `store` is True).
+        """
+        self._stop_event.set()
+        if join:
+            self.join()
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+    def set_filter(self, expression) -> None:
+        """
+        Replaces the BPF filter of the running capture.
+
+        The new program is attached to the open socket, which the kernel does
+        atomically, so the capture keeps running without losing or leaking
+        packets. Frames already queued in the socket passed the previous filter
+        and are still delivered.
+
+        Args:
+            expression (str): The new filter expression, or None to accept every frame.
+
+        Raises:
+            ValueError: If the capture is not running.
+        """
+        sock = self._socket
+        if sock is None:
+            raise ValueError("Cannot change the filter of a stopped capture")
+        attach_bpf(sock, expression or None, self.iface, self.snaplen)
+        self.filter = expression
+
+    def join(self, timeout=None) -> None:
+        """
+        Waits for the capture thread to finish.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Default is None.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def kernel_statistics(self) -> dict:
+        """
+        Retrieves the kernel's packet counters for this socket.
+
+        The kernel resets its counters each time they are read, so the values are
+        accumulated here. After the capture stops, the final totals remain available.
+
+        Returns:
+            dict: A dictionary containing:
+                - packets (int): Packets that passed the filter and reached the socket.
+                - drops (int): Packets dropped because the socket buffer was full.
+                - freeze_queue_count (int): Always 0; only meaningful for ring buffers.
+        """
+        if self._socket is not None:
+            self._accumulate_kernel_statistics()
+        return dict(self._kernel_stats)
+
+    def _accumulate_kernel_statistics(self) -> None:
+        """
+        Reads and accumulates the kernel counters (which reset on read).
+
+        Returns:
+            None
+        """
+        try:
+            packets, drops, _ = read_packet_statistics(self._socket)
+        except OSError:
+            return None
+        self._kernel_stats['packets'] += packets
+        self._kernel_stats['drops'] += drops
+
+    def _open_socket(self) -> socket.socket:
+        """
+        Creates an `AF_PACKET` socket bound to the configured interface.
+
+        As in libpcap, the socket is created with protocol 0, so it receives
+        nothing until `bind` sets `ETH_P_ALL` together with the interface; frames
+        from other interfaces never reach it. The socket uses a short receive
+        timeout so the capture thread can notice stop requests and the capture
+        deadline without blocking indefinitely.
+
+        Returns:
+            socket.socket: The bound raw socket with the BPF filter attached.
+        """
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            if self.filter or self.snaplen:
+                attach_bpf(sock, self.filter, self.iface, self.snaplen)
+            if self.snaplen:
+                sock.setsockopt(SOL_PACKET, PACKET_AUXDATA, 1)
+            sock.bind((self.iface, socket.htons(ETH_P_ALL)))
+            sock.settimeout(0.1)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _wire_length(ancillary) -> int:
+        """
+        Extracts the original frame length from `recvmsg` ancillary data.
+
+        Args:
+            ancillary (list of tuple): The `(level, type, data)` control messages.
+
+        Returns:
+            int: The frame's length on the wire, or None if no auxiliary data was received.
+        """
+        for level, message_type, data in ancillary:
+            if level == SOL_PACKET and message_type == PACKET_AUXDATA:
+                return TPACKET_AUXDATA.unpack_from(data)[1]
+        return None
+
+    def _run(self) -> None:
+        """
+        Main loop of the capture thread.
+
+        Receives frames until the stop event is set, the packet count is reached,
+        or the capture duration elapses, then closes the socket. A receive error
+        ends the loop and is kept in `error`.
+
+        Returns:
+            None
+        """
+        deadline = time.time() + self.timeout if self.timeout else None
+        captured = 0
+        sock = self._socket
+        try:
+            while not self._stop_event.is_set():
+                if deadline and time.time() >= deadline:
+                    break
+                try:
+                    if self.snaplen:
+                        data, ancillary, _, _ = sock.recvmsg(self.snaplen, AUXDATA_BUFFER_SIZE)
+                        frame = RawFrame(time.time(), data, self._wire_length(ancillary))
+                    else:
+                        frame = RawFrame(time.time(), sock.recv(MAX_FRAME_SIZE))
+                except socket.timeout:
+                    continue
+                except OSError as error:
+                    self.error = error
+                    break
+
+                if self.store:
+                    self.results.append(frame)
+                if self.prn:
+                    self.prn(frame)
+
+                captured += 1
+                if self.count and captured >= self.count:
+                    break
+        finally:
+            self.running = False
+            self._accumulate_kernel_statistics()
+            self._socket = None
+            sock.close()
@@ -0,0 +1,189 @@
+from tcp_monitor.capture.frame import flow_hash
+
+SAMPLING_MODES = ('packet', 'flow')
+# Flow hashes are unsigned 32-bit values
+FLOW_HASH_SPACE = 1 << 32
+
+
+class PacketSampler:
+    """
+    Selects a subset of captured packets for analysis.
+
+    The `PacketSampler` class supports two strategies. In "packet" mode one
+    packet in every `rate` is kept, so each kept packet stands for `rate`
+    packets and per-connection counters must be scaled up by the rate. In
+    "flow" mode a packet is kept when the symmetric 5-tuple hash of its flow
+    (`flow_hash`) falls in the lowest `1/rate` of the hash space: either every
+    packet of a connection is kept or none is, so the kept connections are
+    tracked exactly and only totals across connections must be scaled.
+
+    With adaptive sampling the rate follows the pressure on the pipeline queue:
+    it doubles while the queue is above the high watermark (up to `max_rate`)
+    and halves again once it drains below the low watermark (down to the
+    configured rate). In flow mode, the flows kept at a rate are a subset of the
+    flows kept at any lower rate, so raising the rate never starts tracking a
+    connection half-way through.
+
+    Attributes:
+        mode (str): "packet" or "flow".
+        rate (int): The current sampling rate: one packet (or flow) in `rate` is kept.
+        base_rate (int): The configured rate, the lower bound for adaptation.
+        max_rate (int): The upper bound for adaptation.
+        adaptive (bool): Whether `adapt` changes the rate.
+        packet_weight (int): The number of packets a kept packet stands for in its connection.
+        packets_seen (int): Packets offered to `sample`.
+        packets_sampled (int): Packets kept.
+        rate_changes (int): The number of adaptive rate changes.
+
+    Methods:
+        sample(packet) -> bool:
+            Decides whether a packet is kept.
+
+        adapt(queue_depth, queue_size) -> int:
+            Adjusts the rate to the queue fill level.
+
+        snapshot() -> dict:
+            Returns the sampling settings and counters.
+    """
+    def __init__(self, rate=1, mode='packet', adaptive=False, max_rate=1024,
+                 low_watermark=0.25, high_watermark=0.75, adapt_interval=1024) -> None:
+        """
+        Initializes the PacketSampler.
+
+        Args:
+            rate (int, optional): Keep one packet (or flow) in `rate`. Default is 1 (keep everything).
+            mode (str, optional): "packet" or "flow". Default is "packet".
+            adaptive (bool, optional): Whether to adapt the rate to queue pressure. Default is False.
+            max_rate (int, optional): The highest rate adaptation may reach. Default is 1024.
+            low_watermark (float, optional): Queue fill fraction below which the rate is lowered. Default is 0.25.
+            high_watermark (float, optional): Queue fill fraction above which the rate is raised. Default is 0.75.
+            adapt_interval (int, optional): Packets between two rate adjustments. Default is 1024.
+
+        Raises:
+            ValueError: If the mode is unknown or the rates or watermarks are invalid.
+        """
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unsupported sampling mode: {mode}. "
+                             f"Supported modes: {', '.join(SAMPLING_MODES)}.")
+        if not isinstance(rate, int) or rate < 1:
+            raise ValueError("Sampling rate must be a positive integer.")
+        if adaptive and max_rate < rate:
+            raise ValueError("Maximum sampling rate must not be below the sampling rate.")
+        if not 0 <= low_watermark < high_watermark <= 1:
+            raise ValueError("Watermarks must satisfy 0 <= low < high <= 1.")
+        if adapt_interval < 1:
+            raise ValueError("Adaptation interval must be positive.")
+
+        self.mode = mode
+        self.base_rate = rate
+        self.max_rate = max_rate if adaptive else rate
+        self.adaptive = adaptive
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.adapt_interval = adapt_interval
+        self.packets_seen = 0
+        self.packets_sampled = 0
+        self.rate_changes = 0
+        self._rate = rate
+        self._threshold = FLOW_HASH_SPACE // rate
+        self._next_adapt = adapt_interval
+
+    @property
+    def rate(self) -> int:
+        """
+        Gets the current sampling rate.
+
+        Returns:
+            int: One packet (or flow) in `rate` is kept.
+        """
+        return self._rate
+
+    @property
+    def packet_weight(self) -> int:
+        """
+        Gets the number of packets each kept packet stands for within its connection.
+
+        Returns:
+            int: The rate in "packet" mode, 1 in "flow" mode since kept flows are complete.
+        """
+        return self._rate if self.mode == 'packet' else 1
+
+    def _set_rate(self, rate) -> None:
+        """Changes the current rate and the matching flow hash threshold."""
+        if rate != self._rate:
+            self._rate = rate
+            self._threshold = FLOW_HASH_SPACE // rate
+            self.rate_changes += 1
+
+    def sample(self, packet) -> bool:
+        """
+        Decides whether a packet is kept.
+
+        Args:
+            packet (scapy.packet.Packet, RawFrame or bytes): The captured packet.
+
+        Returns:
+            bool: True if the packet should be analysed.
+        """
+        self.packets_seen += 1
+        if self._rate == 1:
+            keep = True
+        elif self.mode == 'packet':
+            keep = self.packets_seen % self._rate == 0
+        else:
+            if isinstance(packet, tuple):
+                data = packet[1]
+            elif isinstance(packet, (bytes, bytearray, memoryview)):
+                data = packet
+            else:
+                data = bytes(packet)
+            keep = flow_hash(data) < self._threshold
+        if keep:
+            self.packets_sampled += 1
+        return keep
+
+    def adapt(self, queue_depth, queue_size) -> int:
+        """
+        Adjusts the rate to the pressure on a bounded queue.
+
+        The queue is checked at most once every `adapt_interval` packets, so
+        calling this for every packet is cheap and the rate moves by one step
+        (a factor of two) at a time.
+
+        Args:
+            queue_depth (int): The number of queued packets.
+            queue_size (int): The queue's capacity.
+
+        Returns:
+            int: The current sampling rate.
+        """
+        if not self.adaptive or self.packets_seen < self._next_adapt or not queue_size:
+            return self._rate
+        self._next_adapt = self.packets_seen + self.adapt_interval
+
+        fill = queue_depth / queue_size
+        if fill >= self.high_watermark:
+            self._set_rate(min(self._rate * 2, self.max_rate))
+        elif fill <= self.low_watermark:
+            self._set_rate(max(self._rate // 2, self.base_rate))
+        return self._rate
+
+    def snapshot(self) -> dict:
+        """
+        Summarises the sampling settings and counters.
+
+        Returns:
+            dict: A dictionary containing:
+                - mode (str): "packet" or "flow".
+                - rate (int): The current sampling rate.
+                - adaptive (bool): Whether the rate adapts to queue pressure.
+                - seen (int): Packets offered to the sampler.
+                - sampled (int): Packets kept.
+                - rate_changes (int): Adaptive rate changes so far.
+        """
+        return {'mode': self.mode,
+                'rate': self._rate,
+                'adaptive': self.adaptive,
+                'seen': self.packets_seen,
+                'sampled': self.packets_sampled,
+                'rate_changes': self.rate_changes}
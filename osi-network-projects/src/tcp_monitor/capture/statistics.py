@@ -0,0 +1,476 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from tcp_monitor.capture.frame import frame_wire_length
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets are powers of two in microseconds: <1us, <2us, <4us, ... <2^(N-1)us, overflow
+LATENCY_BUCKETS = 24
+RATE_WINDOWS = (1, 10, 60)
+# Timed stages: userspace filtering (sampling in PacketCapture), then decode and track (ConnectionTracker)
+PIPELINE_STAGES = ('filter', 'decode', 'track')
+
+
+def packet_length(packet) -> int:
+    """
+    Determines the on-the-wire length of a captured packet.
+
+    Raw frames carry their wire length. Scapy packets use `wirelen` when the
+    capture set it, otherwise the length of the bytes they were dissected from
+    (`original`). Only packets built in Python, which have neither, are
+    serialised to be measured.
+
+    Args:
+        packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+    Returns:
+        int: The packet length in bytes, or 0 if it cannot be determined.
+    """
+    if isinstance(packet, tuple):
+        return frame_wire_length(packet)
+    wire_length = getattr(packet, 'wirelen', None)
+    if isinstance(wire_length, int):
+        return wire_length
+    original = getattr(packet, 'original', None)
+    if isinstance(original, bytes):
+        return len(original)
+    try:
+        return len(packet)
+    except TypeError:
+        return 0
+
+
+class LatencyHistogram:
+    """
+    A fixed-size histogram of durations with power-of-two microsecond buckets.
+
+    Recording a value costs one integer conversion and one list increment, so
+    the histogram can stay enabled on the packet path. Percentiles are derived
+    from the bucket bounds and are therefore upper estimates within a factor of two.
+
+    Attributes:
+        count (int): The number of recorded durations.
+        total (float): The sum of the recorded durations, in seconds.
+        max (float): The longest recorded duration, in seconds.
+        buckets (list of int): Counts per bucket; bucket `i` holds durations
+            below `2**i` microseconds, the last bucket holds everything longer.
+
+    Methods:
+        record(seconds):
+            Adds a duration to the histogram.
+
+        percentile(fraction) -> float:
+            Estimates a percentile of the recorded durations.
+
+        summary() -> dict:
+            Returns the count, mean, maximum, and common percentiles.
+    """
+    def __init__(self) -> None:
+        """Initializes an empty LatencyHistogram."""
+        self.buckets = [0] * LATENCY_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds) -> None:
+        """
+        Adds a duration to the histogram.
+
+        Args:
+            seconds (float): The measured duration.
+
+        Returns:
+            None
+        """
+        index = int(seconds * 1_000_000).bit_length()
+        self.buckets[index if index < LATENCY_BUCKETS else LATENCY_BUCKETS - 1] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction) -> float:
+        """
+        Estimates a percentile of the recorded durations.
+
+        Args:
+            fraction (float): The percentile as a fraction, e.g. 0.99.
+
+        Returns:
+            float: The upper bound in seconds of the bucket containing the
+            percentile (capped at the maximum), or 0.0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= threshold:
+                return min((1 << index) / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Summarises the histogram.
+
+        Returns:
+            dict: A dictionary containing:
+                - count (int): The number of recorded durations.
+                - average (float): The mean duration in seconds.
+                - max (float): The longest duration in seconds.
+                - p50, p90, p99 (float): Estimated percentiles in seconds.
+                - buckets (list of int): The raw bucket counts.
+        """
+        return {
+            'count': self.count,
+            'average': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'buckets': list(self.buckets),
+        }
+
+
+class RateCounter:
+    """
+    Counts packets and bytes in one-second buckets to report sliding-window rates.
+
+    The counter keeps one bucket per second for the longest window, reusing
+    buckets as time advances, so recording a packet is constant time and the
+    memory footprint is fixed.
+
+    Attributes:
+        windows (tuple of int): The window lengths in seconds reported by `rates`.
+
+    Methods:
+        add(size, now):
+            Counts one packet of the given size.
+
+        rates(now) -> dict:
+            Returns packets and bits per second over each window.
+    """
+    def __init__(self, windows=RATE_WINDOWS) -> None:
+        """
+        Initializes the RateCounter.
+
+        Args:
+            windows (tuple of int, optional): Window lengths in seconds. Default is (1, 10, 60).
+        """
+        self.windows = tuple(windows)
+        self._slots = max(self.windows) + 1
+        self._seconds = [-1] * self._slots
+        self._packets = [0] * self._slots
+        self._bytes = [0] * self._slots
+
+    def add(self, size, now) -> None:
+        """
+        Counts one packet.
+
+        Args:
+            size (int): The packet length in bytes.
+            now (float): The current time in seconds.
+
+        Returns:
+            None
+        """
+        second = int(now)
+        slot = second % self._slots
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._packets[slot] = 0
+            self._bytes[slot] = 0
+        self._packets[slot] += 1
+        self._bytes[slot] += size
+
+    def rates(self, now) -> dict:
+        """
+        Computes the packet and bit rates over each window.
+
+        Each window covers the last `n` complete seconds, so a partially
+        elapsed current second does not understate the rate.
+
+        Args:
+            now (float): The current time in seconds.
+
+        Returns:
+            dict: A dictionary keyed by window length, each containing
+                `pps` (packets per second) and `bps` (bits per second).
+        """
+        current = int(now)
+        result = {}
+        for window in self.windows:
+            packets = size = 0
+            for second in range(current - window, current):
+                slot = second % self._slots
+                if self._seconds[slot] == second:
+                    packets += self._packets[slot]
+                    size += self._bytes[slot]
+            result[window] = {'pps': packets / window, 'bps': size * 8 / window}
+        return result
+
+
+class CaptureStatistics:
+    """
+    Collects the runtime metrics of a packet capture.
+
+    The `CaptureStatistics` class records packet and byte counts with
+    sliding-window rates, a histogram of the per-packet callback latency, and
+    histograms of the time spent in each processing stage ("filter", "decode",
+    and "track" by convention). Every recording method is a handful of integer
+    operations, so statistics can stay enabled in production.
+
+    Attributes:
+        packets (int): The number of packets recorded.
+        bytes (int): The number of bytes recorded.
+        callback_latency (LatencyHistogram): Time spent in the packet callback.
+        stages (dict): A `LatencyHistogram` per processing stage.
+
+    Methods:
+        record_packet(size, now=None):
+            Counts a captured packet.
+
+        record_callback(seconds):
+            Records the duration of one callback invocation.
+
+        record_stage(stage, seconds):
+            Records time spent in a processing stage.
+
+        time_stage(stage):
+            Context manager timing a processing stage.
+
+        snapshot(now=None) -> dict:
+            Returns all metrics as a dictionary.
+    """
+    def __init__(self, windows=RATE_WINDOWS) -> None:
+        """
+        Initializes the CaptureStatistics.
+
+        Args:
+            windows (tuple of int, optional): Rate window lengths in seconds. Default is (1, 10, 60).
+        """
+        self.packets = 0
+        self.bytes = 0
+        self.callback_latency = LatencyHistogram()
+        self.stages = {stage: LatencyHistogram() for stage in PIPELINE_STAGES}
+        self._rates = RateCounter(windows)
+        self._lock = threading.Lock()
+
+    def record_packet(self, size, now=None) -> None:
+        """
+        Counts a captured packet.
+
+        Args:
+            size (int): The packet length in bytes.
+            now (float, optional): The capture time. Defaults to now.
+
+        Returns:
+            None
+        """
+        self.packets += 1
+        self.bytes += size
+        self._rates.add(size, time.time() if now is None else now)
+
+    def record_callback(self, seconds) -> None:
+        """
+        Records the duration of one packet callback invocation.
+
+        Safe to call from several pipeline workers at once.
+
+        Args:
+            seconds (float): The callback duration.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.callback_latency.record(seconds)
+
+    def record_stage(self, stage, seconds) -> None:
+        """
+        Records time spent in a processing stage.
+
+        Args:
+            stage (str): The stage name, e.g. "decode". Unknown names create a new histogram.
+            seconds (float): The time spent.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def time_stage(self, stage):
+        """
+        Times the enclosed block as a processing stage.
+
+        Args:
+            stage (str): The stage name.
+
+        Yields:
+            None
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started)
+
+    def snapshot(self, now=None) -> dict:
+        """
+        Collects the current metrics.
+
+        Args:
+            now (float, optional): The reference time for the rate windows. Defaults to now.
+
+        Returns:
+            dict: A dictionary containing:
+                - packets (int): Packets recorded.
+                - bytes (int): Bytes recorded.
+                - rates (dict): `pps` and `bps` per window length in seconds.
+                - callback_latency (dict): The callback latency summary.
+                - stages (dict): A latency summary per processing stage.
+        """
+        with self._lock:
+            callback = self.callback_latency.summary()
+            stages = {stage: histogram.summary() for stage, histogram in self.stages.items()}
+        return {
+            'packets': self.packets,
+            'bytes': self.bytes,
+            'rates': self._rates.rates(time.time() if now is None else now),
+            'callback_latency': callback,
+            'stages': stages,
+        }
+
+
+def format_statistics(statistics) -> str:
+    """
+    Formats a statistics dictionary from `PacketCapture.get_statistics` as one log line.
+
+    Args:
+        statistics (dict): The statistics to format.
+
+    Returns:
+        str: A compact, human-readable summary.
+    """
+    parts = [f"packets={statistics['packets']}"]
+    for window, rate in statistics['rates'].items():
+        parts.append(f"{window}s={rate['pps']:.0f}pps/{rate['bps'] / 1e6:.2f}Mbps")
+    kernel = statistics.get('kernel')
+    if kernel:
+        parts.append(f"kernel_received={kernel['packets']} kernel_dropped={kernel['drops']}")
+    if statistics.get('queue_depth') or statistics.get('dropped'):
+        parts.append(f"queue={statistics['queue_depth']} queue_dropped={statistics['dropped']}")
+    sampling = statistics.get('sampling')
+    if sampling:
+        parts.append(f"sampling=1/{sampling['rate']}({sampling['mode']}) sampled={sampling['sampled']}")
+    if statistics.get('paused') or statistics.get('missed'):
+        parts.append(f"paused={'yes' if statistics.get('paused') else 'no'} missed={statistics.get('missed', 0)}")
+    latency = statistics['callback_latency']
+    if latency['count']:
+        parts.append(f"callback_p50={latency['p50'] * 1e6:.0f}us "
+                     f"p99={latency['p99'] * 1e6:.0f}us max={latency['max'] * 1e6:.0f}us")
+    for stage, summary in statistics['stages'].items():
+        if summary['count']:
+            parts.append(f"{stage}_avg={summary['average'] * 1e6:.1f}us")
+    return " ".join(parts)
+
+
+class StatisticsReporter:
+    """
+    Periodically reports the statistics of a running capture.
+
+    The `StatisticsReporter` class runs a daemon thread that calls
+    `capture.get_statistics()` every `interval` seconds and hands the result to
+    a report function. By default each report is logged as a single line at
+    INFO level.
+
+    Attributes:
+        capture (PacketCapture): The capture to report on.
+        interval (float): Seconds between reports.
+        report (callable): Invoked with each statistics dictionary.
+
+    Methods:
+        start():
+            Starts the reporting thread.
+
+        stop():
+            Stops the reporting thread.
+    """
+    def __init__(self, capture, interval=10.0, report=None) -> None:
+        """
+        Initializes the StatisticsReporter.
+
+        Args:
+            capture (PacketCapture): The capture to report on.
+            interval (float, optional): Seconds between reports. Default is 10.
+            report (callable, optional): Invoked with each statistics dictionary.
+                Defaults to logging a formatted summary.
+
+        Raises:
+            ValueError: If the interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError("Reporting interval must be positive.")
+        self.capture = capture
+        self.interval = interval
+        self.report = report or self._log
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starts the reporting thread.
+
+        Raises:
+            ValueError: If the reporter is already running.
+        """
+        if self._thread is not None:
+            raise ValueError("Reporter is already running")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="capture-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the reporting thread.
+
+        Returns:
+            None
+        """
+        if self._thread is None:
+            return None
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        """
+        Main loop of the reporting thread.
+
+        Returns:
+            None
+        """
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.report(self.capture.get_statistics())
+            except Exception:
+                logger.exception("Failed to report capture statistics")
+
+    @staticmethod
+    def _log(statistics) -> None:
+        """
+        Logs a statistics dictionary as one line.
+
+        Returns:
+            None
+        """
+        logger.info(format_statistics(statistics))
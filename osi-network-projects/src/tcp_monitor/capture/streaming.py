@@ -0,0 +1,224 @@
+import asyncio
+import threading
+
+from tcp_monitor.capture.frame import detach_frame
+
+# Queued after the last packet; an exception instance is queued instead if the source failed
+_END_OF_STREAM = object()
+
+
+class PacketStream:
+    """
+    An asynchronous iterator over the packets of a live or offline capture.
+
+    The `PacketStream` class bridges a capture thread into an asyncio event loop.
+    The capture thread (the sniffer for a live interface, a reader thread for a
+    pcap file) hands each packet to `put`, which schedules it onto a bounded
+    `asyncio.Queue` with `call_soon_threadsafe`. A semaphore counting the free
+    queue slots provides backpressure: when the consumer falls behind, the
+    capture thread blocks until a slot is freed instead of buffering without
+    limit. On a live interface the kernel then drops packets, which shows in the
+    capture's kernel statistics.
+
+    Streams are created with `PacketCapture.stream()` and start their source on
+    the first iteration. Leaving an `async with` block, calling `aclose()`, or
+    reaching the duration or count limit stops the source.
+
+    Attributes:
+        capture (PacketCapture): The capture delivering the packets.
+        file_path (str): The pcap file to read, or None for the capture's live interface.
+        duration (float): Seconds after which the stream ends, or None for no limit.
+        count (int): Packets after which the stream ends; 0 means no limit.
+        max_queue (int): The capacity of the queue between the capture thread and the loop.
+        packets_yielded (int): Packets returned to the consumer so far.
+
+    Methods:
+        put(packet) -> bool:
+            Called from the capture thread to queue a packet, blocking while the queue is full.
+
+        aclose():
+            Stops the source and ends the stream.
+    """
+    def __init__(self, capture, file_path=None, duration=None, count=0, max_queue=1000) -> None:
+        """
+        Initializes the PacketStream.
+
+        Args:
+            capture (PacketCapture): The capture delivering the packets.
+            file_path (str, optional): A pcap or pcapng file to read instead of the live interface.
+            duration (float, optional): Seconds after which the stream ends. Default is None (no limit).
+            count (int, optional): Packets after which the stream ends. Default is 0 (no limit).
+            max_queue (int, optional): The queue capacity. Default is 1000.
+
+        Raises:
+            ValueError: If the queue capacity is not positive.
+        """
+        if max_queue <= 0:
+            raise ValueError("Stream queue size must be positive.")
+        self.capture = capture
+        self.file_path = file_path
+        self.duration = duration
+        self.count = count
+        self.max_queue = max_queue
+        self.packets_yielded = 0
+
+        self._loop = None
+        self._queue = None
+        self._slots = threading.Semaphore(max_queue)
+        self._closed = threading.Event()
+        self._reader = None
+        self._deadline = None
+        self._started = False
+        self._finished = False
+
+    def __aiter__(self):
+        """Returns the stream itself."""
+        return self
+
+    async def __aenter__(self):
+        """Returns the stream; the source starts on the first iteration."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        """Stops the source when leaving the `async with` block."""
+        await self.aclose()
+
+    async def __anext__(self):
+        """
+        Waits for the next packet.
+
+        Returns:
+            scapy.packet.Packet or RawFrame: The next captured packet. Frames are
+            copied out of capture buffers, so they remain valid after the next packet.
+
+        Raises:
+            StopAsyncIteration: Once the source is exhausted, a limit is reached, or the stream is closed.
+            ValueError: If the source could not be started or failed while reading.
+        """
+        if self._finished:
+            raise StopAsyncIteration
+        if not self._started:
+            await self._start()
+        if self.count and self.packets_yielded >= self.count:
+            await self.aclose()
+            raise StopAsyncIteration
+
+        try:
+            if self._deadline is None:
+                item = await self._queue.get()
+            else:
+                timeout = self._deadline - self._loop.time()
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            await self.aclose()
+            raise StopAsyncIteration
+        self._slots.release()
+
+        if item is _END_OF_STREAM:
+            await self.aclose()
+            raise StopAsyncIteration
+        if isinstance(item, BaseException):
+            await self.aclose()
+            raise item
+        self.packets_yielded += 1
+        return item
+
+    def put(self, packet) -> bool:
+        """
+        Queues a packet for the event loop. Called from the capture thread.
+
+        Blocks while the queue is full, so a slow consumer slows the capture
+        thread down instead of growing memory.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+        Returns:
+            bool: True if the packet was queued, False if the stream is closed.
+        """
+        return self._enqueue(detach_frame(packet))
+
+    def _enqueue(self, item) -> bool:
+        """
+        Waits for a free queue slot and schedules the item onto the event loop.
+
+        Returns:
+            bool: True if the item was queued, False if the stream is closed.
+        """
+        while not self._slots.acquire(timeout=0.1):
+            if self._closed.is_set():
+                return False
+        if self._closed.is_set():
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop was closed without closing the stream
+            self._closed.set()
+            return False
+        return True
+
+    async def _start(self) -> None:
+        """
+        Starts the capture thread feeding the stream.
+
+        Raises:
+            ValueError: If the capture is already running or has another stream attached.
+        """
+        self._started = True
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self.duration is not None:
+            self._deadline = self._loop.time() + self.duration
+
+        try:
+            self.capture._attach_stream(self)
+            if self.file_path is None:
+                await self._loop.run_in_executor(None, lambda: self.capture.start_capture(
+                    duration=self.duration, count=0))
+            else:
+                self._reader = threading.Thread(target=self._read_file, name="packet-stream-reader",
+                                                daemon=True)
+                self._reader.start()
+        except Exception:
+            self._finished = True
+            self.capture._detach_stream(self)
+            raise
+
+    def _read_file(self) -> None:
+        """
+        Runs in the reader thread: processes the pcap file, then ends the stream.
+
+        Returns:
+            None
+        """
+        try:
+            self.capture.read_file(self.file_path)
+            self._enqueue(_END_OF_STREAM)
+        except Exception as error:
+            self._enqueue(error)
+
+    async def aclose(self) -> None:
+        """
+        Stops the source and ends the stream.
+
+        Queued packets are discarded. Calling this more than once has no effect.
+
+        Returns:
+            None
+        """
+        if self._finished:
+            return None
+        self._finished = True
+        if not self._started:
+            return None
+
+        # Unblock a capture thread waiting for a queue slot
+        self._closed.set()
+        self._slots.release()
+        await self._loop.run_in_executor(None, self.capture.stop_capture)
+        if self._reader is not None:
+            await self._loop.run_in_executor(None, self._reader.join)
+        self.capture._detach_stream(self)
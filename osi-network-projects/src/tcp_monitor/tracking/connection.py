@@ -32,6 +32,8 @@ class TCPConnection:
         self.packets_received = 0
         self.payload_bytes_sent = 0
         self.payload_bytes_received = 0
+        # Highest sampling rate applied to the counters; above 1 they are estimates
+        self.sampling_rate = 1
 
         # Initialize timing information
         self.start_time = time()
@@ -148,7 +150,7 @@ class TCPConnection:
             if flags.get("ack") and not flags.get("fin") and not flags.get("syn") and not is_source:
                 self.state = "TIME_WAIT"
                 
-    def update_statistics(self, packet_size=0, payload_size=0, is_source=True) -> None:
+    def update_statistics(self, packet_size=0, payload_size=0, is_source=True, sampling_rate=1) -> None:
 
         """
         Update the statistics of the TCP connection.
@@ -166,18 +168,23 @@ class TCPConnection:
             payload_size (int): The amount of actual application data in the packet.
             is_source (bool): Indicates whether the statistics update is for the source side
                               of the connection (True) or the destination side (False).
+            sampling_rate (int): The number of packets this packet stands for when only
+                                 1 in N packets is observed. The counters are scaled by
+                                 it, so they estimate the unsampled traffic. Default is 1.
         
         Returns:
             None
         """
+        if sampling_rate > self.sampling_rate:
+            self.sampling_rate = sampling_rate
         if is_source:
-            self.bytes_sent += packet_size
-            self.payload_bytes_sent += payload_size
-            self.packets_sent += 1
+            self.bytes_sent += packet_size * sampling_rate
+            self.payload_bytes_sent += payload_size * sampling_rate
+            self.packets_sent += sampling_rate
         else:
-            self.bytes_received += packet_size
-            self.payload_bytes_received += payload_size
-            self.packets_received += 1
+            self.bytes_received += packet_size * sampling_rate
+            self.payload_bytes_received += payload_size * sampling_rate
+            self.packets_received += sampling_rate
             
     def update_sequence_numbers(self, seq_num=0, ack_num=0, payload_size=0, is_source=True):
         
@@ -300,7 +307,8 @@ class TCPConnection:
             dict: A dictionary containing TCP connection details with keys like
                   'src_ip', 'dst_ip', 'src_port', 'dst_port', 'state', 
                   'bytes_sent', 'bytes_received', 'packets_sent', 
-                  'packets_received', 'duration', and 'idle_time'.
+                  'packets_received', 'duration', and 'idle_time'. 'sampling_rate'
+                  tells whether the counters are estimates (above 1).
         """
         return {
             'src_ip': self.src_ip,
@@ -313,7 +321,8 @@ class TCPConnection:
             'packets_sent': self.packets_sent,
             'packets_received': self.packets_received,
             'duration': self.get_duration(),
-            'idle_time': self.get_idle_time()
+            'idle_time': self.get_idle_time(),
+            'sampling_rate': self.sampling_rate
         }
 
     def get_service(self) -> str:
@@ -0,0 +1,445 @@
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from tcp_monitor.capture.frame import flow_hash
+from tcp_monitor.capture.pcap_writer import packet_record
+from tcp_monitor.tracking.tracker import ConnectionTracker
+
+# Ring header: producer position, then consumer position on its own cache line
+RING_HEAD_OFFSET = 0
+RING_TAIL_OFFSET = 64
+RING_DATA_OFFSET = 128
+RING_POSITION = struct.Struct('<Q')
+# Record header: captured length, wire length, timestamp
+RING_RECORD_HEADER = struct.Struct('<IId')
+RING_WRAP_MARKER = 0xFFFFFFFF
+RING_ALIGNMENT = 8
+
+# Seconds `ShardedConnectionTracker.stop` waits for a result before checking
+# that the analyzer processes are still alive
+SHARD_RESULT_POLL_INTERVAL = 0.5
+# Seconds `ShardedConnectionTracker.stop` waits for a process to exit once its result arrived
+SHARD_JOIN_TIMEOUT = 5.0
+
+
+class SharedFrameRing:
+    """
+    A single-producer, single-consumer ring of frames in shared memory.
+
+    The `SharedFrameRing` class moves raw frames from the capture process to an
+    analyzer process without pickling or pipes. Records are written contiguously
+    into a `multiprocessing.shared_memory` block: the producer advances the head
+    position after writing a record and the consumer advances the tail position
+    after reading one, so no lock is needed as long as exactly one process writes
+    and one process reads. A record that does not fit before the end of the
+    buffer is preceded by a wrap marker and written at the start.
+
+    Attributes:
+        name (str): The name of the shared memory block, used to attach from another process.
+        capacity (int): The size in bytes of the record area.
+
+    Methods:
+        create(capacity) -> SharedFrameRing:
+            Allocates a new ring.
+
+        attach(name) -> SharedFrameRing:
+            Attaches to an existing ring by name.
+
+        put(timestamp, data, wire_length=None) -> bool:
+            Appends a frame, returning False if the ring is full.
+
+        get() -> tuple:
+            Removes and returns the oldest frame, or None if the ring is empty.
+
+        close():
+            Detaches from the shared memory block.
+
+        unlink():
+            Frees the shared memory block (creator only).
+    """
+    def __init__(self, memory, capacity) -> None:
+        """
+        Initializes the SharedFrameRing over an existing shared memory block.
+
+        Use `create` or `attach` instead of calling this directly.
+
+        Args:
+            memory (shared_memory.SharedMemory): The shared memory block.
+            capacity (int): The size in bytes of the record area.
+        """
+        self._memory = memory
+        self._buffer = memory.buf
+        self.name = memory.name
+        self.capacity = capacity
+
+    @classmethod
+    def create(cls, capacity):
+        """
+        Allocates a new, empty ring.
+
+        Args:
+            capacity (int): The size in bytes of the record area; rounded up to a multiple of 8.
+
+        Returns:
+            SharedFrameRing: The new ring.
+
+        Raises:
+            ValueError: If the capacity cannot hold at least one record header.
+        """
+        capacity = (capacity + RING_ALIGNMENT - 1) // RING_ALIGNMENT * RING_ALIGNMENT
+        if capacity <= RING_RECORD_HEADER.size:
+            raise ValueError("Ring capacity is too small.")
+        memory = shared_memory.SharedMemory(create=True, size=RING_DATA_OFFSET + capacity)
+        memory.buf[:RING_DATA_OFFSET] = bytes(RING_DATA_OFFSET)
+        return cls(memory, capacity)
+
+    @classmethod
+    def attach(cls, name, capacity):
+        """
+        Attaches to a ring created by another process.
+
+        Args:
+            name (str): The ring's shared memory name.
+            capacity (int): The ring's capacity, as reported by the creator.
+
+        Returns:
+            SharedFrameRing: The attached ring.
+        """
+        return cls(shared_memory.SharedMemory(name=name), capacity)
+
+    def __len__(self) -> int:
+        """Returns the number of bytes currently used by queued records."""
+        return self._head() - self._tail()
+
+    def _head(self) -> int:
+        """Reads the producer position."""
+        return RING_POSITION.unpack_from(self._buffer, RING_HEAD_OFFSET)[0]
+
+    def _tail(self) -> int:
+        """Reads the consumer position."""
+        return RING_POSITION.unpack_from(self._buffer, RING_TAIL_OFFSET)[0]
+
+    def put(self, timestamp, data, wire_length=None) -> bool:
+        """
+        Appends a frame to the ring.
+
+        Must only be called from the single producer process.
+
+        Args:
+            timestamp (float): The frame's capture time.
+            data (bytes): The raw frame.
+            wire_length (int, optional): The frame's original length if `data` was
+                truncated. Defaults to the length of `data`.
+
+        Returns:
+            bool: True if the frame was written, False if there was not enough free space.
+        """
+        length = len(data)
+        record_size = (RING_RECORD_HEADER.size + length + RING_ALIGNMENT - 1) \
+            // RING_ALIGNMENT * RING_ALIGNMENT
+        head = self._head()
+        position = head % self.capacity
+        padding = self.capacity - position if position + record_size > self.capacity else 0
+
+        if record_size + padding > self.capacity - (head - self._tail()):
+            return False
+
+        buffer = self._buffer
+        if padding:
+            struct.pack_into('<I', buffer, RING_DATA_OFFSET + position, RING_WRAP_MARKER)
+            position = 0
+        start = RING_DATA_OFFSET + position
+        RING_RECORD_HEADER.pack_into(buffer, start, length,
+                                     length if wire_length is None else wire_length, timestamp)
+        start += RING_RECORD_HEADER.size
+        buffer[start:start + length] = data
+        # Publish the record only once it is fully written
+        RING_POSITION.pack_into(buffer, RING_HEAD_OFFSET, head + padding + record_size)
+        return True
+
+    def get(self) -> tuple:
+        """
+        Removes the oldest frame from the ring.
+
+        Must only be called from the single consumer process.
+
+        Returns:
+            tuple: `(timestamp, data, wire_length)` with `data` copied out of the
+            ring, or None if the ring is empty.
+        """
+        tail = self._tail()
+        head = self._head()
+        if tail == head:
+            return None
+
+        buffer = self._buffer
+        position = tail % self.capacity
+        length = struct.unpack_from('<I', buffer, RING_DATA_OFFSET + position)[0]
+        if length == RING_WRAP_MARKER:
+            tail += self.capacity - position
+            position = 0
+        start = RING_DATA_OFFSET + position
+        length, wire_length, timestamp = RING_RECORD_HEADER.unpack_from(buffer, start)
+        start += RING_RECORD_HEADER.size
+        data = bytes(buffer[start:start + length])
+
+        record_size = (RING_RECORD_HEADER.size + length + RING_ALIGNMENT - 1) \
+            // RING_ALIGNMENT * RING_ALIGNMENT
+        RING_POSITION.pack_into(buffer, RING_TAIL_OFFSET, tail + record_size)
+        return timestamp, data, wire_length
+
+    def close(self) -> None:
+        """
+        Detaches this process from the shared memory block.
+
+        Returns:
+            None
+        """
+        self._buffer = None
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory block. Only the creating process should call this.
+
+        Returns:
+            None
+        """
+        self._memory.unlink()
+
+
+def _shard_worker(shard_index, ring_name, capacity, stop_event, results) -> None:
+    """
+    Entry point of an analyzer process.
+
+    Consumes frames from the shard's ring into a `ConnectionTracker` until the
+    stop event is set and the ring is drained, then sends the shard's connections
+    back to the parent. Frames whose tracking raises are counted and skipped, and
+    the result is sent even if the loop itself fails, so the parent never waits
+    for a shard that will not answer.
+
+    Args:
+        shard_index (int): The index of this shard.
+        ring_name (str): The shared memory name of the shard's ring.
+        capacity (int): The ring's capacity.
+        stop_event (multiprocessing.Event): Set by the parent to request shutdown.
+        results (multiprocessing.Queue): Queue receiving `(shard_index, tracker, errors)`.
+
+    Returns:
+        None
+    """
+    tracker = ConnectionTracker()
+    errors = 0
+    idle_sleep = 0.0001
+    ring = None
+    try:
+        ring = SharedFrameRing.attach(ring_name, capacity)
+        while True:
+            record = ring.get()
+            if record is None:
+                # The stop event is only set once the producer has stopped, so an
+                # empty ring observed after it is set stays empty
+                if stop_event.is_set():
+                    record = ring.get()
+                    if record is None:
+                        break
+                else:
+                    time.sleep(idle_sleep)
+                    idle_sleep = min(idle_sleep * 2, 0.01)
+                    continue
+            idle_sleep = 0.0001
+            timestamp, data, wire_length = record
+            try:
+                tracker.process_frame(data, timestamp, wire_length)
+            except Exception:
+                errors += 1
+    finally:
+        if ring is not None:
+            ring.close()
+        results.put((shard_index, tracker, errors))
+
+
+class ShardedConnectionTracker:
+    """
+    Spreads TCP connection tracking across several analyzer processes.
+
+    The `ShardedConnectionTracker` class works around the GIL by running one
+    `ConnectionTracker` per process. The capture process only computes a symmetric
+    5-tuple hash of each frame (`flow_hash`), so both directions of a connection
+    reach the same shard, and copies the raw frame into that shard's
+    `SharedFrameRing`. Each analyzer process owns the `TCPConnection` objects of
+    its shard; when tracking stops, the shards are merged into a global view.
+
+    `dispatch` can be used directly as a `PacketCapture.packet_callback`, also
+    with a multi-worker pipeline: each ring has a single producer, so writes
+    are serialised by a lock.
+
+    Attributes:
+        shards (int): The number of analyzer processes.
+        ring_size (int): The capacity in bytes of each shard's ring.
+        connections (dict): The merged connections of all shards, available after `stop`.
+
+    Methods:
+        start():
+            Creates the rings and starts the analyzer processes.
+
+        dispatch(packet) -> bool:
+            Routes a captured packet to its shard.
+
+        stop() -> dict:
+            Drains the rings, stops the processes, and merges their connections.
+    """
+    def __init__(self, shards=None, ring_size=1 << 24) -> None:
+        """
+        Initializes the ShardedConnectionTracker.
+
+        Args:
+            shards (int, optional): The number of analyzer processes. Defaults to the CPU count.
+            ring_size (int, optional): The capacity in bytes of each ring. Default is 16 MiB.
+
+        Raises:
+            ValueError: If the shard count is not positive.
+        """
+        shards = shards or multiprocessing.cpu_count()
+        if shards <= 0:
+            raise ValueError("Shard count must be positive.")
+        self.shards = shards
+        self.ring_size = ring_size
+        self.connections = {}
+
+        self._rings = []
+        self._processes = []
+        self._stop_event = None
+        self._results = None
+        self._dispatched = [0] * shards
+        self._dropped = [0] * shards
+        self._shard_packets = [0] * shards
+        self._shard_errors = [0] * shards
+        self._shard_failed = [False] * shards
+        self._dispatch_lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Indicates whether the analyzer processes are running.
+
+        Returns:
+            bool: True between `start` and `stop`.
+        """
+        return bool(self._processes)
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Summarises the work done per shard.
+
+        Returns:
+            dict: A dictionary containing per-shard lists:
+                - dispatched (list of int): Frames written to each shard's ring.
+                - dropped (list of int): Frames dropped because a ring was full.
+                - processed (list of int): Frames processed by each shard (after `stop`).
+                - errors (list of int): Frames whose tracking raised an exception (after `stop`).
+                - failed (list of bool): Shards whose process exited without sending its
+                  connections (after `stop`).
+        """
+        return {'dispatched': list(self._dispatched),
+                'dropped': list(self._dropped),
+                'processed': list(self._shard_packets),
+                'errors': list(self._shard_errors),
+                'failed': list(self._shard_failed)}
+
+    def start(self) -> None:
+        """
+        Creates one ring per shard and starts the analyzer processes.
+
+        Raises:
+            ValueError: If tracking is already running.
+        """
+        if self._processes:
+            raise ValueError("Sharded tracking is already running")
+
+        self._stop_event = multiprocessing.Event()
+        self._results = multiprocessing.Queue()
+        self._rings = [SharedFrameRing.create(self.ring_size) for _ in range(self.shards)]
+        for index, ring in enumerate(self._rings):
+            process = multiprocessing.Process(target=_shard_worker,
+                                              args=(index, ring.name, ring.capacity,
+                                                    self._stop_event, self._results),
+                                              name=f"tcp-shard-{index}", daemon=True)
+            process.start()
+            self._processes.append(process)
+
+    def dispatch(self, packet) -> bool:
+        """
+        Routes a captured packet to the shard owning its flow.
+
+        Safe to call from several threads at once.
+
+        Args:
+            packet (scapy.packet.Packet or RawFrame): The captured packet.
+
+        Returns:
+            bool: True if the frame was queued, False if the shard's ring was full.
+        """
+        timestamp, data, wire_length = packet_record(packet)
+        shard = flow_hash(data) % self.shards
+        with self._dispatch_lock:
+            if self._rings[shard].put(timestamp, data, wire_length):
+                self._dispatched[shard] += 1
+                return True
+            self._dropped[shard] += 1
+            return False
+
+    def stop(self) -> dict:
+        """
+        Stops the analyzer processes once their rings are drained and merges their results.
+
+        Since both directions of a flow always land on the same shard, the shards'
+        connection tables are disjoint and merging is a union.
+
+        A shard whose process died without sending its connections (e.g. it was
+        killed) is marked as failed in `statistics` and its connections are lost;
+        `stop` does not wait for it.
+
+        Returns:
+            dict: The merged connections, keyed by connection key.
+        """
+        if not self._processes:
+            return self.connections
+
+        self._stop_event.set()
+        merged = {}
+        pending = set(range(len(self._processes)))
+        dead = set()
+        while pending:
+            try:
+                shard_index, tracker, errors = self._results.get(timeout=SHARD_RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                # A process that was already dead at the previous poll had a full
+                # interval to deliver a result it sent before exiting
+                for shard_index in dead & pending:
+                    self._shard_failed[shard_index] = True
+                pending -= dead
+                dead = {index for index in pending if not self._processes[index].is_alive()}
+                continue
+            pending.discard(shard_index)
+            self._shard_packets[shard_index] = tracker.packets_processed
+            self._shard_errors[shard_index] = errors
+            merged.update(tracker.connections)
+        for process in self._processes:
+            process.join(SHARD_JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for ring in self._rings:
+            ring.close()
+            ring.unlink()
+
+        self._processes = []
+        self._rings = []
+        self.connections = merged
+        return merged
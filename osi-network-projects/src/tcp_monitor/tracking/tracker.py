@@ -0,0 +1,204 @@
+from time import perf_counter, time
+
+from tcp_monitor.analyzers.decoded_packet import DecodedPacket
+from tcp_monitor.tracking.connection import TCPConnection
+
+
+class ConnectionTracker:
+    """
+    Tracks TCP connections from raw Ethernet frames.
+
+    The `ConnectionTracker` class ties the analyzers and `TCPConnection` together:
+    each frame is decoded through the Ethernet, IP and TCP layers, matched to an
+    existing connection in either direction (or a new connection is created), and
+    the connection's state machine, statistics and sequence numbers are updated.
+
+    Attributes:
+        connections (dict): The tracked connections, keyed by `get_connection_key()`
+            of the side that sent the first packet seen.
+        packets_processed (int): The number of frames passed to `process_frame`.
+        packets_ignored (int): Frames that were not valid TCP segments.
+        statistics (CaptureStatistics): Optional collector receiving the time spent
+            in the "decode" (`DecodedPacket`) and "track" (connection update) stages.
+        sampler (PacketSampler): Optional sampler feeding the tracker; in "packet"
+            mode the counters of frames passed without a weight are scaled by its current rate.
+        reassembler (FragmentReassembler): Optional reassembler for fragmented IPv4 and IPv6 segments.
+
+    Methods:
+        process_frame(frame, timestamp=None, wire_length=None, weight=None) -> TCPConnection:
+            Decodes a frame and updates the matching connection.
+
+        get_connection(src_ip, src_port, dst_ip, dst_port) -> TCPConnection:
+            Looks up a connection in either direction.
+
+        get_active_connections() -> list:
+            Returns the connections that are not closed.
+    """
+    def __init__(self, statistics=None, sampler=None, reassembler=None) -> None:
+        """
+        Initializes an empty ConnectionTracker.
+
+        Args:
+            statistics (CaptureStatistics, optional): Collector for stage timings,
+                e.g. `PacketCapture.statistics`. Default is None (no timing).
+            sampler (PacketSampler, optional): The sampler selecting the frames passed
+                to the tracker, e.g. `PacketCapture.sampler`. Default is None (every frame).
+            reassembler (FragmentReassembler, optional): Reassembles fragmented TCP segments
+                before tracking them. Default is None (fragments are ignored).
+        """
+        self.connections = {}
+        self.packets_processed = 0
+        self.packets_ignored = 0
+        self.statistics = statistics
+        self.sampler = sampler
+        self.reassembler = reassembler
+
+    def process_frame(self, frame, timestamp=None, wire_length=None, weight=None) -> TCPConnection:
+        """
+        Decodes an Ethernet frame and updates the matching TCP connection.
+
+        Frames that are not TCP over IPv4 or IPv6 (including 802.1Q tagged frames)
+        or that fail to decode are counted in `packets_ignored`. So are IP
+        fragments, unless a reassembler is set: the fragment completing a
+        segment is then tracked as one frame holding the whole segment.
+
+        Frames captured with a snap length only hold their headers; the bytes cut
+        off are TCP payload, so they are added back to the payload size and the
+        connection's byte counts reflect the traffic on the wire. Likewise, each
+        sampled frame's counts are multiplied by its weight, the number of packets
+        it stood for when the sampler kept it.
+
+        Args:
+            frame (bytes): The raw Ethernet frame.
+            timestamp (float, optional): The capture time of the frame. Defaults to now.
+            wire_length (int, optional): The frame's original length if it was truncated.
+                Defaults to the length of `frame`.
+            weight (int, optional): The number of captured packets the frame stands for,
+                e.g. `frame_weight(packet)` for packets kept by `PacketCapture` sampling.
+                Defaults to the sampler's current packet weight, or 1 without a sampler.
+
+        Returns:
+            TCPConnection: The updated connection, or None if the frame was ignored.
+        """
+        self.packets_processed += 1
+        if timestamp is None:
+            timestamp = time()
+
+        if self.statistics is None:
+            packet = self._decode(frame, timestamp, wire_length)
+            return self._track(packet, timestamp, wire_length, weight) if packet else None
+
+        started = perf_counter()
+        packet = self._decode(frame, timestamp, wire_length)
+        finished = perf_counter()
+        self.statistics.record_stage('decode', finished - started)
+        if packet is None:
+            return None
+        connection = self._track(packet, timestamp, wire_length, weight)
+        self.statistics.record_stage('track', perf_counter() - finished)
+        return connection
+
+    def _decode(self, frame, timestamp, wire_length) -> DecodedPacket:
+        """
+        Wraps a frame in a lazily decoded packet and checks that it is a TCP segment.
+
+        Only the fields the tracker reads are decoded; MAC addresses, IP options
+        and the other per-layer fields are never built. IPv4 and IPv6 fragments
+        of TCP segments go to the reassembler, if any, and the frame completing a
+        segment is replaced by one holding the reassembled packet. Fragments
+        cut by the snap length cannot be reassembled.
+
+        Returns:
+            DecodedPacket: The packet, or None if the frame is not a valid TCP segment.
+        """
+        packet = DecodedPacket(frame)
+        if packet.is_tcp:
+            return packet
+        if (self.reassembler is not None and packet.protocol == 6
+                and (packet.is_fragment or packet.fragment_offset)
+                and (wire_length is None or wire_length <= len(frame))):
+            ip_packet = self.reassembler.reassemble(packet.frame[packet.ip_offset:], timestamp)
+            if ip_packet is not None:
+                packet = DecodedPacket(bytes(packet.frame[:packet.ip_offset]) + ip_packet)
+                if packet.is_tcp:
+                    return packet
+        self.packets_ignored += 1
+        return None
+
+    def _track(self, packet, timestamp, wire_length, weight=None) -> TCPConnection:
+        """
+        Updates the connection a decoded segment belongs to.
+
+        Returns:
+            TCPConnection: The updated connection.
+        """
+        connection, is_source = self._lookup(packet.src_ip, packet.src_port,
+                                             packet.dst_ip, packet.dst_port, timestamp)
+        packet_size = len(packet.frame)
+        payload_size = packet.payload_size
+        if wire_length and wire_length > packet_size:
+            payload_size += wire_length - packet_size
+            packet_size = wire_length
+        if weight is None:
+            weight = self.sampler.packet_weight if self.sampler else 1
+        connection.update_state(packet.flags, is_source=is_source)
+        connection.update_statistics(packet_size, payload_size, is_source=is_source,
+                                     sampling_rate=weight)
+        connection.update_sequence_numbers(packet.seq_num, packet.ack_num,
+                                           payload_size, is_source=is_source)
+        connection.last_activity = timestamp
+        return connection
+
+    def get_connection(self, src_ip, src_port, dst_ip, dst_port) -> TCPConnection:
+        """
+        Looks up a tracked connection in either direction.
+
+        Args:
+            src_ip (str): The source IP address.
+            src_port (int): The source port.
+            dst_ip (str): The destination IP address.
+            dst_port (int): The destination port.
+
+        Returns:
+            TCPConnection: The connection, or None if it is not tracked.
+        """
+        return (self.connections.get(f"{src_ip}:{src_port}-{dst_ip}:{dst_port}")
+                or self.connections.get(f"{dst_ip}:{dst_port}-{src_ip}:{src_port}"))
+
+    def get_active_connections(self) -> list:
+        """
+        Lists the connections that are still active.
+
+        Returns:
+            list of TCPConnection: Connections not in the CLOSED or TIME_WAIT state.
+        """
+        return [connection for connection in self.connections.values() if connection.is_active()]
+
+    def _lookup(self, src_ip, src_port, dst_ip, dst_port, timestamp) -> tuple:
+        """
+        Finds the connection a packet belongs to, creating it if needed.
+
+        Args:
+            src_ip (str): The packet's source IP address.
+            src_port (int): The packet's source port.
+            dst_ip (str): The packet's destination IP address.
+            dst_port (int): The packet's destination port.
+            timestamp (float): The packet's capture time, used as a new connection's start time.
+
+        Returns:
+            tuple: `(connection, is_source)` where `is_source` tells whether the
+            packet travels in the connection's source-to-destination direction.
+        """
+        key = f"{src_ip}:{src_port}-{dst_ip}:{dst_port}"
+        connection = self.connections.get(key)
+        if connection is not None:
+            return connection, True
+
+        connection = self.connections.get(f"{dst_ip}:{dst_port}-{src_ip}:{src_port}")
+        if connection is not None:
+            return connection, False
+
+        connection = TCPConnection(src_ip, dst_ip, src_port, dst_port)
+        connection.start_time = timestamp
+        self.connections[key] = connection
+        return connection, True
@@ -0,0 +1,121 @@
+import struct
+import unittest
+from tcp_monitor.analyzers.batch_analyzer import NUMPY_AVAILABLE, BatchAnalyzer
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer, TCP_ACK, TCP_SYN
+from tcp_monitor.capture.frame import RawFrame
+from tests.tcp_monitor.helpers import ETHERNET, ipv4_frame, ipv6_frame, tcp_segment
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy is not installed")
+class TestBatchAnalyzer(unittest.TestCase):
+    """Test suite for the BatchAnalyzer class."""
+
+    def setUp(self):
+        """Build a mix of TCP, non-TCP and malformed frames."""
+        self.frames = [
+            ipv4_frame(tcp_segment(52800, 80, TCP_SYN, options=b"\x02\x04\x05\xb4")),
+            ipv4_frame(tcp_segment(80, 52800, TCP_SYN | TCP_ACK, b"hello"), "10.0.0.1", "192.168.1.1"),
+            ipv4_frame(tcp_segment(52801, 80)) + b"\x00" * 6,
+            ipv4_frame(tcp_segment(52800, 80, payload=b"x" * 9), vlan=0x2064),
+            ipv6_frame(tcp_segment(40000, 443, payload=b"ipv6")),
+            ipv4_frame(b"\x00" * 12, protocol=17),
+            ipv4_frame(b"y" * 24, flags=3),
+            ETHERNET + b"\x08\x06" + b"\x00" * 28,
+            ETHERNET[:10],
+        ]
+        buffer, offsets, lengths = BatchAnalyzer.pack_frames(self.frames)
+        self.decoded = BatchAnalyzer.analyze_batch(buffer, offsets, lengths)
+        self.buffer = buffer
+
+    def test_matches_per_packet_analyzers(self):
+        """Test that every TCP row matches the per-packet analyzers."""
+        for frame, row in zip(self.frames, self.decoded):
+            ethernet = EthernetAnalyzer.analyze_frame(frame)
+            if 'error' in ethernet:
+                self.assertEqual(row['ethertype'], 0)
+                continue
+            self.assertEqual(row['ethertype'], ethernet['ethertype'])
+            self.assertEqual(row['src_mac'], int(ethernet['src_mac'].replace(':', ''), 16))
+            if not row['is_tcp']:
+                continue
+
+            payload = ethernet['payload'][4:] if ethernet['is_vlan_tagged'] else ethernet['payload']
+            ip = IPAnalyzer.analyze_packet(payload)
+            tcp = TCPAnalyzer.analyze_segment(ip['payload'])
+            self.assertEqual(row['ip_version'], ip['version'])
+            self.assertEqual(BatchAnalyzer.format_address(row['src_ip']), ip['src_ip'])
+            self.assertEqual(BatchAnalyzer.format_address(row['dst_ip']), ip['dst_ip'])
+            for field in ('src_port', 'dst_port', 'seq_num', 'ack_num', 'window_size',
+                          'header_length', 'payload_size'):
+                self.assertEqual(row[field], tcp[field], field)
+            self.assertEqual(bool(row['tcp_flags'] & TCP_SYN), tcp['flags']['syn'])
+            self.assertEqual(bool(row['tcp_flags'] & TCP_ACK), tcp['flags']['ack'])
+            start = int(row['payload_offset'])
+            self.assertEqual(self.buffer[start:start + int(row['payload_size'])], bytes(tcp['payload']))
+
+    def test_non_tcp_rows(self):
+        """Test the rows of frames that are not complete TCP segments."""
+        self.assertEqual(list(self.decoded['is_tcp']), [True] * 5 + [False] * 4)
+        self.assertEqual(list(self.decoded['ip_version']), [4, 4, 4, 4, 6, 4, 4, 0, 0])
+        self.assertEqual(self.decoded['protocol'][5], 17)
+        self.assertTrue(self.decoded['is_fragment'][6])
+        self.assertEqual(self.decoded['payload_size'][6], 0)
+        self.assertEqual(self.decoded['length'][8], 10)
+
+    def test_vlan_and_padding(self):
+        """Test that a VLAN tag is skipped and Ethernet padding is not payload."""
+        self.assertEqual(self.decoded['ethertype'][3], 0x8100)
+        self.assertEqual(self.decoded['vlan_id'][3], 0x064)
+        self.assertEqual(self.decoded['payload_size'][3], 9)
+        self.assertEqual(self.decoded['payload_size'][2], 0)
+        self.assertEqual(self.decoded['ip_length'][4], 40 + 24)
+
+    def test_flow_ids(self):
+        """Test that both directions of a connection share one flow number."""
+        ids, count = BatchAnalyzer.flow_ids(self.decoded)
+        self.assertEqual(count, 3)
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(ids[0], ids[3])
+        self.assertNotEqual(ids[0], ids[2])
+        self.assertEqual(list(ids[5:]), [-1] * 4)
+
+        payload_per_flow = np.bincount(ids[ids >= 0], weights=self.decoded['payload_size'][ids >= 0])
+        self.assertEqual(payload_per_flow[ids[0]], 5 + 9)
+
+    def test_ipv6_extension_headers(self):
+        """Test that IPv6 extension headers are walked to the TCP header, stopping at fragments."""
+        pad = b"\x01\x04\x00\x00\x00\x00"
+        options = bytes([60, 0]) + pad + bytes([6, 0]) + pad
+        segment = tcp_segment(40000, 443, payload=b"ipv6")
+        frames = [
+            ipv6_frame(segment, options, next_header=0),
+            ipv6_frame(segment, struct.pack('!BBHI', 6, 0, 0x0001, 7), next_header=44),
+            ipv6_frame(segment, struct.pack('!BBHI', 6, 0, 0x0000, 7), next_header=44),
+            ipv6_frame(b"", bytes([6, 5]) + pad, next_header=0),
+        ]
+        decoded = BatchAnalyzer.analyze_batch(*BatchAnalyzer.pack_frames(frames))
+
+        self.assertEqual(list(decoded['is_tcp']), [True, False, True, False])
+        self.assertEqual(list(decoded['is_fragment']), [False, True, False, False])
+        self.assertEqual(list(decoded['protocol']), [6, 6, 6, 0])
+        self.assertEqual(list(decoded['ip_header_length'][:3]), [56, 48, 48])
+        self.assertEqual(list(decoded['src_port']), [40000, 0, 40000, 0])
+        self.assertEqual(list(decoded['payload_size']), [4, 0, 4, 0])
+
+    def test_offsets_only(self):
+        """Test decoding with lengths derived from the offsets and with RawFrames."""
+        buffer, offsets, _ = BatchAnalyzer.pack_frames(RawFrame(0.0, frame) for frame in self.frames)
+        decoded = BatchAnalyzer.analyze_batch(memoryview(buffer), offsets)
+        self.assertTrue(np.array_equal(decoded, self.decoded))
+        self.assertEqual(len(BatchAnalyzer.analyze_batch(b"", [])), 0)
+        with self.assertRaises(ValueError):
+            BatchAnalyzer.analyze_batch(buffer, [0], [len(buffer) + 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
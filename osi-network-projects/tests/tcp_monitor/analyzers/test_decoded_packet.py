@@ -0,0 +1,118 @@
+import struct
+import unittest
+from unittest.mock import patch
+from tcp_monitor.analyzers.decoded_packet import DecodedPacket
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer, TCP_ACK, TCP_PSH, TCP_SYN
+from tests.tcp_monitor.helpers import ETHERNET, ipv4_frame, ipv6_frame, tcp_segment
+
+
+class TestDecodedPacket(unittest.TestCase):
+    """Test suite for the DecodedPacket class."""
+
+    def setUp(self):
+        """Build frames of each supported kind."""
+        self.frames = [
+            ipv4_frame(tcp_segment(flags=TCP_SYN, options=b"\x02\x04\x05\xb4", checksum=0xabcd)),
+            ipv4_frame(tcp_segment(flags=TCP_PSH | TCP_ACK, payload=b"hello")) + b"\x00" * 6,
+            ipv4_frame(tcp_segment(payload=b"tagged"), vlan=100),
+            ipv6_frame(tcp_segment(payload=b"ipv6")),
+            ipv6_frame(tcp_segment(payload=b"options"), b"\x3c\x00" + bytes(6) + b"\x06\x00" + bytes(6), 0),
+        ]
+
+    def test_fields_match_analyzers(self):
+        """Test that every field matches the analyzers' output."""
+        for frame in self.frames:
+            packet = DecodedPacket(frame)
+            ethernet = EthernetAnalyzer.analyze_frame(frame)
+            ip_packet = ethernet['payload'][4:] if ethernet['is_vlan_tagged'] else ethernet['payload']
+            ip = IPAnalyzer.analyze_packet(ip_packet)
+            tcp = TCPAnalyzer.analyze_segment(ip['payload'])
+
+            self.assertTrue(packet.is_tcp)
+            for field in ('dst_mac', 'src_mac', 'ethertype', 'vlan_id'):
+                self.assertEqual(getattr(packet, field), ethernet[field], field)
+            self.assertEqual(packet.ip_version, ip['version'])
+            self.assertEqual(packet.src_ip, ip['src_ip'])
+            self.assertEqual(packet.dst_ip, ip['dst_ip'])
+            self.assertEqual(packet.protocol, ip.get('protocol', ip.get('next_header')))
+            for field in ('src_port', 'dst_port', 'seq_num', 'ack_num', 'flags', 'window_size',
+                          'checksum', 'urgent_ptr', 'header_length', 'payload_size'):
+                self.assertEqual(getattr(packet, field), tcp[field], field)
+            self.assertEqual(bytes(packet.payload), bytes(tcp['payload']))
+            self.assertIs(packet.payload.obj, frame)
+
+    def test_lazy_decoding(self):
+        """Test that layers and derived values are only decoded when read."""
+        packet = DecodedPacket(self.frames[3])
+        self.assertFalse(hasattr(packet, '__dict__'))
+        with patch('tcp_monitor.analyzers.decoded_packet.IPv6Address') as mock_address:
+            self.assertEqual((packet.src_port, packet.dst_port), (52800, 80))
+            self.assertTrue(packet.flags['ack'])
+            mock_address.assert_not_called()
+        for slot in ('_dst_mac', '_src_mac', '_src_ip', '_dst_ip'):
+            self.assertFalse(hasattr(packet, slot), slot)
+
+        self.assertEqual(packet.src_ip, '2001:db8::1')
+        self.assertIs(packet.flags, packet.flags)
+        self.assertIs(packet.src_ip, packet.src_ip)
+
+    def test_other_frames(self):
+        """Test frames that are not TCP segments."""
+        udp = DecodedPacket(ipv4_frame(b"\x00" * 8, protocol=17))
+        self.assertFalse(udp.is_tcp)
+        self.assertEqual(udp.ip_version, 4)
+        self.assertEqual(udp.protocol, 17)
+        self.assertIsNone(udp.src_port)
+        self.assertIsNone(udp.flags)
+
+        arp = DecodedPacket(ETHERNET + b"\x08\x06" + b"\x00" * 28)
+        self.assertEqual(arp.ip_version, 0)
+        self.assertIsNone(arp.src_ip)
+        short = DecodedPacket(ETHERNET[:8])
+        self.assertIsNone(short.ethertype)
+        self.assertFalse(short.is_tcp)
+        self.assertEqual(short.to_dict(), {'ethernet': EthernetAnalyzer.analyze_frame(ETHERNET[:8])})
+
+        truncated = DecodedPacket(ipv4_frame(tcp_segment())[:40])
+        self.assertEqual(truncated.ip_version, 4)
+        self.assertFalse(truncated.is_tcp)
+
+        fragment = bytearray(ipv4_frame(tcp_segment(payload=b"x" * 16)))
+        struct.pack_into('!H', fragment, 20, 0x2000)
+        fragment = DecodedPacket(fragment)
+        self.assertTrue(fragment.is_fragment)
+        self.assertEqual(fragment.ip_offset, 14)
+        self.assertFalse(fragment.is_tcp)
+        self.assertIsNone(fragment.payload)
+
+        fragment = DecodedPacket(ipv6_frame(tcp_segment(), struct.pack('!BBHI', 6, 0, 1, 7), 44))
+        self.assertEqual((fragment.protocol, fragment.is_fragment, fragment.fragment_offset), (6, True, 0))
+        self.assertFalse(fragment.is_tcp)
+        truncated = DecodedPacket(ipv6_frame(b"", b"\x06\x01" + bytes(6), 0))
+        self.assertEqual(truncated.ip_version, 6)
+        self.assertFalse(truncated.is_tcp)
+
+    def test_to_dict(self):
+        """Test that to_dict returns the analyzers' dictionaries."""
+        frame = self.frames[0]
+        result = DecodedPacket(frame).to_dict()
+        ethernet = EthernetAnalyzer.analyze_frame(frame)
+        ip = IPAnalyzer.analyze_packet(ethernet['payload'])
+        self.assertEqual(result['ethernet'], ethernet)
+        self.assertEqual(result['ip'], ip)
+        self.assertEqual(result['tcp'], TCPAnalyzer.analyze_segment(ip['payload']))
+        self.assertEqual(result['tcp']['options'], 'MSS=1460')
+
+    def test_tcp_options(self):
+        """Test that TCP options are parsed on first access."""
+        packet = DecodedPacket(self.frames[0])
+        self.assertEqual(packet.tcp_options.mss, 1460)
+        self.assertEqual(packet.tcp_options.text, 'MSS=1460')
+        self.assertEqual(DecodedPacket(self.frames[1]).tcp_options.text, '')
+        self.assertIsNone(DecodedPacket(ipv4_frame(b"\x00" * 8, protocol=17)).tcp_options)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import struct
+import unittest
+from unittest.mock import patch
+from tcp_monitor.analyzers.dissector import (DEPTH_LINK, DEPTH_NETWORK, IP_PROTOCOL_DISSECTORS, dissect)
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+from tests.tcp_monitor.helpers import ETHERNET, ipv4_packet, tcp_segment
+
+TCP = tcp_segment(flags=0x18, payload=b"data")
+
+
+class TestDissect(unittest.TestCase):
+    """Test suite for the dissect function."""
+
+    def test_matches_manual_chain(self):
+        """Test that each layer holds its analyzer's output."""
+        frame = ETHERNET + b"\x08\x00" + ipv4_packet(TCP)
+        layers = dissect(frame)
+        self.assertEqual(list(layers), ['ethernet', 'ip', 'tcp'])
+
+        ethernet = EthernetAnalyzer.analyze_frame(frame)
+        ip = IPAnalyzer.analyze_packet(ethernet['payload'])
+        self.assertEqual(layers['ethernet'], ethernet)
+        self.assertEqual(layers['ip'], ip)
+        self.assertEqual(layers['tcp'], TCPAnalyzer.analyze_segment(ip['payload']))
+        self.assertEqual(bytes(layers['tcp']['payload']), b"data")
+
+    def test_vlan_and_ipv6(self):
+        """Test that tagged frames use the inner Ethertype and IPv6 its next header."""
+        frame = ETHERNET + b"\x81\x00\x00\x64\x08\x00" + ipv4_packet(TCP)
+        layers = dissect(frame)
+        self.assertTrue(layers['ethernet']['is_vlan_tagged'])
+        self.assertEqual(layers['ip']['src_ip'], '192.168.1.1')
+        self.assertEqual(layers['tcp']['src_port'], 52800)
+
+        ipv6 = struct.pack('!IHBB', 0x60000000, len(TCP), 6, 64) + bytes(15) + b"\x01" + bytes(15) + b"\x02"
+        layers = dissect(ETHERNET + b"\x86\xdd" + ipv6 + TCP)
+        self.assertEqual(layers['ip']['dst_ip'], '::2')
+        self.assertEqual(layers['tcp']['payload_size'], 4)
+
+        hop_by_hop = bytes([6, 0]) + bytes(6)
+        ipv6 = struct.pack('!IHBB', 0x60000000, 8 + len(TCP), 0, 64) + bytes(15) + b"\x01" + bytes(15) + b"\x02"
+        layers = dissect(ETHERNET + b"\x86\xdd" + ipv6 + hop_by_hop + TCP)
+        self.assertEqual(layers['ip']['extension_headers'], (0,))
+        self.assertEqual(layers['tcp']['src_port'], 52800)
+        self.assertEqual(bytes(layers['tcp']['payload']), b"data")
+
+    def test_depth(self):
+        """Test that dissection stops at the requested depth."""
+        frame = ETHERNET + b"\x08\x00" + ipv4_packet(TCP)
+        with patch.object(IPAnalyzer, 'analyze_packet') as mock_analyze:
+            self.assertEqual(list(dissect(frame, depth=DEPTH_LINK)), ['ethernet'])
+            mock_analyze.assert_not_called()
+        self.assertEqual(list(dissect(frame, depth=DEPTH_NETWORK)), ['ethernet', 'ip'])
+        with self.assertRaises(ValueError):
+            dissect(frame, depth=0)
+
+    def test_stops_at_unknown_or_invalid_layers(self):
+        """Test frames whose next layer has no dissector or fails to decode."""
+        self.assertEqual(list(dissect(ETHERNET + b"\x08\x06" + bytes(28))), ['ethernet'])
+        self.assertEqual(list(dissect(ETHERNET + b"\x08\x00" + ipv4_packet(bytes(8), protocol=17))),
+                         ['ethernet', 'ip'])
+        self.assertIn('error', dissect(ETHERNET[:6])['ethernet'])
+        self.assertIn('error', dissect(ETHERNET + b"\x81\x00\x00")['ethernet'])
+
+        layers = dissect(ETHERNET + b"\x08\x00" + ipv4_packet(TCP, flags=0x2000))
+        self.assertTrue(layers['ip']['is_fragment'])
+        self.assertNotIn('tcp', layers)
+        self.assertNotIn('tcp', dissect(ETHERNET + b"\x08\x00" + ipv4_packet(TCP, flags=0x0002)))
+
+        layers = dissect(ETHERNET + b"\x08\x00" + ipv4_packet(TCP, flags=0x8000))
+        self.assertIn('error', layers['ip'])
+        self.assertNotIn('tcp', layers)
+        layers = dissect(ETHERNET + b"\x08\x00" + ipv4_packet(TCP[:10]))
+        self.assertIn('error', layers['tcp'])
+
+    def test_malformed_ip_options(self):
+        """Test that IPv4 options overrunning the header or with a zero length do not escape dissect."""
+        for options in (b"\x01\x01\x01\x44", b"\x07\x00\x00\x00"):
+            packet = bytearray(ipv4_packet(options + TCP))
+            packet[0] = 0x46
+            layers = dissect(ETHERNET + b"\x08\x00" + bytes(packet))
+            self.assertEqual(list(layers), ['ethernet', 'ip', 'tcp'])
+            self.assertNotIn('error', layers['ip'])
+
+    def test_dispatch_table(self):
+        """Test that transport dissectors are looked up in the dispatch table."""
+        frame = ETHERNET + b"\x08\x00" + ipv4_packet(bytes(8), protocol=17)
+        with patch.dict(IP_PROTOCOL_DISSECTORS, {17: ('udp', lambda data: {'length': len(data)})}):
+            self.assertEqual(dissect(frame)['udp'], {'length': 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,6 +39,16 @@ class TestEthernetAnalyzer(unittest.TestCase):
         self.assertEqual(eth_info['payload'], self.eth_payload)
         self.assertEqual(eth_info['payload_size'], len(self.eth_payload))
 
+    def test_payload_is_a_view(self):
+        """Test that the payload is a view of the frame rather than a copy."""
+        frame = bytearray(self.eth_frame)
+        eth_info = EthernetAnalyzer.analyze_frame(memoryview(frame))
+
+        self.assertIsInstance(eth_info['payload'], memoryview)
+        self.assertIs(eth_info['payload'].obj, frame)
+        frame[14] = ord("s")
+        self.assertEqual(bytes(eth_info['payload']), b"sample payload")
+
     def test_analyze_ethernet_frame_ipv6(self):
         """Test parsing of Ethernet frame with IPv6 EtherType."""
         # Create a frame with IPv6 EtherType (0x86DD)
@@ -1,5 +1,17 @@
+import struct
 import unittest
-from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer, walk_ipv6_extension_headers
+
+
+def extension_header(next_header, length=8):
+    """Helper building an IPv6 options-type extension header of the given length."""
+    return bytes([next_header, length // 8 - 1]) + bytes(length - 2)
+
+
+def fragment_header(next_header, offset, more_fragments, identification=0x1234):
+    """Helper building an IPv6 fragment header."""
+    return struct.pack('!BBHI', next_header, 0, offset | more_fragments, identification)
+
 
 class TestIPAnalyzer(unittest.TestCase):
     """Test suite for the IPAnalyzer class.
@@ -87,6 +99,42 @@ class TestIPAnalyzer(unittest.TestCase):
         self.assertEqual(len(result['payload']), 4)
         self.assertEqual(result['payload'], b'data')
 
+    def test_two_byte_fields(self):
+        """Test that 16-bit header fields combine their high and low bytes."""
+        packet = bytearray(self.ipv4_packet)
+        packet[2:4] = b"\x01\x18"  # Total length 280, more than the captured data
+        result = IPAnalyzer.analyze_packet(bytes(packet))
+        self.assertEqual(result['total_length'], 280)
+        self.assertEqual(result['id'], 0x1234)
+        self.assertEqual(result['checksum'], 0x1234)
+        # A truncated capture keeps the payload that is present
+        self.assertEqual(result['payload'], b'data')
+
+        packet = bytearray(self.ipv6_packet)
+        packet[4:6] = b"\x01\x04"
+        self.assertEqual(IPAnalyzer.analyze_packet(bytes(packet))['payload_length'], 260)
+
+    def test_payload_excludes_padding(self):
+        """Test that the payload ends at the length given by the header, not at the frame end."""
+        padded = bytes(self.ipv4_packet) + b"\x00" * 22
+        result = IPAnalyzer.analyze_packet(padded)
+        self.assertEqual(result['payload'], b'data')
+        self.assertEqual(result['payload_size'], 4)
+
+        padded = bytes(self.ipv6_packet) + b"\x00" * 6
+        self.assertEqual(IPAnalyzer.analyze_packet(padded)['payload'], b'data')
+
+    def test_memoryview_packet(self):
+        """Test that a memoryview packet is decoded and its payload is not copied."""
+        packet = bytes(self.ipv4_packet)
+        result = IPAnalyzer.analyze_packet(memoryview(packet))
+        self.assertEqual(result['src_ip'], '192.168.1.1')
+        self.assertIsInstance(result['payload'], memoryview)
+        self.assertIs(result['payload'].obj, packet)
+
+        result = IPAnalyzer.analyze_packet(memoryview(bytes(self.ipv6_packet)))
+        self.assertEqual(result['dst_ip'], '2001:db8::2')
+
     def test_fragmented_ipv4_packet(self):
         """Test analyzing a fragmented IPv4 packet."""
         # Create a fragmented IPv4 packet (MF flag set)
@@ -103,6 +151,81 @@ class TestIPAnalyzer(unittest.TestCase):
         self.assertEqual(result['fragment_offset'], 40)
         self.assertTrue(result['is_fragment'])
 
+    def test_large_fragment_offset(self):
+        """Test that the high bits of the fragment offset are decoded."""
+        fragmented_packet = bytearray(self.ipv4_packet)
+        fragmented_packet[6] = 0x5F  # DF set, offset bits 0x1F00
+        fragmented_packet[7] = 0xFF
+
+        result = IPAnalyzer.analyze_packet(bytes(fragmented_packet))
+        self.assertEqual(result['fragment_offset'], 0x1FFF * 8)
+        self.assertTrue(result['flags']['df'])
+        self.assertFalse(result['flags']['mf'])
+
+        fragmented_packet[6] = 0x80  # Reserved bit
+        with self.assertRaises(ValueError):
+            IPAnalyzer.analyze_packet(bytes(fragmented_packet))
+
+    def test_ipv6_extension_headers(self):
+        """Test that the extension header chain is walked to the upper-layer protocol."""
+        headers = extension_header(60) + extension_header(43, 24) + extension_header(6)
+        packet = bytearray(self.ipv6_packet[:40]) + headers + b"data"
+        packet[4:6] = struct.pack('!H', len(headers) + 4)
+        packet[6] = 0  # Hop-by-hop options first
+
+        result = IPAnalyzer.analyze_packet(memoryview(bytes(packet)))
+        self.assertEqual(result['next_header'], 0)
+        self.assertEqual(result['extension_headers'], (0, 60, 43))
+        self.assertEqual(result['protocol'], 6)
+        self.assertEqual(result['protocol_name'], 'TCP')
+        self.assertEqual(result['header_length'], 40 + len(headers))
+        self.assertFalse(result['is_fragment'])
+        self.assertEqual(result['payload'], b'data')
+        self.assertIsInstance(result['payload'], memoryview)
+
+        plain = IPAnalyzer.analyze_packet(bytes(self.ipv6_packet))
+        self.assertEqual((plain['extension_headers'], plain['header_length'], plain['id']), ((), 40, None))
+
+    def test_ipv6_authentication_header(self):
+        """Test that the authentication header length is counted in 4-byte units."""
+        authentication = bytes([6, 4]) + bytes(22)  # (4 + 2) * 4 = 24 bytes
+        chain = walk_ipv6_extension_headers(bytes(self.ipv6_packet[:40]) + authentication + b"data", 51)
+        self.assertEqual(chain.protocol, 6)
+        self.assertEqual(chain.header_length, 64)
+        self.assertEqual(chain.headers, (51,))
+
+    def test_ipv6_fragment_header(self):
+        """Test that the walk stops at the fragment header of a fragment."""
+        packet = bytearray(self.ipv6_packet[:40]) + extension_header(44) + fragment_header(60, 1448, True) \
+            + extension_header(6) + b"data"
+        packet[4:6] = struct.pack('!H', len(packet) - 40)
+        packet[6] = 0
+
+        result = IPAnalyzer.analyze_packet(bytes(packet))
+        self.assertEqual(result['extension_headers'], (0, 44))
+        self.assertEqual(result['protocol'], 60)
+        self.assertTrue(result['is_fragment'])
+        self.assertEqual(result['fragment_offset'], 1448)
+        self.assertEqual(result['id'], 0x1234)
+        self.assertEqual(bytes(result['payload']), extension_header(6) + b"data")
+
+        # An atomic fragment is walked through
+        packet[50:52] = b"\x00\x00"
+        result = IPAnalyzer.analyze_packet(bytes(packet))
+        self.assertEqual(result['extension_headers'], (0, 44, 60))
+        self.assertEqual(result['protocol'], 6)
+        self.assertFalse(result['is_fragment'])
+        self.assertEqual(result['payload'], b'data')
+
+    def test_truncated_extension_headers(self):
+        """Test that an extension header running past the packet raises a ValueError."""
+        packet = bytearray(self.ipv6_packet)
+        packet[6] = 0  # Hop-by-hop options header in a 4-byte payload
+        with self.assertRaises(ValueError):
+            IPAnalyzer.analyze_packet(bytes(packet))
+        with self.assertRaises(ValueError):
+            walk_ipv6_extension_headers(bytes(self.ipv6_packet[:40]) + extension_header(6, 16)[:12], 60)
+
     def test_ip_protocol_mapping(self):
         """Test mapping of IP protocol numbers to protocol names."""
         # Test common protocol numbers
@@ -150,6 +273,25 @@ class TestIPAnalyzer(unittest.TestCase):
         self.assertEqual(result['options'][0]['type'], 7)  # Record Route
         self.assertEqual(result['options'][0]['length'], 4)
 
+    def test_malformed_ipv4_options(self):
+        """Test that option walks stop at zero lengths and at the end of the header."""
+        for options, expected in ((b"\x01\x01\x01\x44", [1, 1, 1]),
+                                  (b"\x07\x00\x00\x00", []),
+                                  (b"\x01\x07\x08\x00", [1])):
+            packet = bytearray(self.ipv4_packet)
+            packet[0] = 0x46
+            packet[3] = 0x1C
+            packet[20:20] = options
+            result = IPAnalyzer.analyze_packet(bytes(packet))
+            self.assertEqual([option['type'] for option in result['options']], expected)
+
+        # Options cut short by the capture end with the captured bytes
+        truncated = bytearray(self.ipv4_packet[:20])
+        truncated[0] = 0x4F
+        truncated += b"\x01\x01"
+        result = IPAnalyzer.analyze_ipv4_packet_header(bytes(truncated))
+        self.assertEqual(len(result['options']), 2)
+
     def test_get_ip_address_type(self):
         """Test classification of IP address types."""
         # Test IPv4 address types
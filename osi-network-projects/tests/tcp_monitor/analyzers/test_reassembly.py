@@ -0,0 +1,203 @@
+import struct
+import unittest
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.reassembly import FragmentReassembler
+from tests.tcp_monitor.helpers import ipv4_packet
+
+SRC = bytes([192, 168, 1, 1])
+DST = bytes([10, 0, 0, 1])
+
+
+def ipv4_fragment(payload, offset, more_fragments, identification=1, protocol=6):
+    """Helper building an IPv4 fragment from 192.168.1.1 to 10.0.0.1."""
+    flags_fragment = (0x2000 if more_fragments else 0) | offset // 8
+    return ipv4_packet(payload, protocol=protocol, flags=flags_fragment, identification=identification)
+
+
+def ipv6_fragment(payload, offset, more_fragments, identification=1, hop_by_hop=False):
+    """Helper building an IPv6 fragment of a TCP segment, optionally after hop-by-hop options."""
+    headers = struct.pack('!BBHI', 6, 0, offset | more_fragments, identification)
+    next_header = 44
+    if hop_by_hop:
+        headers = bytes([44, 0]) + bytes(6) + headers
+        next_header = 0
+    return struct.pack('!IHBB16s16s', 0x60000000, len(headers) + len(payload), next_header, 64,
+                       bytes(15) + b"\x01", bytes(15) + b"\x02") + headers + payload
+
+
+class TestFragmentReassembler(unittest.TestCase):
+    """Test suite for the FragmentReassembler class."""
+
+    def setUp(self):
+        """Set up a reassembler and a datagram payload for each test."""
+        self.reassembler = FragmentReassembler()
+        self.payload = bytes(range(256)) * 4
+
+    def test_in_order_fragments(self):
+        """Test that fragments arriving in order are reassembled."""
+        key = (SRC, DST, 1, 6)
+        self.assertIsNone(self.reassembler.add_fragment(key, 0, self.payload[:512], True, 1.0, b"header"))
+        self.assertEqual(self.reassembler.memory_used, 512)
+        header, payload = self.reassembler.add_fragment(key, 512, self.payload[512:], False, 1.1)
+
+        self.assertEqual(header, b"header")
+        self.assertEqual(payload, self.payload)
+        self.assertEqual(self.reassembler.reassembled, 1)
+        self.assertEqual(len(self.reassembler), 0)
+        self.assertEqual(self.reassembler.memory_used, 0)
+
+    def test_out_of_order_fragments(self):
+        """Test that holes are filled whatever the arrival order."""
+        key = (SRC, DST, 2, 6)
+        for offset in (768, 256, 512):
+            self.assertIsNone(self.reassembler.add_fragment(key, offset, self.payload[offset:offset + 256],
+                                                            offset != 768, 1.0))
+        self.assertEqual(self.reassembler.datagrams[key].holes, [(0, 256)])
+        _, payload = self.reassembler.add_fragment(key, 0, memoryview(self.payload)[:256], True, 1.0)
+        self.assertEqual(payload, self.payload)
+
+    def test_overlapping_fragments(self):
+        """Test that overlaps are counted and never overwrite bytes received first."""
+        key = (SRC, DST, 3, 6)
+        self.reassembler.add_fragment(key, 0, self.payload[:512], True, 1.0)
+        self.reassembler.add_fragment(key, 0, b"\xff" * 512, True, 1.0)
+        _, payload = self.reassembler.add_fragment(key, 256, b"\xee" * 256 + self.payload[512:], False, 1.0)
+
+        self.assertEqual(payload, self.payload)
+        self.assertEqual(self.reassembler.overlapping, 2)
+
+    def test_inconsistent_fragments_are_dropped(self):
+        """Test datagrams whose fragments disagree on the length or exceed the limits."""
+        key = (SRC, DST, 4, 6)
+        self.reassembler.add_fragment(key, 512, self.payload[:8], False, 1.0)
+        self.assertIsNone(self.reassembler.add_fragment(key, 1024, self.payload[:8], True, 1.0))
+        self.assertNotIn(key, self.reassembler.datagrams)
+
+        self.assertIsNone(self.reassembler.add_fragment(key, 65528, self.payload[:16], True, 1.0))
+        reassembler = FragmentReassembler(max_fragments=4)
+        for offset in range(0, 40, 8):
+            reassembler.add_fragment(key, offset, self.payload[:8], True, 1.0)
+        self.assertEqual(len(reassembler), 0)
+        self.assertEqual((self.reassembler.dropped, reassembler.dropped), (2, 1))
+
+    def test_timeout(self):
+        """Test that datagrams idle for longer than the timeout are discarded."""
+        reassembler = FragmentReassembler(timeout=5.0)
+        reassembler.add_fragment(1, 0, self.payload[:8], True, 1.0)
+        reassembler.add_fragment(2, 0, self.payload[:8], True, 3.0)
+        reassembler.add_fragment(1, 8, self.payload[:8], True, 4.0)
+
+        self.assertEqual(reassembler.expire(8.5), 1)
+        self.assertEqual(list(reassembler.datagrams), [1])
+        self.assertIsNone(reassembler.add_fragment(1, 16, self.payload[:8], False, 10.0))
+        self.assertEqual(reassembler.timed_out, 2)
+        self.assertEqual(reassembler.memory_used, 8)
+
+    def test_memory_cap_evicts_least_recently_used(self):
+        """Test that the memory and datagram caps evict the least recently used datagrams."""
+        reassembler = FragmentReassembler(max_bytes=1000, max_datagrams=3)
+        for key in range(3):
+            reassembler.add_fragment(key, 0, self.payload[:300], True, 1.0)
+        reassembler.add_fragment(0, 300, self.payload[:8], True, 1.1)
+        reassembler.add_fragment(3, 0, self.payload[:300], True, 1.2)
+
+        self.assertEqual(list(reassembler.datagrams), [2, 0, 3])
+        self.assertLessEqual(reassembler.memory_used, 1000)
+        for key in range(4, 10):
+            reassembler.add_fragment(key, 0, self.payload[:8], True, 1.3)
+        self.assertEqual(len(reassembler), 3)
+        self.assertEqual(reassembler.evicted, 7)
+
+    def test_reassemble_ipv4(self):
+        """Test that IPv4 fragments are reassembled into a packet the analyzers decode."""
+        fragments = [ipv4_fragment(self.payload[:600], 0, True),
+                     ipv4_fragment(self.payload[600:], 600, False) + b"\x00" * 6]
+        whole = ipv4_fragment(self.payload, 0, False)
+        self.assertIs(self.reassembler.reassemble_ipv4(memoryview(whole)).obj, whole)
+
+        self.assertIsNone(self.reassembler.reassemble_ipv4(fragments[1], 1.0))
+        packet = self.reassembler.reassemble_ipv4(fragments[0], 1.0)
+        self.assertEqual(packet, whole)
+        result = IPAnalyzer.analyze_packet(packet)
+        self.assertFalse(result['is_fragment'])
+        self.assertEqual(bytes(result['payload']), self.payload)
+
+    def test_ipv4_datagrams_are_keyed_by_identification(self):
+        """Test that fragments with different identifications are kept apart."""
+        self.reassembler.reassemble_ipv4(ipv4_fragment(self.payload[:8], 0, True, identification=1), 1.0)
+        self.reassembler.reassemble_ipv4(ipv4_fragment(b"\xff" * 8, 8, False, identification=2), 1.0)
+        self.assertIsNone(self.reassembler.reassemble_ipv4(
+            ipv4_fragment(b"\xff" * 8, 8, False, identification=1, protocol=17), 1.0))
+        packet = self.reassembler.reassemble_ipv4(ipv4_fragment(self.payload[8:16], 8, False), 1.0)
+        self.assertEqual(packet[20:], self.payload[:16])
+        self.assertEqual(len(self.reassembler), 2)
+
+    def test_reassemble_ipv6(self):
+        """Test that IPv6 fragments are reassembled after the unfragmentable headers."""
+        self.assertIsNone(self.reassembler.reassemble(ipv6_fragment(self.payload[512:], 512, False, hop_by_hop=True)))
+        packet = self.reassembler.reassemble(ipv6_fragment(self.payload[:512], 0, True, hop_by_hop=True))
+
+        result = IPAnalyzer.analyze_packet(packet)
+        self.assertEqual(result['extension_headers'], (0,))
+        self.assertEqual(result['protocol'], 6)
+        self.assertEqual(result['payload_length'], 8 + len(self.payload))
+        self.assertEqual(result['payload'], self.payload)
+        self.assertEqual(self.reassembler.reassembled, 1)
+
+    def test_ipv6_datagrams_are_keyed_by_identification(self):
+        """Test that IPv6 fragments with different identifications are kept apart."""
+        self.reassembler.reassemble_ipv6(ipv6_fragment(self.payload[:8], 0, True, identification=1), 1.0)
+        self.assertIsNone(self.reassembler.reassemble_ipv6(
+            ipv6_fragment(self.payload[8:16], 8, False, identification=2), 1.0))
+        packet = self.reassembler.reassemble_ipv6(ipv6_fragment(self.payload[8:16], 8, False), 1.0)
+        self.assertEqual(packet[6], 6)
+        self.assertEqual(packet[40:], self.payload[:16])
+
+    def test_unfragmented_packets_pass_through(self):
+        """Test that whole packets and atomic fragments are returned unchanged."""
+        atomic = ipv6_fragment(self.payload, 0, False)
+        self.assertIs(self.reassembler.reassemble(atomic).obj, atomic)
+        whole = ipv4_fragment(self.payload, 0, False)
+        self.assertIs(self.reassembler.reassemble(whole).obj, whole)
+        self.assertEqual(len(self.reassembler), 0)
+        with self.assertRaises(ValueError):
+            self.reassembler.reassemble(b"\x50" + bytes(39))
+
+    def test_oversized_datagrams_are_dropped(self):
+        """Test that fragments reaching past what the length field can hold drop their datagram."""
+        # Ping of death: fragments up to offset 65528, then 7 more bytes, 20 over the total length limit
+        for offset in range(0, 65528, 1480):
+            self.reassembler.reassemble_ipv4(ipv4_fragment(bytes(min(1480, 65528 - offset)), offset, True), 1.0)
+        self.assertIsNone(self.reassembler.reassemble_ipv4(ipv4_fragment(bytes(7), 65528, False), 1.0))
+        # Dropped at the fragment crossing 65515 bytes; the last one then starts a datagram of its own
+        self.assertEqual((self.reassembler.reassembled, self.reassembler.dropped), (0, 2))
+        self.assertEqual(len(self.reassembler), 0)
+
+        # The smallest limit applies, whatever the arrival order
+        reassembler = FragmentReassembler()
+        reassembler.add_fragment(1, 65000, bytes(400), False, 1.0, max_size=65515)
+        self.assertIsNone(reassembler.add_fragment(1, 0, bytes(8), True, 1.0, b"header", max_size=65000))
+        self.assertEqual(reassembler.dropped, 1)
+
+        # IPv6: the hop-by-hop options kept before the payload count in the payload length
+        reassembler = FragmentReassembler()
+        largest = 65535 - 8
+        for offset in range(0, largest, 1448):
+            size = min(1448, largest - offset)
+            packet = reassembler.reassemble(
+                ipv6_fragment(bytes(size), offset, offset + size < largest, hop_by_hop=True), 1.0)
+        self.assertEqual(len(packet), 40 + 65535)
+        reassembler.reassemble(ipv6_fragment(bytes(8), 0, True, 2, hop_by_hop=True), 1.0)
+        self.assertIsNone(reassembler.reassemble(ipv6_fragment(bytes(8), largest, False, 2, hop_by_hop=True), 1.0))
+        self.assertEqual((reassembler.reassembled, reassembler.dropped), (1, 1))
+
+    def test_invalid_limits(self):
+        """Test that limits must be positive."""
+        with self.assertRaises(ValueError):
+            FragmentReassembler(timeout=0)
+        with self.assertRaises(ValueError):
+            FragmentReassembler(max_bytes=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
+import struct
 import unittest
 from struct import pack
-from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer, parse_tcp_options
 
 class TestTCPAnalyzer(unittest.TestCase):
     """Test suite for the TCPAnalyzer class.
@@ -90,6 +91,12 @@ class TestTCPAnalyzer(unittest.TestCase):
         self.assertIn('payload_size', tcp_info)
         self.assertEqual(tcp_info['payload_size'], len(self.tcp_payload))
 
+    def test_payload_is_a_view(self):
+        """Test that the payload is a view of the segment, also when given bytes."""
+        tcp_info = TCPAnalyzer.analyze_segment(self.tcp_segment)
+        self.assertIsInstance(tcp_info['payload'], memoryview)
+        self.assertIs(tcp_info['payload'].obj, self.tcp_segment)
+
     def test_parse_tcp_with_options(self):
         """Test parsing TCP header with options present."""
         # Create a header with data offset of 6 words (24 bytes) indicating presence of options
@@ -121,6 +128,45 @@ class TestTCPAnalyzer(unittest.TestCase):
         # Check payload is correctly extracted after the options
         self.assertEqual(tcp_info['payload'], self.tcp_payload)
 
+    def test_parse_syn_option_sequence(self):
+        """Test parsing every option of a typical SYN: MSS, SACKOK, TS, NOP, WSCALE."""
+        options = (b"\x02\x04\x05\xb4" b"\x04\x02" + b"\x08\x0a" + struct.pack('!II', 4294967, 0)
+                   + b"\x01" b"\x03\x03\x07")
+        segment = self.tcp_header[:12] + bytes([(20 + len(options)) // 4 << 4]) + self.tcp_header[13:] + options
+
+        tcp_info = TCPAnalyzer.analyze_segment(segment)
+        self.assertEqual(tcp_info['header_length'], 40)
+        self.assertEqual(tcp_info['options'], 'MSS=1460,SACKOK,TS=4294967/0,NOP,WSCALE=7')
+        tcp_options = tcp_info['tcp_options']
+        self.assertEqual(tcp_options.mss, 1460)
+        self.assertEqual(tcp_options.window_scale, 7)
+        self.assertTrue(tcp_options.sack_permitted)
+        self.assertEqual((tcp_options.tsval, tcp_options.tsecr), (4294967, 0))
+        self.assertEqual(tcp_options.sack_blocks, ())
+
+    def test_parse_sack_blocks(self):
+        """Test parsing SACK blocks after timestamps."""
+        options = (b"\x01\x01\x08\x0a" + struct.pack('!II', 100, 200)
+                   + b"\x01\x01\x05\x12" + struct.pack('!IIII', 5000, 6000, 7000, 8000))
+        tcp_options = parse_tcp_options(options)
+        self.assertEqual(tcp_options.sack_blocks, ((5000, 6000), (7000, 8000)))
+        self.assertEqual((tcp_options.tsval, tcp_options.tsecr), (100, 200))
+        self.assertFalse(tcp_options.sack_permitted)
+        self.assertEqual(tcp_options.text, 'NOP,NOP,TS=100/200,NOP,NOP,SACK=5000-6000;7000-8000')
+
+    def test_parse_malformed_options(self):
+        """Test that the walk stops at End of Option List and at invalid lengths."""
+        self.assertEqual(parse_tcp_options(b"\x02\x04\x05\xb4\x00\x03\x03\x07").text, 'MSS=1460,EOO')
+        self.assertEqual(parse_tcp_options(b"\x01\x03\x00\x07").text, 'NOP')
+        self.assertEqual(parse_tcp_options(b"\x08\x0a\x00\x00").text, '')
+        self.assertEqual(parse_tcp_options(b"\x1e\x03\x00\x01").text, 'UNKNOWN=30,NOP')
+        self.assertIsNone(parse_tcp_options(b"\x02\x03\x05").mss)
+
+    def test_options_are_cached(self):
+        """Test that identical option bytes are parsed once."""
+        options = b"\x02\x04\x05\xb4\x01\x03\x03\x02"
+        self.assertIs(parse_tcp_options(options), parse_tcp_options(bytes(options)))
+
     def test_parse_all_flags_set(self):
         """Test parsing TCP segment with all flags set."""
         # Modified header with all flags set (0x3F)
@@ -148,6 +194,15 @@ class TestTCPAnalyzer(unittest.TestCase):
         self.assertTrue(flags['ack'])
         self.assertTrue(flags['urg'])
 
+    def test_each_flag_bit(self):
+        """Test that each control bit maps to its own flag, ignoring ECE and CWR."""
+        names = ['fin', 'syn', 'rst', 'psh', 'ack', 'urg']
+        for bit, name in enumerate(names):
+            segment = bytearray(self.tcp_header)
+            segment[13] = (1 << bit) | 0xC0
+            flags = TCPAnalyzer.analyze_tcp_header(segment)['flags']
+            self.assertEqual([flag for flag in names if flags[flag]], [name])
+
     def test_parse_empty_segment(self):
         """Test parsing TCP segment with no payload."""
         # TCP segment with just the header and no payload
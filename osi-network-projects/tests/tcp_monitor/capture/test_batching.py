@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+from tcp_monitor.capture.batching import PacketBatcher
+from tcp_monitor.capture.frame import RawFrame
+
+
+class TestPacketBatcher(unittest.TestCase):
+    """Test suite for the PacketBatcher class."""
+
+    def setUp(self):
+        """Set up a batcher collecting its batches in a list."""
+        self.batches = []
+        self.batcher = PacketBatcher(self.batches.append, batch_size=3, max_delay=60)
+
+    def test_full_batches(self):
+        """Test that a batch is delivered as soon as it is full."""
+        for i in range(7):
+            self.batcher.add(RawFrame(float(i), bytes([i])))
+
+        self.assertEqual([[frame.timestamp for frame in batch] for batch in self.batches],
+                         [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]])
+        self.assertEqual(self.batcher.pending, 1)
+        self.assertEqual(self.batcher.flush(), 1)
+        self.assertEqual(self.batcher.flush(), 0)
+        self.assertEqual(self.batcher.batches_delivered, 3)
+        self.assertEqual(self.batcher.packets_delivered, 7)
+
+    def test_stale_batch_flushed_by_timer(self):
+        """Test that a partial batch is delivered once it reaches the maximum delay."""
+        delivered = threading.Event()
+        batches = []
+
+        def collect(batch):
+            batches.append(batch)
+            delivered.set()
+
+        batcher = PacketBatcher(collect, batch_size=100, max_delay=0.01)
+        batcher.start()
+        started = time.monotonic()
+        batcher.add(RawFrame(0.0, b"\x00"))
+        self.assertTrue(delivered.wait(1))
+        batcher.stop()
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.01)
+        self.assertEqual(len(batches), 1)
+
+    def test_stop_delivers_pending_packets(self):
+        """Test that stopping delivers the partial batch."""
+        self.batcher.start()
+        self.batcher.add(RawFrame(0.0, b"\x00"))
+        self.batcher.stop()
+        self.assertEqual(len(self.batches), 1)
+
+    def test_memoryview_frames_are_copied(self):
+        """Test that ring-buffer views are copied before being batched."""
+        ring = bytearray(b"\x01" * 4)
+        self.batcher.add(RawFrame(0.0, memoryview(ring)))
+        ring[:] = b"\x02" * 4
+        self.batcher.flush()
+        self.assertEqual(self.batches[0][0].data, b"\x01" * 4)
+
+    def test_callback_errors_are_counted(self):
+        """Test that a failing callback does not stop batching."""
+        batcher = PacketBatcher(lambda batch: 1 / 0, batch_size=1)
+        batcher.add(RawFrame(0.0, b"\x00"))
+        batcher.add(RawFrame(0.0, b"\x00"))
+        self.assertEqual(batcher.callback_errors, 2)
+        self.assertEqual(batcher.batches_delivered, 2)
+
+    def test_invalid_settings(self):
+        """Test validation of the batch size and delay."""
+        with self.assertRaises(ValueError):
+            PacketBatcher(print, batch_size=0)
+        with self.assertRaises(ValueError):
+            PacketBatcher(print, max_delay=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
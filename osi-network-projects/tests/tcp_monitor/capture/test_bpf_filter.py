@@ -0,0 +1,144 @@
+import socket
+import unittest
+from unittest.mock import Mock, patch
+from scapy.error import Scapy_Exception
+from tcp_monitor.capture.bpf_filter import (BPFFilter, BPF_ACCEPT_ALL, BPF_RET_K, LINKTYPE_ETHERNET,
+                                            SO_ATTACH_FILTER, attach_bpf, compile_bpf, truncate_program)
+
+
+class TestBPFFilter(unittest.TestCase):
+    """Test suite for the BPFFilter class."""
+
+    def test_default_filter(self):
+        """Test that a new filter captures TCP only."""
+        self.assertEqual(BPFFilter().build(), "(tcp)")
+        self.assertEqual(BPFFilter(["TCP", "udp"]).build(), "(tcp or udp)")
+
+    def test_hosts_and_networks(self):
+        """Test host, CIDR network, and direction predicates."""
+        bpf = BPFFilter()
+        bpf.add_hosts("10.0.0.1", "192.168.0.0/16")
+        bpf.add_hosts("2001:db8::1", direction="src")
+        self.assertEqual(bpf.build(),
+                         "(tcp) and (host 10.0.0.1 or net 192.168.0.0/16) and src host 2001:db8::1")
+
+    def test_network_is_normalised(self):
+        """Test that host bits in a CIDR network are cleared."""
+        bpf = BPFFilter()
+        bpf.add_hosts("10.1.2.3/8", direction="dst")
+        self.assertEqual(bpf.build(), "(tcp) and dst net 10.0.0.0/8")
+
+    def test_ports_and_ranges(self):
+        """Test single ports and both port range notations."""
+        bpf = BPFFilter()
+        bpf.add_ports(80, (8000, 8100), "9000-9010", direction="dst")
+        self.assertEqual(bpf.build(),
+                         "(tcp) and (dst port 80 or dst portrange 8000-8100 or dst portrange 9000-9010)")
+
+    def test_vlan_is_first(self):
+        """Test that the VLAN predicate precedes the predicates it shifts."""
+        bpf = BPFFilter()
+        bpf.add_ports(443)
+        bpf.set_vlan(100)
+        self.assertEqual(bpf.build(), "vlan 100 and (tcp) and port 443")
+        bpf.set_vlan()
+        self.assertEqual(bpf.build(), "vlan and (tcp) and port 443")
+        bpf.set_vlan(0)
+        self.assertEqual(bpf.build(), "vlan 0 and (tcp) and port 443")
+        bpf.set_vlan(None)
+        self.assertEqual(bpf.build(), "(tcp) and port 443")
+
+    def test_tcp_flags(self):
+        """Test TCP flag predicates such as SYN-only."""
+        bpf = BPFFilter()
+        bpf.set_tcp_flags(set_flags=["syn"], clear_flags=["ack"])
+        self.assertEqual(bpf.build(), "(tcp) and tcp[tcpflags] & (tcp-syn|tcp-ack) == tcp-syn")
+
+        bpf.set_tcp_flags(set_flags=["rst"])
+        self.assertEqual(bpf.build(), "(tcp) and tcp[tcpflags] & tcp-rst == tcp-rst")
+
+        bpf.set_tcp_flags(clear_flags=["fin"])
+        self.assertEqual(bpf.build(), "(tcp) and tcp[tcpflags] & tcp-fin == 0")
+
+    def test_invalid_predicates(self):
+        """Test that malformed predicates are rejected when added."""
+        bpf = BPFFilter()
+        with self.assertRaises(ValueError):
+            BPFFilter(["tcp", "quic"])
+        with self.assertRaises(ValueError):
+            bpf.add_hosts("10.0.0.0/33")
+        with self.assertRaises(ValueError):
+            bpf.add_hosts("bad host; rm")
+        with self.assertRaises(ValueError):
+            bpf.add_hosts("10.0.0.1", direction="both")
+        with self.assertRaises(ValueError):
+            bpf.add_ports(70000)
+        with self.assertRaises(ValueError):
+            bpf.add_ports((100, 10))
+        with self.assertRaises(ValueError):
+            bpf.set_vlan(5000)
+        with self.assertRaises(ValueError):
+            bpf.set_tcp_flags(set_flags=["syn"], clear_flags=["syn"])
+        with self.assertRaises(ValueError):
+            bpf.set_tcp_flags(set_flags=["nope"])
+        with self.assertRaises(ValueError):
+            BPFFilter(["udp"]).set_tcp_flags(set_flags=["syn"])
+
+    @patch('scapy.arch.common.free_filter')
+    @patch('scapy.arch.common.compile_filter')
+    def test_compile(self, mock_compile_filter, mock_free_filter):
+        """Test that compiling validates the whole expression with libpcap."""
+        bpf = BPFFilter()
+        bpf.add_ports(22)
+        self.assertIs(bpf.compile(), mock_compile_filter.return_value)
+        mock_compile_filter.assert_called_once_with("(tcp) and port 22", linktype=LINKTYPE_ETHERNET)
+        mock_free_filter.assert_not_called()
+
+        # Validating releases the program it compiled
+        self.assertIsNone(bpf.validate())
+        mock_free_filter.assert_called_once_with(mock_compile_filter.return_value)
+
+        mock_compile_filter.side_effect = Scapy_Exception("syntax error")
+        with self.assertRaises(ValueError):
+            compile_bpf("tcp and and")
+
+
+
+class TestSnapLengthPrograms(unittest.TestCase):
+    """Test suite for the kernel-side truncation helpers."""
+
+    def test_truncate_program(self):
+        """Test that accepting returns are capped and rejecting returns are kept."""
+        program = [(0x28, 0, 0, 12), (0x15, 0, 1, 0x0800), (BPF_RET_K, 0, 0, 262144), (BPF_RET_K, 0, 0, 0)]
+        self.assertEqual(truncate_program(program, 96),
+                         [(0x28, 0, 0, 12), (0x15, 0, 1, 0x0800), (BPF_RET_K, 0, 0, 96), (BPF_RET_K, 0, 0, 0)])
+
+    def test_attach_without_expression(self):
+        """Test that a snap length alone attaches a one-instruction program."""
+        sock = Mock()
+        attach_bpf(sock, None, "eth0", snaplen=96)
+
+        level, option, program = sock.setsockopt.call_args[0]
+        self.assertEqual((level, option), (socket.SOL_SOCKET, SO_ATTACH_FILTER))
+        self.assertEqual(program.len, 1)
+        self.assertEqual((program.filter[0].code, program.filter[0].k), (BPF_RET_K, 96))
+
+    def test_attach_accept_all(self):
+        """Test that no expression and no snap length attach a program accepting whole packets."""
+        sock = Mock()
+        attach_bpf(sock, None, "eth0")
+
+        program = sock.setsockopt.call_args[0][2]
+        self.assertEqual(program.len, 1)
+        self.assertEqual((program.filter[0].code, program.filter[0].k), (BPF_RET_K, BPF_ACCEPT_ALL))
+
+    @patch('scapy.arch.linux.attach_filter')
+    def test_attach_without_snaplen(self, mock_attach_filter):
+        """Test that without a snap length the filter is attached unchanged."""
+        sock = Mock()
+        attach_bpf(sock, "tcp", "eth0")
+        mock_attach_filter.assert_called_once_with(sock, "tcp", "eth0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import gzip
+import io
+import unittest
+from unittest.mock import patch
+from tcp_monitor.capture.compression import (ZSTD_AVAILABLE, BlockCompressedFile, check_compression,
+                                             detect_compression, read_exact)
+
+if ZSTD_AVAILABLE:
+    import zstandard
+
+
+class TestBlockCompressedFile(unittest.TestCase):
+    """Test suite for the BlockCompressedFile class."""
+
+    def test_gzip_blocks_are_independent(self):
+        """Test that full blocks become separate gzip members readable on their own."""
+        raw = io.BytesIO()
+        compressed = BlockCompressedFile(raw, 'gzip', block_size=100)
+        compressed.write(b"a" * 60)
+        self.assertEqual(raw.getvalue(), b"")
+        compressed.write(b"b" * 60)
+        first_block = raw.getvalue()
+        self.assertEqual(compressed.blocks_written, 1)
+        self.assertEqual(gzip.decompress(first_block), b"a" * 60 + b"b" * 60)
+
+        compressed.write(b"c" * 10)
+        raw.close = lambda: None
+        compressed.close()
+        self.assertEqual(compressed.blocks_written, 2)
+        self.assertEqual(compressed.compressed_bytes, len(raw.getvalue()))
+        self.assertEqual(gzip.decompress(raw.getvalue()), b"a" * 60 + b"b" * 60 + b"c" * 10)
+
+    def test_partial_block_is_compressed_after_delay(self):
+        """Test that flush only compresses a partial block once it reached the maximum delay."""
+        raw = io.BytesIO()
+        compressed = BlockCompressedFile(raw, 'gzip', block_size=1000, max_delay=1.0)
+        with patch('tcp_monitor.capture.compression.time.monotonic', return_value=10.0):
+            compressed.write(b"x" * 10)
+            self.assertEqual(compressed.deadline, 11.0)
+            compressed.flush()
+        self.assertEqual(compressed.blocks_written, 0)
+        with patch('tcp_monitor.capture.compression.time.monotonic', return_value=11.5):
+            compressed.flush()
+        self.assertEqual(compressed.blocks_written, 1)
+        self.assertIsNone(compressed.deadline)
+
+    @unittest.skipUnless(ZSTD_AVAILABLE, "zstandard is not installed")
+    def test_zstd_frames(self):
+        """Test that zstd blocks are concatenated frames."""
+        raw = io.BytesIO()
+        compressed = BlockCompressedFile(raw, 'zstd', block_size=50)
+        compressed.write(b"a" * 50)
+        compressed.write(b"b" * 20)
+        compressed.flush(force=True)
+        self.assertEqual(compressed.blocks_written, 2)
+        self.assertEqual(detect_compression(raw.getvalue()), 'zstd')
+
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw.getvalue()),
+                                                            read_across_frames=True)
+        self.assertEqual(reader.read(), b"a" * 50 + b"b" * 20)
+
+    def test_truncated_stream(self):
+        """Test that a stream cut off inside a block reads as ending at the last full block."""
+        data = gzip.compress(b"a" * 40, mtime=0)
+        data += gzip.compress(b"b" * 40, mtime=0)[:-10]
+        stream = gzip.GzipFile(fileobj=io.BytesIO(data))
+        self.assertEqual(read_exact(stream, 40), b"a" * 40)
+        self.assertIsNone(read_exact(stream, 40))
+
+    def test_settings(self):
+        """Test validation and detection of compression formats."""
+        check_compression('gzip', 9)
+        with self.assertRaises(ValueError):
+            check_compression('bzip2')
+        with self.assertRaises(ValueError):
+            check_compression('gzip', 10)
+        with self.assertRaises(ValueError):
+            BlockCompressedFile(io.BytesIO(), 'gzip', block_size=0)
+        self.assertEqual(detect_compression(b"\x1f\x8b\x08\x00"), 'gzip')
+        self.assertIsNone(detect_compression(b"\xd4\xc3\xb2\xa1"))
+
+        with patch('tcp_monitor.capture.compression.ZSTD_AVAILABLE', False):
+            with self.assertRaises(ValueError):
+                check_compression('zstd')
+
+
+if __name__ == '__main__':
+    unittest.main()
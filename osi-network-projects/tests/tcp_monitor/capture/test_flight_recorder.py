@@ -0,0 +1,156 @@
+import os
+import tempfile
+import threading
+import unittest
+from tcp_monitor.capture.flight_recorder import FlightRecorder, RstStormTrigger
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.packet_capture import PacketCapture
+from tests.tcp_monitor.helpers import build_tcp_frame, read_pcap
+
+
+class TestFlightRecorder(unittest.TestCase):
+    """Test suite for the FlightRecorder class."""
+
+    def setUp(self):
+        """Set up a temporary output directory before each test case."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "incident.pcap")
+
+    def tearDown(self):
+        """Remove the temporary output directory."""
+        self.temp_dir.cleanup()
+
+    def test_buffer_keeps_latest_frames(self):
+        """Test that the oldest frames are evicted once the buffer is full, across wrap-arounds."""
+        # Each record takes 16 + 60 bytes, so 4 fit in 330 bytes
+        recorder = FlightRecorder(self.file_path, max_bytes=330, post_trigger=0)
+        for i in range(11):
+            recorder.record(RawFrame(float(i), bytes([i]) * 60, 1500))
+        self.assertEqual(recorder.buffered_packets, 4)
+        self.assertEqual(recorder.buffered_bytes, 4 * 76)
+
+        dump_path = recorder.trigger("test")
+        recorder.finish()
+        self.assertTrue(dump_path.endswith("incident_00001.pcap"))
+        records = read_pcap(dump_path)
+        self.assertEqual([record[0] for record in records], [7.0, 8.0, 9.0, 10.0])
+        self.assertEqual(records[0][1:], (bytes([7]) * 60, 1500))
+
+    def test_variable_frame_sizes(self):
+        """Test eviction with frames of different sizes."""
+        recorder = FlightRecorder(self.file_path, max_bytes=500, post_trigger=0)
+        for i in range(50):
+            recorder.record(RawFrame(float(i), bytes([i]) * (20 + i * 7 % 100)))
+        recorder.trigger()
+        recorder.finish()
+
+        records = read_pcap(recorder.dumps[0])
+        self.assertEqual(records[-1][0], 49.0)
+        self.assertEqual([record[0] for record in records], sorted(record[0] for record in records))
+        for timestamp, data, _ in records:
+            self.assertEqual(data, bytes([int(timestamp)]) * (20 + int(timestamp) * 7 % 100))
+
+    def test_time_window(self):
+        """Test that frames older than the window are evicted."""
+        recorder = FlightRecorder(self.file_path, max_seconds=2.5)
+        for i in range(10):
+            recorder.record(RawFrame(float(i), b"\x00" * 60))
+        self.assertEqual(recorder.buffered_packets, 3)
+
+    def test_post_trigger_window(self):
+        """Test that frames within the post-trigger window are appended to the dump."""
+        recorder = FlightRecorder(self.file_path, post_trigger=2)
+        recorder.record(RawFrame(10.0, b"\x01" * 60))
+        recorder.trigger()
+        self.assertTrue(recorder.is_dumping)
+        self.assertEqual(recorder.trigger(), recorder.dumps[0])
+        for timestamp in (11.0, 12.0, 12.5):
+            recorder.record(RawFrame(timestamp, b"\x02" * 60))
+        self.assertFalse(recorder.is_dumping)
+        recorder.finish()
+
+        self.assertEqual([record[0] for record in read_pcap(recorder.dumps[0])], [10.0, 11.0, 12.0])
+        self.assertEqual(len(recorder.dumps), 1)
+
+    def test_trigger_from_another_thread(self):
+        """Test that a trigger racing the capture thread dumps every frame exactly once."""
+        recorder = FlightRecorder(self.file_path, post_trigger=1_000_000)
+        started = threading.Event()
+
+        def capture():
+            for i in range(2000):
+                recorder.record(RawFrame(float(i), i.to_bytes(2, 'big') * 30))
+                if i == 100:
+                    started.set()
+
+        capture_thread = threading.Thread(target=capture)
+        capture_thread.start()
+        started.wait()
+        recorder.trigger("api")
+        capture_thread.join()
+        recorder.finish()
+
+        records = read_pcap(recorder.dumps[0])
+        self.assertEqual([record[0] for record in records], [float(i) for i in range(2000)])
+
+    def test_timestamps_are_rounded(self):
+        """Test that buffered records round microseconds like the pcap writer."""
+        recorder = FlightRecorder(self.file_path, post_trigger=0)
+        recorder.record(RawFrame(1.9999996, b"\x00" * 60))
+        recorder.trigger()
+        recorder.finish()
+        self.assertEqual(read_pcap(recorder.dumps[0])[0][0], 2.0)
+
+    def test_rst_storm_trigger(self):
+        """Test that a burst of resets triggers a dump."""
+        recorder = FlightRecorder(self.file_path, post_trigger=0,
+                                  trigger=RstStormTrigger(threshold=3, window=1.0))
+        recorder.record(RawFrame(0.0, build_tcp_frame(flags=0x10)))
+        recorder.record(RawFrame(0.1, build_tcp_frame(flags=0x04)))
+        recorder.record(RawFrame(1.5, build_tcp_frame(flags=0x04)))
+        recorder.record(RawFrame(1.6, build_tcp_frame(flags=0x04)))
+        self.assertEqual(recorder.dumps, [])
+        recorder.record(RawFrame(1.7, build_tcp_frame(flags=0x14)))
+        recorder.finish()
+
+        self.assertEqual(len(recorder.dumps), 1)
+        self.assertEqual(len(read_pcap(recorder.dumps[0])), 5)
+
+    def test_oversized_frames_are_skipped(self):
+        """Test that a frame larger than the buffer is not recorded."""
+        recorder = FlightRecorder(self.file_path, max_bytes=100)
+        recorder.record(RawFrame(0.0, b"\x00" * 200))
+        self.assertEqual(recorder.buffered_packets, 0)
+
+    def test_invalid_settings(self):
+        """Test validation of the recorder settings."""
+        with self.assertRaises(ValueError):
+            FlightRecorder("")
+        with self.assertRaises(ValueError):
+            FlightRecorder(self.file_path, max_bytes=8)
+        with self.assertRaises(ValueError):
+            FlightRecorder(self.file_path, max_seconds=0)
+        with self.assertRaises(ValueError):
+            RstStormTrigger(threshold=0)
+
+    def test_packet_capture_integration(self):
+        """Test the flight recorder through PacketCapture."""
+        capture = PacketCapture()
+        with self.assertRaises(ValueError):
+            capture.trigger_recording()
+
+        capture.set_flight_recorder(self.file_path, max_bytes=1024, post_trigger=1)
+        capture.set_sampling(4)
+        for i in range(5):
+            capture._process_packet(RawFrame(float(i), b"\x00" * 60))
+        dump_path = capture.trigger_recording("manual")
+        capture._process_packet(RawFrame(4.5, b"\x00" * 60))
+        capture.flight_recorder.finish()
+
+        self.assertEqual(len(read_pcap(dump_path)), 6)
+        capture.set_flight_recorder(None)
+        self.assertIsNone(capture.flight_recorder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import errno
+import mmap
+import select
+import socket
+import struct
+import unittest
+from unittest.mock import Mock, patch
+from tcp_monitor.capture.mmap_ring import (MmapRingSniffer, BLOCK_STATUS_OFFSET, FRAME_HEADER,
+                                           TP_STATUS_KERNEL, TP_STATUS_USER)
+from tcp_monitor.capture.raw_socket import ETH_P_ALL
+
+
+class TestMmapRingSniffer(unittest.TestCase):
+    """Test suite for the MmapRingSniffer class.
+
+    The kernel ring is simulated with a bytearray laid out like TPACKET_V3 blocks,
+    so the block walking logic can be tested without privileges.
+    """
+
+    def setUp(self):
+        """Build a two-block ring where the first block holds two frames."""
+        self.block_size = mmap.PAGESIZE
+        self.frames = [b"\xaa" * 60, b"\xbb" * 74]
+        ring = bytearray(self.block_size * 2)
+
+        first_packet = 48
+        mac_offset = 80
+        offsets = [first_packet, first_packet + 256]
+        struct.pack_into('III', ring, BLOCK_STATUS_OFFSET, TP_STATUS_USER, 2, first_packet)
+        for index, (offset, data) in enumerate(zip(offsets, self.frames)):
+            next_offset = offsets[1] - offsets[0] if index == 0 else 0
+            FRAME_HEADER.pack_into(ring, offset, next_offset, 1700000000 + index, 500_000_000,
+                                   len(data), len(data), 0, mac_offset)
+            ring[offset + mac_offset:offset + mac_offset + len(data)] = data
+        self.ring = ring
+
+        self.sniffer = MmapRingSniffer(iface="eth0", block_size=self.block_size, block_count=2)
+        self.sniffer._ring = memoryview(self.ring)
+
+    def test_block_ready(self):
+        """Test detection of blocks handed over to userspace."""
+        self.assertTrue(self.sniffer._block_ready(0))
+        self.assertFalse(self.sniffer._block_ready(self.block_size))
+
+    def test_process_block_delivers_views(self):
+        """Test that frames are delivered as memoryviews over the ring without copying."""
+        delivered = []
+
+        def callback(frame):
+            self.assertIsInstance(frame.data, memoryview)
+            self.assertIs(frame.data.obj, self.ring)
+            delivered.append((frame.timestamp, bytes(frame.data)))
+
+        self.sniffer.prn = callback
+        self.assertTrue(self.sniffer._process_block(0))
+
+        self.assertEqual(delivered, [(1700000000.5, self.frames[0]),
+                                     (1700000001.5, self.frames[1])])
+        # The block is returned to the kernel
+        status = struct.unpack_from('I', self.ring, BLOCK_STATUS_OFFSET)[0]
+        self.assertEqual(status, TP_STATUS_KERNEL)
+
+    def test_process_block_store_and_count(self):
+        """Test that stored frames are copied and the packet count stops the capture."""
+        self.sniffer.store = True
+        self.sniffer.count = 1
+        self.sniffer.prn = Mock()
+
+        self.assertFalse(self.sniffer._process_block(0))
+        self.assertEqual(self.sniffer.prn.call_count, 1)
+        self.assertEqual(len(self.sniffer.results), 1)
+        self.assertIsInstance(self.sniffer.results[0].data, bytes)
+        self.assertEqual(self.sniffer.results[0].data, self.frames[0])
+
+    @patch('tcp_monitor.capture.mmap_ring.mmap.mmap')
+    @patch('tcp_monitor.capture.mmap_ring.socket.socket')
+    def test_socket_is_bound_to_the_interface_protocol(self, mock_socket_class, mock_mmap):
+        """Test that the socket only starts receiving when bound to the interface."""
+        mock_mmap.return_value = bytearray(self.block_size * 2)
+        self.sniffer._open_ring()
+
+        mock_socket_class.assert_called_once_with(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        mock_socket_class.return_value.bind.assert_called_once_with(("eth0", socket.htons(ETH_P_ALL)))
+
+    @patch('tcp_monitor.capture.mmap_ring.select.poll')
+    def test_socket_error_is_raised_by_stop(self, mock_poll):
+        """Test that an error reported by the socket ends the capture and is raised by stop()."""
+        mock_poll.return_value.poll.return_value = [(3, select.POLLERR)]
+        self.sniffer._socket = Mock()
+        self.sniffer._socket.getsockopt.side_effect = [errno.ENETDOWN, OSError()]
+        self.sniffer._mmap = Mock()
+        struct.pack_into('I', self.ring, BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+
+        self.sniffer._run()
+        self.assertEqual(self.sniffer.error.errno, errno.ENETDOWN)
+        with self.assertRaises(OSError):
+            self.sniffer.stop()
+
+    def test_invalid_geometry(self):
+        """Test validation of the ring geometry."""
+        with self.assertRaises(ValueError):
+            MmapRingSniffer(iface="eth0", block_size=1000)
+        with self.assertRaises(ValueError):
+            MmapRingSniffer(iface="eth0", block_count=0)
+        with self.assertRaises(ValueError):
+            MmapRingSniffer(iface="eth0", frame_size=1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
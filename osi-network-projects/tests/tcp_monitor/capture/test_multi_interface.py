@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import Mock
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.multi_interface import FrameMerger, MultiInterfaceSniffer
+
+
+class TestFrameMerger(unittest.TestCase):
+    """Test suite for the FrameMerger class."""
+
+    def setUp(self):
+        """Set up a merger collecting its output in a list."""
+        self.output = []
+        self.merger = FrameMerger(self.output.append, reorder_window=0.5, dedup_window=0.1)
+
+    def timestamps(self):
+        """Helper returning the timestamps of the merged packets."""
+        return [packet.timestamp for packet in self.output]
+
+    def test_timestamp_order_within_window(self):
+        """Test that packets arriving out of order within the window are sorted."""
+        for timestamp, index in ((1.0, 0), (1.2, 0), (1.1, 1), (1.3, 1), (1.25, 0)):
+            self.merger.add(RawFrame(timestamp, bytes([int(timestamp * 100) % 256])), index)
+        self.assertEqual(self.output, [])
+
+        self.merger.add(RawFrame(1.8, b"\xff"), 1)
+        self.assertEqual(self.timestamps(), [1.0, 1.1, 1.2, 1.25, 1.3])
+        self.assertEqual(self.merger.reordered, 2)
+        self.assertEqual(self.merger.pending, 1)
+        self.assertEqual(self.merger.flush(), 1)
+        self.assertEqual(self.timestamps()[-1], 1.8)
+
+    def test_release_by_clock(self):
+        """Test that held packets are released once the window has passed on the clock."""
+        self.merger.add(RawFrame(10.0, b"\x01"), 0)
+        self.assertEqual(self.merger.release(now=10.2), 0)
+        self.assertEqual(self.merger.release(now=10.6), 1)
+
+    def test_cross_interface_duplicates_are_dropped(self):
+        """Test that the same frame seen on two interfaces is delivered once."""
+        frame = b"\x45" * 60
+        self.merger.add(RawFrame(1.0, frame), 0)
+        self.merger.add(RawFrame(1.001, frame), 1)
+        # Same contents on the same interface is a distinct packet
+        self.merger.add(RawFrame(1.002, frame), 0)
+        # Outside the dedup window
+        self.merger.add(RawFrame(1.5, frame), 1)
+        self.merger.flush()
+
+        self.assertEqual(self.timestamps(), [1.0, 1.002, 1.5])
+        self.assertEqual(self.merger.duplicates, 1)
+
+    def test_dedup_disabled(self):
+        """Test that a zero dedup window keeps every copy."""
+        merger = FrameMerger(self.output.append, reorder_window=0, dedup_window=0)
+        merger.add(RawFrame(1.0, b"\x01"), 0)
+        merger.add(RawFrame(1.0, b"\x01"), 1)
+        self.assertEqual(len(self.output), 2)
+
+    def test_memoryview_frames_are_copied(self):
+        """Test that ring-buffer views are copied before being held."""
+        ring = bytearray(b"\x01" * 4)
+        self.merger.add(RawFrame(1.0, memoryview(ring)), 0)
+        ring[:] = b"\x02" * 4
+        self.merger.flush()
+        self.assertEqual(self.output[0].data, b"\x01" * 4)
+
+    def test_invalid_windows(self):
+        """Test validation of the windows."""
+        with self.assertRaises(ValueError):
+            FrameMerger(print, reorder_window=-1)
+
+
+class TestMultiInterfaceSniffer(unittest.TestCase):
+    """Test suite for the MultiInterfaceSniffer class."""
+
+    def test_sniffers_feed_merged_stream(self):
+        """Test that one sniffer per interface feeds the merger and stop flushes it."""
+        output = []
+        sniffers = {}
+
+        def factory(iface, prn):
+            sniffer = Mock()
+            sniffer.prn = prn
+            sniffer.kernel_statistics.return_value = {'packets': 2, 'drops': 1}
+            sniffers[iface] = sniffer
+            return sniffer
+
+        sniffer = MultiInterfaceSniffer(["eth0", "eth1"], factory, prn=output.append, store=True,
+                                        reorder_window=10)
+        sniffer.start()
+        sniffers["eth1"].prn(RawFrame(2.0, b"\x02"))
+        sniffers["eth0"].prn(RawFrame(1.0, b"\x01"))
+        sniffers["eth0"].prn(RawFrame(2.005, b"\x02"))
+        results = sniffer.stop()
+
+        self.assertEqual([packet.timestamp for packet in output], [1.0, 2.0])
+        self.assertEqual(results, output)
+        self.assertEqual(sniffer.merger.duplicates, 1)
+        for mock_sniffer in sniffers.values():
+            mock_sniffer.start.assert_called_once()
+            mock_sniffer.stop.assert_called_once()
+        self.assertEqual(sniffer.kernel_statistics(), {'packets': 4, 'drops': 2})
+
+    def test_failed_start_stops_started_sniffers(self):
+        """Test that sniffers already started are stopped if another fails to start."""
+        first, second = Mock(), Mock()
+        second.start.side_effect = OSError("no such device")
+        sniffer = MultiInterfaceSniffer(["eth0", "eth1"], Mock(side_effect=[first, second]))
+        with self.assertRaises(OSError):
+            sniffer.start()
+        first.stop.assert_called_once()
+
+    def test_requires_interfaces(self):
+        """Test that an empty interface list is rejected."""
+        with self.assertRaises(ValueError):
+            MultiInterfaceSniffer([], Mock())
+
+
+if __name__ == '__main__':
+    unittest.main()
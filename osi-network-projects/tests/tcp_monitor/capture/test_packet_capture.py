@@ -1,5 +1,8 @@
 import unittest
 from unittest.mock import Mock, patch
+from scapy.error import Scapy_Exception
+from tcp_monitor.capture.bpf_filter import BPFFilter
+from tcp_monitor.capture.frame import RawFrame, frame_weight
 from tcp_monitor.capture.packet_capture import PacketCapture
 
 class TestPacketCapture(unittest.TestCase):
@@ -271,6 +274,393 @@ class TestPacketCapture(unittest.TestCase):
                 # Check second argument is the results
                 self.assertEqual(mock_wrpcap.call_args[0][1], self.mock_sniffer_instance.results)
 
+    @patch('tcp_monitor.capture.packet_capture.RotatingPcapWriter')
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_streaming_output(self, mock_async_sniffer, mock_writer_class):
+        """Test that streaming output writes packets as they arrive instead of storing them."""
+        mock_writer = mock_writer_class.return_value
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.set_output_file("capture.pcap", streaming=True,
+                                            max_file_size=1024, max_files=3)
+        self.packet_capture.start_capture()
+
+        # Packets must not be buffered in the sniffer
+        self.assertEqual(mock_async_sniffer.call_args[1]['store'], False)
+        mock_writer_class.assert_called_once_with("capture.pcap", snaplen=None, max_file_size=1024,
+                                                  max_file_duration=None, max_file_packets=None,
+                                                  max_files=3, batch_size=1000, compression=None,
+                                                  compression_level=None, index=False)
+        mock_writer.start.assert_called_once()
+        self.assertIs(self.packet_capture.output_writer, mock_writer)
+
+        self.packet_capture._process_packet(self.sample_packet)
+        mock_writer.write.assert_called_once_with(self.sample_packet)
+
+        with patch('tcp_monitor.capture.packet_capture.wrpcap') as mock_wrpcap:
+            self.packet_capture.stop_capture()
+            mock_wrpcap.assert_not_called()
+
+        # Compression happens on the writer thread, so it needs streaming output
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_output_file("capture.pcap.gz", compression="gzip")
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_output_file("capture.pcap.gz", streaming=True, compression="lzma")
+        self.packet_capture.set_output_file("capture.pcap.gz", streaming=True, compression="gzip")
+        self.assertEqual(self.packet_capture._writer_options['compression'], "gzip")
+        mock_writer.close.assert_called_once()
+        self.assertIsNone(self.packet_capture.output_writer)
+
+    def test_rotation_requires_streaming(self):
+        """Test that rotation settings are rejected for buffered output."""
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_output_file("capture.pcap", max_file_size=1024)
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_output_file("capture.pcap", streaming=True, max_files=3)
+
+    def test_backend_property(self):
+        """Test backend selection and validation."""
+        self.assertEqual(self.packet_capture.backend, "scapy")
+        self.packet_capture.backend = "raw"
+        self.assertEqual(self.packet_capture.backend, "raw")
+
+        with self.assertRaises(ValueError):
+            self.packet_capture.backend = "pcap"
+
+        with patch.object(self.packet_capture, '_is_running', True):
+            with self.assertRaises(ValueError):
+                self.packet_capture.backend = "scapy"
+
+    @patch('tcp_monitor.capture.packet_capture.append_pcap')
+    @patch('tcp_monitor.capture.packet_capture.RawSocketSniffer')
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_raw_backend(self, mock_async_sniffer, mock_raw_sniffer, mock_append_pcap):
+        """Test that the raw backend uses RawSocketSniffer with the same filter."""
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.backend = "raw"
+        self.packet_capture.set_filters(port=80)
+        self.packet_capture.set_output_file("capture.pcap")
+        self.packet_capture.start_capture(duration=10, count=5)
+
+        mock_async_sniffer.assert_not_called()
+        mock_raw_sniffer.assert_called_once_with(
+            iface="eth0",
+            filter="(tcp) and port 80",
+            prn=self.packet_capture._process_packet,
+            count=5,
+            timeout=10,
+            store=True,
+            snaplen=None
+        )
+
+        self.packet_capture.stop_capture()
+        mock_append_pcap.assert_called_once_with("capture.pcap",
+                                                 mock_raw_sniffer.return_value.results,
+                                                 snaplen=None)
+
+    @patch('tcp_monitor.capture.packet_capture.RawSocketSniffer')
+    def test_multiple_interfaces(self, mock_raw_sniffer):
+        """Test that a list of interfaces starts one sniffer per interface behind a merger."""
+        self.packet_capture.interface = ["eth0", "eth1"]
+        self.assertEqual(self.packet_capture.interfaces, ["eth0", "eth1"])
+        self.packet_capture.backend = "raw"
+        self.packet_capture.set_merge_options(reorder_window_ms=0, dedup_window_ms=50)
+        self.packet_capture.start_capture(duration=10, count=5)
+
+        self.assertEqual([call.kwargs['iface'] for call in mock_raw_sniffer.call_args_list],
+                         ["eth0", "eth1"])
+        self.assertEqual(mock_raw_sniffer.call_args.kwargs['filter'], "(tcp)")
+        prn = mock_raw_sniffer.call_args.kwargs['prn']
+        first_prn = mock_raw_sniffer.call_args_list[0].kwargs['prn']
+        first_prn(RawFrame(1.0, b"\x00" * 60))
+        prn(RawFrame(1.01, b"\x00" * 60))
+        self.packet_capture.stop_capture()
+
+        self.assertEqual(self.packet_capture.packet_count, 1)
+        self.assertEqual(mock_raw_sniffer.return_value.stop.call_count, 2)
+        self.assertEqual(self.packet_capture.get_statistics()['duplicates'], 1)
+
+        self.packet_capture.interface = ["eth2"]
+        self.assertEqual(self.packet_capture.interface, "eth2")
+        with self.assertRaises(ValueError):
+            self.packet_capture.interface = ["eth0", ""]
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_merge_options(reorder_window_ms=-1)
+
+    @patch('tcp_monitor.capture.packet_capture.MmapRingSniffer')
+    def test_mmap_backend(self, mock_ring_sniffer):
+        """Test that the mmap backend receives the ring options and exposes kernel statistics."""
+        mock_ring_sniffer.return_value.kernel_statistics.return_value = {
+            'packets': 10, 'drops': 2, 'freeze_queue_count': 0}
+        self.assertIsNone(self.packet_capture.kernel_statistics)
+
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.backend = "mmap"
+        self.packet_capture.set_ring_options(block_size=1 << 22, retire_timeout_ms=10)
+        self.packet_capture.start_capture(duration=10, count=0)
+
+        mock_ring_sniffer.assert_called_once_with(
+            iface="eth0",
+            filter="(tcp)",
+            prn=self.packet_capture._process_packet,
+            count=0,
+            timeout=10,
+            store=False,
+            block_size=1 << 22,
+            retire_timeout_ms=10,
+            snaplen=None
+        )
+        self.assertEqual(self.packet_capture.kernel_statistics['drops'], 2)
+
+    @patch('tcp_monitor.capture.packet_capture.append_pcap')
+    @patch('tcp_monitor.capture.packet_capture.wrpcap')
+    @patch('tcp_monitor.capture.packet_capture.RawSocketSniffer')
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_snaplen(self, mock_async_sniffer, mock_raw_sniffer, mock_wrpcap, mock_append_pcap):
+        """Test that the snap length reaches the kernel backends and the output file."""
+        self.assertIsNone(self.packet_capture.snaplen)
+        self.packet_capture.set_snaplen("headers")
+        self.assertEqual(self.packet_capture.snaplen, 138)
+
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.backend = "raw"
+        self.packet_capture.start_capture()
+        self.assertEqual(mock_raw_sniffer.call_args[1]['snaplen'], 138)
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_snaplen(96)
+        self.packet_capture.stop_capture()
+
+        # The Scapy backend truncates when writing, keeping the wire lengths
+        self.packet_capture.backend = "scapy"
+        self.packet_capture.set_output_file("capture.pcap")
+        self.packet_capture.start_capture()
+        self.packet_capture.stop_capture()
+        mock_wrpcap.assert_not_called()
+        mock_append_pcap.assert_called_once_with("capture.pcap",
+                                                 mock_async_sniffer.return_value.results,
+                                                 snaplen=138)
+
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_snaplen("payload")
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_snaplen(0)
+        self.packet_capture.set_snaplen(None)
+        self.assertIsNone(self.packet_capture.snaplen)
+
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_pipeline_mode(self, mock_async_sniffer):
+        """Test that pipeline mode runs the callback on worker threads and exposes counters."""
+        callback_mock = Mock()
+        self.packet_capture.packet_callback = callback_mock
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.set_pipeline(workers=2, queue_size=10, overflow_policy="drop-newest")
+
+        self.assertEqual(self.packet_capture.queue_depth, 0)
+        self.assertIsNone(self.packet_capture.callback_latency)
+
+        self.packet_capture.start_capture()
+        for _ in range(3):
+            self.packet_capture._process_packet(self.sample_packet)
+        self.packet_capture.stop_capture()
+
+        self.assertEqual(self.packet_capture.packet_count, 3)
+        self.assertEqual(callback_mock.call_count, 3)
+        self.assertEqual(self.packet_capture.dropped_packets, 0)
+        self.assertEqual(self.packet_capture.queue_depth, 0)
+        self.assertEqual(self.packet_capture.callback_latency['count'], 3)
+
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_batch_callback(self, mock_async_sniffer):
+        """Test that the batch callback receives packets in lists of the configured size."""
+        batches = []
+        self.packet_capture.batch_callback = batches.append
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.set_batching(batch_size=2, max_delay_ms=10000)
+
+        self.packet_capture.start_capture()
+        for _ in range(5):
+            self.packet_capture._process_packet(self.sample_packet)
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+        self.packet_capture.stop_capture()
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(self.packet_capture.get_statistics()['batches'], 3)
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_batching(batch_size=0)
+
+    def test_set_pipeline_validation(self):
+        """Test that invalid pipeline settings are rejected and workers=0 disables it."""
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_pipeline(overflow_policy="unknown")
+
+        self.packet_capture.set_pipeline(workers=2)
+        self.packet_capture.set_pipeline(workers=0)
+        callback_mock = Mock()
+        self.packet_capture.packet_callback = callback_mock
+        self.packet_capture._process_packet(self.sample_packet)
+        callback_mock.assert_called_once_with(self.sample_packet)
+
+        with patch.object(self.packet_capture, '_is_running', True):
+            with self.assertRaises(ValueError):
+                self.packet_capture.set_pipeline(workers=4)
+
+    @patch('scapy.arch.common.free_filter')
+    @patch('scapy.arch.common.compile_filter')
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_capture_filter(self, mock_async_sniffer, mock_compile_filter, mock_free_filter):
+        """Test that a BPFFilter replaces the simple filters and is compiled before capture."""
+        bpf = BPFFilter()
+        bpf.add_hosts("10.0.0.0/8", direction="src")
+        bpf.set_tcp_flags(set_flags=["syn"], clear_flags=["ack"])
+        self.packet_capture.set_filters(port=80)
+        self.packet_capture.set_capture_filter(bpf)
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.start_capture()
+
+        expected = "(tcp) and src net 10.0.0.0/8 and tcp[tcpflags] & (tcp-syn|tcp-ack) == tcp-syn"
+        mock_compile_filter.assert_called_once_with(expected, linktype=1)
+        # The program is only compiled to validate the expression, and is released again
+        mock_free_filter.assert_called_once_with(mock_compile_filter.return_value)
+        self.assertEqual(mock_async_sniffer.call_args[1]['filter'], expected)
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_capture_filter(None)
+        self.packet_capture.stop_capture()
+
+        # An expression rejected by libpcap stops the capture from starting
+        mock_compile_filter.side_effect = Scapy_Exception("bad filter")
+        mock_async_sniffer.reset_mock()
+        with self.assertRaises(ValueError):
+            self.packet_capture.start_capture()
+        mock_async_sniffer.assert_not_called()
+        self.assertFalse(self.packet_capture.is_running)
+
+        self.packet_capture.set_capture_filter(None)
+        self.assertEqual(self.packet_capture._build_filter_string(), "(tcp) and port 80")
+        # The simple filters pass protocol names through to libpcap unchecked
+        self.packet_capture.set_filters(port=80, protocols=["vrrp"])
+        self.assertEqual(self.packet_capture._build_filter_string(), "(vrrp) and port 80")
+        with self.assertRaises(TypeError):
+            self.packet_capture.set_capture_filter("tcp port 80")
+
+    @patch('scapy.arch.common.free_filter')
+    @patch('scapy.arch.common.compile_filter')
+    @patch('tcp_monitor.capture.packet_capture.RawSocketSniffer')
+    def test_live_filter_swap(self, mock_raw_sniffer, mock_compile_filter, mock_free_filter):
+        """Test that a running raw capture gets its filter replaced without restarting."""
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.backend = "raw"
+        self.packet_capture.start_capture()
+        sniffer = mock_raw_sniffer.return_value
+
+        bpf = BPFFilter()
+        bpf.add_ports(443)
+        self.packet_capture.set_capture_filter(bpf)
+        sniffer.set_filter.assert_called_once_with("(tcp) and port 443")
+        mock_free_filter.assert_called_once_with(mock_compile_filter.return_value)
+        mock_raw_sniffer.assert_called_once()
+        sniffer.stop.assert_not_called()
+
+        # A rejected expression leaves the previous filter attached
+        mock_compile_filter.side_effect = Scapy_Exception("bad filter")
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_capture_filter(BPFFilter(["udp"]))
+        self.assertIs(self.packet_capture._capture_filter, bpf)
+        self.assertEqual(sniffer.set_filter.call_count, 1)
+
+        mock_compile_filter.side_effect = None
+        self.packet_capture.set_capture_filter(None)
+        sniffer.set_filter.assert_called_with("(tcp)")
+        self.packet_capture.stop_capture()
+
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_pause_resume(self, mock_async_sniffer):
+        """Test that paused packets are counted as missed instead of processed."""
+        callback = Mock()
+        self.packet_capture.packet_callback = callback
+        with self.assertRaises(ValueError):
+            self.packet_capture.pause()
+
+        self.packet_capture.interface = "eth0"
+        self.packet_capture.start_capture()
+        self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 60))
+        self.packet_capture.pause()
+        self.assertTrue(self.packet_capture.is_paused)
+        self.packet_capture._process_packet(RawFrame(1.1, b"\x00" * 60))
+        self.packet_capture._process_packet(RawFrame(1.2, b"\x00" * 60))
+        self.packet_capture.resume()
+        self.packet_capture._process_packet(RawFrame(1.3, b"\x00" * 60))
+
+        self.assertEqual(callback.call_count, 2)
+        self.assertEqual(self.packet_capture.packet_count, 2)
+        self.assertEqual(self.packet_capture.missed_packets, 2)
+        statistics = self.packet_capture.get_statistics()
+        self.assertEqual((statistics['paused'], statistics['missed']), (False, 2))
+        mock_async_sniffer.return_value.stop.assert_not_called()
+
+        self.packet_capture.pause()
+        self.packet_capture.stop_capture()
+        self.assertFalse(self.packet_capture.is_paused)
+
+    def test_get_statistics(self):
+        """Test that the statistics combine packet, callback, kernel and queue metrics."""
+        self.packet_capture.packet_callback = Mock()
+        for _ in range(3):
+            self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 100))
+
+        statistics = self.packet_capture.get_statistics()
+        self.assertEqual(statistics['packets'], 3)
+        self.assertEqual(statistics['bytes'], 300)
+        self.assertEqual(statistics['callback_latency']['count'], 3)
+        self.assertIsNone(statistics['kernel'])
+        self.assertEqual(statistics['queue_depth'], 0)
+        self.assertEqual(statistics['dropped'], 0)
+        self.assertEqual(self.packet_capture.statistics.packets, 3)
+
+    def test_disable_packet_statistics(self):
+        """Test that packet counting into the statistics can be turned off."""
+        self.packet_capture.set_statistics(record_packets=False)
+        self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 100))
+
+        self.assertEqual(self.packet_capture.packet_count, 1)
+        self.assertEqual(self.packet_capture.get_statistics()['packets'], 0)
+
+    def test_sampling(self):
+        """Test that sampling limits the callback but not the counters."""
+        self.packet_capture.packet_callback = Mock()
+        self.packet_capture.set_sampling(4)
+        for _ in range(8):
+            self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 100))
+
+        self.assertEqual(self.packet_capture.packet_callback.call_count, 2)
+        self.assertEqual(self.packet_capture.packet_count, 8)
+        statistics = self.packet_capture.get_statistics()
+        self.assertEqual(statistics['packets'], 8)
+        self.assertEqual(statistics['sampling']['rate'], 4)
+        self.assertEqual(statistics['sampling']['sampled'], 2)
+        self.assertEqual(statistics['stages']['filter']['count'], 8)
+        for call in self.packet_capture.packet_callback.call_args_list:
+            self.assertEqual(frame_weight(call.args[0]), 4)
+
+        self.packet_capture.set_sampling(1)
+        self.assertIsNone(self.packet_capture.sampler)
+        self.assertIsNone(self.packet_capture.get_statistics()['sampling'])
+        with self.assertRaises(ValueError):
+            self.packet_capture.set_sampling(4, mode='random')
+
+    def test_sampled_packets_keep_their_weight(self):
+        """Test that a packet's weight is the rate it was sampled at, not the rate when it is processed."""
+        kept = []
+        self.packet_capture.packet_callback = kept.append
+        self.packet_capture.set_sampling(2, adaptive=True, max_rate=8)
+        self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 100))
+        self.packet_capture._process_packet(RawFrame(1.0, b"\x00" * 100))
+        self.packet_capture.sampler._set_rate(8)
+        packet = self.sample_packet
+        for _ in range(8):
+            self.packet_capture._process_packet(packet)
+
+        self.assertEqual([frame_weight(packet) for packet in kept], [2, 8])
+        self.assertEqual(frame_weight(RawFrame(1.0, b"")), 1)
+
     def test_stop_capture_not_running(self):
         """Test stopping capture when not running."""
         # Make sure is_running returns False
@@ -278,6 +668,21 @@ class TestPacketCapture(unittest.TestCase):
             # Stop capture - should not raise exception
             self.packet_capture.stop_capture()
 
+    @patch('tcp_monitor.capture.packet_capture.append_pcap')
+    def test_stop_capture_raises_socket_errors(self, mock_append_pcap):
+        """Test that a backend's socket error is raised once the capture is stopped and saved."""
+        sniffer = Mock(results=[RawFrame(1.0, b"\x00" * 60)])
+        sniffer.stop.side_effect = OSError("Network is down")
+        self.packet_capture.backend = "raw"
+        self.packet_capture.set_output_file("capture.pcap")
+        self.packet_capture._sniffer = sniffer
+        self.packet_capture._is_running = True
+
+        with self.assertRaises(OSError):
+            self.packet_capture.stop_capture()
+        mock_append_pcap.assert_called_once_with("capture.pcap", sniffer.results, snaplen=None)
+        self.assertFalse(self.packet_capture.is_running)
+
     def test_process_packet(self):
         """Test packet processing callback."""
         # Setup mock callback
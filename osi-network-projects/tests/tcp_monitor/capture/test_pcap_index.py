@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from tcp_monitor.capture.frame import flow_hash, tuple_flow_key
+from tcp_monitor.capture.packet_capture import PacketCapture
+from tcp_monitor.capture.pcap_index import (PcapIndex, build_index, extract_connection, extract_time_slice,
+                                            index_path, open_index)
+from tcp_monitor.capture.pcap_reader import PcapFileSource
+from tcp_monitor.capture.pcap_writer import RotatingPcapWriter, append_pcap
+from tcp_monitor.tracking.connection import TCPConnection
+from tests.tcp_monitor.helpers import build_tcp_frame
+
+
+class TestPcapIndex(unittest.TestCase):
+    """Test suite for the pcap sidecar index."""
+
+    def setUp(self):
+        """Write a pcap interleaving three connections over ten seconds."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "capture.pcap")
+        self.client = ("192.168.1.1", "10.0.0.1", 52800, 80)
+        self.packets = []
+        for i in range(30):
+            port = 52800 + i % 3
+            frame = (build_tcp_frame("192.168.1.1", port, "10.0.0.1", 80) if i % 2 == 0
+                     else build_tcp_frame("10.0.0.1", 80, "192.168.1.1", port))
+            self.packets.append((100.0 + i / 3, frame))
+        append_pcap(self.path, self.packets)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def test_tuple_key_matches_frames(self):
+        """Test that the 5-tuple key of a connection matches both directions of its frames."""
+        forward = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80)
+        reverse = build_tcp_frame("10.0.0.1", 80, "192.168.1.1", 52800)
+        self.assertEqual(flow_hash(forward), flow_hash(reverse))
+        key = tuple_flow_key(*self.client)
+        self.assertEqual(key, tuple_flow_key("10.0.0.1", "192.168.1.1", 80, 52800))
+        self.assertEqual(len(key), 1 + 2 * (4 + 2))
+
+    def test_build_save_and_load(self):
+        """Test that the index round-trips through its sidecar file."""
+        index = build_index(self.path)
+        self.assertTrue(os.path.exists(index_path(self.path)))
+        self.assertEqual(index.record_count, 30)
+        self.assertEqual(index.flow_count, 3)
+        self.assertEqual(index.file_size, os.path.getsize(self.path))
+
+        loaded = PcapIndex.load(index_path(self.path))
+        flow = flow_hash(self.packets[0][1])
+        self.assertEqual(loaded.flow_offsets(flow), index.flow_offsets(flow))
+        self.assertEqual(len(loaded.flow_offsets(flow)), 10)
+        self.assertEqual(loaded.time_range(101.0, 102.0), index.time_range(101.0, 102.0))
+        self.assertLess(os.path.getsize(index_path(self.path)), os.path.getsize(self.path))
+
+    def test_extract_connection(self):
+        """Test that a connection's packets in both directions are read by offset."""
+        expected = [(ts, frame) for i, (ts, frame) in enumerate(self.packets) if i % 3 == 0]
+        frames = [(frame.timestamp, bytes(frame.data)) for frame in extract_connection(self.path, self.client)]
+        self.assertEqual(frames, [(round(ts, 6), frame) for ts, frame in expected])
+
+        connection = TCPConnection(*self.client)
+        self.assertEqual(len(list(extract_connection(self.path, connection, start_time=105.0))), 5)
+
+        # Only the connection's records are read, not the whole file
+        with patch.object(PcapFileSource, 'read_records') as mock_read_records:
+            self.assertEqual(len(list(extract_connection(self.path, self.client))), 10)
+            mock_read_records.assert_not_called()
+
+    def test_extract_time_slice(self):
+        """Test that a time slice is read from the byte range of its buckets."""
+        index = open_index(self.path)
+        frames = list(extract_time_slice(self.path, 102.0, 104.0, index=index))
+        self.assertEqual([frame.timestamp for frame in frames],
+                         [round(ts, 6) for ts, _ in self.packets if 102.0 <= ts < 104.0])
+        start, end = index.time_range(102.0, 104.0)
+        self.assertGreater(start, 24)
+        self.assertLess(end, index.file_size)
+        self.assertEqual(list(extract_time_slice(self.path, 500.0, 600.0, index=index)), [])
+
+    def test_stale_index_is_rebuilt(self):
+        """Test that an index of a file that grew since is rebuilt."""
+        build_index(self.path)
+        append_pcap(self.path, [(200.0, build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80))])
+        index = open_index(self.path)
+        self.assertEqual(index.record_count, 31)
+        self.assertEqual(PcapIndex.load(index_path(self.path)).record_count, 31)
+
+        with open(index_path(self.path), "wb") as index_file:
+            index_file.write(b"garbage")
+        with self.assertRaises(ValueError):
+            PcapIndex.load(index_path(self.path))
+        self.assertEqual(open_index(self.path).record_count, 31)
+
+    def test_writer_saves_index(self):
+        """Test that the streaming writer indexes each file as it writes it."""
+        path = os.path.join(self.temp_dir.name, "written.pcap")
+        writer = RotatingPcapWriter(path, max_file_packets=20, index=True)
+        writer.start()
+        for packet in self.packets:
+            writer.write(packet)
+        writer.close()
+
+        for file_path in writer.files:
+            written = PcapIndex.load(index_path(file_path))
+            rebuilt = build_index(file_path, save=False)
+            self.assertEqual(written.file_size, rebuilt.file_size)
+            flow = flow_hash(self.packets[0][1])
+            self.assertEqual(written.flow_offsets(flow), rebuilt.flow_offsets(flow))
+
+        with self.assertRaises(ValueError):
+            RotatingPcapWriter(path, compression="gzip", index=True)
+
+    def test_read_file_connection(self):
+        """Test that PacketCapture.read_file processes only the requested connection or slice."""
+        capture = PacketCapture()
+        self.assertEqual(capture.read_file(self.path, connection=self.client), 10)
+        self.assertEqual(capture.read_file(self.path, start_time=100.0, end_time=101.0), 3)
+        self.assertEqual(capture.read_file(self.path, connection=self.client, end_time=101.0), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+import gzip
+import os
+import struct
+import tempfile
+import unittest
+from tcp_monitor.analyzers.ethernet_analyzer import EthernetAnalyzer
+from tcp_monitor.analyzers.ip_analyzer import IPAnalyzer
+from tcp_monitor.analyzers.tcp_analyzer import TCPAnalyzer
+from tcp_monitor.capture.packet_capture import PacketCapture
+from tcp_monitor.capture.pcap_reader import PcapFileSource
+from tcp_monitor.capture.pcap_writer import append_pcap
+from tcp_monitor.tracking.connection import TCPConnection
+from tests.tcp_monitor.helpers import build_tcp_frame
+
+
+def pcapng_block(block_type, body):
+    """Helper packing a little-endian pcapng block."""
+    body += b"\x00" * (-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+class TestPcapFileSource(unittest.TestCase):
+    """Test suite for the PcapFileSource class."""
+
+    def setUp(self):
+        """Set up a temporary directory and sample frames before each test case."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.frames = [b"\x11" * 60, b"\x22" * 74, b"\x33" * 90]
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        """Helper returning a path inside the temporary directory."""
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_read_pcap(self):
+        """Test reading a little-endian microsecond pcap file."""
+        path = self.path("capture.pcap")
+        append_pcap(path, [(100.25 + i, frame) for i, frame in enumerate(self.frames)])
+
+        with PcapFileSource(path) as source:
+            self.assertEqual(source.file_format, "pcap")
+            records = [(frame.timestamp, bytes(frame.data)) for frame in source]
+
+        self.assertEqual(records, [(100.25, self.frames[0]), (101.25, self.frames[1]),
+                                   (102.25, self.frames[2])])
+
+    def test_wire_length_of_truncated_records(self):
+        """Test that frames report the original length recorded in the file."""
+        path = self.path("headers.pcap")
+        append_pcap(path, [(1.0, self.frames[0] + b"\x00" * 1000)], snaplen=54)
+
+        with PcapFileSource(path) as source:
+            frame = next(iter(source))
+            self.assertEqual((len(frame.data), frame.wire_length), (54, len(self.frames[0]) + 1000))
+
+    def test_frames_are_memoryviews(self):
+        """Test that records are yielded as views over the mapped file."""
+        path = self.path("capture.pcap")
+        append_pcap(path, [(1.0, self.frames[0])])
+
+        with PcapFileSource(path) as source:
+            frame = next(iter(source))
+            self.assertIsInstance(frame.data, memoryview)
+            self.assertEqual(frame.data.tobytes(), self.frames[0])
+
+    def test_read_big_endian_nanosecond_pcap(self):
+        """Test reading a big-endian pcap file with nanosecond timestamps."""
+        path = self.path("capture_be.pcap")
+        with open(path, "wb") as pcap_file:
+            pcap_file.write(struct.pack('>IHHiIII', 0xa1b23c4d, 2, 4, 0, 0, 65535, 1))
+            pcap_file.write(struct.pack('>IIII', 5, 500_000_000, 60, 60) + self.frames[0])
+
+        with PcapFileSource(path) as source:
+            records = [(frame.timestamp, bytes(frame.data)) for frame in source]
+        self.assertEqual(records, [(5.5, self.frames[0])])
+
+    def test_truncated_record_is_ignored(self):
+        """Test that a record cut short by the end of the file is skipped."""
+        path = self.path("truncated.pcap")
+        append_pcap(path, [(1.0, self.frames[0]), (2.0, self.frames[1])])
+        with open(path, "r+b") as pcap_file:
+            pcap_file.truncate(os.path.getsize(path) - 10)
+
+        with PcapFileSource(path) as source:
+            self.assertEqual(len(list(source)), 1)
+
+    def test_read_pcapng(self):
+        """Test reading Enhanced and Simple Packet Blocks from a pcapng file."""
+        path = self.path("capture.pcapng")
+        section = pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+        # Interface with if_tsresol = 9 (nanoseconds)
+        options = struct.pack('<HHB', 9, 1, 9) + b"\x00" * 3 + struct.pack('<HH', 0, 0)
+        interface = pcapng_block(0x1, struct.pack('<HHI', 1, 0, 65535) + options)
+        timestamp = 1_700_000_000_250_000_000
+        enhanced = pcapng_block(0x6, struct.pack('<IIIII', 0, timestamp >> 32,
+                                                 timestamp & 0xFFFFFFFF, 74, 74) + self.frames[1])
+        custom = pcapng_block(0xBAD, b"ignored")
+        simple = pcapng_block(0x3, struct.pack('<I', 60) + self.frames[0])
+        with open(path, "wb") as pcapng_file:
+            pcapng_file.write(section + interface + enhanced + custom + simple)
+
+        with PcapFileSource(path) as source:
+            self.assertEqual(source.file_format, "pcapng")
+            records = [(frame.timestamp, bytes(frame.data)) for frame in source]
+
+        self.assertEqual(records, [(1_700_000_000.25, self.frames[1]), (0.0, self.frames[0])])
+
+    def test_read_compressed(self):
+        """Test that gzip pcap and pcapng files are read, ignoring a truncated final block."""
+        path = self.path("capture.pcap")
+        append_pcap(path, [(100.0 + i, frame) for i, frame in enumerate(self.frames)])
+        with open(path, 'rb') as pcap_file:
+            content = pcap_file.read()
+        compressed = self.path("capture.pcap.gz")
+        with open(compressed, 'wb') as gzip_file:
+            # Two complete blocks, then a block cut off by a crash
+            gzip_file.write(gzip.compress(content[:100]) + gzip.compress(content[100:200])
+                            + gzip.compress(content[200:])[:-12])
+
+        with PcapFileSource(compressed) as source:
+            self.assertEqual((source.compression, source.file_format), ("gzip", "pcap"))
+            records = [(frame.timestamp, frame.data) for frame in source]
+        self.assertEqual(records, [(100.0, self.frames[0]), (101.0, self.frames[1])])
+
+        section = pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+        interface = pcapng_block(0x1, struct.pack('<HHI', 1, 0, 65535))
+        enhanced = pcapng_block(0x6, struct.pack('<IIIII', 0, 0, 5_000_000, 60, 60) + self.frames[0])
+        compressed = self.path("capture.pcapng.gz")
+        with open(compressed, 'wb') as gzip_file:
+            gzip_file.write(gzip.compress(section + interface + enhanced))
+        with PcapFileSource(compressed) as source:
+            self.assertEqual(source.file_format, "pcapng")
+            self.assertEqual([(frame.timestamp, frame.data) for frame in source], [(5.0, self.frames[0])])
+
+    def test_invalid_files(self):
+        """Test that empty and unknown files are rejected."""
+        empty = self.path("empty.pcap")
+        open(empty, "wb").close()
+        with self.assertRaises(ValueError):
+            PcapFileSource(empty).open()
+
+        garbage = self.path("garbage.pcap")
+        with open(garbage, "wb") as garbage_file:
+            garbage_file.write(b"not a capture file")
+        with self.assertRaises(ValueError):
+            PcapFileSource(garbage).open()
+
+    def test_non_ethernet_link_types_are_rejected(self):
+        """Test that pcap files and pcapng interfaces of another link type raise an error."""
+        raw_ip = self.path("raw_ip.pcap")
+        with open(raw_ip, "wb") as pcap_file:
+            pcap_file.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 101))
+        with self.assertRaises(ValueError):
+            PcapFileSource(raw_ip).open()
+
+        path = self.path("raw_ip.pcapng")
+        section = pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+        interface = pcapng_block(0x1, struct.pack('<HHI', 101, 0, 65535))
+        with open(path, "wb") as pcapng_file:
+            pcapng_file.write(section + interface)
+        with PcapFileSource(path) as source:
+            with self.assertRaises(ValueError):
+                list(source)
+
+    def test_undefined_interface_is_rejected(self):
+        """Test that a packet block naming an undescribed interface raises an error."""
+        path = self.path("capture.pcapng")
+        section = pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+        interface = pcapng_block(0x1, struct.pack('<HHI', 1, 0, 65535))
+        enhanced = pcapng_block(0x6, struct.pack('<IIIII', 1, 0, 0, 60, 60) + self.frames[0])
+        with open(path, "wb") as pcapng_file:
+            pcapng_file.write(section + interface + enhanced)
+        with PcapFileSource(path) as source:
+            with self.assertRaises(ValueError):
+                list(source)
+
+    def test_iterate_without_open(self):
+        """Test that iterating a closed source raises an error."""
+        with self.assertRaises(ValueError):
+            iter(PcapFileSource(self.path("capture.pcap")))
+
+    def test_read_file_runs_analyzers_and_tracking(self):
+        """Test that recorded traffic flows through PacketCapture into analyzers and tracking."""
+        path = self.path("handshake.pcap")
+        append_pcap(path, [
+            (1.0, build_tcp_frame(flags=0x02)),                                  # SYN
+            (1.1, build_tcp_frame("10.0.0.1", 80, "192.168.1.1", 52800, 0x12)),  # SYN-ACK
+            (1.2, build_tcp_frame(flags=0x10)),                                  # ACK
+            (1.3, build_tcp_frame(flags=0x18, payload=b"GET /")),                # PSH-ACK with data
+        ])
+
+        connection = TCPConnection("192.168.1.1", "10.0.0.1", 52800, 80)
+
+        def track(frame):
+            ethernet = EthernetAnalyzer.analyze_frame(bytes(frame.data))
+            ip_info = IPAnalyzer.analyze_packet(ethernet['payload'])
+            tcp_info = TCPAnalyzer.analyze_segment(ip_info['payload'])
+            is_source = ip_info['src_ip'] == connection.src_ip
+            connection.update_state(tcp_info['flags'], is_source=is_source)
+            connection.update_statistics(len(frame.data), tcp_info['payload_size'], is_source)
+
+        capture = PacketCapture()
+        capture.packet_callback = track
+        self.assertEqual(capture.read_file(path), 4)
+
+        self.assertEqual(capture.packet_count, 4)
+        self.assertEqual(connection.state, "ESTABLISHED")
+        self.assertEqual(connection.packets_sent, 3)
+        self.assertEqual(connection.packets_received, 1)
+        self.assertEqual(connection.payload_bytes_sent, 5)
+
+        # The count limit stops early
+        self.assertEqual(PacketCapture().read_file(path, count=2), 2)
+
+    def test_read_file_streams_output(self):
+        """Test that read_file writes the packets it processes through the streaming writer."""
+        path = self.path("input.pcap")
+        append_pcap(path, [(100.25 + i, frame) for i, frame in enumerate(self.frames)])
+        output = self.path("output.pcap")
+
+        capture = PacketCapture()
+        capture.set_output_file(output, streaming=True)
+        self.assertEqual(capture.read_file(path, count=2), 2)
+        self.assertIsNone(capture.output_writer)
+
+        with PcapFileSource(output) as source:
+            records = [(frame.timestamp, bytes(frame.data)) for frame in source]
+        self.assertEqual(records, [(100.25, self.frames[0]), (101.25, self.frames[1])])
+
+
+if __name__ == '__main__':
+    unittest.main()
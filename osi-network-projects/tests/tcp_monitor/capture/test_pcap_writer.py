@@ -0,0 +1,203 @@
+import errno
+import gzip
+import os
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+from tcp_monitor.capture.compression import ZSTD_AVAILABLE
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.pcap_reader import PcapFileSource
+from tcp_monitor.capture.pcap_writer import (RotatingPcapWriter, append_pcap, pack_record, packet_record,
+                                             PCAP_GLOBAL_HEADER, PCAP_RECORD_HEADER)
+from tests.tcp_monitor.helpers import read_pcap
+
+
+class TestRotatingPcapWriter(unittest.TestCase):
+    """Test suite for the RotatingPcapWriter class."""
+
+    def setUp(self):
+        """Set up a temporary output directory before each test case."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "capture.pcap")
+
+    def tearDown(self):
+        """Remove the temporary output directory."""
+        self.temp_dir.cleanup()
+
+    def test_packet_record_formats(self):
+        """Test extraction of timestamp, bytes and wire length from tuples and Scapy-like packets."""
+        self.assertEqual(packet_record((1.5, b"abc")), (1.5, b"abc", 3))
+        self.assertEqual(packet_record(RawFrame(1.5, b"abc", 1514)), (1.5, b"abc", 1514))
+
+        class FakePacket:
+            time = 2.25
+
+            def __bytes__(self):
+                return b"xyz"
+
+        scapy_packet = FakePacket()
+        self.assertEqual(packet_record(scapy_packet), (2.25, b"xyz", 3))
+        scapy_packet.wirelen = 60
+        self.assertEqual(packet_record(scapy_packet), (2.25, b"xyz", 60))
+
+    def test_pack_record(self):
+        """Test packing of pcap record headers."""
+        header = pack_record(10.000001, b"abcd")
+        self.assertEqual(struct.unpack('<IIII', header), (10, 1, 4, 4))
+        header = pack_record(10.5, b"abcd", wire_length=1500)
+        self.assertEqual(struct.unpack('<IIII', header), (10, 500000, 4, 1500))
+
+    def test_streaming_write(self):
+        """Test that packets are written to a single file without rotation."""
+        writer = RotatingPcapWriter(self.file_path)
+        writer.start()
+        for i in range(5):
+            self.assertTrue(writer.write((100.0 + i, bytes([i]) * 60)))
+        writer.close()
+
+        records = read_pcap(self.file_path)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[3], (103.0, bytes([3]) * 60, 60))
+        self.assertEqual(writer.packets_written, 5)
+        self.assertEqual(writer.files, [self.file_path])
+
+    def test_append_to_existing_file(self):
+        """Test that a second writer appends to an existing non-rotating file."""
+        for _ in range(2):
+            writer = RotatingPcapWriter(self.file_path)
+            writer.start()
+            writer.write((1.0, b"\x00" * 60))
+            writer.close()
+
+        self.assertEqual(len(read_pcap(self.file_path)), 2)
+
+    def test_rotation_by_packet_count_with_retention(self):
+        """Test rotation by packet count and deletion of the oldest files."""
+        writer = RotatingPcapWriter(self.file_path, max_file_packets=2, max_files=2)
+        writer.start()
+        for i in range(7):
+            writer.write((float(i), bytes([i]) * 60))
+        writer.close()
+
+        files = writer.files
+        self.assertEqual(len(files), 2)
+        self.assertTrue(files[-1].endswith("capture_00004.pcap"))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "capture_00001.pcap")))
+        self.assertEqual([r[0] for r in read_pcap(files[0])], [4, 5])
+        self.assertEqual([r[0] for r in read_pcap(files[1])], [6])
+
+    def test_rotation_by_size(self):
+        """Test rotation once the current file reaches the size limit."""
+        writer = RotatingPcapWriter(self.file_path, max_file_size=200)
+        writer.start()
+        for i in range(4):
+            writer.write((float(i), b"\x00" * 100))
+        writer.close()
+
+        self.assertEqual(len(writer.files), 2)
+        self.assertEqual(len(read_pcap(writer.files[0])), 2)
+
+    def test_gzip_output(self):
+        """Test that compressed output is a valid gzip file of a pcap."""
+        path = self.file_path + ".gz"
+        writer = RotatingPcapWriter(path, compression="gzip", block_size=256)
+        writer.start()
+        for i in range(10):
+            writer.write((float(i), bytes([i]) * 60))
+        writer.close()
+
+        with gzip.open(path, 'rb') as compressed, open(self.file_path, 'wb') as plain:
+            plain.write(compressed.read())
+        self.assertEqual([r[0] for r in read_pcap(self.file_path)], list(range(10)))
+        self.assertEqual(writer.compressed_bytes, os.path.getsize(path))
+        self.assertEqual(writer.bytes_written, 24 + 10 * 76)
+
+    @unittest.skipUnless(ZSTD_AVAILABLE, "zstandard is not installed")
+    def test_zstd_output_with_rotation(self):
+        """Test that rotated zstd files keep their extension and read back as pcap."""
+        writer = RotatingPcapWriter(self.file_path + ".zst", max_file_packets=3, compression="zstd")
+        writer.start()
+        for i in range(5):
+            writer.write((float(i), bytes([i]) * 60))
+        writer.close()
+
+        self.assertEqual([os.path.basename(path) for path in writer.files],
+                         ["capture_00001.pcap.zst", "capture_00002.pcap.zst"])
+        timestamps = []
+        for path in writer.files:
+            with PcapFileSource(path) as source:
+                self.assertEqual(source.compression, "zstd")
+                timestamps.extend(frame.timestamp for frame in source)
+        self.assertEqual(timestamps, [0.0, 1.0, 2.0, 3.0, 4.0])
+
+    def test_bounded_batch_drops(self):
+        """Test that packets are dropped instead of queued once the batch is full."""
+        writer = RotatingPcapWriter(self.file_path, batch_size=3)
+        # Not started: nothing drains the pending batch
+        results = [writer.write((0.0, b"\x00")) for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(writer.packets_dropped, 2)
+
+    def test_memoryview_frames_are_copied(self):
+        """Test that ring-buffer views are copied before being queued."""
+        writer = RotatingPcapWriter(self.file_path)
+        ring = bytearray(b"\x01" * 60)
+        writer.write((0.0, memoryview(ring)))
+        ring[:] = b"\x02" * 60
+
+        writer.start()
+        writer.close()
+        self.assertEqual(read_pcap(self.file_path)[0][1], b"\x01" * 60)
+
+    def test_snaplen_truncates_and_keeps_wire_length(self):
+        """Test that records are truncated to the snap length with their original length."""
+        writer = RotatingPcapWriter(self.file_path, snaplen=64)
+        writer.start()
+        writer.write((1.0, b"\x01" * 1500))
+        writer.write(RawFrame(2.0, b"\x02" * 40, 9000))
+        writer.close()
+        append_pcap(self.file_path, [(3.0, b"\x03" * 100)], snaplen=64)
+
+        with open(self.file_path, 'rb') as pcap_file:
+            content = pcap_file.read()
+        self.assertEqual(PCAP_GLOBAL_HEADER.unpack_from(content, 0)[5], 64)
+        offset = PCAP_GLOBAL_HEADER.size
+        lengths = []
+        while offset < len(content):
+            _, _, captured, wire = PCAP_RECORD_HEADER.unpack_from(content, offset)
+            lengths.append((captured, wire))
+            offset += PCAP_RECORD_HEADER.size + captured
+        self.assertEqual(lengths, [(64, 1500), (40, 9000), (64, 100)])
+
+    def test_invalid_limits(self):
+        """Test validation of rotation limits."""
+        with self.assertRaises(ValueError):
+            RotatingPcapWriter("")
+        with self.assertRaises(ValueError):
+            RotatingPcapWriter(self.file_path, max_files=0)
+        with self.assertRaises(ValueError):
+            RotatingPcapWriter(self.file_path, compression="gzip", compression_level=0)
+        # Retention only applies to rotated files
+        with self.assertRaises(ValueError):
+            RotatingPcapWriter(self.file_path, max_files=3)
+
+    def test_write_errors_are_raised(self):
+        """Test that an error on the writer thread is raised by write and close instead of lost."""
+        writer = RotatingPcapWriter(self.file_path)
+        disk_full = OSError(errno.ENOSPC, "No space left on device")
+        with patch.object(writer, '_write_batch', side_effect=disk_full):
+            writer.start()
+            writer.write((1.0, b"\x01" * 60))
+            writer._thread.join(timeout=5)
+
+        self.assertIs(writer.error, disk_full)
+        with self.assertRaises(OSError):
+            writer.write((2.0, b"\x02" * 60))
+        with self.assertRaises(OSError):
+            writer.close()
+        self.assertEqual(writer.packets_written, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import threading
+import unittest
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.pipeline import PacketPipeline
+from tcp_monitor.capture.statistics import CaptureStatistics
+
+
+class TestPacketPipeline(unittest.TestCase):
+    """Test suite for the PacketPipeline class."""
+
+    def setUp(self):
+        """Set up a callback that can be held until the test releases it."""
+        self.processed = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+        def slow_callback(packet):
+            self.started.set()
+            self.release.wait(timeout=5)
+            self.processed.append(packet)
+
+        self.slow_callback = slow_callback
+
+    def test_processes_all_packets(self):
+        """Test that every submitted packet reaches the callback."""
+        pipeline = PacketPipeline(self.processed.append, workers=2, queue_size=100)
+        pipeline.start()
+        for i in range(50):
+            self.assertTrue(pipeline.submit(i))
+        pipeline.stop()
+
+        self.assertEqual(sorted(self.processed), list(range(50)))
+        self.assertEqual(pipeline.processed_packets, 50)
+        self.assertEqual(pipeline.dropped_packets, 0)
+        self.assertEqual(pipeline.queue_depth, 0)
+        self.assertEqual(pipeline.callback_latency['count'], 50)
+        self.assertGreaterEqual(pipeline.callback_latency['max'],
+                                pipeline.callback_latency['average'])
+
+    def test_drop_newest(self):
+        """Test that incoming packets are discarded when the queue is full."""
+        pipeline = PacketPipeline(self.slow_callback, queue_size=2, overflow_policy='drop-newest')
+        pipeline.start()
+        pipeline.submit(0)
+        self.started.wait(timeout=5)  # the worker now holds packet 0
+
+        results = [pipeline.submit(i) for i in range(1, 5)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(pipeline.queue_depth, 2)
+        self.assertEqual(pipeline.max_queue_depth, 2)
+
+        self.release.set()
+        pipeline.stop()
+        self.assertEqual(self.processed, [0, 1, 2])
+        self.assertEqual(pipeline.dropped_packets, 2)
+
+    def test_drop_oldest(self):
+        """Test that the oldest queued packets are discarded when the queue is full."""
+        pipeline = PacketPipeline(self.slow_callback, queue_size=2, overflow_policy='drop-oldest')
+        pipeline.start()
+        pipeline.submit(0)
+        self.started.wait(timeout=5)
+
+        for i in range(1, 5):
+            self.assertTrue(pipeline.submit(i))
+
+        self.release.set()
+        pipeline.stop()
+        self.assertEqual(self.processed, [0, 3, 4])
+        self.assertEqual(pipeline.dropped_packets, 2)
+
+    def test_stop_without_drain(self):
+        """Test that queued packets are discarded and counted when not draining."""
+        pipeline = PacketPipeline(self.slow_callback, queue_size=10)
+        pipeline.start()
+        pipeline.submit(0)
+        self.started.wait(timeout=5)
+        for i in range(1, 4):
+            pipeline.submit(i)
+
+        self.release.set()
+        pipeline.stop(drain=False)
+        self.assertEqual(pipeline.dropped_packets + pipeline.processed_packets, 4)
+
+    def test_callback_errors_are_counted(self):
+        """Test that a failing callback does not stop the worker."""
+        def failing_callback(packet):
+            if packet % 2:
+                raise RuntimeError("analysis failed")
+            self.processed.append(packet)
+
+        pipeline = PacketPipeline(failing_callback)
+        pipeline.start()
+        for i in range(4):
+            pipeline.submit(i)
+        pipeline.stop()
+
+        self.assertEqual(self.processed, [0, 2])
+        self.assertEqual(pipeline.callback_errors, 2)
+
+    def test_memoryview_frames_are_copied(self):
+        """Test that frames referencing a capture buffer are copied before queueing."""
+        pipeline = PacketPipeline(self.processed.append)
+        buffer = bytearray(b"\x01" * 60)
+        pipeline.submit(RawFrame(1.0, memoryview(buffer)))
+        buffer[:] = b"\x02" * 60
+
+        pipeline.start()
+        pipeline.stop()
+        self.assertEqual(self.processed[0].data, b"\x01" * 60)
+
+    def test_statistics_receive_callback_latency(self):
+        """Test that a statistics collector records every worker callback."""
+        statistics = CaptureStatistics()
+        pipeline = PacketPipeline(self.processed.append, workers=2, statistics=statistics)
+        pipeline.start()
+        for i in range(10):
+            pipeline.submit(i)
+        pipeline.stop()
+        self.assertEqual(statistics.callback_latency.count, 10)
+
+    def test_invalid_settings(self):
+        """Test validation of the pipeline settings."""
+        with self.assertRaises(ValueError):
+            PacketPipeline(print, workers=0)
+        with self.assertRaises(ValueError):
+            PacketPipeline(print, queue_size=0)
+        with self.assertRaises(ValueError):
+            PacketPipeline(print, overflow_policy='drop-random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import socket
+import struct
+import unittest
+from unittest.mock import ANY, Mock, patch
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.bpf_filter import SO_ATTACH_FILTER
+from tcp_monitor.capture.raw_socket import (RawSocketSniffer, ETH_P_ALL, PACKET_AUXDATA, SOL_PACKET,
+                                            TPACKET_AUXDATA)
+
+
+class TestRawSocketSniffer(unittest.TestCase):
+    """Test suite for the RawSocketSniffer class.
+
+    The AF_PACKET socket is mocked so the tests run without privileges.
+    """
+
+    def setUp(self):
+        """Set up a mocked raw socket returning a few frames."""
+        self.frames = [b"\x00" * 60, b"\x01" * 60, b"\x02" * 60]
+        self.mock_socket = Mock()
+        self.mock_socket.recv.side_effect = self.frames + [socket.timeout()] * 1000
+        self.mock_socket.getsockopt.return_value = struct.pack('II', 3, 1)
+
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_capture_delivers_raw_frames(self, mock_socket_class):
+        """Test that frames are delivered to the callback as RawFrame tuples."""
+        mock_socket_class.return_value = self.mock_socket
+        callback = Mock()
+
+        sniffer = RawSocketSniffer(iface="eth0", prn=callback, count=3, store=True)
+        sniffer.start()
+        sniffer.join(timeout=5)
+
+        # No protocol until bound, so frames from other interfaces are never queued
+        mock_socket_class.assert_called_once_with(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        self.mock_socket.bind.assert_called_once_with(("eth0", socket.htons(ETH_P_ALL)))
+        self.assertEqual(callback.call_count, 3)
+
+        frame = callback.call_args_list[1][0][0]
+        self.assertIsInstance(frame, RawFrame)
+        self.assertEqual(frame.data, self.frames[1])
+        self.assertIsInstance(frame.timestamp, float)
+
+        self.assertEqual([f.data for f in sniffer.results], self.frames)
+        self.assertFalse(sniffer.running)
+        self.mock_socket.close.assert_called_once()
+
+        # Kernel counters were read once when the socket closed
+        self.assertEqual(sniffer.kernel_statistics(),
+                         {'packets': 3, 'drops': 1, 'freeze_queue_count': 0})
+
+    @patch('scapy.arch.linux.attach_filter')
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_filter_is_attached(self, mock_socket_class, mock_attach_filter):
+        """Test that the BPF filter is attached to the socket before capturing."""
+        mock_socket_class.return_value = self.mock_socket
+
+        sniffer = RawSocketSniffer(iface="eth0", filter="(tcp) and port 80", count=1)
+        sniffer.start()
+        sniffer.join(timeout=5)
+
+        mock_attach_filter.assert_called_once_with(self.mock_socket, "(tcp) and port 80", "eth0")
+        # Nothing is stored unless requested
+        self.assertEqual(sniffer.results, [])
+
+    @patch('scapy.arch.linux.attach_filter')
+    def test_set_filter(self, mock_attach_filter):
+        """Test that the filter of an open socket is replaced in place."""
+        sniffer = RawSocketSniffer(iface="eth0", filter="tcp")
+        with self.assertRaises(ValueError):
+            sniffer.set_filter("tcp port 443")
+
+        sniffer._socket = self.mock_socket
+        sniffer.set_filter("tcp port 443")
+        mock_attach_filter.assert_called_once_with(self.mock_socket, "tcp port 443", "eth0")
+        self.assertEqual(sniffer.filter, "tcp port 443")
+        self.mock_socket.close.assert_not_called()
+
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_snaplen_uses_kernel_truncation(self, mock_socket_class):
+        """Test that a snap length attaches a truncating filter and reports wire lengths."""
+        mock_socket_class.return_value = self.mock_socket
+        auxdata = TPACKET_AUXDATA.pack(0, 1514, 96, 0, 0, 0, 0)
+        self.mock_socket.recvmsg.side_effect = [(b"\x00" * 96, [(SOL_PACKET, PACKET_AUXDATA, auxdata)], 0, None),
+                                                (b"\x01" * 60, [], 0, None)]
+        callback = Mock()
+
+        sniffer = RawSocketSniffer(iface="eth0", prn=callback, count=2, snaplen=96)
+        sniffer.start()
+        sniffer.join(timeout=5)
+
+        self.mock_socket.setsockopt.assert_any_call(socket.SOL_SOCKET, SO_ATTACH_FILTER, ANY)
+        self.mock_socket.setsockopt.assert_any_call(SOL_PACKET, PACKET_AUXDATA, 1)
+        self.assertEqual(self.mock_socket.recvmsg.call_args[0][0], 96)
+        frames = [call[0][0] for call in callback.call_args_list]
+        self.assertEqual([(len(f.data), f.wire_length) for f in frames], [(96, 1514), (60, None)])
+
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_stop(self, mock_socket_class):
+        """Test that stop() ends an unbounded capture."""
+        mock_socket_class.return_value = self.mock_socket
+        self.mock_socket.recv.side_effect = lambda size: (_ for _ in ()).throw(socket.timeout())
+
+        sniffer = RawSocketSniffer(iface="eth0")
+        sniffer.start()
+        self.assertTrue(sniffer.running)
+        sniffer.stop()
+
+        self.assertFalse(sniffer.running)
+        self.mock_socket.close.assert_called_once()
+
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_receive_error_is_raised_by_stop(self, mock_socket_class):
+        """Test that a receive error ends the capture and is raised by stop()."""
+        mock_socket_class.return_value = self.mock_socket
+        network_down = OSError(100, "Network is down")
+        self.mock_socket.recv.side_effect = [self.frames[0], network_down]
+        callback = Mock()
+
+        sniffer = RawSocketSniffer(iface="eth0", prn=callback)
+        sniffer.start()
+        sniffer.join(timeout=5)
+        self.assertFalse(sniffer.running)
+        self.assertIs(sniffer.error, network_down)
+        with self.assertRaises(OSError):
+            sniffer.stop()
+        self.assertEqual(callback.call_count, 1)
+
+    @patch('tcp_monitor.capture.raw_socket.socket.socket')
+    def test_open_failure_closes_socket(self, mock_socket_class):
+        """Test that the socket is closed if binding fails."""
+        mock_socket_class.return_value = self.mock_socket
+        self.mock_socket.bind.side_effect = OSError("No such device")
+
+        sniffer = RawSocketSniffer(iface="missing0")
+        with self.assertRaises(OSError):
+            sniffer.start()
+        self.mock_socket.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.sampling import PacketSampler
+from tests.tcp_monitor.helpers import build_tcp_frame
+
+
+class TestPacketSampler(unittest.TestCase):
+    """Test suite for the PacketSampler class."""
+
+    def setUp(self):
+        """Build frames for 200 distinct flows."""
+        self.flows = [build_tcp_frame("10.0.0.1", 1024 + i, "10.0.0.2", 80) for i in range(200)]
+
+    def test_packet_sampling(self):
+        """Test that one packet in N is kept and weighted by N."""
+        sampler = PacketSampler(5)
+        kept = [sampler.sample(RawFrame(0.0, b"\x00" * 60)) for _ in range(20)]
+
+        self.assertEqual(kept.count(True), 4)
+        self.assertEqual(sampler.packets_seen, 20)
+        self.assertEqual(sampler.packets_sampled, 4)
+        self.assertEqual(sampler.packet_weight, 5)
+
+    def test_no_sampling(self):
+        """Test that a rate of 1 keeps every packet."""
+        sampler = PacketSampler()
+        self.assertTrue(all(sampler.sample(frame) for frame in self.flows))
+
+    def test_flow_sampling_keeps_whole_flows(self):
+        """Test that flow sampling keeps both directions of a flow together."""
+        sampler = PacketSampler(4, mode='flow')
+        kept = [sampler.sample(RawFrame(0.0, frame)) for frame in self.flows]
+        self.assertTrue(0 < kept.count(True) < len(self.flows))
+        self.assertEqual(sampler.packet_weight, 1)
+
+        for index in range(20):
+            reply = build_tcp_frame("10.0.0.2", 80, "10.0.0.1", 1024 + index)
+            self.assertEqual(sampler.sample(reply), kept[index])
+            self.assertEqual(sampler.sample(self.flows[index]), kept[index])
+
+    def test_higher_flow_rate_keeps_a_subset(self):
+        """Test that the flows kept at a higher rate were also kept at the lower rate."""
+        low, high = PacketSampler(2, mode='flow'), PacketSampler(8, mode='flow')
+        for frame in self.flows:
+            if high.sample(frame):
+                self.assertTrue(low.sample(frame))
+
+    def test_adaptive_rate(self):
+        """Test that the rate follows queue pressure within its bounds."""
+        sampler = PacketSampler(2, adaptive=True, max_rate=8, adapt_interval=1)
+        for expected in (4, 8, 8):
+            sampler.sample(b"")
+            self.assertEqual(sampler.adapt(90, 100), expected)
+        sampler.sample(b"")
+        self.assertEqual(sampler.adapt(50, 100), 8)
+        for expected in (4, 2, 2):
+            sampler.sample(b"")
+            self.assertEqual(sampler.adapt(0, 100), expected)
+        self.assertEqual(sampler.rate_changes, 4)
+        self.assertEqual(sampler.snapshot()['rate'], 2)
+
+    def test_adaptation_interval(self):
+        """Test that the queue is only checked once per interval."""
+        sampler = PacketSampler(1, adaptive=True, adapt_interval=10)
+        sampler.sample(b"")
+        self.assertEqual(sampler.adapt(100, 100), 1)
+        for _ in range(9):
+            sampler.sample(b"")
+        self.assertEqual(sampler.adapt(100, 100), 2)
+
+    def test_non_adaptive_rate_is_fixed(self):
+        """Test that adapt does nothing without adaptive sampling."""
+        sampler = PacketSampler(4, adapt_interval=1)
+        sampler.sample(b"")
+        self.assertEqual(sampler.adapt(100, 100), 4)
+
+    def test_invalid_settings(self):
+        """Test validation of the sampler settings."""
+        with self.assertRaises(ValueError):
+            PacketSampler(0)
+        with self.assertRaises(ValueError):
+            PacketSampler(2, mode='random')
+        with self.assertRaises(ValueError):
+            PacketSampler(8, adaptive=True, max_rate=4)
+        with self.assertRaises(ValueError):
+            PacketSampler(2, low_watermark=0.9, high_watermark=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
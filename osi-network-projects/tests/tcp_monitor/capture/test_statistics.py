@@ -0,0 +1,125 @@
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from scapy.layers.l2 import Ether
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.statistics import (CaptureStatistics, LatencyHistogram, RateCounter,
+                                            StatisticsReporter, format_statistics, packet_length)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test suite for the LatencyHistogram class."""
+
+    def test_buckets_and_percentiles(self):
+        """Test that durations land in power-of-two microsecond buckets."""
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.record(0.000_003)  # 3us -> bucket 2 (<4us)
+        for _ in range(10):
+            histogram.record(0.001)  # 1000us -> bucket 10 (<1024us)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.buckets[2], 90)
+        self.assertEqual(histogram.buckets[10], 10)
+        self.assertEqual(histogram.percentile(0.5), 0.000_004)
+        self.assertEqual(histogram.percentile(0.99), 0.001)  # capped at the maximum
+        summary = histogram.summary()
+        self.assertAlmostEqual(summary['average'], (90 * 0.000_003 + 10 * 0.001) / 100)
+        self.assertEqual(summary['max'], 0.001)
+
+    def test_overflow_bucket(self):
+        """Test that very long durations go to the last bucket."""
+        histogram = LatencyHistogram()
+        histogram.record(3600.0)
+        self.assertEqual(histogram.buckets[-1], 1)
+
+    def test_empty(self):
+        """Test the summary of an empty histogram."""
+        self.assertEqual(LatencyHistogram().summary()['p99'], 0.0)
+
+
+class TestRateCounter(unittest.TestCase):
+    """Test suite for the RateCounter class."""
+
+    def test_sliding_windows(self):
+        """Test packet and bit rates over complete seconds."""
+        counter = RateCounter(windows=(1, 10))
+        for second in range(100, 110):
+            for _ in range(5):
+                counter.add(100, second + 0.5)
+        counter.add(100, 110.2)  # the current, incomplete second is excluded
+
+        rates = counter.rates(110.5)
+        self.assertEqual(rates[1], {'pps': 5.0, 'bps': 4000.0})
+        self.assertEqual(rates[10], {'pps': 5.0, 'bps': 4000.0})
+
+    def test_stale_buckets_are_ignored(self):
+        """Test that buckets from earlier laps of the ring do not count."""
+        counter = RateCounter(windows=(10,))
+        counter.add(1000, 100.0)
+        self.assertEqual(counter.rates(200.0)[10]['pps'], 0.0)
+        counter.add(1000, 111.0)  # reuses the slot of second 100
+        self.assertEqual(counter.rates(112.0)[10]['pps'], 0.1)
+
+
+class TestCaptureStatistics(unittest.TestCase):
+    """Test suite for the CaptureStatistics class and reporting helpers."""
+
+    def test_snapshot(self):
+        """Test that packets, callbacks and stages are summarised."""
+        statistics = CaptureStatistics()
+        statistics.record_packet(60, now=50.5)
+        statistics.record_packet(1500, now=50.7)
+        statistics.record_callback(0.000_010)
+        with statistics.time_stage('decode'):
+            pass
+        statistics.record_stage('custom', 0.5)
+
+        snapshot = statistics.snapshot(now=51.0)
+        self.assertEqual(snapshot['packets'], 2)
+        self.assertEqual(snapshot['bytes'], 1560)
+        self.assertEqual(snapshot['rates'][1], {'pps': 2.0, 'bps': 12480.0})
+        self.assertEqual(snapshot['callback_latency']['count'], 1)
+        self.assertEqual(snapshot['stages']['decode']['count'], 1)
+        self.assertEqual(snapshot['stages']['filter']['count'], 0)
+        self.assertEqual(snapshot['stages']['custom']['max'], 0.5)
+
+        line = format_statistics(dict(snapshot, kernel={'packets': 3, 'drops': 1}, queue_depth=0, dropped=0))
+        self.assertIn("packets=2", line)
+        self.assertIn("kernel_dropped=1", line)
+        self.assertIn("decode_avg=", line)
+
+    def test_packet_length(self):
+        """Test packet lengths for raw frames and Scapy packets."""
+        self.assertEqual(packet_length(RawFrame(1.0, b"\x00" * 60)), 60)
+        self.assertEqual(packet_length(Mock(wirelen=1514)), 1514)
+        self.assertEqual(packet_length(Mock()), 0)
+
+        # Dissected packets are measured by their original bytes, without being rebuilt
+        packet = Ether(b"\x00" * 60)
+        with patch.object(Ether, 'build', side_effect=AssertionError("packet was serialised")):
+            self.assertEqual(packet_length(packet), 60)
+
+    def test_reporter(self):
+        """Test that the reporter delivers statistics periodically until stopped."""
+        reports = []
+        reported = threading.Event()
+        capture = Mock()
+        capture.get_statistics.return_value = {'packets': 1}
+
+        def report(statistics):
+            reports.append(statistics)
+            reported.set()
+
+        reporter = StatisticsReporter(capture, interval=0.01, report=report)
+        reporter.start()
+        self.assertTrue(reported.wait(timeout=5))
+        reporter.stop()
+        self.assertEqual(reports[0], {'packets': 1})
+
+        with self.assertRaises(ValueError):
+            StatisticsReporter(capture, interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
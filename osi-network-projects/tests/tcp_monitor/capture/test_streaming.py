@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.capture.packet_capture import PacketCapture
+from tcp_monitor.capture.pcap_writer import append_pcap
+
+
+class TestPacketStream(unittest.TestCase):
+    """Test suite for the PacketStream class."""
+
+    def setUp(self):
+        """Set up a capture and a temporary pcap file with ten frames."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "capture.pcap")
+        append_pcap(self.file_path, [(float(i), bytes([i]) * 60) for i in range(10)])
+        self.capture = PacketCapture()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def test_offline_stream(self):
+        """Test iterating over a recorded file, alongside the packet callback."""
+        self.capture.packet_callback = Mock()
+
+        async def consume():
+            return [packet async for packet in self.capture.stream(self.file_path, max_queue=2)]
+
+        packets = asyncio.run(consume())
+        self.assertEqual([packet.timestamp for packet in packets], [float(i) for i in range(10)])
+        self.assertEqual(packets[3].data, b"\x03" * 60)
+        self.assertIsInstance(packets[3].data, bytes)
+        self.assertEqual(self.capture.packet_callback.call_count, 10)
+        self.assertIsNone(self.capture._stream)
+
+    def test_count_limit_stops_reading(self):
+        """Test that the stream ends after `count` packets and stops the reader."""
+        async def consume():
+            stream = self.capture.stream(self.file_path, count=3, max_queue=1)
+            packets = [packet async for packet in stream]
+            return packets, stream
+
+        packets, stream = asyncio.run(consume())
+        self.assertEqual(len(packets), 3)
+        self.assertLess(self.capture.packet_count, 10)
+        self.assertFalse(stream._reader.is_alive())
+
+    def test_invalid_file_raises(self):
+        """Test that a reader error is raised in the consumer."""
+        garbage = os.path.join(self.temp_dir.name, "garbage.pcap")
+        with open(garbage, "wb") as garbage_file:
+            garbage_file.write(b"not a capture file")
+
+        async def consume():
+            async for _ in self.capture.stream(garbage):
+                pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(consume())
+
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_live_stream_with_backpressure(self, mock_async_sniffer):
+        """Test that a live stream blocks the capture thread while its queue is full."""
+        self.capture.interface = "eth0"
+        produced = []
+
+        def sniff():
+            for i in range(5):
+                self.capture._process_packet(RawFrame(float(i), b"\x00" * 60))
+                produced.append(i)
+
+        async def consume():
+            async with self.capture.stream(max_queue=2) as stream:
+                # The first iteration starts the capture
+                first = asyncio.ensure_future(stream.__anext__())
+                while not self.capture.is_running:
+                    await asyncio.sleep(0.001)
+                sniffer = threading.Thread(target=sniff)
+                sniffer.start()
+                await asyncio.sleep(0.05)
+                # The pending iteration takes the first packet, two more fill the
+                # queue, and the capture thread waits for a slot with the fourth
+                self.assertEqual(len(produced), 3)
+                received = [await first]
+                while len(received) < 4:
+                    received.append(await stream.__anext__())
+            sniffer.join()
+            return received
+
+        received = asyncio.run(consume())
+        self.assertEqual([packet.timestamp for packet in received], [0.0, 1.0, 2.0, 3.0])
+        mock_async_sniffer.return_value.stop.assert_called_once()
+        self.assertFalse(self.capture.is_running)
+        self.assertIsNone(self.capture._stream)
+
+    @patch('tcp_monitor.capture.packet_capture.AsyncSniffer')
+    def test_duration_limit(self, mock_async_sniffer):
+        """Test that a live stream ends once its duration has elapsed."""
+        self.capture.interface = "eth0"
+
+        async def consume():
+            return [packet async for packet in self.capture.stream(duration=0.05)]
+
+        self.assertEqual(asyncio.run(consume()), [])
+        self.assertEqual(mock_async_sniffer.call_args.kwargs['timeout'], 0.05)
+        self.assertFalse(self.capture.is_running)
+
+    def test_live_stream_requires_interface(self):
+        """Test that starting a live stream without an interface fails."""
+        async def consume():
+            async for _ in self.capture.stream():
+                pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(consume())
+        self.assertIsNone(self.capture._stream)
+        with self.assertRaises(ValueError):
+            self.capture.stream(max_queue=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import struct
+from tcp_monitor.analyzers.tcp_analyzer import TCP_ACK
+from tcp_monitor.capture.pcap_writer import PCAP_GLOBAL_HEADER, PCAP_MAGIC, PCAP_RECORD_HEADER
+
+# Destination and source MAC addresses of every test frame
+ETHERNET = bytes.fromhex('0242ac110002' '0242ac110003')
+IPV6_SRC = bytes.fromhex('20010db8' + '00' * 11 + '01')
+IPV6_DST = bytes.fromhex('20010db8' + '00' * 11 + '02')
+
+
+def tcp_segment(src_port=52800, dst_port=80, flags=TCP_ACK, payload=b"", options=b"", checksum=0):
+    """Helper building a TCP segment with sequence number 1000 and acknowledgment number 2000."""
+    offset = (20 + len(options)) // 4
+    return struct.pack('!HHIIBBHHH', src_port, dst_port, 1000, 2000, offset << 4, flags, 8192, checksum, 0) \
+        + options + payload
+
+
+def ipv4_packet(segment, src_ip="192.168.1.1", dst_ip="10.0.0.1", protocol=6, flags=0x4000, identification=1):
+    """Helper building an IPv4 packet; `flags` holds the flags and fragment offset field."""
+    return struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(segment), identification, flags, 64, protocol, 0,
+                       bytes(map(int, src_ip.split("."))), bytes(map(int, dst_ip.split(".")))) + segment
+
+
+def ipv4_frame(segment, src_ip="192.168.1.1", dst_ip="10.0.0.1", protocol=6, flags=0x4000, vlan=None):
+    """Helper building an Ethernet/IPv4 frame, 802.1Q tagged if a VLAN tag control field is given."""
+    tag = struct.pack('!HH', 0x8100, vlan) if vlan is not None else b""
+    return ETHERNET + tag + b"\x08\x00" + ipv4_packet(segment, src_ip, dst_ip, protocol, flags)
+
+
+def ipv6_frame(segment, extension_headers=b"", next_header=6):
+    """Helper building an Ethernet/IPv6 frame from 2001:db8::1 to 2001:db8::2."""
+    segment = extension_headers + segment
+    header = struct.pack('!IHBB', 0x60000000, len(segment), next_header, 32) + IPV6_SRC + IPV6_DST
+    return ETHERNET + b"\x86\xdd" + header + segment
+
+
+def build_tcp_frame(src_ip="192.168.1.1", src_port=52800, dst_ip="10.0.0.1", dst_port=80,
+                    flags=TCP_ACK, payload=b"", vlan=None):
+    """Helper building an Ethernet/IPv4/TCP frame between two endpoints."""
+    return ipv4_frame(tcp_segment(src_port, dst_port, flags, payload), src_ip, dst_ip, vlan=vlan)
+
+
+def read_pcap(path):
+    """Helper returning the list of (timestamp, data, wire length) records in a pcap file."""
+    with open(path, 'rb') as pcap_file:
+        content = pcap_file.read()
+    assert PCAP_GLOBAL_HEADER.unpack_from(content, 0)[0] == PCAP_MAGIC
+    offset = PCAP_GLOBAL_HEADER.size
+    records = []
+    while offset < len(content):
+        seconds, microseconds, captured, wire = PCAP_RECORD_HEADER.unpack_from(content, offset)
+        offset += PCAP_RECORD_HEADER.size
+        records.append((seconds + microseconds / 1_000_000, content[offset:offset + captured], wire))
+        offset += captured
+    return records
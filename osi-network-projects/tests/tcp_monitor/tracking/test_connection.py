@@ -212,6 +212,15 @@ class TestTCPConnection(unittest.TestCase):
         self.assertEqual(self.connection.payload_bytes_sent, 1400)
         self.assertEqual(self.connection.payload_bytes_received, 1400)
 
+    def test_update_statistics_with_sampling_rate(self):
+        """Test that sampled packets are scaled up by the sampling rate."""
+        self.connection.update_statistics(packet_size=100, payload_size=40, is_source=True, sampling_rate=8)
+
+        self.assertEqual(self.connection.packets_sent, 8)
+        self.assertEqual(self.connection.bytes_sent, 800)
+        self.assertEqual(self.connection.payload_bytes_sent, 320)
+        self.assertEqual(self.connection.to_dict()['sampling_rate'], 8)
+
     def test_update_sequence_numbers(self):
         """Test updating TCP sequence and acknowledgment numbers."""
         # Initialize sequence numbers
@@ -0,0 +1,207 @@
+import multiprocessing
+import struct
+import threading
+import unittest
+from unittest.mock import patch
+from tcp_monitor.capture.frame import RawFrame
+from tcp_monitor.tracking.sharding import SharedFrameRing, ShardedConnectionTracker, flow_hash
+from tcp_monitor.tracking.tracker import ConnectionTracker
+from tests.tcp_monitor.helpers import build_tcp_frame, ipv4_frame, ipv6_frame, tcp_segment
+
+
+class TestFlowHash(unittest.TestCase):
+    """Test suite for the flow_hash function."""
+
+    def test_hash_is_symmetric(self):
+        """Test that both directions of a flow hash to the same value."""
+        forward = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x02)
+        backward = build_tcp_frame("10.0.0.1", 80, "192.168.1.1", 52800, 0x12, b"data")
+        self.assertEqual(flow_hash(forward), flow_hash(backward))
+        self.assertEqual(flow_hash(forward), flow_hash(memoryview(forward)))
+
+    def test_different_flows_differ(self):
+        """Test that changing a port changes the hash."""
+        first = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x02)
+        second = build_tcp_frame("192.168.1.1", 52801, "10.0.0.1", 80, 0x02)
+        self.assertNotEqual(flow_hash(first), flow_hash(second))
+
+    def test_fragments_hash_together(self):
+        """Test that all fragments of a datagram hash to the same value, whatever their ports."""
+        first = ipv4_frame(tcp_segment(52800, 80, payload=b"x" * 16), "192.168.1.1", "10.0.0.1", flags=0x2000)
+        last = ipv4_frame(b"y" * 16, "192.168.1.1", "10.0.0.1", flags=0x0004)
+        other_ports = ipv4_frame(tcp_segment(52801, 81), "10.0.0.1", "192.168.1.1", flags=0x2000)
+        self.assertEqual(flow_hash(first), flow_hash(last))
+        self.assertEqual(flow_hash(first), flow_hash(other_ports))
+
+    def test_ipv6_extension_headers(self):
+        """Test that IPv6 frames hash by the ports after their extension headers."""
+        segment = tcp_segment(40000, 443)
+        options = bytes([6, 0]) + b"\x01\x04\x00\x00\x00\x00"
+        self.assertEqual(flow_hash(ipv6_frame(segment, options, next_header=60)), flow_hash(ipv6_frame(segment)))
+        self.assertNotEqual(flow_hash(ipv6_frame(segment, options, next_header=60)),
+                            flow_hash(ipv6_frame(tcp_segment(40001, 443), options, next_header=60)))
+
+        first = ipv6_frame(segment, struct.pack('!BBHI', 6, 0, 0x0001, 7), next_header=44)
+        last = ipv6_frame(b"y" * 16, struct.pack('!BBHI', 6, 0, 0x0010, 7), next_header=44)
+        self.assertEqual(flow_hash(first), flow_hash(last))
+
+    def test_non_ip_frames(self):
+        """Test that non-IP and truncated frames still hash."""
+        self.assertIsInstance(flow_hash(b"\xff" * 6 + b"\x02" * 6 + b"\x08\x06" + b"\x00" * 28), int)
+        self.assertIsInstance(flow_hash(b"\x00" * 4), int)
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    """Test suite for the SharedFrameRing class."""
+
+    def setUp(self):
+        """Create a small ring."""
+        self.ring = SharedFrameRing.create(256)
+
+    def tearDown(self):
+        """Free the ring."""
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_put_and_get(self):
+        """Test that frames come out in order with their timestamps."""
+        self.assertIsNone(self.ring.get())
+        self.assertTrue(self.ring.put(1.5, b"first"))
+        self.assertTrue(self.ring.put(2.5, b"second", 1500))
+        self.assertEqual(self.ring.get(), (1.5, b"first", 5))
+        self.assertEqual(self.ring.get(), (2.5, b"second", 1500))
+        self.assertIsNone(self.ring.get())
+        self.assertEqual(len(self.ring), 0)
+
+    def test_full_ring_rejects_frames(self):
+        """Test that put fails instead of overwriting unread frames."""
+        frame = b"x" * 100
+        self.assertTrue(self.ring.put(1.0, frame))
+        self.assertTrue(self.ring.put(2.0, frame))
+        self.assertFalse(self.ring.put(3.0, frame))
+        self.ring.get()
+        self.assertTrue(self.ring.put(3.0, frame))
+
+    def test_wrap_around(self):
+        """Test that records continue at the start of the buffer once the end is reached."""
+        for index in range(20):
+            frame = bytes([index]) * (40 + index * 3)
+            self.assertTrue(self.ring.put(float(index), frame))
+            self.assertEqual(self.ring.get(), (float(index), frame, len(frame)))
+
+    def test_attach_from_name(self):
+        """Test that a second handle sees frames written through the first."""
+        other = SharedFrameRing.attach(self.ring.name, self.ring.capacity)
+        self.ring.put(1.0, b"shared")
+        self.assertEqual(other.get(), (1.0, b"shared", 6))
+        other.close()
+
+    def test_invalid_capacity(self):
+        """Test that a ring too small for a record is rejected."""
+        with self.assertRaises(ValueError):
+            SharedFrameRing.create(8)
+
+
+class TestShardedConnectionTracker(unittest.TestCase):
+    """Test suite for the ShardedConnectionTracker class."""
+
+    def test_connections_are_merged_across_shards(self):
+        """Test that each flow is tracked by one shard and the results are merged."""
+        tracker = ShardedConnectionTracker(shards=2, ring_size=1 << 16)
+        tracker.start()
+        self.assertTrue(tracker.is_running)
+        try:
+            for port in range(50000, 50010):
+                tracker.dispatch(RawFrame(1.0, build_tcp_frame("192.168.1.1", port, "10.0.0.1", 80, 0x02)))
+                tracker.dispatch(RawFrame(1.1, build_tcp_frame("10.0.0.1", 80, "192.168.1.1", port, 0x12)))
+                tracker.dispatch(RawFrame(1.2, build_tcp_frame("192.168.1.1", port, "10.0.0.1", 80, 0x10)))
+        finally:
+            connections = tracker.stop()
+
+        self.assertFalse(tracker.is_running)
+        self.assertEqual(len(connections), 10)
+        for port in range(50000, 50010):
+            connection = connections[f"192.168.1.1:{port}-10.0.0.1:80"]
+            self.assertEqual(connection.state, "ESTABLISHED")
+            self.assertEqual(connection.packets_sent, 2)
+            self.assertEqual(connection.packets_received, 1)
+
+        statistics = tracker.statistics
+        self.assertEqual(sum(statistics['dispatched']), 30)
+        self.assertEqual(statistics['processed'], statistics['dispatched'])
+        self.assertEqual(sum(statistics['dropped']), 0)
+
+    def test_killed_shard_does_not_block_stop(self):
+        """Test that stop returns the other shards' connections when a process dies."""
+        tracker = ShardedConnectionTracker(shards=2, ring_size=1 << 16)
+        tracker.start()
+        try:
+            for port in range(50000, 50010):
+                tracker.dispatch(RawFrame(1.0, build_tcp_frame("192.168.1.1", port, "10.0.0.1", 80, 0x02)))
+            killed = tracker._processes[0]
+            killed.kill()
+            killed.join()
+        finally:
+            connections = tracker.stop()
+
+        statistics = tracker.statistics
+        self.assertEqual(statistics['failed'], [True, False])
+        self.assertEqual(len(connections), statistics['dispatched'][1])
+        self.assertFalse(tracker.is_running)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork',
+                         "the patched tracker only reaches forked analyzer processes")
+    def test_tracking_errors_are_counted(self):
+        """Test that a frame whose tracking raises is counted and the shard still reports."""
+        process_frame = ConnectionTracker.process_frame
+
+        def failing(tracker, frame, timestamp=None, wire_length=None):
+            if len(frame) > 54:
+                raise RuntimeError("tracking failed")
+            return process_frame(tracker, frame, timestamp, wire_length)
+
+        with patch.object(ConnectionTracker, 'process_frame', failing):
+            tracker = ShardedConnectionTracker(shards=1, ring_size=1 << 16)
+            tracker.start()
+        try:
+            tracker.dispatch(RawFrame(1.0, build_tcp_frame("192.168.1.1", 50000, "10.0.0.1", 80, 0x02)))
+            tracker.dispatch(RawFrame(1.1, build_tcp_frame("192.168.1.1", 50001, "10.0.0.1", 80, 0x18, b"x")))
+        finally:
+            connections = tracker.stop()
+
+        self.assertEqual(list(connections), ["192.168.1.1:50000-10.0.0.1:80"])
+        self.assertEqual(tracker.statistics['errors'], [1])
+        self.assertEqual(tracker.statistics['failed'], [False])
+
+    def test_concurrent_dispatch(self):
+        """Test that several capture threads can dispatch into the same rings."""
+        tracker = ShardedConnectionTracker(shards=2, ring_size=1 << 20)
+        tracker.start()
+
+        def dispatch(first_port):
+            for port in range(first_port, first_port + 200):
+                tracker.dispatch(RawFrame(1.0, build_tcp_frame("192.168.1.1", port, "10.0.0.1", 80, 0x02)))
+
+        try:
+            threads = [threading.Thread(target=dispatch, args=(port,)) for port in (10000, 20000, 30000, 40000)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            connections = tracker.stop()
+
+        statistics = tracker.statistics
+        self.assertEqual(sum(statistics['dispatched']), 800)
+        self.assertEqual(statistics['processed'], statistics['dispatched'])
+        self.assertEqual(statistics['errors'], [0, 0])
+        self.assertEqual(len(connections), 800)
+
+    def test_invalid_shard_count(self):
+        """Test that a negative shard count is rejected."""
+        with self.assertRaises(ValueError):
+            ShardedConnectionTracker(shards=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import struct
+import unittest
+from tcp_monitor.analyzers.reassembly import FragmentReassembler
+from tcp_monitor.capture.sampling import PacketSampler
+from tcp_monitor.capture.statistics import CaptureStatistics
+from tcp_monitor.tracking.tracker import ConnectionTracker
+from tests.tcp_monitor.helpers import build_tcp_frame
+
+
+def fragment_frame(frame, offset, size):
+    """Helper cutting an IPv4 fragment out of a frame built by build_tcp_frame."""
+    header = bytearray(frame[14:34])
+    more_fragments = offset + size < len(frame) - 34
+    struct.pack_into('!HHH', header, 2, 20 + size, 7, (0x2000 if more_fragments else 0) | offset // 8)
+    return frame[:14] + bytes(header) + frame[34 + offset:34 + offset + size]
+
+
+class TestConnectionTracker(unittest.TestCase):
+    """Test suite for the ConnectionTracker class."""
+
+    def setUp(self):
+        """Set up a tracker for each test."""
+        self.tracker = ConnectionTracker()
+
+    def test_handshake_in_both_directions(self):
+        """Test that both directions of a flow update the same connection."""
+        self.tracker.process_frame(build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x02), 1.0)
+        self.tracker.process_frame(build_tcp_frame("10.0.0.1", 80, "192.168.1.1", 52800, 0x12), 1.1)
+        connection = self.tracker.process_frame(
+            build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x18, b"hello"), 1.2)
+
+        self.assertEqual(list(self.tracker.connections), ["192.168.1.1:52800-10.0.0.1:80"])
+        self.assertEqual(connection.state, "ESTABLISHED")
+        self.assertEqual(connection.packets_sent, 2)
+        self.assertEqual(connection.packets_received, 1)
+        self.assertEqual(connection.payload_bytes_sent, 5)
+        self.assertEqual(connection.start_time, 1.0)
+        self.assertEqual(connection.last_activity, 1.2)
+        self.assertIs(self.tracker.get_connection("10.0.0.1", 80, "192.168.1.1", 52800), connection)
+        self.assertEqual(self.tracker.get_active_connections(), [connection])
+
+    def test_vlan_tagged_frame(self):
+        """Test that 802.1Q tagged frames are tracked."""
+        self.tracker.process_frame(build_tcp_frame("192.168.1.1", 1234, "10.0.0.1", 443, 0x02, vlan=10))
+        self.assertIsNotNone(self.tracker.get_connection("192.168.1.1", 1234, "10.0.0.1", 443))
+
+    def test_non_tcp_frames_are_ignored(self):
+        """Test that ARP, UDP and truncated frames are counted as ignored."""
+        arp = b"\xff" * 6 + b"\x02" * 6 + b"\x08\x06" + b"\x00" * 28
+        udp = bytearray(build_tcp_frame("192.168.1.1", 53, "10.0.0.1", 53, 0))
+        udp[23] = 17
+        for frame in (arp, bytes(udp), b"\x00" * 10):
+            self.assertIsNone(self.tracker.process_frame(frame))
+
+        self.assertEqual(self.tracker.packets_processed, 3)
+        self.assertEqual(self.tracker.packets_ignored, 3)
+        self.assertEqual(self.tracker.connections, {})
+
+    def test_fragmented_segments(self):
+        """Test that fragments are ignored, or tracked once reassembled with a reassembler."""
+        frame = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x18, b"x" * 100)
+        fragments = [fragment_frame(frame, 0, 64), fragment_frame(frame, 64, 56)]
+        for fragment in fragments:
+            self.assertIsNone(self.tracker.process_frame(fragment, 1.0))
+        self.assertEqual(self.tracker.packets_ignored, 2)
+
+        reassembler = FragmentReassembler()
+        tracker = ConnectionTracker(reassembler=reassembler)
+        self.assertIsNone(tracker.process_frame(fragments[1], 1.0))
+        connection = tracker.process_frame(fragments[0], 1.1)
+        self.assertEqual(connection.payload_bytes_sent, 100)
+        self.assertEqual(connection.bytes_sent, len(frame))
+        self.assertEqual(tracker.packets_ignored, 1)
+        self.assertEqual(reassembler.reassembled, 1)
+
+    def test_fragmented_ipv6_segments(self):
+        """Test that IPv6 fragments are reassembled and tracked."""
+        segment = struct.pack('!HHIIBBHHH', 52800, 80, 1000, 2000, 0x50, 0x18, 8192, 0, 0) + b"x" * 100
+        addresses = bytes.fromhex('20010db8' + '00' * 11 + '01') + bytes.fromhex('20010db8' + '00' * 11 + '02')
+        frames = []
+        for offset, data, more_fragments in ((0, segment[:64], 1), (64, segment[64:], 0)):
+            fragment = struct.pack('!BBHI', 6, 0, offset | more_fragments, 99)
+            ipv6 = struct.pack('!IHBB', 0x60000000, 8 + len(data), 44, 64) + addresses
+            frames.append(b"\x02" * 6 + b"\x04" * 6 + b"\x86\xdd" + ipv6 + fragment + data)
+
+        tracker = ConnectionTracker(reassembler=FragmentReassembler())
+        self.assertIsNone(tracker.process_frame(frames[0], 1.0))
+        connection = tracker.process_frame(frames[1], 1.1)
+        self.assertEqual(connection.payload_bytes_sent, 100)
+        self.assertIsNotNone(tracker.get_connection("2001:db8::1", 52800, "2001:db8::2", 80))
+
+    def test_truncated_frames_keep_wire_lengths(self):
+        """Test that frames cut to their headers are counted with their original sizes."""
+        frame = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x18, b"x" * 1446)
+        connection = self.tracker.process_frame(frame[:54], 1.0, wire_length=len(frame))
+
+        self.assertEqual(connection.bytes_sent, 1500)
+        self.assertEqual(connection.payload_bytes_sent, 1446)
+
+    def test_stage_timing(self):
+        """Test that decode and track times are recorded when a collector is given."""
+        statistics = CaptureStatistics()
+        tracker = ConnectionTracker(statistics=statistics)
+        tracker.process_frame(build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x02))
+        tracker.process_frame(b"\x00" * 10)
+
+        self.assertEqual(statistics.stages['decode'].count, 2)
+        self.assertEqual(statistics.stages['track'].count, 1)
+
+
+    def test_sampled_counts_are_scaled(self):
+        """Test that packet sampling scales counters while flow sampling does not."""
+        frame = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x18, b"x" * 10)
+        tracker = ConnectionTracker(sampler=PacketSampler(4))
+        connection = tracker.process_frame(frame, 1.0)
+        self.assertEqual(connection.packets_sent, 4)
+        self.assertEqual(connection.payload_bytes_sent, 40)
+
+        tracker = ConnectionTracker(sampler=PacketSampler(4, mode='flow'))
+        connection = tracker.process_frame(frame, 1.0)
+        self.assertEqual(connection.packets_sent, 1)
+
+    def test_weight_recorded_at_sampling_time(self):
+        """Test that a frame's own weight takes precedence over the sampler's current rate."""
+        frame = build_tcp_frame("192.168.1.1", 52800, "10.0.0.1", 80, 0x18, b"x" * 10)
+        tracker = ConnectionTracker(sampler=PacketSampler(16))
+        connection = tracker.process_frame(frame, 1.0, weight=2)
+        self.assertEqual(connection.packets_sent, 2)
+        self.assertEqual(connection.payload_bytes_sent, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()